@@ -7,7 +7,6 @@ import streamlit as st
 st.set_page_config(page_title="이삿날 포장이사 견적서", layout="wide", page_icon="🚚")
 
 # 3. Import standard libraries
-import pandas as pd
 from datetime import datetime, date
 import pytz
 import math
@@ -41,6 +40,8 @@ try:
     import ui_tab3
     import mms_utils # ui_tab3에서 사용
     import email_utils # ui_tab3에서 사용
+    import warmup
+    import outbox # 이메일/MMS 발송 대기열
 except ImportError as ie:
     st.error(f"메인 앱: 필수 UI/상태 모듈 로딩 실패 - {ie}.")
     # 실패한 모듈 이름 출력 (디버깅에 도움)
@@ -53,6 +54,14 @@ except Exception as e:
     st.stop()
 
 
+# --- Server warm-up ---
+# 글꼴, Excel 템플릿, Drive 서비스, 견적 인덱스를 프로세스당 한 번 백그라운드에서 준비 (첫 화면은 기다리지 않음)
+warmup.start_warmup()
+
+# --- Outbound message queue ---
+# 이메일/MMS는 대기열에 등록만 하고 작업 스레드가 발송 (이전 프로세스에서 남은 메시지도 이어서 발송)
+outbox.start_workers()
+
 # --- Main Application ---
 
 st.markdown("<h1 style='text-align: center; color: #1E90FF;'>🚚 이삿날 스마트 견적 🚚</h1>", unsafe_allow_html=True)
@@ -81,11 +90,13 @@ if not st.session_state.get("_app_initialized", False):
 
 # --- Define and Render Tabs ---
 # Tabs will render using the most current session state, which is updated by callbacks.
+# 각 탭의 render 함수는 @st.fragment로 감싸져 있어 탭 안의 위젯을 바꾸면 그 탭만 다시 실행됩니다.
+# 다른 탭에 반영해야 하는 변경(견적 금액, 차량/바구니, 이사 유형)은 탭을 바꿀 때 전체 화면이 다시 실행되면서 반영됩니다.
 tab1_title = "👤 고객 정보"
 tab2_title = "📋 물품 선택"
 tab3_title = "💰 견적 및 비용"
 
-tab1, tab2, tab3 = st.tabs([tab1_title, tab2_title, tab3_title])
+tab1, tab2, tab3 = st.tabs([tab1_title, tab2_title, tab3_title], key="main_tabs", on_change="rerun")
 
 with tab1:
     if hasattr(ui_tab1, 'render_tab1') and callable(ui_tab1.render_tab1):
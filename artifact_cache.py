@@ -0,0 +1,239 @@
+# artifact_cache.py
+# 견적서 산출물(PDF, 견적 이미지, Excel)을 견적 내용 해시 단위로 한 번만 생성하고
+# MMS/다운로드/이메일 등 모든 소비처에서 재사용하기 위한 캐시
+
+import io
+import re
+import threading
+import traceback
+import zipfile
+from collections import OrderedDict
+
+import utils
+import quote_report
+
+try:
+    import pdf_generator
+except ImportError as e:
+    print(f"Warning [ArtifactCache]: pdf_generator 로드 실패. PDF/이미지 캐시 비활성화. {e}")
+    pdf_generator = None
+
+try:
+    import excel_filler
+except ImportError as e:
+    print(f"Warning [ArtifactCache]: excel_filler 로드 실패. Excel 캐시 비활성화. {e}")
+    excel_filler = None
+
+try:
+    from state_manager import STATE_KEYS_TO_SAVE
+except ImportError:
+    STATE_KEYS_TO_SAVE = []
+
+# 견적서 양식(레이아웃, 문구, 템플릿 셀 배치)을 바꾸면 이 값을 올려 기존 캐시를 무효화합니다.
+TEMPLATE_VERSION = "2024.06-1"
+
+# 산출물 종류
+ARTIFACT_PDF = "pdf"
+ARTIFACT_IMAGE = "jpeg"
+ARTIFACT_EXCEL = "xlsx"
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024 # 전체 캐시 최대 크기 (초과 시 오래된 항목부터 제거)
+MAX_CACHED_REPORTS = 256 # 견적 보고서(quote_report) 캐시 항목 수
+
+# 저장 대상 키 외에 산출물 내용에 영향을 주는 파생/입력 키
+_EXTRA_FINGERPRINT_KEYS = [
+    "deposit_amount", "adjustment_amount", "regional_ladder_surcharge",
+    "date_opt_0_widget", "date_opt_1_widget", "date_opt_2_widget",
+    "date_opt_3_widget", "date_opt_4_widget",
+    "total_volume", "total_weight", "recommended_vehicle_auto",
+]
+
+_FIXED_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_cache = OrderedDict() # {(kind, fingerprint): bytes}
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+_build_locks = {} # {(kind, fingerprint): Lock} - 같은 산출물의 동시 생성 방지
+_stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "bytes_built": 0}
+_reports = OrderedDict() # {fingerprint: 견적 보고서}
+
+
+def quote_fingerprint(state_data, calculated_cost_items, total_cost, personnel_info):
+    """
+    견적 내용(저장 대상 키 + 파생 키 + 비용 계산 결과)과 양식 버전, 견적일로 내용 해시를 계산합니다.
+    같은 해시이면 PDF/이미지/Excel 결과가 동일하므로 재사용할 수 있습니다.
+    """
+    state_data = state_data or {}
+    fingerprint_keys = list(dict.fromkeys(list(STATE_KEYS_TO_SAVE) + _EXTRA_FINGERPRINT_KEYS))
+    # 품목 수량 키(qty_*)는 STATE_KEYS_TO_SAVE에 동적으로 추가되지만, 초기화 전 호출에 대비해 직접 포함
+    fingerprint_keys += [k for k in state_data if isinstance(k, str) and k.startswith("qty_") and k not in fingerprint_keys]
+    quote_fields = {key: state_data.get(key) for key in fingerprint_keys if key in state_data}
+    payload = {
+        "template_version": TEMPLATE_VERSION,
+        "quote_date": utils.get_current_kst_time_str("%Y-%m-%d"), # 견적일이 문서에 인쇄되므로 날짜가 바뀌면 새로 생성
+        "state": quote_fields,
+        "cost_items": calculated_cost_items,
+        "total_cost": total_cost,
+        "personnel_info": personnel_info,
+    }
+    return utils.compute_content_hash(payload)
+
+
+def _normalize_zip_timestamps(zip_bytes):
+    """
+    xlsx(zip) 항목의 수정 시각과 문서 속성의 수정일(openpyxl이 저장 시각으로 기록)을
+    견적일 기준 고정값으로 바꿔 같은 내용이면 같은 바이트가 나오도록 합니다.
+    """
+    quote_date_w3c = utils.get_current_kst_time_str("%Y-%m-%d") + "T00:00:00Z"
+    src = zipfile.ZipFile(io.BytesIO(zip_bytes))
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            fixed_info = zipfile.ZipInfo(info.filename, date_time=_FIXED_ZIP_DATE_TIME)
+            fixed_info.compress_type = zipfile.ZIP_DEFLATED
+            fixed_info.external_attr = info.external_attr
+            entry_bytes = src.read(info.filename)
+            if info.filename == "docProps/core.xml":
+                entry_bytes = re.sub(rb"(<dcterms:modified[^>]*>)[^<]*(</dcterms:modified>)",
+                                     lambda m: m.group(1) + quote_date_w3c.encode() + m.group(2), entry_bytes)
+            dst.writestr(fixed_info, entry_bytes)
+    return out.getvalue()
+
+
+def _evict_if_needed():
+    global _cache_bytes
+    while _cache_bytes > MAX_CACHE_BYTES and len(_cache) > 1:
+        _, old_bytes = _cache.popitem(last=False)
+        _cache_bytes -= len(old_bytes)
+
+
+def get_or_build(kind, fingerprint, builder):
+    """
+    (kind, fingerprint)에 해당하는 산출물을 반환합니다. 없으면 builder()로 한 번만 생성해 보관합니다.
+    생성 실패(None/빈 값)는 캐시하지 않습니다.
+    """
+    global _cache_bytes
+    cache_key = (kind, fingerprint)
+    with _cache_lock:
+        cached = _cache.get(cache_key)
+        if cached is not None:
+            _cache.move_to_end(cache_key)
+            _stats["hits"] += 1
+            _stats["bytes_saved"] += len(cached)
+            return cached
+        build_lock = _build_locks.setdefault(cache_key, threading.Lock())
+
+    with build_lock:
+        # 다른 요청이 먼저 생성을 끝냈을 수 있으므로 다시 확인
+        with _cache_lock:
+            cached = _cache.get(cache_key)
+            if cached is not None:
+                _cache.move_to_end(cache_key)
+                _stats["hits"] += 1
+                _stats["bytes_saved"] += len(cached)
+                return cached
+        try:
+            built = builder()
+        except Exception as e:
+            print(f"ERROR [ArtifactCache]: Failed to build '{kind}' artifact: {e}")
+            traceback.print_exc()
+            built = None
+        with _cache_lock:
+            _build_locks.pop(cache_key, None)
+            _stats["misses"] += 1
+            if built:
+                _stats["bytes_built"] += len(built)
+                _cache[cache_key] = built
+                _cache_bytes += len(built)
+                _evict_if_needed()
+        return built
+
+
+def get_quote_report(state_data, calculated_cost_items, total_cost, personnel_info, fingerprint=None):
+    """
+    견적 보고서 (quote_report.build_quote_report). 견적 내용(fingerprint)당 한 번만 만들어
+    PDF/이미지/Excel/화면 요약이 함께 사용합니다. 보고서의 'revision'이 fingerprint입니다.
+    """
+    fingerprint = fingerprint or quote_fingerprint(state_data, calculated_cost_items, total_cost, personnel_info)
+    with _cache_lock:
+        report = _reports.get(fingerprint)
+        if report is not None:
+            _reports.move_to_end(fingerprint)
+            return report
+    report = quote_report.build_quote_report(state_data, calculated_cost_items, total_cost, personnel_info, revision=fingerprint)
+    with _cache_lock:
+        report = _reports.setdefault(fingerprint, report) # 동시에 만든 경우 먼저 저장된 것 사용
+        while len(_reports) > MAX_CACHED_REPORTS:
+            _reports.popitem(last=False)
+    return report
+
+
+def get_quote_pdf(state_data, calculated_cost_items, total_cost, personnel_info, fingerprint=None):
+    """견적서 PDF 바이트 (견적 내용이 같으면 재사용)."""
+    if pdf_generator is None: return None
+    fingerprint = fingerprint or quote_fingerprint(state_data, calculated_cost_items, total_cost, personnel_info)
+    return get_or_build(ARTIFACT_PDF, fingerprint,
+                        lambda: pdf_generator.generate_pdf(state_data, calculated_cost_items, total_cost, personnel_info,
+                                                           report=get_quote_report(state_data, calculated_cost_items, total_cost, personnel_info, fingerprint)))
+
+
+def get_quote_image(state_data, calculated_cost_items, total_cost, personnel_info, fingerprint=None, pdf_fallback=True):
+    """
+    견적서 JPEG 바이트 (모든 페이지를 세로로 이어 붙인 한 장). PDF와 같은 레이아웃을 Pillow로 직접 그리고,
+    실패하면 pdf_fallback=True일 때 같은 견적의 캐시된 PDF를 Poppler로 변환합니다 (프로세스 풀, 제한 시간).
+    UI에서 기다리지 않으려면 pdf_fallback=False로 호출하고 pdf_raster 작업을 직접 등록합니다.
+    """
+    if pdf_generator is None: return None
+    fingerprint = fingerprint or quote_fingerprint(state_data, calculated_cost_items, total_cost, personnel_info)
+
+    def _build_image():
+        if hasattr(pdf_generator, "generate_quote_image"):
+            report = get_quote_report(state_data, calculated_cost_items, total_cost, personnel_info, fingerprint)
+            image_bytes = pdf_generator.generate_quote_image(state_data, calculated_cost_items, total_cost, personnel_info, image_format='JPEG', report=report)
+            if image_bytes: return image_bytes
+            if not pdf_fallback: return None
+            print("Warning [ArtifactCache]: 직접 이미지 생성 실패. PDF 변환 방식으로 대체합니다.")
+        pdf_bytes = get_quote_pdf(state_data, calculated_cost_items, total_cost, personnel_info, fingerprint=fingerprint)
+        if not pdf_bytes: return None
+        return pdf_generator.generate_quote_image_from_pdf(pdf_bytes, poppler_path=None, image_format='JPEG')
+
+    return get_or_build(ARTIFACT_IMAGE, fingerprint, _build_image)
+
+
+def get_quote_excel(state_data, calculated_cost_items, total_cost, personnel_info, fingerprint=None):
+    """final.xlsx 템플릿을 채운 Excel 바이트 (zip 항목 시각을 고정해 내용이 같으면 같은 바이트)."""
+    if excel_filler is None: return None
+    fingerprint = fingerprint or quote_fingerprint(state_data, calculated_cost_items, total_cost, personnel_info)
+
+    def _build_excel():
+        report = get_quote_report(state_data, calculated_cost_items, total_cost, personnel_info, fingerprint)
+        excel_bytes = excel_filler.fill_final_excel_template(state_data, calculated_cost_items, total_cost, personnel_info, report=report)
+        if not excel_bytes: return None
+        return _normalize_zip_timestamps(excel_bytes)
+
+    return get_or_build(ARTIFACT_EXCEL, fingerprint, _build_excel)
+
+
+def get_cache_stats():
+    """캐시 적중률과 재사용으로 생성하지 않아도 된 바이트 수를 반환합니다."""
+    with _cache_lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "hit_rate": (_stats["hits"] / lookups) if lookups else 0.0,
+            "bytes_saved": _stats["bytes_saved"],
+            "bytes_built": _stats["bytes_built"],
+            "entries": len(_cache),
+            "cached_bytes": _cache_bytes,
+        }
+
+
+def clear_cache():
+    """캐시와 통계를 초기화합니다 (양식 변경 테스트 등)."""
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _reports.clear()
+        _cache_bytes = 0
+        for key in _stats: _stats[key] = 0
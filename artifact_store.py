@@ -0,0 +1,143 @@
+# artifact_store.py
+# 생성된 견적서 파일(PDF, 이미지, Excel)을 session_state 대신 디스크의 내용 주소(해시) 기반 임시 저장소에 보관합니다.
+# 세션에는 짧은 핸들 문자열만 두고, 다운로드는 파일에서 바로 제공합니다.
+# 오래된 파일(TTL)과 전체 용량 초과분은 자동으로 정리합니다.
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+import traceback
+
+try:
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    # 클릭할 때 데이터를 읽는 지연 다운로드(data=callable) 지원 여부
+    _DEFERRED_DOWNLOAD_SUPPORTED = hasattr(MediaFileManager, "add_deferred")
+except ImportError:
+    _DEFERRED_DOWNLOAD_SUPPORTED = False
+
+STORE_DIR = os.path.join(tempfile.gettempdir(), "move24day_artifacts")
+ARTIFACT_TTL_SEC = 6 * 60 * 60         # 마지막 사용 후 이 시간이 지나면 삭제
+MAX_STORE_BYTES = 256 * 1024 * 1024     # 저장소 전체 최대 크기 (초과 시 오래 사용하지 않은 파일부터 삭제)
+CLEANUP_INTERVAL_SEC = 60               # 저장 시 정리 작업 최소 간격
+
+_HANDLE_PATTERN = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]{1,5}$")
+_store_lock = threading.Lock()
+_last_cleanup = 0.0
+
+
+def _ensure_store_dir():
+    os.makedirs(STORE_DIR, exist_ok=True)
+    return STORE_DIR
+
+
+def _touch(path):
+    """마지막 사용 시각(mtime)을 갱신해 TTL/용량 정리에서 최근 파일로 취급되게 합니다."""
+    try: os.utime(path, None)
+    except OSError: pass
+
+
+def put_artifact(data, extension):
+    """
+    바이트를 저장소에 쓰고 핸들("<sha256>.<확장자>")을 반환합니다. 같은 내용은 같은 파일을 재사용합니다.
+    실패하거나 빈 데이터면 None.
+    """
+    if not data: return None
+    extension = extension.lower().lstrip(".")
+    handle = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+    try:
+        path = os.path.join(_ensure_store_dir(), handle)
+        if os.path.exists(path):
+            _touch(path)
+        else:
+            # 다른 세션/프로세스가 같은 파일을 동시에 쓰더라도 완성된 파일만 보이도록 임시 파일에 쓴 뒤 교체
+            fd, temp_path = tempfile.mkstemp(dir=STORE_DIR, suffix=".part")
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, path)
+        cleanup_store()
+        return handle
+    except Exception as e:
+        print(f"ERROR [ArtifactStore]: Failed to store artifact: {e}")
+        traceback.print_exc()
+        return None
+
+
+def get_artifact_path(handle):
+    """핸들에 해당하는 파일 경로 (없거나 정리되었으면 None). 조회할 때마다 사용 시각을 갱신합니다."""
+    if not isinstance(handle, str) or not _HANDLE_PATTERN.match(handle): return None
+    path = os.path.join(STORE_DIR, handle)
+    if not os.path.exists(path): return None
+    _touch(path)
+    return path
+
+
+def read_artifact(handle):
+    """핸들의 파일 내용을 바이트로 읽습니다 (이메일 첨부 등). 없으면 None."""
+    path = get_artifact_path(handle)
+    if path is None: return None
+    try:
+        with open(path, "rb") as artifact_file:
+            return artifact_file.read()
+    except OSError as e:
+        print(f"ERROR [ArtifactStore]: Failed to read artifact '{handle}': {e}")
+        return None
+
+
+def download_data(handle):
+    """
+    st.download_button의 data로 넘길 값. 지원되는 Streamlit이면 클릭할 때 파일을 읽는 함수를,
+    아니면 파일 내용(바이트)을 반환합니다. 파일이 없으면 None.
+    (열린 파일 객체를 넘기면 닫히지 않아 다시 그릴 때마다 파일 핸들이 하나씩 남음)
+    """
+    if not _DEFERRED_DOWNLOAD_SUPPORTED: return read_artifact(handle)
+    if get_artifact_path(handle) is None: return None
+    return lambda: read_artifact(handle) or b"" # 클릭 전에 정리된 경우 빈 파일
+
+
+def cleanup_store(force=False):
+    """
+    TTL이 지난 파일을 지우고, 남은 전체 크기가 MAX_STORE_BYTES를 넘으면 오래 사용하지 않은 파일부터 지웁니다.
+    force=False면 CLEANUP_INTERVAL_SEC에 한 번만 실행합니다. 반환: 삭제한 파일 수
+    """
+    global _last_cleanup
+    now = time.time()
+    with _store_lock:
+        if not force and now - _last_cleanup < CLEANUP_INTERVAL_SEC: return 0
+        _last_cleanup = now
+    if not os.path.isdir(STORE_DIR): return 0
+
+    removed = 0
+    entries = []
+    for entry in os.scandir(STORE_DIR):
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        if now - stat.st_mtime > ARTIFACT_TTL_SEC:
+            try: os.remove(entry.path); removed += 1
+            except FileNotFoundError: pass
+        else:
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= MAX_STORE_BYTES: break
+        try: os.remove(path); removed += 1
+        except FileNotFoundError: pass
+        total_bytes -= size
+    if removed:
+        print(f"DEBUG [ArtifactStore]: Removed {removed} artifacts, {total_bytes:,} bytes remain.")
+    return removed
+
+
+def get_store_stats():
+    """저장소 파일 수와 전체 크기."""
+    if not os.path.isdir(STORE_DIR): return {"files": 0, "bytes": 0}
+    sizes = []
+    for entry in os.scandir(STORE_DIR):
+        try: sizes.append(entry.stat().st_size)
+        except FileNotFoundError: pass
+    return {"files": len(sizes), "bytes": sum(sizes)}
@@ -0,0 +1,169 @@
+# bulk_pdf_export.py
+# 특정 이사일의 견적서를 모두 PDF로 만들어 하나의 ZIP으로 내려받기 위한 일괄 생성 작업 (팀 브리핑용)
+# - 견적 인덱스(google_drive_helper)에서 이사일로 대상 견적을 고르고
+# - 폰트를 미리 등록한 작업자 프로세스들이 병렬로 PDF를 만들며
+# - 완성된 PDF는 도착하는 순서대로 디스크의 ZIP 파일에 바로 기록합니다 (전체를 메모리에 모으지 않음).
+#
+# CLI: python bulk_pdf_export.py 2024-06-15 -o quotes_2024-06-15.zip --workers 4
+
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import time
+import traceback
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime
+
+import calculations
+import pdf_generator
+import state_manager
+
+try:
+    import google_drive_helper as gdrive
+except ImportError as e:
+    print(f"Warning [BULK_PDF]: google_drive_helper 로드 실패. 저장된 견적을 불러올 수 없습니다. {e}")
+    gdrive = None
+
+BULK_DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+BULK_INFLIGHT_PER_WORKER = 2 # 작업자당 대기열에 올려 둘 견적 수 (메모리에 동시에 존재하는 견적/PDF 수 제한)
+
+_INVALID_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+
+def _pdf_entry_name(state_data, fallback_name):
+    customer = _INVALID_FILENAME_CHARS.sub("_", str(state_data.get("customer_name") or "").strip()) or "고객"
+    phone = re.sub(r"\D", "", str(state_data.get("customer_phone") or "")) or os.path.splitext(fallback_name)[0]
+    return f"견적서_{customer}_{phone}.pdf"
+
+
+def _render_quote_pdf(source_name, saved_data):
+    """
+    (작업자 프로세스) 저장된 견적 하나를 PDF로 만듭니다.
+    반환: (source_name, ZIP 안 파일명, PDF 바이트 또는 None, 오류 메시지 또는 None)
+    """
+    try:
+        state_data = state_manager.build_quote_state(saved_data)
+        total_cost, cost_items, personnel_info = calculations.calculate_total_moving_cost(state_data)
+        if cost_items.has_error:
+            return source_name, None, None, f"비용 계산 오류: {cost_items.error_note}"
+        pdf_bytes = pdf_generator.generate_pdf(state_data, cost_items, total_cost, personnel_info)
+        if not pdf_bytes:
+            return source_name, None, None, "PDF 생성 실패"
+        return source_name, _pdf_entry_name(state_data, source_name), pdf_bytes, None
+    except Exception as e:
+        traceback.print_exc()
+        return source_name, None, None, str(e)
+
+
+def _iter_quotes_for_date(moving_date, root_folder_id):
+    """인덱스로 고른 견적을 순서대로 불러옵니다 (여러 개를 미리 내려받음). 이사일이 인덱스에 없던 후보는 불러온 내용으로 다시 확인합니다."""
+    target_date = moving_date.isoformat()
+    for entry, saved_data in gdrive.iter_loaded_quotes(gdrive.find_quotes_by_moving_date(moving_date, root_folder_id=root_folder_id)):
+        if saved_data is None:
+            yield entry["name"], None
+            continue
+        if not entry["verified"] and str(saved_data.get("moving_date") or "")[:10] != target_date:
+            continue
+        yield entry["name"], saved_data
+
+
+def export_quotes_for_date(moving_date, output_path, root_folder_id=None, max_workers=BULK_DEFAULT_WORKERS, progress_callback=None):
+    """
+    이사일이 moving_date인 모든 견적을 PDF로 만들어 output_path ZIP에 기록합니다.
+    ZIP은 같은 폴더의 임시 파일에 PDF가 완성될 때마다 추가하고, 끝나면 output_path로 교체합니다.
+    progress_callback(완료 수, 현재까지 불러온 대상 수)을 주면 PDF 하나가 끝날 때마다 호출합니다.
+    반환: 처리량 보고 딕셔너리 (exported/failed 수, 소요 시간, 초당 PDF 수, ZIP 크기, 실패 목록)
+    """
+    if gdrive is None:
+        raise RuntimeError("google_drive_helper를 불러오지 못해 저장된 견적을 조회할 수 없습니다.")
+    if isinstance(moving_date, datetime): moving_date = moving_date.date()
+    if isinstance(moving_date, str): moving_date = date.fromisoformat(moving_date.strip()[:10])
+    root_folder_id = root_folder_id or gdrive.get_root_folder_id()
+    max_workers = max(1, int(max_workers))
+
+    started = time.perf_counter()
+    report = {"moving_date": moving_date.isoformat(), "output_path": output_path, "workers": max_workers,
+              "selected": 0, "exported": 0, "failed": [], "pdf_bytes": 0}
+    temp_path = f"{output_path}.part"
+    quotes = _iter_quotes_for_date(moving_date, root_folder_id)
+    pending = set()
+    # 작업자 프로세스는 견적 탭과 무관한 스레드에서 만들어질 수 있으므로 fork 대신 spawn 사용
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=pdf_generator.register_fonts)
+    try:
+        # PDF는 이미 압축된 스트림이므로 ZIP에서는 다시 압축하지 않음
+        with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_STORED) as zip_file:
+            used_names = set()
+            exhausted = False
+            while pending or not exhausted:
+                # 대기열을 작업자 수의 일정 배수로만 채워 불러온 견적과 PDF가 메모리에 쌓이지 않도록 함
+                while not exhausted and len(pending) < max_workers * BULK_INFLIGHT_PER_WORKER:
+                    source_name, saved_data = next(quotes, (None, None))
+                    if source_name is None:
+                        exhausted = True
+                        break
+                    report["selected"] += 1
+                    if saved_data is None:
+                        report["failed"].append({"name": source_name, "error": "견적 불러오기 실패"})
+                        continue
+                    pending.add(pool.submit(_render_quote_pdf, source_name, saved_data))
+                if not pending: continue
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source_name, entry_name, pdf_bytes, error = future.result()
+                    if error:
+                        print(f"ERROR [BULK_PDF]: '{source_name}' 실패 - {error}")
+                        report["failed"].append({"name": source_name, "error": error})
+                    else:
+                        if entry_name in used_names: # 고객명/번호가 같은 견적이 여러 개인 경우
+                            entry_name = f"{os.path.splitext(entry_name)[0]}_{os.path.splitext(source_name)[0]}.pdf"
+                        used_names.add(entry_name)
+                        zip_file.writestr(entry_name, pdf_bytes)
+                        report["exported"] += 1
+                        report["pdf_bytes"] += len(pdf_bytes)
+                    if progress_callback:
+                        progress_callback(report["exported"] + len(report["failed"]), report["selected"])
+        os.replace(temp_path, output_path)
+    except Exception:
+        if os.path.exists(temp_path): os.remove(temp_path)
+        raise
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    report["elapsed_sec"] = round(elapsed, 2)
+    report["pdfs_per_sec"] = round(report["exported"] / elapsed, 2) if elapsed > 0 else 0.0
+    report["zip_bytes"] = os.path.getsize(output_path)
+    print(f"INFO [BULK_PDF]: {report['moving_date']} - {report['exported']}/{report['selected']} PDFs "
+          f"in {report['elapsed_sec']}s ({report['pdfs_per_sec']} PDF/s, {max_workers} workers), "
+          f"ZIP {report['zip_bytes']:,} bytes, {len(report['failed'])} failed")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="이사일 기준 견적서 PDF 일괄 생성 (ZIP)")
+    parser.add_argument("moving_date", help="이사일 (YYYY-MM-DD)")
+    parser.add_argument("-o", "--output", help="ZIP 파일 경로 (기본: quotes_<이사일>.zip)")
+    parser.add_argument("-w", "--workers", type=int, default=BULK_DEFAULT_WORKERS, help="PDF 생성 프로세스 수")
+    parser.add_argument("--root-folder-id", default=None, help="견적 저장 Drive 폴더 ID (기본: secrets의 drive_folder_id)")
+    args = parser.parse_args(argv)
+
+    try:
+        moving_date = date.fromisoformat(args.moving_date)
+    except ValueError:
+        parser.error(f"이사일 형식이 올바르지 않습니다: {args.moving_date}")
+    output_path = args.output or f"quotes_{moving_date.isoformat()}.zip"
+    report = export_quotes_for_date(moving_date, output_path, root_folder_id=args.root_folder_id, max_workers=args.workers,
+                                    progress_callback=lambda done, total: print(f"  {done}/{total}", end="\r"))
+    for failure in report["failed"]:
+        print(f"  실패: {failure['name']} - {failure['error']}")
+    print(f"{report['exported']}개 PDF -> {output_path} ({report['elapsed_sec']}초, {report['pdfs_per_sec']} PDF/초)")
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
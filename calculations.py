@@ -2,6 +2,8 @@
 import data
 import math
 
+from cost_ledger import CostCode, CostLedger, error_ledger
+
 # --- 이사짐 부피/무게 계산 ---
 def calculate_total_volume_weight(state_data, move_type):
     total_volume = 0.0
@@ -87,7 +89,7 @@ def get_ladder_cost(floor_num, vehicle_name):
 # --- 총 이사 비용 계산 ---
 def calculate_total_moving_cost(state_data):
     cost_before_add_charges = 0 
-    cost_items = [] 
+    cost_items = CostLedger() # 비용 항목 (고정 코드 + 표시 라벨)
     personnel_info = {} 
 
     current_move_type = state_data.get('base_move_type')
@@ -95,7 +97,7 @@ def calculate_total_moving_cost(state_data):
     is_storage, has_via_point = state_data.get('is_storage_move', False), state_data.get('has_via_point', False)
 
     if not selected_vehicle:
-        return 0, [("오류", 0, "차량 선택 필요")], {}
+        return 0, error_ledger("차량 선택 필요"), {}
 
     base_price, base_men, base_women = 0, 0, 0
     vehicle_prices_options = getattr(data, 'vehicle_prices', {}).get(current_move_type, {})
@@ -103,24 +105,24 @@ def calculate_total_moving_cost(state_data):
         v_info = vehicle_prices_options[selected_vehicle]
         base_price, base_men, base_women = v_info.get('price', 0), v_info.get('men', 0), v_info.get('housewife', 0)
         actual_base_price = base_price * 2 if is_storage else base_price
-        cost_items.append(("기본 운임", actual_base_price, f"{selected_vehicle} 기준" + (" (보관 x2)" if is_storage else "")))
+        cost_items.add(CostCode.BASE_FARE, "기본 운임", actual_base_price, f"{selected_vehicle} 기준" + (" (보관 x2)" if is_storage else ""))
         cost_before_add_charges += actual_base_price
     else:
-        return 0, [("오류", 0, f"차량({selected_vehicle}) 가격 정보 없음")], {}
+        return 0, error_ledger(f"차량({selected_vehicle}) 가격 정보 없음"), {}
 
-    for loc_type, floor_key, method_key, sky_hours_key in [
-        ("출발지", 'from_floor', 'from_method', 'sky_hours_from'),
-        ("도착지", 'to_floor', 'to_method', 'sky_hours_final')]:
+    for loc_type, floor_key, method_key, sky_hours_key, ladder_code, sky_code in [
+        ("출발지", 'from_floor', 'from_method', 'sky_hours_from', CostCode.LADDER_FROM, CostCode.SKY_FROM),
+        ("도착지", 'to_floor', 'to_method', 'sky_hours_final', CostCode.LADDER_TO, CostCode.SKY_TO)]:
         floor_num, method = get_floor_num(state_data.get(floor_key)), state_data.get(method_key)
         if method == "사다리차 🪜":
             l_cost, l_note = get_ladder_cost(floor_num, selected_vehicle)
-            if l_cost > 0 or (l_cost == 0 and l_note != "1층 이하"): cost_items.append((f"{loc_type} 사다리차", l_cost, l_note)); cost_before_add_charges += l_cost
+            if l_cost > 0 or (l_cost == 0 and l_note != "1층 이하"): cost_items.add(ladder_code, f"{loc_type} 사다리차", l_cost, l_note); cost_before_add_charges += l_cost
         elif method == "스카이 🏗️":
             sky_h = max(1, int(state_data.get(sky_hours_key, 1) or 1))
             s_base, s_extra = getattr(data, 'SKY_BASE_PRICE',0), getattr(data, 'SKY_EXTRA_HOUR_PRICE',0)
             s_cost = s_base + s_extra * (sky_h - 1)
             s_note = f"{loc_type}({sky_h}h): 기본 {s_base:,.0f}" + (f" + 추가 {s_extra*(sky_h-1):,.0f}" if sky_h > 1 else "")
-            cost_items.append((f"{loc_type} 스카이 장비", s_cost, s_note)); cost_before_add_charges += s_cost
+            cost_items.add(sky_code, f"{loc_type} 스카이 장비", s_cost, s_note); cost_before_add_charges += s_cost
     
     add_m, add_w = int(state_data.get('add_men',0) or 0), int(state_data.get('add_women',0) or 0)
     add_person_cost_unit = getattr(data, 'ADDITIONAL_PERSON_COST', 0)
@@ -128,17 +130,17 @@ def calculate_total_moving_cost(state_data):
     actual_removed_hw = False
     if current_move_type == "가정 이사 🏠" and state_data.get('remove_base_housewife', False) and base_women > 0:
         discount = -add_person_cost_unit * base_women
-        cost_items.append(("기본 여성 인원 제외 할인", discount, f"여 {base_women}명 제외"))
+        cost_items.add(CostCode.HOUSEWIFE_DISCOUNT, "기본 여성 인원 제외 할인", discount, f"여 {base_women}명 제외")
         cost_before_add_charges += discount
         actual_removed_hw = True
         
     manual_added_total_cost = (add_m + add_w) * add_person_cost_unit
     if manual_added_total_cost > 0:
-        cost_items.append(("추가 인력", manual_added_total_cost, f"남{add_m}, 여{add_w}"))
+        cost_items.add(CostCode.ADDITIONAL_PERSONNEL, "추가 인력", manual_added_total_cost, f"남{add_m}, 여{add_w}")
         cost_before_add_charges += manual_added_total_cost
 
     adj_amount = int(state_data.get('adjustment_amount',0) or 0)
-    if adj_amount != 0: cost_items.append((f"{'할증' if adj_amount > 0 else '할인'} 조정 금액", adj_amount, "수동입력")); cost_before_add_charges += adj_amount
+    if adj_amount != 0: cost_items.add(CostCode.ADJUSTMENT, f"{'할증' if adj_amount > 0 else '할인'} 조정 금액", adj_amount, "수동입력"); cost_before_add_charges += adj_amount
 
     if is_storage:
         s_dur, s_type = max(1, int(state_data.get('storage_duration',1) or 1)), state_data.get('storage_type', getattr(data,'DEFAULT_STORAGE_TYPE',"정보없음"))
@@ -150,20 +152,20 @@ def calculate_total_moving_cost(state_data):
                 s_elec_surcharge = getattr(data,'STORAGE_ELECTRICITY_SURCHARGE_PER_DAY',3000) * s_dur
                 s_note += ", 전기사용"
             s_final_cost = s_base_cost + s_elec_surcharge
-            cost_items.append(("보관료", s_final_cost, s_note)); cost_before_add_charges += s_final_cost
-        else: cost_items.append(("오류", 0, f"보관유형({s_type}) 요금정보 없음"))
+            cost_items.add(CostCode.STORAGE, "보관료", s_final_cost, s_note); cost_before_add_charges += s_final_cost
+        else: cost_items.add_error(f"보관유형({s_type}) 요금정보 없음")
 
     if state_data.get('apply_long_distance', False):
         ld_sel = state_data.get('long_distance_selector')
         if ld_sel and ld_sel != "선택 안 함":
             ld_cost = getattr(data,'long_distance_prices',{}).get(ld_sel,0)
-            if ld_cost > 0: cost_items.append(("장거리 운송료", ld_cost, ld_sel)); cost_before_add_charges += ld_cost
+            if ld_cost > 0: cost_items.add(CostCode.LONG_DISTANCE, "장거리 운송료", ld_cost, ld_sel); cost_before_add_charges += ld_cost
             
     if state_data.get('has_waste_check', False):
         w_tons = max(0.5, float(state_data.get('waste_tons_input',0.5) or 0.5))
         w_cost_ton = getattr(data,'WASTE_DISPOSAL_COST_PER_TON',0)
         w_cost = w_cost_ton * w_tons
-        cost_items.append(("폐기물 처리", w_cost, f"{w_tons:.1f}톤 기준")); cost_before_add_charges += w_cost
+        cost_items.add(CostCode.WASTE, "폐기물 처리", w_cost, f"{w_tons:.1f}톤 기준"); cost_before_add_charges += w_cost
 
     dt_surcharge, dt_notes = 0, []
     dt_opts, dt_prices = ["이사많은날 🏠","손없는날 ✋","월말 📅","공휴일 🎉","금요일 📅"], getattr(data,'special_day_prices',{})
@@ -171,27 +173,27 @@ def calculate_total_moving_cost(state_data):
         if state_data.get(f"date_opt_{i}_widget", False):
             s = dt_prices.get(opt,0); 
             if s > 0: dt_surcharge += s; dt_notes.append(opt.split(" ")[0])
-    if dt_surcharge > 0: cost_items.append(("날짜 할증", dt_surcharge, ", ".join(dt_notes))); cost_before_add_charges += dt_surcharge
+    if dt_surcharge > 0: cost_items.add(CostCode.DATE_SURCHARGE, "날짜 할증", dt_surcharge, ", ".join(dt_notes)); cost_before_add_charges += dt_surcharge
     
     reg_ladder_surcharge = int(state_data.get('regional_ladder_surcharge',0) or 0)
-    if reg_ladder_surcharge > 0: cost_items.append(("지방 사다리 추가요금", reg_ladder_surcharge, "수동입력")); cost_before_add_charges += reg_ladder_surcharge
+    if reg_ladder_surcharge > 0: cost_items.add(CostCode.REGIONAL_LADDER, "지방 사다리 추가요금", reg_ladder_surcharge, "수동입력"); cost_before_add_charges += reg_ladder_surcharge
     
     if has_via_point:
         via_s = int(state_data.get('via_point_surcharge',0) or 0)
-        if via_s > 0: cost_items.append(("경유지 추가요금", via_s, "수동입력")); cost_before_add_charges += via_s
+        if via_s > 0: cost_items.add(CostCode.VIA_POINT, "경유지 추가요금", via_s, "수동입력"); cost_before_add_charges += via_s
 
     # --- VAT 및 카드 수수료 계산 ---
     current_total_cost = cost_before_add_charges # 순수 비용 합계로 시작
 
     if state_data.get('issue_tax_invoice', False):
         vat = math.ceil(cost_before_add_charges * 0.1) # 원금 기준 VAT
-        cost_items.append(("부가세 (10%)", vat, "세금계산서 발행 요청"))
+        cost_items.add(CostCode.VAT, "부가세 (10%)", vat, "세금계산서 발행 요청")
         current_total_cost += vat
     
     if state_data.get('card_payment', False):
         # 카드수수료는 (원금 + VAT가 이미 적용된) 금액에 대해 부과
         card_fee = math.ceil(current_total_cost * 0.13) 
-        cost_items.append(("카드결제 수수료 (13%)", card_fee, "카드 결제 요청"))
+        cost_items.add(CostCode.CARD_FEE, "카드결제 수수료 (13%)", card_fee, "카드 결제 요청")
         current_total_cost += card_fee
     # --- VAT 및 카드 수수료 계산 완료 ---
 
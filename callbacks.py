@@ -205,4 +205,47 @@ def update_selected_gdrive_id():
             # print(f"Warning CB (update_selected_gdrive_id): No ID found for GDrive file name '{selected_name}' in map.")
     # else: # 선택된 파일 이름이 없거나 파일 맵이 없는 경우
         # print(f"DEBUG CB (update_selected_gdrive_id): No GDrive file selected or map not ready.")
-        pass
\ No newline at end of file
+        pass
+
+
+# --- Fragment ---
+# 각 탭과 Tab 3 견적 결과 영역은 @st.fragment(key=...)로 감싸져 있어, 위젯을 바꾸면 그 fragment만 다시 실행됩니다.
+# 다른 탭에 표시되는 값(견적 금액, 바구니 기본값, 저장 상태)은 탭을 바꿀 때 전체 화면이 다시 실행되면서 최신 값으로 그려지므로
+# (app.py의 st.tabs on_change="rerun") 콜백에서 다른 탭을 다시 실행하지 않습니다.
+# 콜백에서 st.rerun(scope=...)를 부르면 위젯이 바뀐 실행이 중단되고 한 번 더 실행되어, 입력 한 번에 실행과 gc가 두 번씩 일어납니다.
+FRAGMENT_TAB1 = "tab1"
+FRAGMENT_TAB2 = "tab2"
+FRAGMENT_TAB3 = "tab3" # 옵션 입력 + 비용 계산 (견적 결과 영역 포함)
+FRAGMENT_QUOTE_VIEW = "tab3_quote" # 견적 결과/요약 + 견적서 생성·발송 버튼
+
+
+
+ITEM_GRID_QTY_COLUMN = "수량" # Tab 2 품목 수량 표(data_editor)의 편집 가능한 열
+
+
+def apply_item_grid_edits(grid_row_keys):
+    """
+    Tab 2 '수량 적용' 버튼: 섹션별 수량 표에서 바뀐 칸만 모아 세션 상태에 한 번에 반영하고,
+    물량/추천 차량 계산(handle_item_update)도 한 번만 실행합니다 (콜백이 끝나면 버튼이 있는 Tab 2가 다시 실행됨).
+    grid_row_keys: {표 key: [행 순서대로의 qty_ 세션 키]}
+    """
+    updates = {}
+    for grid_key, row_keys in grid_row_keys.items():
+        edited_rows = (st.session_state.get(grid_key) or {}).get("edited_rows", {})
+        for row, changes in edited_rows.items():
+            if ITEM_GRID_QTY_COLUMN not in changes: continue
+            try:
+                qty_key = row_keys[int(row)]
+                qty = max(0, int(changes[ITEM_GRID_QTY_COLUMN] or 0))
+            except (IndexError, ValueError, TypeError):
+                print(f"Warning: 수량 표 '{grid_key}'의 {row}행 변경값을 무시합니다: {changes}")
+                continue
+            if st.session_state.get(qty_key) != qty:
+                updates[qty_key] = qty
+
+    # 표 key를 바꿔 편집 상태를 비우고, 다음 실행에서 적용된 수량으로 다시 그림
+    st.session_state.item_grid_version = st.session_state.get("item_grid_version", 0) + 1
+    if not updates: return
+
+    st.session_state.update(updates)
+    handle_item_update()
\ No newline at end of file
@@ -0,0 +1,188 @@
+# cost_ledger.py
+# 비용 원장 (calculations.calculate_total_moving_cost의 비용 항목 목록)
+# 각 비용 항목은 고정 코드(CostCode)와 화면 표시용 라벨/금액/비고를 가진 CostLine 레코드이고,
+# CostLedger는 항목 순서를 유지하면서 코드별 색인을 함께 가지고 있어 코드로 바로(O(1)) 찾을 수 있습니다.
+# 출력 형식(PDF, Excel, 화면 요약)은 라벨 문구가 아니라 코드로 항목을 찾습니다.
+# CostLine은 (라벨, 금액, 비고, 코드) 튜플이라 기존처럼 item[0], item[1], item[2]로도 읽을 수 있습니다.
+
+from enum import Enum
+from typing import NamedTuple
+
+
+class CostCode(str, Enum):
+    """비용 항목 고정 코드 (값은 해시/저장 시 그대로 문자열로 기록됨)"""
+    BASE_FARE = "BASE_FARE"                       # 기본 운임
+    LADDER_FROM = "LADDER_FROM"                   # 출발지 사다리차
+    LADDER_TO = "LADDER_TO"                       # 도착지 사다리차
+    SKY_FROM = "SKY_FROM"                         # 출발지 스카이 장비
+    SKY_TO = "SKY_TO"                             # 도착지 스카이 장비
+    HOUSEWIFE_DISCOUNT = "HOUSEWIFE_DISCOUNT"     # 기본 여성 인원 제외 할인
+    ADDITIONAL_PERSONNEL = "ADDITIONAL_PERSONNEL" # 추가 인력
+    ADJUSTMENT = "ADJUSTMENT"                     # 할증/할인 조정 금액
+    STORAGE = "STORAGE"                           # 보관료
+    LONG_DISTANCE = "LONG_DISTANCE"               # 장거리 운송료
+    WASTE = "WASTE"                               # 폐기물 처리
+    DATE_SURCHARGE = "DATE_SURCHARGE"             # 날짜 할증
+    REGIONAL_LADDER = "REGIONAL_LADDER"           # 지방 사다리 추가요금
+    VIA_POINT = "VIA_POINT"                       # 경유지 추가요금
+    VAT = "VAT"                                   # 부가세 (10%)
+    CARD_FEE = "CARD_FEE"                         # 카드결제 수수료 (13%)
+    ERROR = "ERROR"                               # 계산 오류 (금액 0, 비고에 오류 내용)
+    OTHER = "OTHER"                               # 코드 없는 항목 (이전 형식 목록에서 변환 시)
+
+
+LIFT_COST_CODES = (CostCode.LADDER_FROM, CostCode.LADDER_TO, CostCode.SKY_FROM, CostCode.SKY_TO)
+TAX_FEE_COST_CODES = (CostCode.VAT, CostCode.CARD_FEE)
+ERROR_LABEL = "오류"
+
+# 이전 형식 (라벨, 금액, 비고) 목록을 변환할 때만 사용하는 라벨 -> 코드 표
+_LEGACY_LABEL_CODES = {
+    "기본 운임": CostCode.BASE_FARE,
+    "출발지 사다리차": CostCode.LADDER_FROM,
+    "도착지 사다리차": CostCode.LADDER_TO,
+    "출발지 스카이 장비": CostCode.SKY_FROM,
+    "도착지 스카이 장비": CostCode.SKY_TO,
+    "기본 여성 인원 제외 할인": CostCode.HOUSEWIFE_DISCOUNT,
+    "추가 인력": CostCode.ADDITIONAL_PERSONNEL,
+    "할증 조정 금액": CostCode.ADJUSTMENT,
+    "할인 조정 금액": CostCode.ADJUSTMENT,
+    "보관료": CostCode.STORAGE,
+    "장거리 운송료": CostCode.LONG_DISTANCE,
+    "폐기물 처리": CostCode.WASTE,
+    "날짜 할증": CostCode.DATE_SURCHARGE,
+    "지방 사다리 추가요금": CostCode.REGIONAL_LADDER,
+    "경유지 추가요금": CostCode.VIA_POINT,
+    "부가세 (10%)": CostCode.VAT,
+    "카드결제 수수료 (13%)": CostCode.CARD_FEE,
+}
+
+
+class CostLine(NamedTuple):
+    """비용 항목 하나 (튜플이므로 __slots__ = (), 인스턴스 __dict__ 없음)"""
+    label: str
+    amount: int
+    note: str
+    code: CostCode
+
+
+class CostLedger(list):
+    """
+    CostLine 목록 (계산 순서 유지) + 코드별 색인.
+    항목은 add/add_error(또는 append/extend/+=)로 뒤에 추가만 할 수 있고, 색인이 어긋나지 않도록
+    중간 삽입/교체/삭제/정렬은 TypeError입니다. 슬라이스와 복사본도 색인을 가진 CostLedger입니다.
+    """
+    __slots__ = ("_by_code",)
+
+    def __init__(self, lines=()):
+        super().__init__()
+        self._by_code = {} # 코드 -> [CostLine] (같은 코드 항목이 여러 개일 수 있음)
+        for line in lines:
+            self._add_line(line)
+
+    def _add_line(self, line):
+        if not isinstance(line, CostLine):
+            raise TypeError(f"CostLedger에는 CostLine만 넣을 수 있습니다: {line!r}")
+        super().append(line)
+        self._by_code.setdefault(line.code, []).append(line)
+        return line
+
+    def add(self, code, label, amount, note=""):
+        return self._add_line(CostLine(label, amount, note, CostCode(code)))
+
+    def add_error(self, note):
+        return self._add_line(CostLine(ERROR_LABEL, 0, note, CostCode.ERROR))
+
+    def append(self, line):
+        self._add_line(line)
+
+    def extend(self, lines):
+        for line in lines:
+            self._add_line(line)
+
+    def __iadd__(self, lines):
+        self.extend(lines)
+        return self
+
+    def __add__(self, lines):
+        ledger = self.copy()
+        ledger.extend(lines)
+        return ledger
+
+    def copy(self):
+        return CostLedger(self)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CostLedger(super().__getitem__(index))
+        return super().__getitem__(index)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("CostLedger 항목은 뒤에 추가만 할 수 있습니다 (add/add_error/append/extend).")
+
+    insert = __setitem__ = __delitem__ = pop = remove = clear = sort = reverse = __imul__ = _read_only
+
+    def __reduce__(self):
+        # 기본 list 피클은 색인(_by_code)을 복원하기 전에 항목을 넣으므로 생성자로 다시 만듦 (pickle/copy)
+        return (self.__class__, (list(self),))
+
+    @classmethod
+    def from_items(cls, items):
+        """CostLedger는 그대로, 이전 형식 (라벨, 금액, 비고) 목록은 라벨로 코드를 찾아 변환합니다."""
+        if isinstance(items, cls):
+            return items
+        ledger = cls()
+        for item in items or []:
+            if isinstance(item, CostLine):
+                ledger._add_line(item)
+            elif isinstance(item, (list, tuple)) and len(item) >= 2:
+                label = str(item[0])
+                note = str(item[2] or '') if len(item) > 2 else ''
+                if ERROR_LABEL in label: ledger.add_error(note)
+                else: ledger.add(_LEGACY_LABEL_CODES.get(label, CostCode.OTHER), label, item[1], note)
+        return ledger
+
+    def lines(self, code):
+        """code 항목 목록 (계산 순서)"""
+        return list(self._by_code.get(code, ()))
+
+    def first(self, code):
+        lines = self._by_code.get(code)
+        return lines[0] if lines else None
+
+    def amount(self, code):
+        """code 항목 금액 합계 (예: 할증/할인 조정은 합산)"""
+        return sum(line.amount for line in self._by_code.get(code, ()))
+
+    def __contains__(self, item):
+        if isinstance(item, CostCode):
+            return item in self._by_code
+        return super().__contains__(item)
+
+    @property
+    def has_error(self):
+        return CostCode.ERROR in self._by_code
+
+    @property
+    def error_note(self):
+        """첫 오류 항목의 비고 (오류가 없으면 None)"""
+        error_line = self.first(CostCode.ERROR)
+        if error_line is None: return None
+        return error_line.note or '알 수 없는 오류'
+
+    def without_errors(self):
+        """오류 항목을 뺀 새 원장"""
+        if not self.has_error: return self
+        return CostLedger(line for line in self if line.code != CostCode.ERROR)
+
+    def total(self):
+        return sum(line.amount for line in self)
+
+    def __repr__(self):
+        return f"CostLedger({list.__repr__(self)})"
+
+
+def error_ledger(note):
+    """오류 항목 하나만 있는 원장 (비용 계산을 진행할 수 없을 때)"""
+    ledger = CostLedger()
+    ledger.add_error(note)
+    return ledger
\ No newline at end of file
@@ -0,0 +1,246 @@
+# dispatch_report.py
+# 배차표: 이사일 범위(다음 날, 한 달 등)의 저장된 견적을 모두 불러와 하나의 Excel로 만듭니다.
+# - '배차 목록': 작업(견적)당 한 행 (차량, 배차 대수, 인원, 작업 방법, 사다리/스카이, 금액/잔금)
+# - '차량별 합계', '날짜별 인원 합계': 배차 목록을 쓰는 동안 함께 집계
+# 비용과 인원은 저장된 값을 믿지 않고 calculations(가격 엔진)로 다시 계산하며,
+# 행은 excel_summary_generator의 스트리밍 작성기로 기록하므로 한 달치 작업도 메모리에 모으지 않습니다.
+#
+# CLI: python dispatch_report.py 2024-06-15 [2024-06-30] -o dispatch_2024-06-15.xlsx
+
+import argparse
+import os
+import sys
+import time
+import traceback
+from datetime import date, datetime, timedelta
+
+import calculations
+import data
+import excel_summary_generator
+import state_manager
+
+try:
+    import google_drive_helper as gdrive
+except ImportError as e:
+    print(f"Warning [DISPATCH]: google_drive_helper 로드 실패. 저장된 견적을 불러올 수 없습니다. {e}")
+    gdrive = None
+
+LADDER_METHOD = "사다리차 🪜"
+SKY_METHOD = "스카이 🏗️"
+
+# 배차 대수 입력 키 -> 차량 이름 (data.vehicle_specs 키)
+DISPATCH_VEHICLE_KEYS = [
+    ("dispatched_1t", "1톤"),
+    ("dispatched_2_5t", "2.5톤"),
+    ("dispatched_3_5t", "3.5톤"),
+    ("dispatched_5t", "5톤"),
+]
+
+JOB_HEADERS = (["이사일", "고객명", "연락처", "이사 종류",
+                "출발지", "출발층", "출발 작업", "도착지", "도착층", "도착 작업", "경유지", "경유지 작업",
+                "선택 차량"] + [f"배차 {name}" for _, name in DISPATCH_VEHICLE_KEYS] +
+               ["남성", "여성", "총 인원", "사다리차", "스카이",
+                "총 견적 비용", "계약금", "잔금", "고객요구사항"])
+_JOB_MONEY_COLUMNS = [JOB_HEADERS.index(label) + 1 for label in ("총 견적 비용", "계약금", "잔금")]
+VEHICLE_TOTAL_HEADERS = ["차량", "선택 작업 수", "배차 대수"]
+CREW_TOTAL_HEADERS = ["이사일", "작업 수", "남성", "여성", "총 인원", "사다리차 작업", "스카이 작업", "총 견적 비용", "잔금"]
+FAILED_HEADERS = ["파일", "이사일", "오류"]
+
+
+def _to_date(value):
+    if isinstance(value, datetime): return value.date()
+    if isinstance(value, date): return value
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def _to_int(value):
+    try: return int(value or 0)
+    except (ValueError, TypeError): return 0
+
+
+def _site_needs(state_data):
+    """출발/도착/경유지 중 작업 방법이 사다리차/스카이인 곳 (스카이는 사용 시간 포함)."""
+    ladder_sites, sky_sites = [], []
+    for site, key, hours in (("출발", 'from_method', 'sky_hours_from'), ("도착", 'to_method', 'sky_hours_final'),
+                             ("경유", 'via_point_method', None)):
+        if site == "경유" and not state_data.get('has_via_point'): continue
+        method = state_data.get(key)
+        if method == LADDER_METHOD:
+            ladder_sites.append(site)
+        elif method == SKY_METHOD:
+            sky_sites.append(f"{site} {_to_int(state_data.get(hours, 1)) or 1}시간" if hours else site)
+    return ", ".join(ladder_sites), ", ".join(sky_sites)
+
+
+def build_job_record(state_data):
+    """
+    견적 상태 하나를 배차 작업 정보로 만듭니다 (비용/인원은 가격 엔진으로 다시 계산).
+    반환: {'moving_date', 'row': 배차 목록 행, 'vehicle', 'dispatched': {차량: 대수}, 'men', 'women', 'ladder', 'sky',
+           'total_cost', 'balance'}. 비용 계산 오류면 ValueError
+    """
+    total_cost, cost_items, personnel_info = calculations.calculate_total_moving_cost(state_data)
+    if cost_items.has_error:
+        raise ValueError(f"비용 계산 오류: {cost_items.error_note}")
+    men = _to_int(personnel_info.get('final_men'))
+    women = _to_int(personnel_info.get('final_women'))
+    deposit_amount = _to_int(state_data.get('deposit_amount', state_data.get('tab3_deposit_amount', 0)))
+    balance = total_cost - deposit_amount
+    dispatched = {name: _to_int(state_data.get(key)) for key, name in DISPATCH_VEHICLE_KEYS}
+    vehicle = state_data.get('final_selected_vehicle') or state_data.get('recommended_vehicle_auto') or ""
+    ladder, sky = _site_needs(state_data)
+    has_via = bool(state_data.get('has_via_point'))
+    moving_date = state_data.get('moving_date')
+    row = ((moving_date.isoformat() if isinstance(moving_date, date) else str(moving_date or '')),
+           state_data.get('customer_name', ''), state_data.get('customer_phone', ''), state_data.get('base_move_type', ''),
+           state_data.get('from_location', ''), state_data.get('from_floor', ''), state_data.get('from_method', ''),
+           state_data.get('to_location', ''), state_data.get('to_floor', ''), state_data.get('to_method', ''),
+           state_data.get('via_point_location', '') if has_via else '', state_data.get('via_point_method', '') if has_via else '',
+           vehicle) + tuple(dispatched[name] or None for _, name in DISPATCH_VEHICLE_KEYS) + (
+           men, women, men + women, ladder, sky,
+           total_cost, deposit_amount, balance, (state_data.get('special_notes') or '').strip())
+    return {'moving_date': row[0], 'row': row, 'vehicle': vehicle, 'dispatched': dispatched,
+            'men': men, 'women': women, 'ladder': bool(ladder), 'sky': bool(sky),
+            'total_cost': total_cost, 'balance': balance}
+
+
+def _iter_quote_states(start_date, end_date, root_folder_id):
+    """인덱스로 고른 견적을 (파일명, 상태 또는 None, 오류) 순서로 불러옵니다. 이사일이 인덱스에 없던 후보는 불러온 내용으로 다시 확인합니다."""
+    start_str, end_str = start_date.isoformat(), end_date.isoformat()
+    entries = gdrive.find_quotes_by_moving_date_range(start_date, end_date, root_folder_id=root_folder_id)
+    for entry, saved_data in gdrive.iter_loaded_quotes(entries):
+        if saved_data is None:
+            yield entry["name"], None, "견적 불러오기 실패"
+            continue
+        saved_date = str(saved_data.get("moving_date") or "")[:10]
+        if not entry["verified"] and not start_str <= saved_date <= end_str:
+            continue
+        try:
+            yield entry["name"], state_manager.build_quote_state(saved_data), None
+        except Exception as e:
+            traceback.print_exc()
+            yield entry["name"], None, f"견적 변환 실패: {e}"
+
+
+def write_dispatch_workbook(quote_states, output_path):
+    """
+    quote_states: (파일명, 견적 상태 또는 None, 오류 메시지) iterable (이사일 순서 권장).
+    배차 목록/차량별 합계/날짜별 인원 합계(+ 실패 목록) 시트를 output_path에 저장합니다 (임시 파일에 쓴 뒤 교체).
+    반환: 처리량 보고 딕셔너리
+    """
+    started = time.perf_counter()
+    jobs_spool = excel_summary_generator.new_sheet_spool('배차 목록', JOB_HEADERS, {col: '#,##0' for col in _JOB_MONEY_COLUMNS})
+    failed_spool = excel_summary_generator.new_sheet_spool('실패 목록', FAILED_HEADERS)
+    vehicle_totals = {} # 차량 -> {'jobs': 선택 작업 수, 'units': 배차 대수}
+    crew_totals = {} # 이사일 -> 합계
+    report = {"output_path": output_path, "jobs": 0, "failed": []}
+
+    for source_name, state_data, error in quote_states:
+        if error is None:
+            try:
+                job = build_job_record(state_data)
+            except Exception as e:
+                print(f"ERROR [DISPATCH]: '{source_name}' 비용 계산 실패 - {e}")
+                job, error = None, str(e)
+        if error is not None:
+            moving_date = state_data.get('moving_date') if isinstance(state_data, dict) else None
+            report["failed"].append({"name": source_name, "error": error})
+            excel_summary_generator.spool_row(failed_spool, (source_name, str(moving_date or ''), error))
+            continue
+
+        excel_summary_generator.spool_row(jobs_spool, job['row'])
+        report["jobs"] += 1
+        if job['vehicle']:
+            vehicle_totals.setdefault(job['vehicle'], {'jobs': 0, 'units': 0})['jobs'] += 1
+        for name, units in job['dispatched'].items():
+            if units: vehicle_totals.setdefault(name, {'jobs': 0, 'units': 0})['units'] += units
+        day = crew_totals.setdefault(job['moving_date'], {'jobs': 0, 'men': 0, 'women': 0, 'ladder': 0, 'sky': 0, 'total_cost': 0, 'balance': 0})
+        day['jobs'] += 1
+        for key in ('men', 'women', 'ladder', 'sky', 'total_cost', 'balance'):
+            day[key] += job[key]
+
+    # 차량은 data.vehicle_specs 순서 (정의에 없는 이름은 뒤에)
+    vehicle_order = list(getattr(data, 'vehicle_specs', {}) or {})
+    vehicle_spool = excel_summary_generator.new_sheet_spool('차량별 합계', VEHICLE_TOTAL_HEADERS)
+    for name in sorted(vehicle_totals, key=lambda n: (vehicle_order.index(n) if n in vehicle_order else len(vehicle_order), n)):
+        excel_summary_generator.spool_row(vehicle_spool, (name, vehicle_totals[name]['jobs'], vehicle_totals[name]['units']))
+    excel_summary_generator.spool_row(vehicle_spool, ("합계", sum(v['jobs'] for v in vehicle_totals.values()),
+                                                      sum(v['units'] for v in vehicle_totals.values())))
+
+    crew_spool = excel_summary_generator.new_sheet_spool('날짜별 인원 합계', CREW_TOTAL_HEADERS, {8: '#,##0', 9: '#,##0'})
+    grand_total = {'jobs': 0, 'men': 0, 'women': 0, 'ladder': 0, 'sky': 0, 'total_cost': 0, 'balance': 0}
+    for moving_date in sorted(crew_totals):
+        day = crew_totals[moving_date]
+        excel_summary_generator.spool_row(crew_spool, (moving_date, day['jobs'], day['men'], day['women'], day['men'] + day['women'],
+                                                       day['ladder'], day['sky'], day['total_cost'], day['balance']))
+        for key in grand_total: grand_total[key] += day[key]
+    excel_summary_generator.spool_row(crew_spool, ("합계", grand_total['jobs'], grand_total['men'], grand_total['women'],
+                                                   grand_total['men'] + grand_total['women'], grand_total['ladder'], grand_total['sky'],
+                                                   grand_total['total_cost'], grand_total['balance']))
+
+    spools = [jobs_spool, vehicle_spool, crew_spool]
+    if failed_spool["rows"]: spools.append(failed_spool)
+    else: failed_spool["file"].close()
+    temp_path = f"{output_path}.part"
+    try:
+        excel_summary_generator.write_summary_workbook(temp_path, spools)
+        os.replace(temp_path, output_path)
+    except Exception:
+        if os.path.exists(temp_path): os.remove(temp_path)
+        raise
+
+    elapsed = time.perf_counter() - started
+    report.update({"elapsed_sec": round(elapsed, 2), "jobs_per_sec": round(report["jobs"] / elapsed, 1) if elapsed > 0 else 0.0,
+                   "crew": grand_total, "vehicles": vehicle_totals, "xlsx_bytes": os.path.getsize(output_path)})
+    return report
+
+
+def generate_dispatch_report(start_date, end_date=None, output_path=None, root_folder_id=None):
+    """
+    이사일이 start_date~end_date(기본: start_date 하루)인 저장된 견적으로 배차표 Excel을 만듭니다.
+    반환: write_dispatch_workbook의 보고 딕셔너리 (+ start_date/end_date)
+    """
+    if gdrive is None:
+        raise RuntimeError("google_drive_helper를 불러오지 못해 저장된 견적을 조회할 수 없습니다.")
+    start_date = _to_date(start_date)
+    end_date = _to_date(end_date) if end_date else start_date
+    if end_date < start_date:
+        raise ValueError(f"종료일({end_date})이 시작일({start_date})보다 빠릅니다.")
+    output_path = output_path or f"dispatch_{start_date.isoformat()}" + (f"_{end_date.isoformat()}" if end_date != start_date else "") + ".xlsx"
+    root_folder_id = root_folder_id or gdrive.get_root_folder_id()
+
+    report = write_dispatch_workbook(_iter_quote_states(start_date, end_date, root_folder_id), output_path)
+    report.update({"start_date": start_date.isoformat(), "end_date": end_date.isoformat()})
+    print(f"INFO [DISPATCH]: {report['start_date']}~{report['end_date']} - {report['jobs']} jobs in {report['elapsed_sec']}s "
+          f"({report['jobs_per_sec']} jobs/s), {len(report['failed'])} failed -> {output_path}")
+    return report
+
+
+def next_day_range(today=None):
+    """다음 날 배차표 기본 범위 (내일 하루)."""
+    tomorrow = (today or date.today()) + timedelta(days=1)
+    return tomorrow, tomorrow
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="이사일 기준 배차표 Excel 생성")
+    parser.add_argument("start_date", nargs="?", help="시작 이사일 (YYYY-MM-DD, 기본: 내일)")
+    parser.add_argument("end_date", nargs="?", help="종료 이사일 (YYYY-MM-DD, 기본: 시작일)")
+    parser.add_argument("-o", "--output", help="Excel 파일 경로 (기본: dispatch_<이사일>.xlsx)")
+    parser.add_argument("--root-folder-id", default=None, help="견적 저장 Drive 폴더 ID (기본: secrets의 drive_folder_id)")
+    args = parser.parse_args(argv)
+
+    try:
+        start_date = _to_date(args.start_date) if args.start_date else next_day_range()[0]
+        end_date = _to_date(args.end_date) if args.end_date else start_date
+    except ValueError:
+        parser.error(f"이사일 형식이 올바르지 않습니다: {args.start_date} {args.end_date or ''}")
+    report = generate_dispatch_report(start_date, end_date, output_path=args.output, root_folder_id=args.root_folder_id)
+    for failure in report["failed"]:
+        print(f"  실패: {failure['name']} - {failure['error']}")
+    print(f"{report['jobs']}건 -> {report['output_path']} ({report['elapsed_sec']}초, "
+          f"인원 {report['crew']['men'] + report['crew']['women']}명)")
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
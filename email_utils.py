@@ -1,124 +1,388 @@
 # email_utils.py
+# 견적서 이메일 발송
+# SMTP 연결(TLS + 로그인)은 프로세스 안에서 재사용합니다 (연결 풀).
+# - 메일마다 새로 연결/로그인하지 않으므로 발송이 빠르고, 메일 제공자의 로그인 횟수 제한에 걸리지 않습니다.
+# - 한동안 쓰지 않은 연결은 재사용 전에 NOOP으로 확인하고, 끊긴 연결은 새 연결로 바꿔 다시 보냅니다.
+# - 여러 건은 send_many로 한 세션에서 차례로 보냅니다.
+# 화면의 발송 버튼(send_quote_email)은 발송 대기열(outbox)에 등록만 하고, 대기열 작업 스레드가 send_many로 보냅니다.
+# 로컬 SMTP 서버(aiosmtpd)로 점검: python -m pytest tests/test_email_utils.py
 
+import atexit
+import hashlib
+import threading
+import time
 import streamlit as st
-import smtplib
-import ssl
+from lazy_imports import lazy_module
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 import traceback
+import outbox
 
-def send_quote_email(recipient_email, subject, body, pdf_bytes, pdf_filename="견적서.pdf"):
-    """견적서 PDF를 이메일로 발송합니다."""
+# 실제 발송할 때 import (첫 화면 지연 방지)
+smtplib = lazy_module("smtplib")
+ssl = lazy_module("ssl")
 
-    # 1. 자격 증명 및 서버 정보 가져오기 (Streamlit Secrets)
-    try:
-        creds = st.secrets["email_credentials"]
-        sender_email = creds["sender_email"]
-        sender_password = creds["sender_password"]
-        smtp_server = creds["smtp_server"]
-        smtp_port = creds["smtp_port"]
-        # # # print(f"DEBUG: Loaded email credentials for {sender_email}")
-    except KeyError as e:
-        st.error(f"Streamlit Secrets에 이메일 설정({e})이 누락되었습니다. '.streamlit/secrets.toml' 파일을 확인하세요.")
-        return False
-    except Exception as e:
-        st.error(f"Streamlit Secrets 로딩 중 오류: {e}")
-        return False
+SMTP_TIMEOUT_SEC = 30               # 연결/응답 대기 시간
+POOL_MAX_IDLE_CONNECTIONS = 2       # 서버/계정별로 보관할 유휴 연결 수
+NOOP_CHECK_AFTER_SEC = 10           # 이보다 오래 쉬었던 연결은 재사용 전에 NOOP으로 확인
+MAX_CONNECTION_AGE_SEC = 240        # 서버가 유휴 연결을 끊기 전에(보통 5분) 새 연결로 교체
+MAX_MESSAGES_PER_CONNECTION = 80    # 연결당 발송 수 (제공자의 연결당 제한보다 작게)
+SEND_RETRIES = 1                    # 연결이 끊겨 실패했을 때 새 연결로 다시 보내는 횟수
 
-    # 2. 수신자 이메일 유효성 검사 (간단하게)
-    if not recipient_email or "@" not in recipient_email or "." not in recipient_email.split('@')[-1]:
-        st.error(f"유효하지 않은 이메일 주소입니다: {recipient_email}")
-        return False
+_pool_lock = threading.Lock()
+_idle_connections = {} # (서버, 포트, 보내는 주소) -> [연결 정보 dict]
+_parked_logins = {} # (서버, 포트, 보내는 주소) -> 로그인에 실패한 비밀번호의 해시 (설정이 바뀔 때까지 로그인하지 않음)
+_pool_stats = {"connects": 0, "reuses": 0, "noops": 0, "reconnects": 0, "sent": 0, "failed": 0}
+
+
+def _load_smtp_settings():
+    """Streamlit Secrets의 이메일 설정 (키가 없으면 KeyError)"""
+    creds = st.secrets["email_credentials"]
+    return {"sender_email": creds["sender_email"], "sender_password": creds["sender_password"],
+            "smtp_server": creds["smtp_server"], "smtp_port": int(creds["smtp_port"])}
+
+
+def _pool_key(settings):
+    return (settings["smtp_server"], int(settings["smtp_port"]), settings["sender_email"])
 
-    # 3. 이메일 메시지 생성 (MIMEMultipart 사용)
+
+def _is_valid_email(address):
+    return bool(address) and "@" in address and "." in address.split('@')[-1]
+
+
+def build_quote_message(sender_email, recipient_email, subject, body, pdf_bytes=None, pdf_filename="견적서.pdf"):
+    """견적서 메일(MIMEMultipart)을 만듭니다. PDF가 있으면 첨부합니다."""
     message = MIMEMultipart()
     message["From"] = sender_email
     message["To"] = recipient_email
     message["Subject"] = subject
-    # # # print(f"DEBUG: Email object created for {recipient_email}")
-
-    # 이메일 본문 추가
     message.attach(MIMEText(body, "plain", "utf-8")) # UTF-8 인코딩 명시
-
-    # PDF 첨부파일 추가
     if pdf_bytes:
-        try:
-            part = MIMEApplication(pdf_bytes, Name=pdf_filename) # 파일명 직접 사용
-            part.add_header('Content-Disposition', 'attachment', filename=('utf-8', '', pdf_filename))
-            message.attach(part)
-            # # # print(f"DEBUG: PDF attached with filename: {pdf_filename}")
-        except Exception as e:
-            st.error(f"PDF 첨부파일 처리 중 오류: {e}")
-            # # # print(f"Error attaching PDF: {e}")
-            traceback.print_exc()
-            return False
+        part = MIMEApplication(pdf_bytes, Name=pdf_filename) # 파일명 직접 사용
+        part.add_header('Content-Disposition', 'attachment', filename=('utf-8', '', pdf_filename))
+        message.attach(part)
+    return message
+
+
+def _close_quietly(server):
+    try: server.quit()
+    except Exception:
+        try: server.close()
+        except Exception: pass
+
 
-    # 4. SMTP 서버 연결 및 이메일 발송
-    server = None
+def _password_digest(settings):
+    return hashlib.sha256(str(settings["sender_password"]).encode("utf-8")).hexdigest()
+
+
+def _open_connection(settings):
+    """
+    새 SMTP 연결을 열고 로그인합니다 (465: SSL, 587: STARTTLS, 그 외: 평문).
+    로그인에 실패한 계정/비밀번호로는 설정이 바뀔 때까지 다시 로그인하지 않습니다 (반복 실패로 계정이 잠기지 않도록).
+    """
+    key = _pool_key(settings)
+    with _pool_lock: parked = _parked_logins.get(key) == _password_digest(settings)
+    if parked:
+        raise smtplib.SMTPAuthenticationError(535, "이전 로그인 실패 후 이메일 설정이 바뀌지 않아 로그인을 시도하지 않습니다.")
+    smtp_server, smtp_port = settings["smtp_server"], int(settings["smtp_port"])
+    timeout = settings.get("timeout", SMTP_TIMEOUT_SEC)
+    context = ssl.create_default_context()
+    if smtp_port == 465:
+        server = smtplib.SMTP_SSL(smtp_server, smtp_port, context=context, timeout=timeout)
+    elif smtp_port == 587:
+        server = smtplib.SMTP(smtp_server, smtp_port, timeout=timeout)
+        server.ehlo()
+        server.starttls(context=context)
+        server.ehlo()
+    else:
+        server = smtplib.SMTP(smtp_server, smtp_port, timeout=timeout)
     try:
-        context = ssl.create_default_context()
-        # # # print(f"DEBUG: Connecting to SMTP: {smtp_server}:{smtp_port}")
-        if smtp_port == 465:
-             server = smtplib.SMTP_SSL(smtp_server, smtp_port, context=context)
-             # # # print("DEBUG: Using SMTP_SSL.")
-        elif smtp_port == 587:
-             server = smtplib.SMTP(smtp_server, smtp_port)
-             # # # print("DEBUG: Using SMTP, attempting STARTTLS...")
-             server.ehlo()
-             server.starttls(context=context)
-             server.ehlo()
-             # # # print("DEBUG: STARTTLS successful.")
-        else:
-             server = smtplib.SMTP(smtp_server, smtp_port)
-             # # # print(f"DEBUG: Using SMTP on port {smtp_port}. Consider security.")
-
-        # # # print(f"DEBUG: Logging in as {sender_email}")
-        server.login(sender_email, sender_password)
-        # # # print("DEBUG: Login successful.")
-
-        # # # print(f"DEBUG: Sending email to {recipient_email}...")
-        server.send_message(message)
-        # # # print(f"DEBUG: Email sent successfully to {recipient_email}")
+        server.login(settings["sender_email"], settings["sender_password"])
+    except Exception as e:
+        _close_quietly(server)
+        if isinstance(e, smtplib.SMTPAuthenticationError):
+            with _pool_lock: _parked_logins[key] = _password_digest(settings)
+            print(f"ERROR [Email]: SMTP login failed for {settings['sender_email']}; no more logins until the email settings change")
+        raise
+    now = time.monotonic()
+    with _pool_lock:
+        _pool_stats["connects"] += 1
+        _parked_logins.pop(key, None)
+    print(f"INFO [Email]: SMTP connection opened to {smtp_server}:{smtp_port}")
+    return {"server": server, "key": key, "opened_at": now, "last_used": now, "sent": 0}
+
+
+def _is_reusable(conn):
+    """유휴 연결을 다시 써도 되는지 (오래된 연결은 버리고, 한동안 쉬었던 연결은 NOOP으로 확인)."""
+    now = time.monotonic()
+    if now - conn["opened_at"] > MAX_CONNECTION_AGE_SEC or conn["sent"] >= MAX_MESSAGES_PER_CONNECTION:
+        return False
+    if now - conn["last_used"] < NOOP_CHECK_AFTER_SEC:
+        return True
+    with _pool_lock: _pool_stats["noops"] += 1
+    try:
+        return conn["server"].noop()[0] == 250
+    except Exception:
+        return False
+
+
+def _checkout(settings):
+    """풀에서 살아 있는 연결을 꺼내거나, 없으면 새로 엽니다. 꺼낸 연결은 반납 전까지 한 호출만 사용합니다."""
+    key = _pool_key(settings)
+    while True:
+        with _pool_lock:
+            idle = _idle_connections.get(key)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            return _open_connection(settings)
+        if _is_reusable(conn):
+            with _pool_lock: _pool_stats["reuses"] += 1
+            return conn
+        _close_quietly(conn["server"])
+
+
+def _checkin(conn):
+    """사용이 끝난 연결을 풀에 돌려줍니다 (교체할 때가 되었거나 풀이 차 있으면 닫음)."""
+    if conn is None: return
+    if conn["sent"] < MAX_MESSAGES_PER_CONNECTION and time.monotonic() - conn["opened_at"] <= MAX_CONNECTION_AGE_SEC:
+        with _pool_lock:
+            idle = _idle_connections.setdefault(conn["key"], [])
+            if len(idle) < POOL_MAX_IDLE_CONNECTIONS:
+                idle.append(conn)
+                return
+    _close_quietly(conn["server"])
+
+
+def _needs_reconnect(error):
+    """연결 문제로 실패해 새 연결로 다시 보내면 되는 오류인지 (수신 거부, 인증 실패 등은 아님)."""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
         return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == 421 # 서버가 연결 종료 예고
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, (ConnectionError, TimeoutError)) or (isinstance(error, OSError) and not isinstance(error, ssl.SSLError))
+
+
+class _SendError(Exception):
+    """발송 실패 (원래 오류 + 아직 쓸 수 있는 연결, 없으면 None)"""
+    def __init__(self, error, conn):
+        super().__init__(str(error))
+        self.error, self.conn = error, conn
+
+
+def _deliver(settings, conn, message):
+    """
+    conn(None이면 새 연결)으로 message를 보냅니다. 연결이 끊겨 있으면 새 연결로 바꿔 다시 보냅니다.
+    반환: 이후에도 사용할 연결 (연결당 발송 수가 찼으면 닫고 None). 실패하면 _SendError
+    """
+    for attempt in range(SEND_RETRIES + 1):
+        try:
+            if conn is None: conn = _open_connection(settings)
+            conn["server"].send_message(message)
+        except Exception as e:
+            reconnect = _needs_reconnect(e)
+            if reconnect and conn is not None:
+                _close_quietly(conn["server"])
+                conn = None
+            if not reconnect or attempt >= SEND_RETRIES:
+                raise _SendError(e, conn) from e
+            print(f"WARNING [Email]: SMTP connection lost ({type(e).__name__}: {e}), reconnecting")
+            with _pool_lock: _pool_stats["reconnects"] += 1
+            continue
+        conn["sent"] += 1
+        conn["last_used"] = time.monotonic()
+        with _pool_lock: _pool_stats["sent"] += 1
+        if conn["sent"] >= MAX_MESSAGES_PER_CONNECTION:
+            _close_quietly(conn["server"])
+            conn = None
+        return conn
 
-    except smtplib.SMTPAuthenticationError:
-        st.error("이메일 로그인 실패: 이메일 주소 또는 앱 비밀번호를 확인하세요. (Gmail 사용 시 앱 비밀번호 필요)")
-        # # # print("Error: SMTP Authentication Error. Check email/app password.")
+
+def _error_message(error, settings):
+    """발송 오류를 화면/결과에 표시할 문구로 바꿉니다."""
+    smtp_server, smtp_port = settings.get("smtp_server"), settings.get("smtp_port")
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return "이메일 로그인 실패: 이메일 주소 또는 앱 비밀번호를 확인하세요. (Gmail 사용 시 앱 비밀번호 필요)"
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return "SMTP 서버 연결이 끊겼습니다. 잠시 후 다시 시도하세요."
+    if isinstance(error, smtplib.SMTPException):
+        return f"SMTP 오류 발생: {error}"
+    if isinstance(error, ConnectionRefusedError):
+        return f"SMTP 서버 연결 거부: 서버 주소({smtp_server}) 또는 포트({smtp_port})를 확인하세요."
+    if isinstance(error, ssl.SSLError):
+        return f"SSL 오류 발생: {error}. 포트({smtp_port}) 설정 또는 서버 보안 설정을 확인하세요."
+    if isinstance(error, OSError):
+        return f"네트워크 오류 발생: {error}. SMTP 서버 주소 및 포트, 네트워크 연결 상태를 확인하세요."
+    return f"이메일 발송 중 예상치 못한 오류 발생: {error}"
+
+
+def _is_retryable(error):
+    """
+    나중에 다시 보내면 성공할 수 있는 오류인지 (4xx 일시 오류, 연결/네트워크 오류는 재시도).
+    로그인 실패는 설정을 고치기 전에는 계속 실패하므로 재시도하지 않습니다 (고친 뒤 관리자 화면에서 다시 시도).
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPAuthenticationError):
         return False
-    except smtplib.SMTPServerDisconnected:
-        st.error("SMTP 서버 연결이 끊겼습니다. 잠시 후 다시 시도하세요.")
-        # # # print("Error: SMTP Server Disconnected.")
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return True
+
+
+def _print_error_trace(error):
+    # 인증 실패/연결 끊김/연결 거부는 원인이 분명하므로 스택 출력 생략
+    if not isinstance(error, (smtplib.SMTPAuthenticationError, smtplib.SMTPServerDisconnected, ConnectionRefusedError)):
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+
+def send_quote_email(recipient_email, subject, body, pdf_bytes, pdf_filename="견적서.pdf", revision=None, resend=False):
+    """
+    견적서 PDF 이메일을 발송 대기열(outbox)에 등록합니다. 실제 발송은 대기열 작업 스레드가 합니다.
+    revision(견적 내용 해시)이 같고 받는 사람이 같으면 한 번만 등록됩니다 (실패한 건은 다시 대기,
+    이미 발송한 건은 resend=True일 때만 다시 발송).
+    반환: 'queued'(등록), 'duplicate'(이미 대기/발송 중이거나 발송됨), 실패하면 False.
+    대기열을 쓸 수 없으면 바로 발송하고 성공하면 'sent'를 반환합니다.
+    """
+    if not _is_valid_email(recipient_email):
+        st.error(f"유효하지 않은 이메일 주소입니다: {recipient_email}")
         return False
-    except smtplib.SMTPException as e:
-        st.error(f"SMTP 오류 발생: {e}")
-        # # # print(f"Error: SMTP Exception: {e}")
+    try:
+        entry = outbox.enqueue("email", recipient_email, {"subject": subject, "body": body, "pdf_filename": pdf_filename},
+                               attachment=pdf_bytes, revision=revision, resend=resend)
+    except Exception as e:
+        print(f"ERROR [Email]: outbox enqueue failed, sending directly: {e}")
         traceback.print_exc()
+        return "sent" if send_quote_email_now(recipient_email, subject, body, pdf_bytes, pdf_filename) else False
+    return "duplicate" if entry["duplicate"] else "queued"
+
+
+def send_quote_email_now(recipient_email, subject, body, pdf_bytes, pdf_filename="견적서.pdf", settings=None):
+    """견적서 PDF를 이메일로 바로 발송합니다. (풀의 SMTP 연결 사용, settings가 없으면 Streamlit Secrets)"""
+
+    # 1. 자격 증명 및 서버 정보 가져오기 (Streamlit Secrets)
+    if settings is None:
+        try:
+            settings = _load_smtp_settings()
+        except KeyError as e:
+            st.error(f"Streamlit Secrets에 이메일 설정({e})이 누락되었습니다. '.streamlit/secrets.toml' 파일을 확인하세요.")
+            return False
+        except Exception as e:
+            st.error(f"Streamlit Secrets 로딩 중 오류: {e}")
+            return False
+
+    # 2. 수신자 이메일 유효성 검사 (간단하게)
+    if not _is_valid_email(recipient_email):
+        st.error(f"유효하지 않은 이메일 주소입니다: {recipient_email}")
         return False
-    except ConnectionRefusedError:
-         st.error(f"SMTP 서버 연결 거부: 서버 주소({smtp_server}) 또는 포트({smtp_port})를 확인하세요.")
-         # # # print(f"Error: Connection Refused for SMTP server {smtp_server}:{smtp_port}")
-         return False
-    except ssl.SSLError as e:
-         st.error(f"SSL 오류 발생: {e}. 포트({smtp_port}) 설정 또는 서버 보안 설정을 확인하세요.")
-         # # # print(f"Error: SSL Error: {e}")
-         traceback.print_exc()
-         return False
-    except OSError as e:
-         st.error(f"네트워크 오류 발생: {e}. SMTP 서버 주소 및 포트, 네트워크 연결 상태를 확인하세요.")
-         # # # print(f"Error: Network/OS Error: {e}")
-         traceback.print_exc()
-         return False
+
+    # 3. 이메일 메시지 생성
+    try:
+        message = build_quote_message(settings["sender_email"], recipient_email, subject, body, pdf_bytes, pdf_filename)
     except Exception as e:
-        st.error(f"이메일 발송 중 예상치 못한 오류 발생: {e}")
-        # # # print(f"Error: Unexpected error sending email: {e}")
+        st.error(f"PDF 첨부파일 처리 중 오류: {e}")
         traceback.print_exc()
         return False
+
+    # 4. 풀의 SMTP 연결로 발송
+    conn = None
+    try:
+        conn = _checkout(settings)
+        conn = _deliver(settings, conn, message)
+        return True
+    except _SendError as e:
+        conn = e.conn
+        error = e.error
+    except Exception as e:
+        error = e
     finally:
-        if server:
+        _checkin(conn)
+    with _pool_lock: _pool_stats["failed"] += 1
+    st.error(_error_message(error, settings))
+    _print_error_trace(error)
+    return False
+
+
+def send_many(emails, settings=None):
+    """
+    여러 이메일을 한 SMTP 세션으로 차례로 발송합니다 (연결이 끊기면 새 연결로 이어서 발송).
+    emails: [{'recipient', 'subject', 'body', 'pdf_bytes'(선택), 'pdf_filename'(선택)}]
+    반환: 입력 순서대로 [{'recipient', 'ok', 'error', 'retryable'}]. 화면 표시는 호출하는 쪽에서 합니다.
+    로그인 실패/서버 연결 불가처럼 이후 메일도 보낼 수 없는 오류면 남은 메일은 시도하지 않고 같은 오류로 표시합니다.
+    """
+    emails = list(emails or [])
+    results = [{"recipient": email.get("recipient"), "ok": False, "error": None, "retryable": False} for email in emails]
+    if settings is None:
+        try:
+            settings = _load_smtp_settings()
+        except Exception as e:
+            for result in results: result.update(error=f"이메일 설정을 불러올 수 없습니다: {e}", retryable=True)
+            return results
+
+    conn, fatal_error, fatal_retryable = None, None, True
+    try:
+        for email, result in zip(emails, results):
+            if fatal_error:
+                result.update(error=fatal_error, retryable=fatal_retryable)
+                continue
+            if not _is_valid_email(result["recipient"]):
+                result["error"] = f"유효하지 않은 이메일 주소입니다: {result['recipient']}"
+                continue
             try:
-                 server.quit()
-                 # # # print("DEBUG: SMTP connection closed.")
+                message = build_quote_message(settings["sender_email"], result["recipient"], email.get("subject", ""),
+                                              email.get("body", ""), email.get("pdf_bytes"), email.get("pdf_filename", "견적서.pdf"))
             except Exception as e:
-                 # # # print(f"Warning: Error quitting SMTP server: {e}")
-                 pass
\ No newline at end of file
+                result["error"] = f"PDF 첨부파일 처리 중 오류: {e}"
+                continue
+            try:
+                if conn is None: conn = _checkout(settings)
+                conn = _deliver(settings, conn, message)
+                result["ok"] = True
+                continue
+            except _SendError as e:
+                conn, error = e.conn, e.error
+            except Exception as e: # _checkout에서 새 연결/로그인 실패
+                conn, error = None, e
+            result.update(error=_error_message(error, settings), retryable=_is_retryable(error))
+            with _pool_lock: _pool_stats["failed"] += 1
+            print(f"ERROR [Email]: send to {result['recipient']} failed: {result['error']}")
+            # 연결을 쓸 수 없게 된 오류(인증 실패, 연결 거부 등)는 남은 메일에도 같으므로 로그인을 반복하지 않음
+            if conn is None:
+                fatal_error, fatal_retryable = result["error"], result["retryable"]
+                _print_error_trace(error)
+    finally:
+        _checkin(conn)
+    sent = sum(1 for result in results if result["ok"])
+    print(f"INFO [Email]: send_many finished: {sent}/{len(results)} sent")
+    return results
+
+
+def _send_outbox_batch(entries, settings=None):
+    """발송 대기열(outbox) 작업 스레드가 호출: 대기 중인 이메일 여러 건을 한 SMTP 세션으로 보냅니다."""
+    return send_many([{"recipient": entry["recipient"], "subject": entry["payload"].get("subject", ""),
+                       "body": entry["payload"].get("body", ""), "pdf_bytes": entry["attachment"],
+                       "pdf_filename": entry["payload"].get("pdf_filename", "견적서.pdf")} for entry in entries],
+                     settings=settings)
+
+
+outbox.register_channel("email", _send_outbox_batch, batch_size=20)
+
+
+def close_pool():
+    """유휴 SMTP 연결을 모두 닫습니다 (프로세스 종료 시 자동 호출)."""
+    with _pool_lock:
+        connections = [conn for idle in _idle_connections.values() for conn in idle]
+        _idle_connections.clear()
+    for conn in connections:
+        _close_quietly(conn["server"])
+
+
+atexit.register(close_pool)
+
+
+def get_pool_stats():
+    """연결 풀 통계 (connects: 새 연결/로그인 수, reuses, noops, reconnects, sent, failed, idle: 현재 유휴 연결 수)"""
+    with _pool_lock:
+        return dict(_pool_stats, idle=sum(len(idle) for idle in _idle_connections.values()))
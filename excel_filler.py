@@ -1,13 +1,20 @@
 # excel_filler.py
 
-import openpyxl
 import io
 import streamlit as st
 import os
 import traceback
-from datetime import date
+from datetime import date, datetime
 import re
+import threading
+import zipfile
+from xml.sax.saxutils import escape as xml_escape
 import utils # <--- utils 모듈 임포트
+import quote_report # 모든 출력 형식이 공통으로 쓰는 견적 보고서 모델
+from cost_ledger import CostCode
+from lazy_imports import lazy_module
+
+openpyxl = lazy_module("openpyxl") # XML 패치 실패 시(대체 경로)에만 불러옴
 
 try:
     import data
@@ -15,282 +22,527 @@ except ImportError:
     st.error("data.py 파일을 찾을 수 없습니다. excel_filler.py와 같은 폴더에 있는지 확인하세요.")
     data = None
 
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FINAL_XLSX_PATH = os.path.join(_BASE_DIR, "final.xlsx") # 실제 템플릿 파일명
+TEMPLATE_SHEET_NAME = 'Sheet1'
+_DATE_CELLS = ("K3",) # date 값을 'yyyy-mm-dd' 날짜 형식으로 기록하는 셀
+_DATE_NUMBER_FORMAT = "yyyy-mm-dd"
+_EXCEL_EPOCH = datetime(1899, 12, 30) # 1900 날짜 체계 기준일 (일련번호 0)
+_FIXED_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_template_lock = threading.Lock()
+_template_cache = {} # {"bytes": 템플릿 원본 바이트, "mtime": 파일 수정 시각, "compiled": {셀 주소 집합: 컴파일된 템플릿}}
+
+# XML 직렬화에 사용할 수 없는 제어 문자 (openpyxl은 이 경우 예외 발생)
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_CELL_PATTERN = re.compile(r'<c r="(?P<ref>[A-Z]+\d+)"(?P<attrs>[^>]*?)(?:/>|>(?P<body>.*?)</c>)', re.S)
+_ROW_PATTERN = re.compile(r'<row r="(?P<num>\d+)"[^>]*?(?:/>|>(?P<body>.*?)</row>)', re.S)
+_STYLE_ATTR_PATTERN = re.compile(r'\ss="(\d+)"')
+
+
 # --- 수정된 get_tv_qty (utils 사용) ---
-def get_tv_qty(state_data):
-    """모든 크기의 TV 수량을 합산하여 반환 (utils.get_item_qty 사용)"""
+def get_tv_qty(state_data, qty_index=None):
+    """모든 크기의 TV 수량을 합산하여 반환 (utils.build_item_qty_index 사용)"""
     if not data or not hasattr(data, 'items') or not isinstance(data.items, dict):
         return 0
-    total_tv_qty = 0
-    # data.items에서 "TV("로 시작하는 모든 품목 키를 찾습니다.
-    tv_keys = [key for key in data.items if key.startswith("TV(")]
-    for tv_item_name in tv_keys:
-        # utils의 get_item_qty 함수를 사용하여 각 TV 품목의 수량을 가져옵니다.
-        total_tv_qty += utils.get_item_qty(state_data, tv_item_name)
-    return total_tv_qty
+    if qty_index is None: qty_index = utils.build_item_qty_index(state_data)
+    # data.items에서 "TV("로 시작하는 모든 품목의 수량을 합산합니다.
+    return sum(qty_index.get(key, 0) for key in data.items if key.startswith("TV("))
 # --- 헬퍼 함수 끝 ---
 
 
-def fill_final_excel_template(state_data, calculated_cost_items, total_cost, personnel_info):
+# === 템플릿 캐시 ===
+def _get_template_bytes():
+    """final.xlsx 원본 바이트 (프로세스 내 캐시, 파일이 바뀌면 다시 읽고 컴파일 결과도 버림)."""
+    mtime = os.path.getmtime(FINAL_XLSX_PATH)
+    with _template_lock:
+        if _template_cache.get("mtime") != mtime:
+            with open(FINAL_XLSX_PATH, "rb") as template_file:
+                _template_cache.update({"bytes": template_file.read(), "mtime": mtime, "compiled": {}})
+            print(f"INFO [Excel Filler]: Template '{FINAL_XLSX_PATH}' loaded into memory.")
+        return _template_cache["bytes"]
+
+
+def warm_up_template():
+    """템플릿을 읽고 셀 매핑과 시트 XML 분석 결과를 미리 만들어 둡니다 (warmup 스레드에서 호출)."""
+    if not data or not os.path.exists(FINAL_XLSX_PATH): return False
+    empty_report = quote_report.build_quote_report({}, [], 0, {})
+    _get_compiled_template(_build_cell_values(empty_report).keys()) # 셀 주소 집합은 견적 내용과 무관하게 같음
+    return True
+
+
+def _column_index(col_letters):
+    index = 0
+    for ch in col_letters: index = index * 26 + (ord(ch) - 64)
+    return index
+
+
+def _split_ref(ref):
+    match = re.match(r"([A-Z]+)(\d+)$", ref)
+    return _column_index(match.group(1)), int(match.group(2))
+
+
+def _find_sheet_path(zip_file, sheet_name):
+    """workbook.xml과 관계 파일에서 시트 이름에 해당하는 워크시트 XML 경로를 찾습니다."""
+    workbook_xml = zip_file.read("xl/workbook.xml").decode("utf-8")
+    sheet_match = re.search(r'<sheet [^>]*name="%s"[^>]*r:id="([^"]+)"' % re.escape(sheet_name), workbook_xml)
+    if not sheet_match: raise KeyError(f"시트 '{sheet_name}'를 찾을 수 없습니다.")
+    rels_xml = zip_file.read("xl/_rels/workbook.xml.rels").decode("utf-8")
+    rel_match = re.search(r'<Relationship [^>]*Id="%s"[^>]*Target="([^"]+)"' % re.escape(sheet_match.group(1)), rels_xml) \
+        or re.search(r'<Relationship [^>]*Target="([^"]+)"[^>]*Id="%s"' % re.escape(sheet_match.group(1)), rels_xml)
+    target = rel_match.group(1)
+    return target.lstrip("/") if target.startswith("/") else "xl/" + target
+
+
+def _compile_styles(styles_xml, date_base_styles):
+    """
+    날짜 셀용 셀 서식(xf)을 미리 추가한 styles.xml과 {원래 서식 번호: 날짜 서식 번호}를 만듭니다.
+    원래 셀 서식(테두리, 글꼴 등)은 유지하고 표시 형식만 yyyy-mm-dd로 바꿉니다.
+    """
+    fmt_match = re.search(r'<numFmt numFmtId="(\d+)" formatCode="%s"/>' % re.escape(_DATE_NUMBER_FORMAT), styles_xml)
+    if fmt_match:
+        date_fmt_id = int(fmt_match.group(1))
+    else:
+        date_fmt_id = max([163] + [int(x) for x in re.findall(r'<numFmt numFmtId="(\d+)"', styles_xml)]) + 1
+        new_fmt = f'<numFmt numFmtId="{date_fmt_id}" formatCode="{_DATE_NUMBER_FORMAT}"/>'
+        if "<numFmts" in styles_xml:
+            styles_xml = re.sub(r'<numFmts count="(\d+)">', lambda m: f'<numFmts count="{int(m.group(1)) + 1}">', styles_xml, count=1)
+            styles_xml = styles_xml.replace("</numFmts>", new_fmt + "</numFmts>", 1)
+        else:
+            styles_xml = styles_xml.replace("<fonts", f'<numFmts count="1">{new_fmt}</numFmts><fonts', 1)
+
+    xfs_match = re.search(r'<cellXfs count="(\d+)">(.*?)</cellXfs>', styles_xml, re.S)
+    xf_elements = re.findall(r'<xf [^>]*?(?:/>|>.*?</xf>)', xfs_match.group(2), re.S)
+    date_style_map = {}
+    new_xfs = []
+    for base_style in sorted(set(date_base_styles)):
+        base_xf = xf_elements[base_style] if base_style is not None else '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        date_xf = re.sub(r'numFmtId="\d+"', f'numFmtId="{date_fmt_id}"', base_xf, count=1)
+        if 'applyNumberFormat=' in date_xf:
+            date_xf = re.sub(r'applyNumberFormat="\d"', 'applyNumberFormat="1"', date_xf, count=1)
+        else:
+            date_xf = date_xf.replace("<xf ", '<xf applyNumberFormat="1" ', 1)
+        date_style_map[base_style] = len(xf_elements) + len(new_xfs)
+        new_xfs.append(date_xf)
+    if new_xfs:
+        new_count = len(xf_elements) + len(new_xfs)
+        styles_xml = (styles_xml[:xfs_match.start()] + f'<cellXfs count="{new_count}">' + xfs_match.group(2)
+                      + "".join(new_xfs) + "</cellXfs>" + styles_xml[xfs_match.end():])
+    return styles_xml, date_style_map
+
+
+def _compile_template(template_bytes, cell_refs):
+    """
+    템플릿을 한 번 분석해 요청마다 문자열 이어 붙이기만으로 시트 XML을 만들 수 있는 형태로 준비합니다.
+    - 시트 XML: 값을 쓸 셀 위치(슬롯)와 그 사이의 고정 XML 조각
+    - 공유 문자열: 템플릿 문자열 목록과 {문자열: 번호} 사전
+    - 그 외 zip 항목: 원본 바이트 그대로 (styles.xml은 날짜 서식 추가본)
+    """
+    src = zipfile.ZipFile(io.BytesIO(template_bytes))
+    sheet_path = _find_sheet_path(src, TEMPLATE_SHEET_NAME)
+    sheet_xml = src.read(sheet_path).decode("utf-8")
+    data_start = sheet_xml.index("<sheetData>") + len("<sheetData>")
+    data_end = sheet_xml.index("</sheetData>")
+
+    rows = {} # 행 번호 -> {"start", "end", "body_end", "cells": {주소: (start, end, attrs, body)}}
+    for row_match in _ROW_PATTERN.finditer(sheet_xml, data_start, data_end):
+        if row_match.group("body") is None: continue # 빈 행(<row/>)은 새 행으로 취급
+        row_cells = {}
+        for cell_match in _CELL_PATTERN.finditer(sheet_xml, row_match.start("body"), row_match.end("body")):
+            row_cells[cell_match.group("ref")] = (cell_match.start(), cell_match.end(), cell_match.group("attrs"), cell_match.group("body"))
+        rows[int(row_match.group("num"))] = {"start": row_match.start(), "end": row_match.end(),
+                                             "body_end": row_match.end("body"), "cells": row_cells}
+
+    slots = [] # (시작, 끝, 정렬 키, 종류, 내용)
+    shared_refs_replaced = 0
+    new_rows = {} # 삽입 위치 -> {행 번호: [주소]}
+    for ref in cell_refs:
+        col, row_num = _split_ref(ref)
+        row = rows.get(row_num)
+        if row and ref in row["cells"]:
+            start, end, attrs, body = row["cells"][ref]
+            style_match = _STYLE_ATTR_PATTERN.search(attrs)
+            if 't="s"' in attrs: shared_refs_replaced += 1
+            slots.append((start, end, col, "cell", (ref, int(style_match.group(1)) if style_match else None, True)))
+        elif row:
+            later_cells = [c[0] for r, c in row["cells"].items() if _split_ref(r)[0] > col]
+            insert_at = min(later_cells) if later_cells else row["body_end"]
+            slots.append((insert_at, insert_at, col, "cell", (ref, None, False)))
+        else:
+            later_rows = [r["start"] for n, r in rows.items() if n > row_num]
+            insert_at = min(later_rows) if later_rows else data_end
+            new_rows.setdefault(insert_at, {}).setdefault(row_num, []).append(ref)
+    for insert_at, row_map in new_rows.items():
+        slots.append((insert_at, insert_at, 0, "rows", {n: sorted(refs, key=lambda r: _split_ref(r)[0]) for n, refs in row_map.items()}))
+
+    dim_match = re.search(r'<dimension ref="([A-Z]+\d+):([A-Z]+)(\d+)"/>', sheet_xml)
+    if dim_match:
+        slots.append((dim_match.start(), dim_match.end(), 0, "dimension", (dim_match.group(1), dim_match.group(2), int(dim_match.group(3)))))
+    slots.sort(key=lambda slot: (slot[0], slot[2]))
+
+    segments, cursor = [], 0
+    for start, end, _, _, _ in slots:
+        segments.append(sheet_xml[cursor:start])
+        cursor = end
+    segments.append(sheet_xml[cursor:])
+
+    sst_xml = src.read("xl/sharedStrings.xml").decode("utf-8") if "xl/sharedStrings.xml" in src.namelist() else None
+    sst_items, sst_index, sst_count = [], {}, 0
+    if sst_xml:
+        sst_items = re.findall(r"<si>.*?</si>", sst_xml, re.S)
+        count_match = re.search(r'<sst [^>]*count="(\d+)"', sst_xml)
+        sst_count = int(count_match.group(1)) if count_match else len(sst_items)
+        for i, item in enumerate(sst_items):
+            plain = re.fullmatch(r'<si><t(?: xml:space="preserve")?>([^<]*)</t></si>', item)
+            if plain:
+                text = plain.group(1).replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"').replace("&apos;", "'").replace("&amp;", "&")
+                sst_index.setdefault(text, i)
+
+    date_base_styles = [slot[4][1] for slot in slots if slot[3] == "cell" and slot[4][0] in _DATE_CELLS]
+    styles_xml, date_style_map = _compile_styles(src.read("xl/styles.xml").decode("utf-8"), date_base_styles)
+
+    static_entries = [] # (이름, 바이트, 원본 ZipInfo) - 요청마다 바뀌는 시트/공유 문자열 외 항목
+    for info in src.infolist():
+        if info.filename in (sheet_path, "xl/sharedStrings.xml"): continue
+        entry_bytes = styles_xml.encode("utf-8") if info.filename == "xl/styles.xml" else src.read(info.filename)
+        static_entries.append((info.filename, entry_bytes, info))
+
+    return {
+        "sheet_path": sheet_path, "segments": segments, "slots": [slot[3:] for slot in slots],
+        "sst_items_xml": "".join(sst_items), "sst_index": sst_index,
+        "sst_base_count": sst_count - shared_refs_replaced, "sst_unique_count": len(sst_items),
+        "date_style_map": date_style_map, "static_entries": static_entries,
+        "entry_order": [info.filename for info in src.infolist()],
+    }
+
+
+def _get_compiled_template(cell_refs):
+    template_bytes = _get_template_bytes()
+    key = tuple(sorted(cell_refs))
+    with _template_lock:
+        compiled = _template_cache["compiled"].get(key)
+        if compiled is None:
+            compiled = _compile_template(template_bytes, key)
+            _template_cache["compiled"][key] = compiled
+        return compiled
+
+
+# === XML 직접 패치 ===
+def _excel_serial(value):
+    """date/datetime -> Excel 날짜 일련번호 (1900 날짜 체계)."""
+    if not isinstance(value, datetime): value = datetime(value.year, value.month, value.day)
+    delta = value.replace(tzinfo=None) - _EXCEL_EPOCH
+    serial = delta.days + delta.seconds / 86400
+    return int(serial) if serial == int(serial) else serial
+
+
+def _render_cell(ref, style, value, compiled, new_strings):
+    """셀 하나의 XML. 문자열은 공유 문자열 번호로, 숫자/날짜는 값으로 기록합니다. 빈 값이면 서식만 남깁니다."""
+    style_attr = f' s="{style}"' if style is not None else ""
+    if value is None or value == "":
+        return f'<c r="{ref}"{style_attr}/>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{style_attr} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{style_attr}><v>{value!r}</v></c>'
+    if isinstance(value, date):
+        date_style = compiled["date_style_map"].get(style, style)
+        date_style_attr = f' s="{date_style}"' if date_style is not None else ""
+        return f'<c r="{ref}"{date_style_attr}><v>{_excel_serial(value)}</v></c>'
+    text = _ILLEGAL_XML_CHARS.sub("", str(value))
+    index = compiled["sst_index"].get(text)
+    if index is None:
+        index = new_strings.get(text)
+        if index is None:
+            index = compiled["sst_unique_count"] + len(new_strings)
+            new_strings[text] = index
+    return f'<c r="{ref}"{style_attr} t="s"><v>{index}</v></c>'
+
+
+def _write_with_xml_patch(cell_values):
+    """미리 컴파일한 템플릿에 셀 값만 끼워 넣어 xlsx 바이트를 만듭니다 (워크북 전체를 파싱하지 않음)."""
+    compiled = _get_compiled_template(cell_values.keys())
+    new_strings = {} # {문자열: 공유 문자열 번호} - 템플릿에 없는 문자열만
+    string_refs = 0
+    parts = [compiled["segments"][0]]
+    for (kind, payload), segment in zip(compiled["slots"], compiled["segments"][1:]):
+        if kind == "cell":
+            ref, style, exists = payload
+            value = cell_values.get(ref)
+            if exists or (value is not None and value != ""):
+                cell_xml = _render_cell(ref, style, value, compiled, new_strings)
+                if 't="s"' in cell_xml: string_refs += 1
+                parts.append(cell_xml)
+        elif kind == "rows":
+            for row_num in sorted(payload):
+                row_cells = [_render_cell(ref, None, cell_values.get(ref), compiled, new_strings)
+                             for ref in payload[row_num] if cell_values.get(ref) not in (None, "")]
+                string_refs += sum(1 for cell_xml in row_cells if 't="s"' in cell_xml)
+                if row_cells: parts.append(f'<row r="{row_num}">{"".join(row_cells)}</row>')
+        elif kind == "dimension":
+            first_ref, last_col, last_row = payload
+            filled_rows = [_split_ref(ref)[1] for ref, value in cell_values.items() if value not in (None, "")]
+            parts.append(f'<dimension ref="{first_ref}:{last_col}{max([last_row] + filled_rows)}"/>')
+        parts.append(segment)
+    sheet_xml = "".join(parts)
+
+    new_items = "".join(
+        f'<si><t xml:space="preserve">{xml_escape(text)}</t></si>' if text != text.strip() else f"<si><t>{xml_escape(text)}</t></si>"
+        for text in new_strings)
+    sst_xml = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+               f'count="{compiled["sst_base_count"] + string_refs}" uniqueCount="{compiled["sst_unique_count"] + len(new_strings)}">'
+               f'{compiled["sst_items_xml"]}{new_items}</sst>')
+
+    generated = {compiled["sheet_path"]: sheet_xml.encode("utf-8"), "xl/sharedStrings.xml": sst_xml.encode("utf-8")}
+    static = {name: entry_bytes for name, entry_bytes, _ in compiled["static_entries"]}
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as dst:
+        for name in compiled["entry_order"]:
+            info = zipfile.ZipInfo(name, date_time=_FIXED_ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            dst.writestr(info, generated[name] if name in generated else static[name])
+    return output.getvalue()
+
+
+# === openpyxl 방식 (대체 경로) ===
+def _write_with_openpyxl(cell_values):
+    """메모리에 캐시한 템플릿 원본을 openpyxl로 열어 셀 값을 쓰고 저장합니다."""
+    wb = openpyxl.load_workbook(io.BytesIO(_get_template_bytes()))
+    ws = wb[TEMPLATE_SHEET_NAME]
+    for ref, value in cell_values.items():
+        if value is None and ws[ref].value is None: continue
+        ws[ref] = value
+        if ref in _DATE_CELLS and isinstance(value, date):
+            ws[ref].number_format = _DATE_NUMBER_FORMAT # 날짜 형식 지정
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+# === 셀 매핑 표 ===
+def _or_blank(value):
+    """보고서 값이 없으면(None) 빈 칸."""
+    return '' if value is None else value
+
+
+def _format_jangrong_qty(original_jangrong_qty):
+    """장롱은 3으로 나눈 값을 소수점 첫째 자리까지 표시 (예: 10자 -> 3.3)"""
+    try:
+        return f"{original_jangrong_qty / 3.0:.1f}"
+    except Exception as e:
+        print(f"ERROR [Excel Filler D8]: Error calculating Jangrong qty: {e}")
+        return "Error" # 오류 발생 시 "Error" 표시
+
+# 셀 주소 -> 값 출처. 처음 사용할 때 한 번 컴파일합니다 (_get_cell_map).
+#   ("state", 키)            : state_data 값 그대로
+#   ("item", 품목명[, 변환])  : 품목 수량
+#   ("items", 접두어)         : 이름이 접두어로 시작하는 모든 품목 수량의 합 (예: 모든 크기의 TV)
+#   ("cost", 필드, ...)       : 비용 필드 합 (COST_CODE_FIELDS 참고)
+EXCEL_CELL_MAP = {
+    'C2': ("state", 'customer_name'),
+    'G2': ("state", 'customer_phone'),
+    'C3': ("state", 'from_location'),
+    'C4': ("state", 'to_location'),
+    'E5': ("state", 'from_method'),
+    'E6': ("state", 'to_method'),
+    # 비용 (다른 비용 필드도 템플릿에 칸을 만들면 여기에 추가)
+    'F22': ("cost", 'basic_fare'),
+    'F23': ("cost", 'ladder_from', 'ladder_to'), # 출발지, 도착지 사다리 합산 (템플릿 구조에 따라 분리 가능)
+    'J22': ("cost", 'sky_cost'), # 스카이 비용
+    # D열
+    'D8': ("item", '장롱', _format_jangrong_qty),
+    'D9': ("item", '더블침대'),
+    'D10': ("item", '서랍장'),
+    'D11': ("item", '서랍장(3단)'),
+    'D12': ("item", '4도어 냉장고'),
+    'D13': ("item", '김치냉장고(일반형)'),
+    'D14': ("item", '김치냉장고(스탠드형)'),
+    'D15': ("item", '소파(3인용)'),
+    'D16': ("item", '소파(1인용)'),
+    'D17': ("item", '식탁(4인)'),
+    'D18': ("item", '에어컨'),
+    'D19': ("item", '장식장'),
+    'D20': ("item", '피아노(디지털)'),
+    'D21': ("item", '세탁기 및 건조기'),
+    # H열
+    'H9': ("item", '사무실책상'),
+    'H10': ("item", '책상&의자'),
+    'H11': ("item", '책장'),
+    'H15': ("item", '바구니'),
+    'H16': ("item", '중박스'), # data.py 정의에 따라 '중자바구니' 또는 '중박스' 확인
+    'H19': ("item", '화분'),
+    'H20': ("item", '책바구니'),
+    # L열
+    'L8': ("item", '스타일러'),
+    'L9': ("item", '안마기'),
+    'L10': ("item", '피아노(일반)'),
+    'L12': ("items", 'TV('), # 모든 TV 합산
+    'L16': ("item", '금고'),
+    'L17': ("item", '앵글'),
+}
+
+# 비용 항목 코드(cost_ledger.CostCode) -> 비용 필드 (같은 필드의 코드는 합산)
+COST_CODE_FIELDS = {
+    CostCode.BASE_FARE: 'basic_fare',
+    CostCode.LADDER_FROM: 'ladder_from',
+    CostCode.LADDER_TO: 'ladder_to',
+    CostCode.SKY_FROM: 'sky_cost',
+    CostCode.SKY_TO: 'sky_cost',
+    CostCode.STORAGE: 'storage_cost',
+    CostCode.LONG_DISTANCE: 'long_dist_cost',
+    CostCode.WASTE: 'waste_cost',
+    CostCode.ADDITIONAL_PERSONNEL: 'add_person_cost',
+    CostCode.DATE_SURCHARGE: 'date_surcharge',
+    CostCode.REGIONAL_LADDER: 'regional_surcharge',
+    CostCode.VIA_POINT: 'via_point_surcharge',
+    CostCode.ADJUSTMENT: 'adjustment', # 할증/할인 조정
+}
+
+_compiled_cell_map = None
+
+
+def _get_cell_map():
+    """EXCEL_CELL_MAP을 [(주소, 종류, 출처 이름 튜플, 변환 함수)]로 한 번만 컴파일합니다 (접두어 합산은 품목명 목록으로 풀어 둠)."""
+    global _compiled_cell_map
+    if _compiled_cell_map is None:
+        item_names = list(data.items) if data and isinstance(getattr(data, 'items', None), dict) else []
+        compiled = []
+        for ref, spec in EXCEL_CELL_MAP.items():
+            kind = spec[0]
+            if kind == "state":
+                compiled.append((ref, kind, (spec[1],), None))
+            elif kind == "item":
+                compiled.append((ref, kind, (spec[1],), spec[2] if len(spec) > 2 else None))
+            elif kind == "items":
+                compiled.append((ref, "item", tuple(name for name in item_names if name.startswith(spec[1])), None))
+            elif kind == "cost":
+                compiled.append((ref, kind, tuple(spec[1:]), None))
+            else:
+                raise ValueError(f"알 수 없는 셀 매핑 종류: {ref} -> {spec}")
+        _compiled_cell_map = compiled
+    return _compiled_cell_map
+
+
+def _collect_cost_fields(report):
+    """견적 보고서의 비용 항목을 {비용 필드: 금액}으로 모읍니다 (코드 색인으로 조회, 목록을 다시 훑지 않음)."""
+    ledger = report["cost_lines"]
+    costs = dict.fromkeys(COST_CODE_FIELDS.values(), 0)
+    for code, field in COST_CODE_FIELDS.items():
+        costs[field] += ledger.amount(code)
+    return costs
+
+
+def _build_cell_values(report):
     """
-    final.xlsx 템플릿을 열고 값을 채웁니다.
+    견적 보고서(quote_report)를 템플릿 셀 주소별 값 {주소: 값}으로 계산합니다 (None은 비움).
     경유지 정보 및 요금 포함
     """
+    cells = {}
+    state_data = report["state"]
+    locations, via_point, vehicle = report["locations"], report["via_point"], report["vehicle"]
+
+    # --- 1. 기본 정보 입력 ---
+    move_type_parts = []
+    if report["storage"]: move_type_parts.append("보관")
+    if via_point: move_type_parts.append("경유") # 경유 추가
+    if report["long_distance"]: move_type_parts.append("장거리")
+
+    base_move_type = report["move_type"] or ""
+    if "사무실" in base_move_type: move_type_parts.append("사무실")
+    elif "가정" in base_move_type: move_type_parts.append("가정")
+
+    move_type_str = " ".join(move_type_parts).strip() or base_move_type
+    cells['J1'] = move_type_str
+
+    # 매핑 표의 셀 (품목 수량은 보고서의 수량 인덱스에서 조회)
+    qty_index = report["qty_index"]
+    costs = _collect_cost_fields(report)
+    for ref, kind, names, formatter in _get_cell_map():
+        if kind == "state": value = state_data.get(names[0], '')
+        elif kind == "item": value = sum(qty_index.get(name, 0) for name in names)
+        else: value = sum(costs[name] for name in names)
+        cells[ref] = formatter(value) if formatter else value
+
+    moving_date_val = report["moving_date"]
+    if isinstance(moving_date_val, date):
+        cells['K3'] = moving_date_val # 날짜 셀은 'yyyy-mm-dd' 형식으로 기록 (_DATE_CELLS)
+    elif moving_date_val: # 문자열 등으로 들어올 경우 그대로 사용
+        cells['K3'] = str(moving_date_val)
+    else:
+        cells['K3'] = '' # 값 없을 시 공백
+
+    cells['C3'] = _or_blank(locations["from"])
+    cells['C4'] = _or_blank(locations["to"])
+
+    # 경유지 주소/작업 방법 (G4, K6)
+    cells['G4'] = _or_blank(via_point["location"]) if via_point else ''
+    cells['K6'] = _or_blank(via_point["method"]) if via_point else ''
+
+    cells['L5'] = report["personnel"]["men"]
+    cells['L6'] = report["personnel"]["women"]
+
+    from_floor_str = str(_or_blank(locations["from_floor"])).strip()
+    cells['D5'] = f"{from_floor_str}층" if from_floor_str else ''
+    to_floor_str = str(_or_blank(locations["to_floor"])).strip()
+    cells['D6'] = f"{to_floor_str}층" if to_floor_str else ''
+
+    # --- 차량 정보 (B7: 톤수 숫자만, H7: 실제 투입) ---
+    cells['B7'] = vehicle["tonnage"]
+    dispatched_parts = [f"{label}: {count}" for label, count in vehicle["dispatched"] if count > 0]
+    cells['H7'] = ", ".join(dispatched_parts) if dispatched_parts else ''
+
+
+    # --- 2. 비용 정보 입력 (기본 운임/사다리/스카이는 EXCEL_CELL_MAP) ---
+    # 계약금은 deposit_amount(UI) 또는 저장된 tab3_deposit_amount (quote_report에서 처리)
+    cells['J23'] = report["deposit"]
+    cells['F25'] = report["total"] # 총액
+    cells['J24'] = report["balance"] # 잔금
+
+    # --- 3. 고객 요구사항 입력 (B26 셀부터 '.' 단위로 한 줄씩) ---
+    start_row_notes = 26 # 시작 행
+    max_possible_note_lines = 20 # 최대 기록 줄 수 (템플릿에 따라 조절)
+
+    # 기존 내용 지우기
+    for i in range(max_possible_note_lines):
+        cells[f"B{start_row_notes + i}"] = None
+
+    for i, part in enumerate(report["note_parts"][:max_possible_note_lines]):
+        cells[f"B{start_row_notes + i}"] = part
+
+    return cells
+
+
+def fill_final_excel_template(state_data, calculated_cost_items, total_cost, personnel_info, report=None):
+    """
+    final.xlsx 템플릿에 값을 채운 xlsx 바이트를 반환합니다. (report: 이미 만든 견적 보고서가 있으면 재사용)
+    템플릿은 한 번만 읽어 시트 XML을 미리 분석해 두고, 요청마다 값이 들어갈 셀 XML만 바꿔 끼웁니다.
+    XML 패치에 실패하면 openpyxl로 템플릿을 열어 채우는 방식으로 대체합니다.
+    """
     if not data:
         st.error("data.py 모듈 로드 실패로 Excel 생성을 진행할 수 없습니다.")
         return None
 
     try:
-        # final.xlsx 경로 설정
-        script_dir = os.path.dirname(__file__) if "__file__" in locals() else "."
-        final_xlsx_path = os.path.join(script_dir, "final.xlsx") # 실제 템플릿 파일명
-
-        if not os.path.exists(final_xlsx_path):
-            st.error(f"템플릿 파일 '{final_xlsx_path}'을 찾을 수 없습니다.")
-            print(f"Error: Template file not found at '{final_xlsx_path}'")
+        if not os.path.exists(FINAL_XLSX_PATH):
+            st.error(f"템플릿 파일 '{FINAL_XLSX_PATH}'을 찾을 수 없습니다.")
+            print(f"Error: Template file not found at '{FINAL_XLSX_PATH}'")
             return None
 
-        wb = openpyxl.load_workbook(final_xlsx_path)
-        # 시트 이름 확인 필요 (활성 시트 또는 특정 이름)
-        # ws = wb.active # 활성 시트 사용
-        ws = wb['Sheet1'] # 또는 특정 시트 이름 사용, 예: 'Sheet1'
-
-        print(f"INFO [Excel Filler]: Template '{final_xlsx_path}' loaded, using sheet '{ws.title}'")
-
-        # --- 1. 기본 정보 입력 ---
-        is_storage = state_data.get('is_storage_move', False)
-        is_long_distance = state_data.get('apply_long_distance', False)
-        has_via_point = state_data.get('has_via_point', False) # 경유지 유무
-
-        move_type_parts = []
-        if is_storage: move_type_parts.append("보관")
-        if has_via_point: move_type_parts.append("경유") # 경유 추가
-        if is_long_distance: move_type_parts.append("장거리")
-        
-        base_move_type = state_data.get('base_move_type', "")
-        if "사무실" in base_move_type: move_type_parts.append("사무실")
-        elif "가정" in base_move_type: move_type_parts.append("가정")
-        
-        move_type_str = " ".join(move_type_parts).strip() or base_move_type
-        ws['J1'] = move_type_str
-
-        ws['C2'] = state_data.get('customer_name', '')
-        ws['G2'] = state_data.get('customer_phone', '')
-        
-        moving_date_val = state_data.get('moving_date')
-        if isinstance(moving_date_val, date):
-            ws['K3'] = moving_date_val
-            ws['K3'].number_format = 'yyyy-mm-dd' # 날짜 형식 지정
-        elif moving_date_val: # 문자열 등으로 들어올 경우 그대로 사용
-            ws['K3'] = str(moving_date_val)
-        else:
-            ws['K3'] = '' # 값 없을 시 공백
-
-        ws['C3'] = state_data.get('from_location', '')
-        ws['C4'] = state_data.get('to_location', '')
-
-        # 경유지 정보 추가 (템플릿에 해당 셀이 있다고 가정, 예: C5)
-        if has_via_point:
-            ws['G4'] = state_data.get('via_point_location', '') # 예시 셀 'G4', 실제 템플릿에 맞게 수정
-        else:
-            ws['G4'] = ''
-
-
-        p_info = personnel_info if isinstance(personnel_info, dict) else {}
-        try: ws['L5'] = int(p_info.get('final_men', 0) or 0)
-        except (ValueError, TypeError): ws['L5'] = 0
-        try: ws['L6'] = int(p_info.get('final_women', 0) or 0)
-        except (ValueError, TypeError): ws['L6'] = 0
-
-        from_floor_str = str(state_data.get('from_floor', '')).strip()
-        ws['D5'] = f"{from_floor_str}층" if from_floor_str else ''
-        to_floor_str = str(state_data.get('to_floor', '')).strip()
-        ws['D6'] = f"{to_floor_str}층" if to_floor_str else ''
-        
-        ws['E5'] = state_data.get('from_method', '')
-        ws['E6'] = state_data.get('to_method', '')
-        # 경유지 작업 방법 (템플릿에 해당 셀이 있다고 가정, 예: E7)
-        if has_via_point:
-            ws['K6'] = state_data.get('via_point_method', '') # 예시 셀 'K6'
-        else:
-            ws['K6'] = ''
-
-
-        # --- 차량 정보 (B7: 톤수만, H7: 실제 투입) ---
-        selected_vehicle = state_data.get('final_selected_vehicle', '')
-        vehicle_tonnage = ''
-        if isinstance(selected_vehicle, str) and selected_vehicle.strip():
-            try:
-                match = re.search(r'(\d+(\.\d+)?)', selected_vehicle) # 숫자 부분 추출
-                if match:
-                    vehicle_tonnage = match.group(1) # "2.5" 또는 "5" 등
-                else: # 매칭 실패 시, 숫자 아닌 문자 제거 후 시도
-                    vehicle_tonnage_cleaned = re.sub(r'[^\d.]', '', selected_vehicle)
-                    vehicle_tonnage = vehicle_tonnage_cleaned if vehicle_tonnage_cleaned else ''
-            except Exception as e:
-                print(f"ERROR [Excel Filler B7]: Error processing vehicle tonnage: {e}")
-                vehicle_tonnage = '' # 오류 시 빈 문자열
-        elif selected_vehicle: # 숫자가 아닌 다른 타입일 경우 문자열로 변환
-             vehicle_tonnage = str(selected_vehicle)
-        ws['B7'] = vehicle_tonnage # "톤" 글자 제외하고 숫자만 입력되도록 수정
-
-        dispatched_parts = []
-        dispatched_1t = state_data.get('dispatched_1t', 0)
-        dispatched_2_5t = state_data.get('dispatched_2_5t', 0)
-        dispatched_3_5t = state_data.get('dispatched_3_5t', 0)
-        dispatched_5t = state_data.get('dispatched_5t', 0)
-        try: dispatched_1t = int(dispatched_1t or 0)
-        except: dispatched_1t = 0
-        try: dispatched_2_5t = int(dispatched_2_5t or 0)
-        except: dispatched_2_5t = 0
-        try: dispatched_3_5t = int(dispatched_3_5t or 0)
-        except: dispatched_3_5t = 0
-        try: dispatched_5t = int(dispatched_5t or 0)
-        except: dispatched_5t = 0
-            
-        if dispatched_1t > 0: dispatched_parts.append(f"1톤: {dispatched_1t}")
-        if dispatched_2_5t > 0: dispatched_parts.append(f"2.5톤: {dispatched_2_5t}")
-        if dispatched_3_5t > 0: dispatched_parts.append(f"3.5톤: {dispatched_3_5t}")
-        if dispatched_5t > 0: dispatched_parts.append(f"5톤: {dispatched_5t}")
-        ws['H7'] = ", ".join(dispatched_parts) if dispatched_parts else ''
-
-
-        # --- 2. 비용 정보 입력 (경유지 요금 포함) ---
-        basic_fare = 0; ladder_from = 0; ladder_to = 0; sky_cost=0; storage_cost=0
-        long_dist_cost=0; waste_cost=0; add_person_cost=0; date_surcharge=0
-        regional_surcharge=0; adjustment=0; via_point_surcharge = 0 # 경유지 요금 변수
-
-        if calculated_cost_items and isinstance(calculated_cost_items, list):
-            for item in calculated_cost_items:
-                if isinstance(item, (list, tuple)) and len(item) >= 2:
-                    label, amount_raw = item[0], item[1]
-                    try: amount = int(amount_raw)
-                    except (ValueError, TypeError): amount = 0
-                    
-                    if label == '기본 운임': basic_fare = amount
-                    elif label == '출발지 사다리차': ladder_from = amount
-                    elif label == '도착지 사다리차': ladder_to = amount
-                    elif label == '스카이 장비': sky_cost = amount
-                    elif label == '보관료': storage_cost = amount
-                    elif label == '장거리 운송료': long_dist_cost = amount
-                    elif label == '폐기물 처리(톤)': waste_cost = amount
-                    elif label == '추가 인력': add_person_cost = amount
-                    elif label == '날짜 할증': date_surcharge = amount
-                    elif label == '지방 사다리 추가요금': regional_surcharge = amount
-                    elif label == '경유지 추가요금': via_point_surcharge = amount # 경유지 요금 할당
-                    elif "조정" in label: adjustment += amount # 할증/할인 조정은 누적
-
-        ws['F22'] = basic_fare
-        ws['F23'] = ladder_from + ladder_to # 출발지, 도착지 사다리 합산 (템플릿 구조에 따라 분리 가능)
-        ws['J22'] = sky_cost # 스카이 비용 (템플릿 셀 J22 가정)
-        # 기타 비용들 (템플릿에 맞는 셀에 배치)
-        # 예: ws['X22'] = storage_cost
-        # 예: ws['X23'] = long_dist_cost
-        # 예: ws['X24'] = waste_cost
-        # 예: ws['X25'] = add_person_cost
-        # 예: ws['X26'] = date_surcharge
-        # 예: ws['X27'] = regional_surcharge
-        # 예: ws['X28'] = via_point_surcharge # 경유지 요금 (템플릿 셀 X28 가정)
-        # 예: ws['X29'] = adjustment
-
-        # 계약금 및 잔금 (state_manager.py와 키 일관성 확인)
-        # UI는 deposit_amount 사용, 저장된 state는 tab3_deposit_amount 일 수 있음
-        deposit_amount_raw = state_data.get('deposit_amount', state_data.get('tab3_deposit_amount', 0))
-        try: deposit_amount = int(deposit_amount_raw)
-        except (ValueError, TypeError): deposit_amount = 0
-        ws['J23'] = deposit_amount
-
-        try: total_cost_num = int(total_cost)
-        except (ValueError, TypeError): total_cost_num = 0
-        ws['F25'] = total_cost_num # 총액
-        remaining_balance = total_cost_num - deposit_amount
-        ws['J24'] = remaining_balance # 잔금
-
-        # --- 3. 고객 요구사항 입력 (B26 셀부터 순차 기록 - 기존 수정 유지) ---
-        special_notes_str = state_data.get('special_notes', '')
-        start_row_notes = 26 # 시작 행
-        max_possible_note_lines = 20 # 최대 기록 줄 수 (템플릿에 따라 조절)
-
-        # 기존 내용 지우기
-        for i in range(max_possible_note_lines):
-             clear_cell_addr = f"B{start_row_notes + i}"
-             try:
-                 if ws[clear_cell_addr].value is not None: # 셀이 존재하고 값이 있을 때만 None으로 설정
-                     ws[clear_cell_addr].value = None
-             except Exception as e:
-                 print(f"Warning [Excel Filler B26+]: Could not clear cell {clear_cell_addr}: {e}")
-
-        if special_notes_str:
-            notes_parts = [part.strip() for part in special_notes_str.split('.') if part.strip()] # '.' 기준으로 나누고 공백 제거
-            for i, part in enumerate(notes_parts):
-                if i < max_possible_note_lines: # 최대 줄 수 넘지 않도록
-                    target_cell_notes = f"B{start_row_notes + i}"
-                    try:
-                        ws[target_cell_notes] = part
-                    except Exception as e:
-                         print(f"ERROR [Excel Filler B26+]: Failed to write note to {target_cell_notes}: {e}")
-        else: # 고객 요구사항이 없을 경우, 첫 줄만 비움 (이미 위에서 처리됨)
-             try:
-                 if ws['B26'].value is not None: ws['B26'] = None
-             except Exception as e: print(f"Warning [Excel Filler B26+]: Could not clear B26 for empty notes: {e}")
-
-
-        # --- 4. 품목 수량 입력 (utils.get_item_qty 사용, D8 장롱 수량 처리) ---
-        # D열
-        original_jangrong_qty = utils.get_item_qty(state_data, '장롱') # utils 사용
-        jangrong_formatted_qty = "0.0" # 기본 문자열 값
+        report = report or quote_report.build_quote_report(state_data, calculated_cost_items, total_cost, personnel_info)
+        cell_values = _build_cell_values(report)
         try:
-            # 장롱은 3으로 나눈 값을 소수점 첫째 자리까지 표시 (예: 10자 -> 3.3)
-            calculated_qty = original_jangrong_qty / 3.0
-            jangrong_formatted_qty = f"{calculated_qty:.1f}"
-        except ZeroDivisionError: # 0으로 나누는 경우 (거의 발생 안 함)
-            jangrong_formatted_qty = "0.0"
-        except Exception as e:
-            print(f"ERROR [Excel Filler D8]: Error calculating Jangrong qty: {e}")
-            jangrong_formatted_qty = "Error" # 오류 발생 시 "Error" 표시
-        ws['D8'] = jangrong_formatted_qty # 계산된 값 또는 오류 메시지 입력
-
-        ws['D9'] = utils.get_item_qty(state_data, '더블침대')
-        ws['D10'] = utils.get_item_qty(state_data, '서랍장')
-        ws['D11'] = utils.get_item_qty(state_data, '서랍장(3단)')
-        ws['D12'] = utils.get_item_qty(state_data, '4도어 냉장고')
-        ws['D13'] = utils.get_item_qty(state_data, '김치냉장고(일반형)')
-        ws['D14'] = utils.get_item_qty(state_data, '김치냉장고(스탠드형)')
-        ws['D15'] = utils.get_item_qty(state_data, '소파(3인용)')
-        ws['D16'] = utils.get_item_qty(state_data, '소파(1인용)')
-        ws['D17'] = utils.get_item_qty(state_data, '식탁(4인)')
-        ws['D18'] = utils.get_item_qty(state_data, '에어컨')
-        ws['D19'] = utils.get_item_qty(state_data, '장식장')
-        ws['D20'] = utils.get_item_qty(state_data, '피아노(디지털)')
-        ws['D21'] = utils.get_item_qty(state_data, '세탁기 및 건조기')
-
-        # H열
-        ws['H9'] = utils.get_item_qty(state_data, '사무실책상')
-        ws['H10'] = utils.get_item_qty(state_data, '책상&의자')
-        ws['H11'] = utils.get_item_qty(state_data, '책장')
-        ws['H15'] = utils.get_item_qty(state_data, '바구니')
-        ws['H16'] = utils.get_item_qty(state_data, '중박스') # data.py 정의에 따라 '중자바구니' 또는 '중박스' 확인
-        ws['H19'] = utils.get_item_qty(state_data, '화분')
-        ws['H20'] = utils.get_item_qty(state_data, '책바구니')
-
-        # L열
-        ws['L8'] = utils.get_item_qty(state_data, '스타일러')
-        ws['L9'] = utils.get_item_qty(state_data, '안마기')
-        ws['L10'] = utils.get_item_qty(state_data, '피아노(일반)')
-        ws['L12'] = get_tv_qty(state_data) # 수정된 get_tv_qty 호출 (모든 TV 합산)
-        ws['L16'] = utils.get_item_qty(state_data, '금고')
-        ws['L17'] = utils.get_item_qty(state_data, '앵글')
-
-
-        # --- 5. 완료된 엑셀 파일을 메모리에 저장 ---
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0) # 버퍼 포인터 리셋
+            excel_bytes = _write_with_xml_patch(cell_values)
+        except Exception as patch_e:
+            print(f"Warning [Excel Filler]: XML patch failed, falling back to openpyxl: {patch_e}")
+            traceback.print_exc()
+            excel_bytes = _write_with_openpyxl(cell_values)
         print("INFO [Excel Filler]: Excel file generation complete.")
-        return output.getvalue() # 바이트 데이터 반환
+        return excel_bytes
 
     except FileNotFoundError:
-        st.error(f"Excel 템플릿 파일 '{final_xlsx_path}'을(를) 찾을 수 없습니다.")
-        print(f"Error: Template file not found at '{final_xlsx_path}' during generation.")
+        st.error(f"Excel 템플릿 파일 '{FINAL_XLSX_PATH}'을(를) 찾을 수 없습니다.")
+        print(f"Error: Template file not found at '{FINAL_XLSX_PATH}' during generation.")
         return None
     except Exception as e:
         st.error(f"Excel 생성 중 오류 발생: {e}")
@@ -1,199 +1,287 @@
 # excel_summary_generator.py (PDF 생성기에서 분리된 Excel 요약 생성 로직)
+# 요약 Excel은 pandas 없이 openpyxl write-only 시트로 바로 기록합니다.
+# - 행을 만드는 동안 열 너비(한글 가중치 적용)를 함께 계산하고
+# - 행은 작은 묶음 단위로 임시 파일에 모아 두었다가 열 너비를 먼저 기록한 뒤 시트로 흘려보냅니다.
+# 여러 견적을 합친 10만 행 규모의 요약도 메모리에 전체 행을 올리지 않고 만들 수 있습니다.
 
-import pandas as pd
 import io
-import streamlit as st
+import math
+import os
+import pickle
+import tempfile
+import time
 import traceback
+import unicodedata
+from datetime import date
+
+import streamlit as st
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
 import utils # utils.py 가 필요합니다
 import data # data.py 가 필요합니다
-import os
-from datetime import date
-import openpyxl # ExcelWriter 및 형식 지정 위해 필요
-import math # 컬럼 너비 계산 위해 추가
+from cost_ledger import CostCode
+
+# --- 열 너비 계산 (문자별 가중치) ---
+WIDE_CHAR_WIDTH = 1.8 # 한글/전각 문자 한 글자의 표시 너비 (영문/숫자 = 1.0)
+SUMMARY_WIDTH_PADDING = 2
+SUMMARY_MIN_WIDTH = 8
+SUMMARY_MAX_WIDTH = 50
+SPOOL_BATCH_ROWS = 1000 # 임시 파일에 한 번에 기록할 행 수 (메모리에 동시에 머무는 최대 행 수)
+
+# 한글 음절/호환 자모는 미리 채워 두고, 그 밖의 비ASCII 문자는 처음 나올 때 한 번만 판정해 추가합니다.
+_CHAR_WIDTHS = {chr(code): WIDE_CHAR_WIDTH for code in range(0xAC00, 0xD7A4)}
+_CHAR_WIDTHS.update({chr(code): WIDE_CHAR_WIDTH for code in range(0x3131, 0x318F)})
+
+# 숫자 서식별 화면 표시 문자열 (열 너비 계산용)
+_NUMBER_FORMAT_DISPLAY = {
+    '#,##0': lambda value: f"{value:,.0f}",
+    '0.0': lambda value: f"{value:.1f}",
+    '0.00': lambda value: f"{value:.2f}",
+    '0.000': lambda value: f"{value:.3f}",
+}
+
+_HEADER_FONT = Font(bold=True)
+_HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+_HEADER_BORDER = Border(*(Side(style='thin'),) * 4)
+
+_WASTE_SECTION = "폐기 처리 품목 🗑️"
+
+
+def _char_width(char):
+    width = _CHAR_WIDTHS.get(char)
+    if width is None:
+        width = WIDE_CHAR_WIDTH if unicodedata.east_asian_width(char) in ('W', 'F') else 1.0
+        _CHAR_WIDTHS[char] = width
+    return width
+
+
+def text_display_width(text):
+    """문자열의 대략적인 표시 너비 (여러 줄이면 가장 긴 줄 기준)."""
+    if text.isascii():
+        return max(len(line) for line in text.split('\n')) if '\n' in text else len(text)
+    return max(sum(_char_width(char) for char in line) for line in text.split('\n'))
+
+
+def _cell_display_width(value, number_format):
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and number_format in _NUMBER_FORMAT_DISPLAY:
+        return len(_NUMBER_FORMAT_DISPLAY[number_format](value))
+    return text_display_width(str(value))
+
+
+# --- 스트리밍 시트 작성 ---
+def new_sheet_spool(title, headers, number_formats=None):
+    """
+    시트 하나의 행을 모을 스풀을 만듭니다. number_formats: {열 번호(1부터): 숫자 서식}
+    행은 spool_row로 추가하고, write_summary_workbook에 넘기면 열 너비를 먼저 기록한 뒤 행을 씁니다.
+    """
+    return {
+        "title": title,
+        "headers": list(headers),
+        "number_formats": dict(number_formats or {}),
+        "widths": [text_display_width(str(header)) for header in headers],
+        "rows": 0,
+        "batch": [],
+        "file": tempfile.TemporaryFile(),
+    }
+
+
+def _flush_spool(spool):
+    if spool["batch"]:
+        pickle.dump(spool["batch"], spool["file"], protocol=pickle.HIGHEST_PROTOCOL)
+        spool["batch"] = []
+
+
+def spool_row(spool, row):
+    """행을 스풀에 추가하면서 열별 최대 표시 너비를 갱신합니다."""
+    widths = spool["widths"]
+    number_formats = spool["number_formats"]
+    for col_idx, value in enumerate(row, 1):
+        if value is None or value == "": continue
+        width = _cell_display_width(value, number_formats.get(col_idx))
+        if col_idx > len(widths):
+            widths.extend([0] * (col_idx - len(widths)))
+        if width > widths[col_idx - 1]:
+            widths[col_idx - 1] = width
+    spool["batch"].append(tuple(row))
+    spool["rows"] += 1
+    if len(spool["batch"]) >= SPOOL_BATCH_ROWS:
+        _flush_spool(spool)
+
+
+def _iter_spooled_rows(spool):
+    _flush_spool(spool)
+    spool_file = spool["file"]
+    spool_file.seek(0)
+    while True:
+        try: batch = pickle.load(spool_file)
+        except EOFError: break
+        yield from batch
 
-def generate_summary_excel(state_data, calculated_cost_items, personnel_info, vehicle_info, waste_info):
-    """계산된 견적 정보를 바탕으로 상세 내역 Excel 파일을 생성하여 Bytes 형태로 반환합니다."""
+
+def _column_width(display_width, padding, min_width, max_width):
+    return min(max(math.ceil(display_width) + padding, min_width), max_width)
+
+
+def _write_spool_sheet(workbook, spool, padding, min_width, max_width):
+    worksheet = workbook.create_sheet(title=spool["title"])
+    # write-only 시트는 첫 행을 쓰기 전에 열 너비가 정해져 있어야 함
+    for col_idx, display_width in enumerate(spool["widths"], 1):
+        column_letter = openpyxl.utils.get_column_letter(col_idx)
+        worksheet.column_dimensions[column_letter].width = _column_width(display_width, padding, min_width, max_width)
+
+    header_cells = []
+    for header in spool["headers"]:
+        cell = WriteOnlyCell(worksheet, value=header)
+        cell.font, cell.alignment, cell.border = _HEADER_FONT, _HEADER_ALIGNMENT, _HEADER_BORDER
+        header_cells.append(cell)
+    worksheet.append(header_cells)
+
+    number_formats = spool["number_formats"]
+    for row in _iter_spooled_rows(spool):
+        if number_formats:
+            row = list(row)
+            for col_idx, number_format in number_formats.items():
+                if col_idx <= len(row) and isinstance(row[col_idx - 1], (int, float)) and not isinstance(row[col_idx - 1], bool):
+                    cell = WriteOnlyCell(worksheet, value=row[col_idx - 1])
+                    cell.number_format = number_format
+                    row[col_idx - 1] = cell
+        worksheet.append(row)
+
+
+def write_summary_workbook(output, spools, padding=SUMMARY_WIDTH_PADDING, min_width=SUMMARY_MIN_WIDTH, max_width=SUMMARY_MAX_WIDTH):
+    """
+    스풀들을 순서대로 시트로 만들어 output(파일 경로 또는 파일 객체)에 저장합니다.
+    열 너비 = ceil(최대 표시 너비) + padding, [min_width, max_width] 범위로 제한
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    try:
+        for spool in spools:
+            _write_spool_sheet(workbook, spool, padding, min_width, max_width)
+        workbook.save(output)
+    finally:
+        for spool in spools:
+            spool["file"].close()
+
+
+def build_summary_workbook_bytes(sheets, **width_options):
+    """sheets: [(시트명, 헤더 목록, 행 iterable, 숫자 서식 dict)] -> xlsx 바이트 (견적 1건 분량의 작은 요약용)"""
+    spools = []
+    for title, headers, rows, number_formats in sheets:
+        spool = new_sheet_spool(title, headers, number_formats)
+        spools.append(spool)
+        for row in rows:
+            spool_row(spool, row)
+    output = io.BytesIO()
+    write_summary_workbook(output, spools, **width_options)
+    return output.getvalue()
+
+
+def iter_item_rows(state_data):
+    """현재 이사 유형의 품목 중 수량이 있는 것: (구분, 품목명, 수량, 개당 부피, 개당 무게) (폐기 품목 제외)"""
+    move_type = state_data.get('base_move_type')
+    item_defs = data.item_definitions.get(move_type) if move_type else None
+    if not isinstance(item_defs, dict): return
+    processed_items = set() # 중복 방지
+    for section, item_list in item_defs.items():
+        if section == _WASTE_SECTION or not isinstance(item_list, list): continue
+        for item_name in item_list:
+            if item_name in processed_items or item_name not in data.items: continue
+            processed_items.add(item_name)
+            qty_raw = state_data.get(f"qty_{move_type}_{section}_{item_name}")
+            try: qty = int(qty_raw) if qty_raw is not None else 0
+            except (ValueError, TypeError): qty = 0
+            if qty > 0:
+                volume, weight = data.items.get(item_name, [0, 0])
+                yield section, item_name, qty, volume, weight
+
+
+ITEM_SHEET_HEADERS = ["구분", "품목명", "수량", "개당 부피(CBM)", "개당 무게(kg)", "총 부피(CBM)", "총 무게(kg)"]
+ITEM_SHEET_FORMATS = {3: '#,##0', 4: '0.000', 5: '0.0', 6: '0.000', 7: '0.0'}
+
+
+def generate_summary_excel(report):
+    """견적 보고서(quote_report.build_quote_report)를 바탕으로 상세 내역 Excel 파일을 생성하여 Bytes 형태로 반환합니다."""
     try:
-        output = io.BytesIO()
-
-        # --- 데이터 준비 ---
-
-        # 1. 견적 기본 정보 DataFrame 생성
-        # 실제 투입 차량/인원 정보 반영
-        actual_vehicles_disp = state_data.get('actual_vehicles_override', {})
-        if not any(actual_vehicles_disp.values()):
-            actual_vehicles_disp = vehicle_info.get('recommended_vehicles', {})
-        vehicle_str_excel = ", ".join([f"{name}({qty}대)" for name, qty in actual_vehicles_disp.items() if qty > 0])
-        if not vehicle_str_excel: vehicle_str_excel = "정보 없음"
-
-        actual_men_excel = state_data.get('actual_men', personnel_info.get('final_men', 0))
-        actual_women_excel = state_data.get('actual_women', personnel_info.get('final_women', 0))
-
-        info_data = {
-            "항목": ["고객명", "연락처", "이메일", "이사일", "이사 종류",
-                   "출발지 주소", "출발지 층수", "출발지 E/V",
-                   "도착지 주소", "도착지 층수", "도착지 E/V",
-                   "예상 총 부피(CBM)", "예상 총 무게(kg)",
-                   "실제 투입 차량", "실제 투입 인원(남)", "실제 투입 인원(여)",
-                   "사다리차(출발)", "사다리차(도착)", "지방 사다리 추가요금",
-                   "폐기물 처리(톤)", "폐기물 처리 비용",
-                   "최종 조정 금액"], # 최종 금액 추가
-            "내용": [
-                state_data.get('customer_name', ''), state_data.get('customer_phone', ''), state_data.get('customer_email', ''),
-                state_data.get('moving_date', ''), state_data.get('base_move_type', ''),
-                state_data.get('start_address', ''), state_data.get('start_floor', ''), '있음' if state_data.get('start_elevator') else '없음',
-                state_data.get('end_address', ''), state_data.get('end_floor', ''), '있음' if state_data.get('end_elevator') else '없음',
-                f"{state_data.get('calculated_total_volume', 0):.2f}", f"{state_data.get('calculated_total_weight', 0):.1f}",
-                vehicle_str_excel, # 실제 투입 차량
-                actual_men_excel, # 실제 투입 남자
-                actual_women_excel, # 실제 투입 여자
-                f"{state_data.get('start_ladder_preset','-')}" if state_data.get('start_ladder') else "미사용",
-                f"{state_data.get('end_ladder_preset','-')}" if state_data.get('end_ladder') else "미사용",
-                f"{state_data.get('regional_ladder_surcharge', 0):,.0f}",
-                f"{waste_info.get('total_waste_tons', 0.0):.1f}", f"{waste_info.get('total_waste_cost', 0):,.0f}",
-                f"{state_data.get('final_adjusted_cost', state_data.get('calculated_total_cost', 0)):,.0f}" # 최종 금액 표시
-            ]
-        }
-        df_info = pd.DataFrame(info_data)
-
-        # 2. 전체 품목 리스트 DataFrame 생성
-        all_items_data = []
-        move_type = state_data.get('base_move_type')
-        if move_type and move_type in data.item_definitions:
-            processed_items = set() # 중복 방지
-            item_defs_excel = data.item_definitions[move_type]
-            if isinstance(item_defs_excel, dict):
-                for section, item_list in item_defs_excel.items():
-                    if section == "폐기 처리 품목 🗑️": continue # 폐기 품목 제외
-                    if isinstance(item_list, list):
-                        for item_name in item_list:
-                            if item_name in processed_items or item_name not in data.items: continue
-                            widget_key = f"qty_{move_type}_{section}_{item_name}"
-                            qty_raw = state_data.get(widget_key)
-                            try: qty = int(qty_raw) if qty_raw is not None else 0
-                            except (ValueError, TypeError): qty = 0
-
-                            if qty > 0:
-                                volume, weight = data.items.get(item_name, [0, 0])
-                                all_items_data.append({
-                                    "구분": section,
-                                    "품목명": item_name,
-                                    "수량": qty,
-                                    "개당 부피(CBM)": volume,
-                                    "개당 무게(kg)": weight,
-                                    "총 부피(CBM)": round(volume * qty, 3),
-                                    "총 무게(kg)": round(weight * qty, 1)
-                                })
-                            processed_items.add(item_name)
-
-        df_all_items = pd.DataFrame(all_items_data)
-
-        # 3. 비용 내역 DataFrame 생성 (최종 조정 금액 반영)
-        cost_data_list = []
-        calculated_sum_excel = 0
-        final_total_excel = state_data.get('final_adjusted_cost', state_data.get('calculated_total_cost', 0))
-        adjustment_added = False
-
-        for item, cost, note in calculated_cost_items:
-            cost_data_list.append({"항목": item, "금액": cost, "비고": note})
-            calculated_sum_excel += cost
-
-        # 조정 항목 추가 (필요시)
-        adjustment_excel = final_total_excel - calculated_sum_excel
-        if abs(adjustment_excel) > 0.1: # 부동소수점 오차 감안
-             cost_data_list.append({"항목": "금액 조정", "금액": adjustment_excel, "비고": "최종 금액 맞춤"})
-             adjustment_added = True
-
-        # 합계 행 추가
-        cost_data_list.append({"항목": "총 합계", "금액": final_total_excel, "비고": ""})
-        df_costs_final = pd.DataFrame(cost_data_list)
-
-
-        # --- 엑셀 파일 쓰기 및 서식 지정 ---
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df_info.to_excel(writer, sheet_name='견적 정보', index=False)
-            df_all_items.to_excel(writer, sheet_name='전체 품목 수량', index=False)
-            df_costs_final.to_excel(writer, sheet_name='비용 내역 및 요약', index=False)
-
-            # 워크북 및 워크시트 객체 가져오기
-            workbook = writer.book
-            ws_info = writer.sheets['견적 정보']
-            ws_items = writer.sheets['전체 품목 수량']
-            ws_costs = writer.sheets['비용 내역 및 요약']
-
-            # 숫자 형식 지정 함수
-            def apply_number_format(worksheet, col_letter, number_format):
-                for cell in worksheet[col_letter]:
-                    if isinstance(cell.value, (int, float)):
-                        cell.number_format = number_format
-
-            # 시트별 형식 지정
-            apply_number_format(ws_info, 'B', '#,##0') # 견적 정보 시트의 일부 숫자
-            # 품목 시트: 부피/무게는 소수점, 수량은 정수
-            apply_number_format(ws_items, 'C', '#,##0') # 수량
-            apply_number_format(ws_items, 'D', '0.000') # 개당 부피
-            apply_number_format(ws_items, 'E', '0.0')   # 개당 무게
-            apply_number_format(ws_items, 'F', '0.000') # 총 부피
-            apply_number_format(ws_items, 'G', '0.0')   # 총 무게
-            # 비용 시트: 금액
-            apply_number_format(ws_costs, 'B', '#,##0') # 금액
-
-            # 컬럼 너비 자동 조절 함수 (개선된 버전)
-            def auto_adjust_column_width(worksheet):
-                for col in worksheet.columns:
-                    max_length = 0
-                    column_letter = col[0].column_letter # 열 문자 얻기
-
-                    # 헤더 길이 먼저 계산
-                    header_cell = worksheet[f"{column_letter}1"]
-                    if header_cell.value:
-                        # 한글/영문/숫자 고려 (대략적인 가중치)
-                        header_len_weighted = 0
-                        for char in str(header_cell.value):
-                            if '\uac00' <= char <= '\ud7a3': header_len_weighted += 1.8
-                            else: header_len_weighted += 1.0
-                        max_length = math.ceil(header_len_weighted)
-
-                    # 각 셀 내용 길이 계산 (형식 적용된 숫자도 고려)
-                    for cell in col:
-                        if cell.row == 1: continue # 헤더는 위에서 계산
-                        if cell.value is not None:
-                            cell_str = ""
-                            # 숫자이고 형식이 지정된 경우, 형식 적용된 문자열 길이 시뮬레이션 (근사치)
-                            if isinstance(cell.value, (int, float)) and cell.number_format != 'General':
-                                try:
-                                    # 예: '#,##0' 형식 -> 천단위 쉼표 고려
-                                    if '0.0' in cell.number_format: # 소수점 형식
-                                        num_decimals = cell.number_format.count('0', cell.number_format.find('.'))
-                                        cell_str = f"{cell.value:,.{num_decimals}f}"
-                                    elif ',' in cell.number_format: # 천단위 쉼표 형식
-                                        cell_str = f"{cell.value:,.0f}"
-                                    else: cell_str = str(cell.value)
-                                except: cell_str = str(cell.value) # 형식 변환 실패 시 기본 문자열
-                            else:
-                                cell_str = str(cell.value)
-
-                            # 문자열 길이 계산 (가중치 적용)
-                            current_len_weighted = 0
-                            for char in cell_str:
-                                if '\uac00' <= char <= '\ud7a3': current_len_weighted += 1.8
-                                else: current_len_weighted += 1.0
-                            max_length = max(max_length, math.ceil(current_len_weighted))
-
-                    # 최종 너비 조정 (여백 추가, 최대/최소 너비 설정)
-                    adjusted_width = max_length + 2 # 기본 여백
-                    adjusted_width = max(adjusted_width, 8) # 최소 너비
-                    adjusted_width = min(adjusted_width, 50) # 최대 너비
-                    worksheet.column_dimensions[column_letter].width = adjusted_width
-
-            # 각 시트에 너비 조절 적용
-            auto_adjust_column_width(ws_info)
-            auto_adjust_column_width(ws_items)
-            auto_adjust_column_width(ws_costs)
-
-        excel_data = output.getvalue()
-        return excel_data
+        # 1. 견적 기본 정보 (실제 투입 차량이 입력되지 않았으면 선택 차량)
+        customer, locations, vehicle = report["customer"], report["locations"], report["vehicle"]
+        vehicle_str_excel = ", ".join(f"{name}({qty}대)" for name, qty in vehicle["dispatched"] if qty > 0)
+        if not vehicle_str_excel: vehicle_str_excel = vehicle["selected"] or "정보 없음"
+        ledger = report["cost_lines"]
+        waste_tons = (report["waste"]["tons"] or 0.5) if report["waste"] else 0.0
+
+        info_rows = [
+            ("고객명", customer["name"]), ("연락처", customer["phone"]),
+            ("이메일", customer["email"]), ("이사일", report["moving_date"]),
+            ("이사 종류", report["move_type"]),
+            ("출발지 주소", locations["from"]), ("출발지 층수", locations["from_floor"]), ("출발지 작업", locations["from_method"]),
+            ("도착지 주소", locations["to"]), ("도착지 층수", locations["to_floor"]), ("도착지 작업", locations["to_method"]),
+            ("예상 총 부피(CBM)", f"{report['total_volume'] or 0:.2f}"),
+            ("예상 총 무게(kg)", f"{report['total_weight'] or 0:.1f}"),
+            ("실제 투입 차량", vehicle_str_excel),
+            ("실제 투입 인원(남)", report["personnel"]["men"]),
+            ("실제 투입 인원(여)", report["personnel"]["women"]),
+            ("지방 사다리 추가요금", f"{ledger.amount(CostCode.REGIONAL_LADDER):,.0f}"),
+            ("폐기물 처리(톤)", f"{waste_tons:.1f}"),
+            ("폐기물 처리 비용", f"{ledger.amount(CostCode.WASTE):,.0f}"),
+            ("최종 견적 금액", f"{report['total']:,.0f}"),
+        ]
+        # 엑셀 셀에 바로 쓸 수 없는 값은 문자열로 (없는 값은 빈 칸)
+        info_rows = [(label, value if isinstance(value, (str, int, float, date)) or value is None else str(value)) for label, value in info_rows]
+
+        # 2. 전체 품목 리스트 (수량 있는 품목만)
+        item_rows = ((section, item_name, qty, volume, weight, round(volume * qty, 3), round(weight * qty, 1))
+                     for section, item_name, qty, volume, weight in iter_item_rows(report["state"]))
+
+        # 3. 비용 내역 (항목 합계가 최종 금액과 다르면 조정 행 추가)
+        cost_rows = [(line.label, line.amount, line.note) for line in ledger]
+        adjustment_excel = report["total"] - ledger.total()
+        if adjustment_excel != 0:
+            cost_rows.append(("금액 조정", adjustment_excel, "최종 금액 맞춤"))
+        cost_rows.append(("총 합계", report["total"], ""))
+
+        return build_summary_workbook_bytes([
+            ('견적 정보', ["항목", "내용"], info_rows, {2: '#,##0'}),
+            ('전체 품목 수량', ITEM_SHEET_HEADERS, item_rows, ITEM_SHEET_FORMATS),
+            ('비용 내역 및 요약', ["항목", "금액", "비고"], cost_rows, {2: '#,##0'}),
+        ])
     except Exception as e:
         st.error(f"Excel 요약 파일 생성 중 오류 발생: {e}")
         traceback.print_exc()
-        return None
\ No newline at end of file
+        return None
+
+
+# --- 여러 견적 합산 요약 (이사일별 일괄 처리 등) ---
+QUOTE_LIST_HEADERS = ["고객명", "연락처", "이사일", "이사 종류", "출발지", "도착지", "총 부피(CBM)", "총 무게(kg)", "견적 금액"]
+QUOTE_LIST_FORMATS = {7: '0.00', 8: '0.0', 9: '#,##0'}
+QUOTE_ITEM_HEADERS = ["고객명", "연락처", "이사일"] + ITEM_SHEET_HEADERS
+
+
+def write_quotes_summary_excel(quotes, output_path):
+    """
+    quotes: (state_data, 견적 금액) iterable. 견적을 한 번만 순회하며 '견적 목록'과 '품목 수량' 시트를 만들어
+    output_path에 저장합니다 (같은 폴더의 임시 파일에 쓴 뒤 교체). 반환: 견적 수/품목 행 수/소요 시간
+    """
+    started = time.perf_counter()
+    quote_spool = new_sheet_spool('견적 목록', QUOTE_LIST_HEADERS, QUOTE_LIST_FORMATS)
+    item_formats = {col_idx + 3: number_format for col_idx, number_format in ITEM_SHEET_FORMATS.items()}
+    item_spool = new_sheet_spool('품목 수량', QUOTE_ITEM_HEADERS, item_formats)
+    for state_data, total_cost in quotes:
+        customer = (state_data.get('customer_name', ''), state_data.get('customer_phone', ''), str(state_data.get('moving_date', '')))
+        spool_row(quote_spool, customer + (
+            state_data.get('base_move_type', ''), state_data.get('from_location', ''), state_data.get('to_location', ''),
+            round(float(state_data.get('total_volume', 0) or 0), 2), round(float(state_data.get('total_weight', 0) or 0), 1),
+            total_cost if isinstance(total_cost, (int, float)) else 0,
+        ))
+        for section, item_name, qty, volume, weight in iter_item_rows(state_data):
+            spool_row(item_spool, customer + (section, item_name, qty, volume, weight, round(volume * qty, 3), round(weight * qty, 1)))
+
+    temp_path = f"{output_path}.part"
+    try:
+        write_summary_workbook(temp_path, [quote_spool, item_spool])
+        os.replace(temp_path, output_path)
+    except Exception:
+        if os.path.exists(temp_path): os.remove(temp_path)
+        raise
+    return {"quotes": quote_spool["rows"], "item_rows": item_spool["rows"], "elapsed_sec": round(time.perf_counter() - started, 2)}
\ No newline at end of file
@@ -1,30 +1,50 @@
 # google_drive_helper.py (이미지 저장 관련 함수 제거)
 
 import streamlit as st
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload # MediaFileUpload 제거
+from lazy_imports import lazy_module
 import io
 import json
 # import mimetypes # 이미지 mime type 추측 불필요
 import os # 이름 분리 등에 여전히 필요할 수 있음
 # import time # 고유 파일명 찾기 지연 불필요
 import traceback # 오류 로깅 위해 유지
+import utils
+import gzip
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+# Google API 클라이언트는 import에 시간이 많이 들어 Drive를 처음 사용할 때 불러옴
+service_account = lazy_module("google.oauth2.service_account")
+discovery = lazy_module("googleapiclient.discovery")
+googleapiclient_http = lazy_module("googleapiclient.http")
 
 # === Authentication and Service Object Creation ===
-@st.cache_resource # Cache the service object for efficiency
+def _build_drive_service():
+    """서비스 계정으로 새 Drive 서비스 객체를 만듭니다 (캐시 없음).
+    httplib2 연결은 스레드 간에 공유할 수 없으므로 백그라운드 작업은 이 함수로 별도 객체를 만들어 사용합니다."""
+    creds_json = st.secrets["gcp_service_account"]
+    creds = service_account.Credentials.from_service_account_info(
+        creds_json,
+        scopes=["https://www.googleapis.com/auth/drive"]
+    )
+    return discovery.build("drive", "v3", credentials=creds)
+
+@st.cache_resource(show_spinner=False) # Cache the service object for efficiency
+def get_shared_drive_service():
+    """프로세스가 함께 쓰는 Drive 서비스 객체 (화면 출력 없이 실패 시 예외 발생, warmup 스레드에서도 호출)."""
+    return _build_drive_service()
+
 def get_drive_service():
     """Connects to Google Drive API using service account credentials."""
     try:
         if "gcp_service_account" not in st.secrets:
             st.error("Streamlit Secrets에 'gcp_service_account' 정보가 설정되지 않았습니다.")
             st.stop()
-        creds_json = st.secrets["gcp_service_account"]
-        creds = service_account.Credentials.from_service_account_info(
-            creds_json,
-            scopes=["https://www.googleapis.com/auth/drive"]
-        )
-        return build("drive", "v3", credentials=creds)
+        return get_shared_drive_service()
     except KeyError:
         st.error("Streamlit Secrets에 'gcp_service_account' 정보가 설정되지 않았습니다.")
         st.stop()
@@ -32,6 +52,11 @@ def get_drive_service():
         st.error(f"Google Drive 서비스 연결 중 오류 발생: {e}")
         st.stop()
 
+def get_root_folder_id():
+    """견적 저장 루트 폴더 ID (secrets의 [gcp_service_account] drive_folder_id). 설정이나 secrets.toml이 없으면 None."""
+    try: return st.secrets.get("gcp_service_account", {}).get("drive_folder_id")
+    except Exception: return None
+
 # === Download File Content (Generic Bytes) - JSON 로딩 위해 유지 ===
 def download_file_bytes(file_id):
     """Downloads the content of a file from Google Drive as bytes."""
@@ -40,7 +65,7 @@ def download_file_bytes(file_id):
     try:
         request = service.files().get_media(fileId=file_id)
         fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
+        downloader = googleapiclient_http.MediaIoBaseDownload(fh, request)
         done = False
         while not done:
             status, done = downloader.next_chunk()
@@ -100,42 +125,80 @@ def find_file_id_by_exact_name(exact_file_name, folder_id=None):
 # === save_image_file 함수 제거 ===
 
 # === JSON Save/Load (기존 로직 유지) ===
-def save_json_file(file_name, data_dict, folder_id=None):
-    """Saves a dictionary as a JSON file on Google Drive (Overwrites if exists)."""
+CONTENT_HASH_PROPERTY = "content_hash" # Drive appProperties에 저장되는 내용 해시 키
+_last_saved_hashes = {} # fileId -> (마지막으로 저장/확인된 내용 해시, 그 내용의 Drive version) (프로세스 내)
+
+def _get_remote_revision(service, file_id):
+    """Drive 파일의 현재 version과 appProperties의 내용 해시를 한 번의 메타데이터 요청으로 가져옵니다."""
+    meta = service.files().get(fileId=file_id, fields="version, appProperties").execute()
+    return meta.get("version"), (meta.get("appProperties") or {}).get(CONTENT_HASH_PROPERTY)
+
+def save_json_file(file_name, data_dict, folder_id=None, existing_file_id=None, expected_version=None, move_from_folder_id=None):
+    """Saves a dictionary as a JSON file on Google Drive (Overwrites if exists).
+    existing_file_id를 알고 있으면 (예: 견적 인덱스) 이름 검색 요청을 생략합니다.
+    내용 해시가 마지막 저장본과 같으면 업로드하지 않고 status 'unchanged'와 그 저장본의 version을 반환합니다
+    (같은 프로세스의 다른 세션이 같은 내용을 저장했으면 그 version을 이어받아 다음 저장이 충돌로 보이지 않도록).
+    expected_version이 주어지면 Drive의 현재 version과 다를 때 덮어쓰지 않고 status 'conflict'를 반환합니다.
+    Drive v3의 files.update에는 조건부 쓰기(If-Match)가 없어, 이 확인은 메타데이터 요청 후 update하는 check-then-write입니다.
+    확인과 update 사이(요청 한 번 왕복)에 다른 사용자가 저장하면 그 변경은 감지되지 않고 덮어써집니다.
+    move_from_folder_id가 주어지면 같은 update 요청으로 파일을 folder_id로 옮깁니다."""
     service = get_drive_service()
     if not service: return None
 
     try:
         # JSON 파일만 대상으로 찾도록 mimeType 지정 (선택적)
-        existing_file_id = find_file_id_by_exact_name(file_name, folder_id=folder_id)
+        if not existing_file_id:
+            existing_file_id = find_file_id_by_exact_name(file_name, folder_id=folder_id)
+
+        content_hash = utils.compute_content_hash(data_dict)
+        if existing_file_id:
+            last_hash, last_version = _last_saved_hashes.get(existing_file_id, (None, None))
+            if last_hash != content_hash and (last_hash is None or expected_version is not None):
+                # 리비전 확인과 Drive 내용 해시 확인을 한 번의 메타데이터 요청으로 처리
+                # (원자적 조건이 아님: 이 요청과 아래 update 사이의 동시 저장은 잡지 못함. 기존 이름 검색 요청을 대신하므로 왕복 수는 그대로)
+                remote_version, remote_hash = _get_remote_revision(service, existing_file_id)
+                if expected_version is not None and str(remote_version) != str(expected_version):
+                    print(f"WARNING [Drive]: Revision conflict on '{file_name}' (expected {expected_version}, found {remote_version})")
+                    return {'id': existing_file_id, 'name': file_name, 'status': 'conflict', 'remote_version': remote_version}
+                last_hash, last_version = remote_hash, remote_version
+            if last_hash == content_hash and not move_from_folder_id:
+                _last_saved_hashes[existing_file_id] = (content_hash, last_version)
+                print(f"DEBUG [Drive]: '{file_name}' unchanged, skipping upload.")
+                return {'id': existing_file_id, 'name': file_name, 'status': 'unchanged', 'content_hash': content_hash, 'version': last_version}
 
         json_string = json.dumps(data_dict, ensure_ascii=False, indent=2)
         json_bytes = json_string.encode('utf-8')
         fh = io.BytesIO(json_bytes)
         # JSON 업로드는 application/json mime type 사용
-        media = MediaIoBaseUpload(fh, mimetype="application/json", resumable=True)
+        media = googleapiclient_http.MediaIoBaseUpload(fh, mimetype="application/json", resumable=True)
         file_metadata = {"name": file_name} # Mime type은 여기서 지정 안해도 Drive가 추론 가능
 
         if folder_id: file_metadata["parents"] = [folder_id]
 
         if existing_file_id:
             print(f"DEBUG [Drive]: Updating existing JSON file: '{file_name}' (ID: {existing_file_id})")
+            move_args = {"addParents": folder_id, "removeParents": move_from_folder_id} if move_from_folder_id and folder_id else {}
             updated_file = service.files().update(
                 fileId=existing_file_id,
+                body={"appProperties": {CONTENT_HASH_PROPERTY: content_hash}},
                 media_body=media,
-                fields="id, name"
+                fields="id, name, version",
+                **move_args
             ).execute()
-            return {'id': existing_file_id, 'name': updated_file.get('name'), 'status': 'updated'}
+            _last_saved_hashes[existing_file_id] = (content_hash, updated_file.get('version'))
+            return {'id': existing_file_id, 'name': updated_file.get('name'), 'status': 'updated', 'content_hash': content_hash, 'version': updated_file.get('version')}
         else:
             print(f"DEBUG [Drive]: Creating new JSON file: '{file_name}'")
             # 새로 생성 시에는 mimeType 명시
             file_metadata["mimeType"] = "application/json"
+            file_metadata["appProperties"] = {CONTENT_HASH_PROPERTY: content_hash}
             created_file = service.files().create(
                 body=file_metadata,
                 media_body=media,
-                fields="id, name"
+                fields="id, name, version"
             ).execute()
-            return {'id': created_file.get("id"), 'name': created_file.get('name'), 'status': 'created'}
+            _last_saved_hashes[created_file.get("id")] = (content_hash, created_file.get('version'))
+            return {'id': created_file.get("id"), 'name': created_file.get('name'), 'status': 'created', 'content_hash': content_hash, 'version': created_file.get('version')}
 
     except Exception as e:
          st.error(f"JSON 저장/업데이트 실패 ('{file_name}'): {e}")
@@ -180,4 +243,599 @@ def find_files_by_name_contains(name_query, mime_types=None, folder_id=None):
         return found_files
     except Exception as e:
         st.error(f"파일 검색 중 오류 발생 ('{name_query}'): {e}")
-        return []
\ No newline at end of file
+        return []
+
+# === 월별 파티션 / 전화번호 인덱스 / 보관(Archive) ===
+# 견적 JSON은 이사일(moving_date) 기준 "YYYY-MM" 하위 폴더에 저장되고,
+# 루트 폴더의 인덱스 파일이 전화번호 -> 저장 위치를 기록합니다.
+# 검색/불러오기는 Drive 목록 조회 대신 이 인덱스를 따라갑니다.
+# 저장할 때마다 인덱스 전체를 다시 올리지 않도록, 변경된 항목은 "_quote_index_deltas" 폴더에 내용 없는 작은 파일
+# ("{전화번호}.delta", 항목은 appProperties)로 추가하고, 보관 스레드가 주기적으로 인덱스 파일에 합칩니다(compaction).
+# 다른 프로세스의 저장을 반영하도록 인덱스 캐시는 QUOTE_INDEX_REFRESH_SECONDS마다 새 delta만 목록 조회해 갱신합니다.
+QUOTE_INDEX_FILE_NAME = "_quote_index.json"
+QUOTE_INDEX_DELTA_FOLDER_NAME = "_quote_index_deltas"
+QUOTE_INDEX_REFRESH_SECONDS = 60
+QUOTE_INDEX_COMPACT_AFTER_DELTAS = 500 # delta 파일이 이보다 많으면 보관 스레드가 인덱스 파일에 합침 (목록 조회 1페이지 이내 유지)
+DRIVE_BATCH_SIZE = 100 # Drive batch 요청 하나에 담을 수 있는 최대 호출 수
+ARCHIVE_FOLDER_NAME = "_archive"
+UNDATED_PARTITION_NAME = "날짜미정"
+ARCHIVE_AFTER_MONTHS = 12 # 이사일이 이보다 오래된 월 파티션은 압축 보관
+ARCHIVE_CHECK_INTERVAL_HOURS = 24
+ARCHIVE_LOCATION_PREFIX = "archive:" # 보관된 견적 위치 표기: "archive:<묶음 파일 ID>:<전화번호>"
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+_PARTITION_NAME_PATTERN = re.compile(r"^\d{4}-\d{2}$")
+
+_folder_id_cache = {} # (parent_id, folder_name) -> folder_id
+# root key -> {"file_id": 인덱스 파일 ID, "version": 인덱스 파일 version, "quotes": {전화번호: 위치 정보},
+#              "delta_folder_id": delta 폴더 ID, "applied_deltas": 반영한 delta 파일 ID 집합, "delta_since": 마지막 delta createdTime, "checked_at": 마지막 확인 시각}
+_quote_index_cache = {}
+# 인덱스 항목 키 -> delta 파일 appProperties 키 (appProperties는 키+값 124바이트 제한이 있어 짧은 키 사용)
+_INDEX_DELTA_PROPERTY_KEYS = {"file_id": "f", "folder_id": "d", "partition": "p", "moving_date": "m", "customer_name": "n", "archive_file_id": "a"}
+_INDEX_DELTA_NAME_MAX_CHARS = 30 # 고객명은 UTF-8 3바이트 문자 기준으로 잘라서 저장
+_index_lock = threading.RLock()
+_archive_bundle_cache = {} # 묶음 파일 ID -> 압축 해제된 묶음 (최근 것만 유지)
+_ARCHIVE_BUNDLE_CACHE_SIZE = 4
+_archive_bundle_lock = threading.Lock()
+QUOTE_LOAD_WORKERS = 4 # 여러 견적을 불러올 때 동시에 내려받을 수 (스레드마다 별도 Drive 서비스 사용)
+_loader_local = threading.local()
+
+
+def _root_key(root_folder_id):
+    return root_folder_id or "root"
+
+
+def month_partition_name(moving_date):
+    """이사일(date 또는 ISO 문자열)을 월 파티션 폴더명("YYYY-MM")으로 변환합니다."""
+    if isinstance(moving_date, datetime): moving_date = moving_date.date()
+    if isinstance(moving_date, str) and moving_date.strip():
+        try: moving_date = date.fromisoformat(moving_date.strip()[:10])
+        except ValueError: return UNDATED_PARTITION_NAME
+    if isinstance(moving_date, date):
+        return moving_date.strftime("%Y-%m")
+    return UNDATED_PARTITION_NAME
+
+
+def _iter_folder_files(folder_id, service, fields="id, name, mimeType", extra_query="", order_by=None):
+    """폴더 안의 (휴지통 제외) 파일을 페이지 단위로 순회합니다."""
+    query = f"'{folder_id}' in parents and trashed = false" + extra_query
+    order_args = {"orderBy": order_by} if order_by else {}
+    page_token = None
+    while True:
+        response = service.files().list(
+            q=query, spaces='drive', pageSize=1000,
+            fields=f"nextPageToken, files({fields})", pageToken=page_token, **order_args
+        ).execute()
+        for file in response.get('files', []):
+            yield file
+        page_token = response.get('nextPageToken', None)
+        if not page_token: break
+
+
+def get_or_create_folder(folder_name, parent_id=None, service=None):
+    """parent_id 아래의 폴더 ID를 반환하고, 없으면 생성합니다 (프로세스 내 캐시)."""
+    service = service or get_drive_service()
+    cache_key = (_root_key(parent_id), folder_name)
+    if cache_key in _folder_id_cache:
+        return _folder_id_cache[cache_key]
+
+    escaped_name = folder_name.replace("'", "\\'")
+    query = f"name = '{escaped_name}' and mimeType = '{FOLDER_MIME_TYPE}' and trashed = false and '{_root_key(parent_id)}' in parents"
+    results = service.files().list(q=query, spaces='drive', fields='files(id)', pageSize=1).execute()
+    items = results.get('files', [])
+    if items:
+        folder_id = items[0]['id']
+    else:
+        metadata = {"name": folder_name, "mimeType": FOLDER_MIME_TYPE}
+        if parent_id: metadata["parents"] = [parent_id]
+        folder_id = service.files().create(body=metadata, fields="id").execute().get('id')
+        print(f"INFO [Drive]: Created folder '{folder_name}' (ID: {folder_id})")
+    _folder_id_cache[cache_key] = folder_id
+    return folder_id
+
+
+def _upload_bytes(file_name, content_bytes, mimetype, folder_id=None, existing_file_id=None, service=None):
+    service = service or get_drive_service()
+    media = googleapiclient_http.MediaIoBaseUpload(io.BytesIO(content_bytes), mimetype=mimetype, resumable=True)
+    if existing_file_id:
+        service.files().update(fileId=existing_file_id, media_body=media, fields="id").execute()
+        return existing_file_id
+    metadata = {"name": file_name, "mimeType": mimetype}
+    if folder_id: metadata["parents"] = [folder_id]
+    return service.files().create(body=metadata, media_body=media, fields="id").execute().get('id')
+
+
+def _download_bytes(file_id, service):
+    request = service.files().get_media(fileId=file_id)
+    fh = io.BytesIO()
+    downloader = googleapiclient_http.MediaIoBaseDownload(fh, request)
+    done = False
+    while not done:
+        status, done = downloader.next_chunk()
+    return fh.getvalue()
+
+
+def _phone_from_file_name(file_name):
+    stem = os.path.splitext(file_name or "")[0]
+    return stem if stem.isdigit() else None
+
+
+def rebuild_quote_index(root_folder_id=None, service=None):
+    """루트 폴더(구 방식의 평면 저장 파일 포함), 월 파티션, 보관 묶음을 스캔해 인덱스를 새로 만듭니다.
+    인덱스 파일이 없을 때 한 번 실행되는 마이그레이션 용도입니다."""
+    service = service or get_drive_service()
+    root = _root_key(root_folder_id)
+    quotes = {}
+    partition_folders = []
+    archive_folder_id = None
+    for file in _iter_folder_files(root, service):
+        name = file.get('name', '')
+        if file.get('mimeType') == FOLDER_MIME_TYPE:
+            if _PARTITION_NAME_PATTERN.match(name) or name == UNDATED_PARTITION_NAME:
+                partition_folders.append((name, file['id']))
+                _folder_id_cache[(root, name)] = file['id']
+            elif name == ARCHIVE_FOLDER_NAME:
+                archive_folder_id = file['id']
+                _folder_id_cache[(root, name)] = file['id']
+            continue
+        phone = _phone_from_file_name(name)
+        if phone:
+            quotes[phone] = {"file_id": file['id'], "folder_id": root_folder_id, "partition": None}
+
+    for partition, folder_id in sorted(partition_folders):
+        for file in _iter_folder_files(folder_id, service):
+            phone = _phone_from_file_name(file.get('name'))
+            if phone:
+                quotes[phone] = {"file_id": file['id'], "folder_id": folder_id, "partition": partition}
+
+    if archive_folder_id:
+        for file in _iter_folder_files(archive_folder_id, service):
+            bundle = _load_archive_bundle(file['id'], service)
+            for phone, summary in (bundle.get("index") or {}).items():
+                if phone not in quotes: # 보관 이후 다시 저장된 견적이 우선
+                    quotes[phone] = dict(summary, archive_file_id=file['id'])
+    print(f"INFO [Drive]: Quote index rebuilt with {len(quotes)} entries.")
+    return quotes
+
+
+def _encode_index_delta(entry):
+    """인덱스 항목을 delta 파일의 appProperties로 변환합니다 (빈 값은 생략)."""
+    properties = {}
+    for key, short_key in _INDEX_DELTA_PROPERTY_KEYS.items():
+        value = entry.get(key)
+        if value in (None, ""): continue
+        properties[short_key] = str(value)[:_INDEX_DELTA_NAME_MAX_CHARS] if key == "customer_name" else str(value)
+    return properties
+
+
+def _decode_index_delta(properties):
+    """delta 파일의 appProperties를 save_quote_json/archive_old_quotes가 기록하는 항목 모양으로 되돌립니다."""
+    properties = properties or {}
+    if properties.get("a"):
+        return {"partition": properties.get("p"), "moving_date": properties.get("m", ""),
+                "customer_name": properties.get("n", ""), "archive_file_id": properties["a"]}
+    return {"file_id": properties.get("f"), "folder_id": properties.get("d"), "partition": properties.get("p"),
+            "moving_date": properties.get("m", ""), "customer_name": properties.get("n", "")}
+
+
+def _apply_index_deltas(cached, service, since=None):
+    """delta 폴더에서 (since 이후에 생성된) delta 파일을 생성 순서대로 인덱스에 반영합니다.
+    같은 시각에 생성된 delta를 놓치지 않도록 since와 같은 시각부터 조회하고, 이미 반영한 파일은 건너뜁니다.
+    목록 조회는 인덱스 잠금 밖에서 하고, 캐시에 반영할 때만 잠금을 잡습니다."""
+    extra_query = f" and createdTime >= '{since}'" if since else ""
+    delta_files = list(_iter_folder_files(cached["delta_folder_id"], service, fields="id, name, createdTime, appProperties",
+                                          extra_query=extra_query, order_by="createdTime"))
+    with _index_lock:
+        for file in delta_files:
+            cached["delta_since"] = file.get("createdTime") or cached.get("delta_since")
+            if file['id'] in cached["applied_deltas"]: continue
+            if file['id'] in cached["folded_deltas"]:
+                # 이미 인덱스 파일에 합쳐졌지만 휴지통 이동에 실패한 delta: 다시 적용하지 않고 다음 compaction에서 다시 정리
+                cached["applied_deltas"].add(file['id'])
+                continue
+            phone = _phone_from_file_name(file.get('name'))
+            if phone:
+                cached["quotes"][phone] = _decode_index_delta(file.get("appProperties"))
+            cached["applied_deltas"].add(file['id'])
+
+
+def _load_quote_index_from_drive(root_folder_id, service):
+    """인덱스 파일과 아직 합쳐지지 않은 delta를 모두 읽어 캐시를 새로 만듭니다 (인덱스 파일이 없으면 재구축 후 저장)."""
+    root = _root_key(root_folder_id)
+    found = service.files().list(
+        q=f"name = '{QUOTE_INDEX_FILE_NAME}' and trashed = false and '{root}' in parents",
+        spaces='drive', fields='files(id, version)', pageSize=1
+    ).execute().get('files', [])
+    index_file_id = found[0]['id'] if found else None
+    quotes = None
+    folded_deltas = set()
+    if index_file_id:
+        try:
+            payload = _download_bytes(index_file_id, service)
+            if payload[:2] == b"\x1f\x8b": payload = gzip.decompress(payload) # 이전 버전은 압축 없이 저장
+            index_data = json.loads(payload.decode("utf-8"))
+            quotes = index_data.get("quotes", {})
+            folded_deltas = set(index_data.get("folded_deltas", []))
+        except Exception as e:
+            print(f"ERROR [Drive]: Failed to read quote index, rebuilding: {e}")
+    if quotes is None:
+        quotes = rebuild_quote_index(root_folder_id, service=service)
+    cached = {"file_id": index_file_id, "version": found[0].get('version') if found else None, "quotes": quotes,
+              "delta_folder_id": get_or_create_folder(QUOTE_INDEX_DELTA_FOLDER_NAME, parent_id=root_folder_id, service=service),
+              "applied_deltas": set(), "folded_deltas": folded_deltas, "delta_since": None, "checked_at": time.monotonic()}
+    _apply_index_deltas(cached, service)
+    with _index_lock:
+        _quote_index_cache[root] = cached
+    if not index_file_id:
+        _persist_quote_index(root_folder_id, service=service)
+    return cached
+
+
+def _refresh_quote_index(cached, root_folder_id, service):
+    """다른 프로세스의 변경 반영: 인덱스 파일이 합쳐져(version 변경) 있으면 다시 읽고, 아니면 새 delta만 목록 조회합니다."""
+    if cached.get("file_id"):
+        version = service.files().get(fileId=cached["file_id"], fields="version").execute().get("version")
+        if str(version) != str(cached.get("version")):
+            return _load_quote_index_from_drive(root_folder_id, service)
+    _apply_index_deltas(cached, service, since=cached.get("delta_since"))
+    cached["checked_at"] = time.monotonic()
+    return cached
+
+
+def load_quote_index(root_folder_id=None, service=None, force_reload=False):
+    """전화번호 -> 저장 위치 인덱스를 반환합니다.
+    프로세스 내 캐시를 쓰되 QUOTE_INDEX_REFRESH_SECONDS가 지나면 다른 프로세스가 추가한 delta를 반영합니다
+    (force_reload는 즉시 확인). 갱신에 실패하면 기존 캐시를 그대로 사용합니다.
+    처음 불러올 때만 인덱스 잠금을 잡은 채 Drive에서 읽고(모든 세션이 기다려야 하는 내용), 주기적 갱신은 잠금 밖에서 하며
+    그동안 다른 세션은 기존 캐시를 그대로 사용합니다."""
+    root = _root_key(root_folder_id)
+    with _index_lock:
+        cached = _quote_index_cache.get(root)
+        if cached is None:
+            return _load_quote_index_from_drive(root_folder_id, service or get_drive_service())["quotes"]
+        refresh_due = time.monotonic() - cached["checked_at"] >= QUOTE_INDEX_REFRESH_SECONDS and not cached.get("refreshing")
+        if not (force_reload or refresh_due):
+            return cached["quotes"]
+        cached["refreshing"] = True
+    try:
+        return _refresh_quote_index(cached, root_folder_id, service or get_drive_service())["quotes"]
+    except Exception as e:
+        print(f"WARNING [Drive]: Quote index refresh failed, using cached index: {e}")
+        cached["checked_at"] = time.monotonic()
+        return cached["quotes"]
+    finally:
+        cached["refreshing"] = False
+
+
+def _record_index_entry(root_folder_id, phone, entry, service=None):
+    """인덱스 항목 하나를 delta 파일(내용 없음, appProperties에 항목)로 추가하고 캐시에 반영합니다.
+    Drive 요청 중에는 인덱스 잠금을 잡지 않습니다 (다른 세션의 검색이 업로드를 기다리지 않도록)."""
+    service = service or get_drive_service()
+    root = _root_key(root_folder_id)
+    with _index_lock:
+        delta_folder_id = _quote_index_cache[root]["delta_folder_id"]
+    created = service.files().create(
+        body={"name": f"{phone}.delta", "parents": [delta_folder_id], "appProperties": _encode_index_delta(entry)},
+        fields="id"
+    ).execute()
+    with _index_lock:
+        cached = _quote_index_cache[root] # 그 사이 다시 읽혔으면 새 캐시에 반영 (이미 반영된 delta는 집합이라 중복 없음)
+        cached["quotes"][phone] = entry
+        cached["applied_deltas"].add(created.get('id'))
+
+
+def _persist_quote_index(root_folder_id=None, service=None):
+    """캐시된 인덱스 전체를 gzip 압축한 인덱스 파일로 저장하고, 이미 반영된 delta 파일은 휴지통으로 옮깁니다.
+    (재구축, 보관, compaction 때만 호출. 그 사이 다른 프로세스가 추가한 delta는 남아 있다가 다음 읽기에서 반영됨)
+    합친 delta ID를 인덱스 파일에 함께 기록하므로, 휴지통 이동에 실패한 delta가 나중에 다시 적용되지 않습니다.
+    인덱스 잠금은 캐시 내용을 직렬화할 때와 결과를 반영할 때만 잡고, 업로드/휴지통 이동 중에는 놓습니다.
+    (호출은 보관 스레드와 최초 재구축뿐이라 같은 프로세스에서 저장이 겹치지 않음)"""
+    root = _root_key(root_folder_id)
+    service = service or get_drive_service()
+    with _index_lock:
+        cached = _quote_index_cache.get(root)
+        if cached is None: return
+        folded_deltas = sorted(cached["applied_deltas"])
+        payload = json.dumps({"version": 2, "quotes": cached["quotes"], "folded_deltas": folded_deltas},
+                             ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        index_file_id = cached.get("file_id")
+    index_file_id = _upload_bytes(QUOTE_INDEX_FILE_NAME, gzip.compress(payload), "application/gzip",
+                                  folder_id=root_folder_id, existing_file_id=index_file_id, service=service)
+    version = service.files().get(fileId=index_file_id, fields="version").execute().get("version")
+    with _index_lock:
+        cached.update(file_id=index_file_id, version=version, folded_deltas=set(folded_deltas))
+    _trash_files(folded_deltas, service, on_trashed=cached["applied_deltas"].discard)
+
+
+def _trash_files(file_ids, service, on_trashed=None):
+    """파일들을 Drive batch 요청(DRIVE_BATCH_SIZE개씩)으로 휴지통으로 옮깁니다. 실패한 파일은 로그만 남깁니다."""
+    def _callback(request_id, response, exception):
+        if exception is not None:
+            print(f"WARNING [Drive]: Could not trash {request_id}: {exception}")
+        elif on_trashed:
+            on_trashed(request_id)
+
+    for start in range(0, len(file_ids), DRIVE_BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=_callback)
+        for file_id in file_ids[start:start + DRIVE_BATCH_SIZE]:
+            batch.add(service.files().update(fileId=file_id, body={"trashed": True}, fields="id"), request_id=file_id)
+        batch.execute()
+
+
+def compact_quote_index(root_folder_id=None, service=None, min_deltas=QUOTE_INDEX_COMPACT_AFTER_DELTAS):
+    """반영된 delta 파일이 min_deltas개 이상이면 인덱스 파일에 합칩니다. 반환: 합친 delta 수"""
+    service = service or get_drive_service()
+    load_quote_index(root_folder_id, service=service, force_reload=True)
+    with _index_lock:
+        delta_count = len(_quote_index_cache[_root_key(root_folder_id)]["applied_deltas"])
+    if delta_count < max(1, min_deltas): return 0
+    _persist_quote_index(root_folder_id, service=service)
+    print(f"INFO [Drive]: Compacted {delta_count} quote index deltas.")
+    return delta_count
+
+
+def save_quote_json(phone, data_dict, root_folder_id=None, expected_file_id=None, expected_version=None):
+    """견적을 이사일 기준 월 파티션 폴더에 "{전화번호}.json"으로 저장하고 인덱스를 갱신합니다.
+    이사일이 바뀌어 파티션이 달라지면 같은 요청으로 기존 파일을 새 폴더로 옮깁니다.
+    expected_file_id/expected_version은 불러올 때의 파일과 리비전으로, 그 사이 다른 사용자가 저장했다면
+    덮어쓰지 않고 status 'conflict' 결과에 서버 내용('remote_data')을 담아 반환합니다."""
+    service = get_drive_service()
+    if not service: return None
+    file_name = f"{phone}.json"
+    try:
+        quotes = load_quote_index(root_folder_id)
+        partition = month_partition_name(data_dict.get('moving_date'))
+        target_folder_id = get_or_create_folder(partition, parent_id=root_folder_id)
+
+        entry = quotes.get(phone) or {}
+        existing_file_id = entry.get("file_id") # 보관된 견적(archive_file_id만 있음)은 새 파일로 생성
+        move_from_folder_id = None
+        if existing_file_id and entry.get("folder_id") != target_folder_id:
+            move_from_folder_id = entry.get("folder_id") or _root_key(root_folder_id)
+        version_to_check = expected_version if existing_file_id and existing_file_id == expected_file_id else None
+
+        result = save_json_file(file_name, data_dict, folder_id=target_folder_id, existing_file_id=existing_file_id,
+                                expected_version=version_to_check, move_from_folder_id=move_from_folder_id)
+        if result and result.get('status') == 'conflict':
+            result['remote_data'], remote_version = load_quote_with_version(existing_file_id)
+            if remote_version is not None: result['remote_version'] = remote_version # 내려받은 내용의 version
+            return result
+        if not result or not result.get('id') or result.get('status') == 'unchanged':
+            return result
+        if move_from_folder_id:
+            print(f"INFO [Drive]: Moved '{file_name}' to partition '{partition}'")
+
+        new_entry = {"file_id": result['id'], "folder_id": target_folder_id, "partition": partition,
+                     "moving_date": str(data_dict.get('moving_date') or ""),
+                     "customer_name": data_dict.get('customer_name', '')}
+        if entry != new_entry:
+            _record_index_entry(root_folder_id, phone, new_entry)
+        return result
+    except Exception as e:
+        st.error(f"견적 저장 실패 ('{file_name}'): {e}")
+        print(f"ERROR [Drive]: Failed to save partitioned quote '{file_name}': {e}")
+        traceback.print_exc()
+        return None
+
+
+def search_quotes(search_term, root_folder_id=None):
+    """인덱스에서 전화번호로 견적을 찾습니다. 숫자 4자리는 끝자리 일치, 그 외는 부분 일치.
+    반환: [{'id': 위치, 'name': 파일명, 'partition': 월}] (id는 load_quote에 그대로 전달)"""
+    digits = re.sub(r'\D', '', search_term or "")
+    if not digits: return []
+    try:
+        quotes = load_quote_index(root_folder_id)
+    except Exception as e:
+        st.error(f"견적 인덱스 로딩 중 오류 발생: {e}")
+        traceback.print_exc()
+        return []
+    if len(digits) == 4:
+        matched = [p for p in quotes if p.endswith(digits)]
+    else:
+        matched = [p for p in quotes if digits in p]
+    results = []
+    for phone in sorted(matched):
+        entry = quotes[phone]
+        results.append({'id': _quote_location(phone, entry), 'name': f"{phone}.json", 'partition': entry.get("partition")})
+    return results
+
+
+def _quote_location(phone, entry):
+    """인덱스 항목을 load_quote에 전달할 위치(파일 ID 또는 보관 묶음 위치)로 변환합니다."""
+    return entry.get("file_id") or f"{ARCHIVE_LOCATION_PREFIX}{entry.get('archive_file_id')}:{phone}"
+
+
+def _iso_date_str(value):
+    if isinstance(value, datetime): value = value.date()
+    return value.isoformat() if isinstance(value, date) else str(value or "").strip()[:10]
+
+
+def find_quotes_by_moving_date_range(start_date, end_date, root_folder_id=None):
+    """인덱스에서 이사일이 start_date~end_date(양 끝 포함, date 또는 ISO 문자열)인 견적을 찾습니다.
+    이사일이 기록되지 않은 예전 인덱스 항목(평면 저장 파일, 범위에 걸친 월 파티션)은 후보로 포함하고 'verified': False로 표시하므로,
+    호출하는 쪽에서 불러온 내용의 moving_date로 다시 확인해야 합니다.
+    반환: 이사일, 전화번호 순 [{'id': 위치, 'name': 파일명, 'partition': 월, 'moving_date': 인덱스의 이사일 또는 None, 'verified': bool}]"""
+    start_str, end_str = _iso_date_str(start_date), _iso_date_str(end_date)
+    start_partition, end_partition = month_partition_name(start_str), month_partition_name(end_str)
+    quotes = load_quote_index(root_folder_id)
+    results = []
+    for phone in sorted(quotes):
+        entry = quotes[phone]
+        indexed_date = str(entry.get("moving_date") or "")[:10]
+        if indexed_date:
+            if not start_str <= indexed_date <= end_str: continue
+            verified = True
+        elif entry.get("partition") is None or (_PARTITION_NAME_PATTERN.match(entry["partition"]) and start_partition <= entry["partition"] <= end_partition):
+            verified = False
+        else:
+            continue
+        results.append({'id': _quote_location(phone, entry), 'name': f"{phone}.json", 'partition': entry.get("partition"),
+                        'moving_date': indexed_date or None, 'verified': verified})
+    # 이사일이 없는 후보는 뒤로 (안정 정렬이므로 같은 날짜 안에서는 전화번호 순 유지)
+    results.sort(key=lambda result: (result['moving_date'] is None, result['moving_date'] or ""))
+    return results
+
+
+def find_quotes_by_moving_date(moving_date, root_folder_id=None):
+    """인덱스에서 이사일이 moving_date(date 또는 ISO 문자열)인 견적을 찾습니다 (find_quotes_by_moving_date_range 참고).
+    반환: [{'id': 위치, 'name': 파일명, 'partition': 월, 'moving_date': 인덱스의 이사일 또는 None, 'verified': bool}]"""
+    return find_quotes_by_moving_date_range(moving_date, moving_date, root_folder_id=root_folder_id)
+
+
+def _load_archive_bundle(bundle_file_id, service=None):
+    with _archive_bundle_lock:
+        if bundle_file_id in _archive_bundle_cache:
+            return _archive_bundle_cache[bundle_file_id]
+        service = service or get_drive_service()
+        bundle = json.loads(gzip.decompress(_download_bytes(bundle_file_id, service)).decode("utf-8"))
+        if len(_archive_bundle_cache) >= _ARCHIVE_BUNDLE_CACHE_SIZE:
+            _archive_bundle_cache.pop(next(iter(_archive_bundle_cache)))
+        _archive_bundle_cache[bundle_file_id] = bundle
+        return bundle
+
+
+def load_quote(location):
+    """search_quotes가 반환한 위치로 견적을 불러옵니다 (일반 파일 ID 또는 보관 묶음 위치)."""
+    return load_quote_with_version(location)[0]
+
+
+def load_quote_with_version(location):
+    """견적과 그 내용의 Drive version을 (견적, version)으로 반환합니다 (보관 묶음은 version None, 실패 시 (None, None)).
+    version은 내용을 내려받기 전에 읽으므로, 그 사이 다른 사용자가 저장했다면 기록되는 version이 내용보다 오래되어
+    다음 저장이 충돌로 감지됩니다 (내용보다 새 version을 기록해 남의 변경을 덮어쓰는 일이 없음)."""
+    if isinstance(location, str) and location.startswith(ARCHIVE_LOCATION_PREFIX):
+        try:
+            bundle_file_id, phone = location[len(ARCHIVE_LOCATION_PREFIX):].rsplit(":", 1)
+            return _load_archive_bundle(bundle_file_id).get("quotes", {}).get(phone), None
+        except Exception as e:
+            st.error(f"보관된 견적 불러오기 실패: {e}")
+            traceback.print_exc()
+            return None, None
+    service = get_drive_service()
+    if not service: return None, None
+    try:
+        version, remote_hash = _get_remote_revision(service, location)
+        loaded = json.loads(_download_bytes(location, service).decode("utf-8-sig"))
+    except Exception as e:
+        st.error(f"견적 불러오기 실패 (ID: {location}): {e}")
+        traceback.print_exc()
+        return None, None
+    if remote_hash and utils.compute_content_hash(loaded) == remote_hash: # 내용과 version이 같은 저장본일 때만 기록
+        _last_saved_hashes[location] = (remote_hash, version)
+    return loaded, version
+
+
+def _load_quote_in_worker(location):
+    """(불러오기 스레드) 스레드 전용 Drive 서비스로 견적 하나를 불러옵니다."""
+    service = getattr(_loader_local, "service", None)
+    if service is None:
+        service = _loader_local.service = _build_drive_service()
+    if location.startswith(ARCHIVE_LOCATION_PREFIX):
+        bundle_file_id, phone = location[len(ARCHIVE_LOCATION_PREFIX):].rsplit(":", 1)
+        return _load_archive_bundle(bundle_file_id, service=service).get("quotes", {}).get(phone)
+    return json.loads(_download_bytes(location, service).decode("utf-8-sig"))
+
+
+def iter_loaded_quotes(entries, max_workers=QUOTE_LOAD_WORKERS):
+    """find_quotes_* 결과 항목을 순서대로 불러옵니다. 앞으로 최대 max_workers * 2개를 미리 내려받아 두며
+    (한 번에 메모리에 있는 견적 수 제한), 불러오기에 실패한 견적은 None으로 돌려줍니다.
+    반환: (항목, 견적 딕셔너리 또는 None) 제너레이터"""
+    entries = iter(entries)
+    window = deque()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="quote-loader") as pool:
+        while True:
+            while len(window) < max(1, max_workers) * 2:
+                entry = next(entries, None)
+                if entry is None: break
+                window.append((entry, pool.submit(_load_quote_in_worker, entry['id'])))
+            if not window: return
+            entry, future = window.popleft()
+            try:
+                saved_data = future.result()
+            except Exception as e:
+                print(f"ERROR [Drive]: Failed to load quote '{entry.get('name')}': {e}")
+                saved_data = None
+            yield entry, saved_data if isinstance(saved_data, dict) else None
+
+
+def archive_old_quotes(root_folder_id=None, older_than_months=ARCHIVE_AFTER_MONTHS, service=None):
+    """이사일이 older_than_months 이상 지난 월 파티션을 gzip 묶음("_archive/YYYY-MM.json.gz")으로 압축하고
+    원본 파일과 폴더를 휴지통으로 옮깁니다. 묶음에는 전화번호별 요약 인덱스가 함께 저장됩니다.
+    휴지통으로 옮기기 직전에 폴더를 다시 조회해, 내려받은 뒤 다시 저장되었거나 다른 폴더로 옮겨진 파일은 남겨 두고
+    (인덱스도 원본을 계속 가리킴, 다음 보관 때 새 내용으로 다시 묶음) 폴더는 비어 있을 때만 휴지통으로 옮깁니다.
+    Drive에는 조건부 삭제가 없어 다시 조회한 뒤 휴지통 이동까지(요청 한 번 왕복)의 저장은 잡지 못합니다.
+    반환: 보관된 견적 수"""
+    service = service or get_drive_service()
+    root = _root_key(root_folder_id)
+    today = date.today()
+    cutoff_index = today.year * 12 + (today.month - 1) - older_than_months
+    quotes = load_quote_index(root_folder_id, service=service)
+    archived_count = 0
+
+    partition_folders = [f for f in _iter_folder_files(root, service, extra_query=f" and mimeType = '{FOLDER_MIME_TYPE}'")
+                         if _PARTITION_NAME_PATTERN.match(f.get('name', ''))]
+    for folder in sorted(partition_folders, key=lambda f: f['name']):
+        year, month = (int(part) for part in folder['name'].split("-"))
+        if year * 12 + (month - 1) >= cutoff_index: continue
+
+        bundle_name = f"{folder['name']}.json.gz"
+        archive_folder_id = get_or_create_folder(ARCHIVE_FOLDER_NAME, parent_id=root_folder_id, service=service)
+        existing = [f for f in _iter_folder_files(archive_folder_id, service) if f.get('name') == bundle_name]
+        bundle_file_id = existing[0]['id'] if existing else None
+        bundle = _load_archive_bundle(bundle_file_id, service) if bundle_file_id else {"version": 1, "index": {}, "quotes": {}}
+
+        bundled_files = {} # 파일 ID -> (전화번호, 내려받을 때의 version)
+        for file in _iter_folder_files(folder['id'], service, fields="id, name, mimeType, version"):
+            phone = _phone_from_file_name(file.get('name'))
+            if not phone: continue
+            quote = json.loads(_download_bytes(file['id'], service).decode("utf-8-sig"))
+            bundle["quotes"][phone] = quote
+            bundle["index"][phone] = {"partition": folder['name'], "moving_date": str(quote.get('moving_date') or ""),
+                                      "customer_name": quote.get('customer_name', '')}
+            bundled_files[file['id']] = (phone, file.get('version'))
+        if not bundled_files: continue
+
+        payload = gzip.compress(json.dumps(bundle, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        bundle_file_id = _upload_bytes(bundle_name, payload, "application/gzip", folder_id=archive_folder_id,
+                                       existing_file_id=bundle_file_id, service=service)
+        _archive_bundle_cache.pop(bundle_file_id, None)
+
+        # 묶은 뒤 바뀐 파일은 남김 (묶음의 예전 내용은 인덱스가 원본을 가리키므로 쓰이지 않음)
+        current_versions = {f['id']: f.get('version') for f in _iter_folder_files(folder['id'], service, fields="id, version")}
+        archived_files = [(phone, file_id) for file_id, (phone, version) in bundled_files.items()
+                          if file_id in current_versions and str(current_versions[file_id]) == str(version)]
+        if len(archived_files) < len(bundled_files):
+            print(f"INFO [Drive]: {len(bundled_files) - len(archived_files)} quotes in '{folder['name']}' changed while archiving, kept for next run")
+
+        with _index_lock:
+            quotes = _quote_index_cache[root]["quotes"] # 그 사이 갱신으로 캐시가 새로 만들어졌을 수 있음
+            for phone, file_id in archived_files:
+                if quotes.get(phone, {}).get("file_id") == file_id:
+                    quotes[phone] = dict(bundle["index"][phone], archive_file_id=bundle_file_id)
+        _persist_quote_index(root_folder_id, service=service)
+        _trash_files([file_id for _, file_id in archived_files], service)
+        # 남긴 파일이나 그 사이 새로 저장된 견적이 있으면 폴더를 그대로 둠
+        if next(_iter_folder_files(folder['id'], service, fields="id"), None) is None:
+            service.files().update(fileId=folder['id'], body={"trashed": True}, fields="id").execute()
+            _folder_id_cache.pop((root, folder['name']), None)
+        archived_count += len(archived_files)
+        print(f"INFO [Drive]: Archived {len(archived_files)} quotes from '{folder['name']}' into '{bundle_name}'")
+    return archived_count
+
+
+@st.cache_resource
+def start_background_archiver(root_folder_id=None, older_than_months=ARCHIVE_AFTER_MONTHS, interval_hours=ARCHIVE_CHECK_INTERVAL_HOURS):
+    """프로세스당 한 번, 오래된 월 파티션을 주기적으로 보관하고 인덱스 delta를 합치는 데몬 스레드를 시작합니다."""
+    def _run():
+        while True:
+            try:
+                service = _build_drive_service()
+                archive_old_quotes(root_folder_id, older_than_months, service=service)
+                compact_quote_index(root_folder_id, service=service)
+            except Exception as e:
+                print(f"ERROR [Drive Archiver]: {e}")
+                traceback.print_exc()
+            time.sleep(interval_hours * 3600)
+
+    thread = threading.Thread(target=_run, name="quote-archiver", daemon=True)
+    thread.start()
+    return thread
\ No newline at end of file
@@ -0,0 +1,108 @@
+# image_utils.py
+# 전송 용량 제한(MMS 등)에 맞춰 JPEG 품질/크기를 자동으로 조정하는 인코더
+
+import io
+import threading
+import traceback
+
+from lazy_imports import lazy_module, module_available
+
+_PILLOW_AVAILABLE = module_available("PIL") # 설치 여부만 확인, import는 처음 인코딩할 때
+Image = lazy_module("PIL.Image") if _PILLOW_AVAILABLE else None
+if not _PILLOW_AVAILABLE:
+    print("Warning [IMAGE_UTILS]: Pillow 라이브러리를 찾을 수 없습니다. 이미지 용량 조정 기능이 비활성화됩니다.")
+
+JPEG_MAX_QUALITY = 90
+JPEG_MIN_QUALITY = 35
+# 최저 품질로도 예산을 넘으면 순서대로 해상도를 줄여 다시 시도
+JPEG_SCALE_STEPS = (1.0, 0.85, 0.7, 0.55, 0.4)
+
+# {(가로, 세로, 예산): (품질, 배율)} - 같은 레이아웃 높이의 견적서는 보통 같은 설정으로 예산에 맞음
+# (성공한 설정만 기록. 맞추지 못한 결과는 이미지 내용에 따라 다르므로 기록하지 않음)
+_chosen_params_cache = {}
+_params_lock = threading.Lock()
+
+
+def _encode_jpeg(img, quality, scale):
+    """주어진 품질/배율로 점진적(progressive) JPEG, 4:2:0 크로마 서브샘플링으로 인코딩합니다."""
+    if scale < 1.0:
+        img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.LANCZOS)
+    out = io.BytesIO()
+    # progressive 모드는 허프만 테이블을 항상 최적화하므로 optimize 옵션은 따로 주지 않음
+    img.save(out, format="JPEG", quality=quality, progressive=True, subsampling=2)
+    return out.getvalue()
+
+
+def _search_quality(img, max_bytes, scale):
+    """배율을 고정하고 예산 이하가 되는 가장 높은 품질을 이진 탐색합니다. 없으면 (None, None)."""
+    # 양 끝을 먼저 확인해 불가능한 배율은 한 번의 인코딩으로 건너뛰고, 충분하면 바로 반환
+    min_encoded = _encode_jpeg(img, JPEG_MIN_QUALITY, scale)
+    if len(min_encoded) > max_bytes:
+        return None, None
+    max_encoded = _encode_jpeg(img, JPEG_MAX_QUALITY, scale)
+    if len(max_encoded) <= max_bytes:
+        return JPEG_MAX_QUALITY, max_encoded
+
+    low, high = JPEG_MIN_QUALITY + 1, JPEG_MAX_QUALITY - 1
+    best_quality, best_bytes = JPEG_MIN_QUALITY, min_encoded
+    while low <= high:
+        quality = (low + high) // 2
+        encoded = _encode_jpeg(img, quality, scale)
+        if len(encoded) <= max_bytes:
+            best_quality, best_bytes = quality, encoded
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best_quality, best_bytes
+
+
+def encode_jpeg_within_budget(image, max_bytes):
+    """
+    PIL 이미지 또는 이미지 바이트를 max_bytes 이하의 JPEG 바이트로 인코딩합니다.
+    품질을 이진 탐색하고, 최저 품질로도 넘으면 해상도를 단계적으로 줄입니다.
+    선택된 (품질, 배율)은 이미지 크기별로 기억해 다음 호출에서 먼저 시도합니다.
+    반환: JPEG 바이트, 예산에 맞출 수 없거나 실패하면 None
+    """
+    if not _PILLOW_AVAILABLE:
+        print("Warning [IMAGE_UTILS]: Pillow 미설치로 이미지 용량 조정 불가.")
+        return None
+    try:
+        img = image if isinstance(image, Image.Image) else Image.open(io.BytesIO(image))
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        cache_key = (img.width, img.height, max_bytes)
+
+        with _params_lock:
+            cached_params = _chosen_params_cache.get(cache_key)
+        if cached_params:
+            quality, scale = cached_params
+            encoded = _encode_jpeg(img, quality, scale)
+            if len(encoded) <= max_bytes:
+                return encoded
+            print(f"DEBUG [IMAGE_UTILS]: Cached JPEG params {cached_params} exceeded budget ({len(encoded)} > {max_bytes}). Searching again.")
+
+        for scale in JPEG_SCALE_STEPS:
+            quality, encoded = _search_quality(img, max_bytes, scale)
+            if encoded is not None:
+                with _params_lock:
+                    _chosen_params_cache[cache_key] = (quality, scale)
+                print(f"DEBUG [IMAGE_UTILS]: JPEG fitted to budget: quality={quality}, scale={scale}, {len(encoded)}/{max_bytes} bytes")
+                return encoded
+
+        print(f"Warning [IMAGE_UTILS]: 최소 품질/해상도로도 {max_bytes} bytes 이하로 줄일 수 없습니다.")
+        return None
+    except Exception as e:
+        print(f"Error encoding JPEG within budget: {e}")
+        traceback.print_exc()
+        return None
+
+
+def fit_jpeg_to_budget(image_bytes, max_bytes):
+    """
+    이미 예산 이하인 JPEG는 그대로 반환하고(재인코딩으로 인한 화질 손실 방지),
+    예산을 넘거나 JPEG가 아니면 encode_jpeg_within_budget으로 다시 인코딩합니다.
+    """
+    if not image_bytes: return None
+    if len(image_bytes) <= max_bytes and image_bytes[:3] == b"\xff\xd8\xff":
+        return image_bytes
+    return encode_jpeg_within_budget(image_bytes, max_bytes)
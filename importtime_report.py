@@ -0,0 +1,141 @@
+# importtime_report.py
+# 앱 시작(첫 화면 표시 전) 모듈 import 시간 보고서
+# app.py가 최상위에서 import하는 모듈을 새 파이썬 프로세스에서 `-X importtime`으로 불러오고,
+# 출력을 파싱해 앱 모듈별 누적 시간과 시간이 많이 드는 패키지를 표로 보여줍니다.
+# 지연 import(lazy_imports)가 유지되는지, 첫 화면 지연이 늘지 않았는지 추적하는 용도입니다.
+#
+# CLI: python importtime_report.py [--top 15] [--runs 3] [--json report.json]
+
+import argparse
+import ast
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(_BASE_DIR, "app.py")
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$")
+
+
+def startup_modules(app_path=APP_PATH):
+    """app.py 최상위(try 블록 포함, 함수 안 제외)에서 import하는 모듈 이름을 순서대로 반환합니다."""
+    with open(app_path, encoding="utf-8") as app_file:
+        tree = ast.parse(app_file.read(), filename=app_path)
+    modules = []
+
+    def _visit(statements):
+        for node in statements:
+            if isinstance(node, ast.Import):
+                modules.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules.append(node.module)
+            elif isinstance(node, (ast.Try, ast.If, ast.With)):
+                for block in (getattr(node, "body", []), getattr(node, "orelse", []), getattr(node, "finalbody", [])):
+                    _visit(block)
+                for handler in getattr(node, "handlers", []):
+                    _visit(handler.body)
+
+    _visit(tree.body)
+    return list(dict.fromkeys(modules))
+
+
+def parse_importtime(stderr_text):
+    """`-X importtime` 출력 -> [{'module', 'depth', 'self_us', 'cumulative_us'}] (출력 순서 = 불러오기가 끝난 순서)"""
+    entries = []
+    for line in stderr_text.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match: continue
+        self_us, cumulative_us, indent, module = match.groups()
+        entries.append({"module": module.strip(), "depth": max(0, len(indent) - 1) // 2,
+                        "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return entries
+
+
+def measure_startup_imports(modules=None, python=sys.executable):
+    """
+    새 프로세스에서 modules(기본: app.py 최상위 import)를 차례로 import하며 import 시간을 잽니다.
+    모듈 하나가 실패해도 나머지는 계속 불러옵니다 (실패 목록은 'errors').
+    반환: {'entries': parse_importtime 결과, 'errors': {모듈: 오류}, 'modules': 대상 모듈}
+    """
+    modules = modules or startup_modules()
+    script = ("import json, sys\n"
+              "errors = {}\n"
+              f"for name in {modules!r}:\n"
+              "    try: __import__(name)\n"
+              "    except BaseException as e: errors[name] = f'{type(e).__name__}: {e}'\n"
+              "sys.stdout.write(json.dumps(errors))\n")
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run([python, "-X", "importtime", "-c", script], cwd=_BASE_DIR, env=env,
+                            capture_output=True, text=True, timeout=300)
+    try: errors = json.loads(result.stdout.strip().splitlines()[-1]) if result.stdout.strip() else {}
+    except (ValueError, IndexError): errors = {"<process>": result.stdout[-500:]}
+    return {"entries": parse_importtime(result.stderr), "errors": errors, "modules": modules}
+
+
+def summarize(measurements, top=15):
+    """
+    여러 번 잰 결과를 모듈별 중앙값으로 요약합니다.
+    - app_modules: app.py가 직접 import하는 모듈별 누적 시간
+    - heavy_packages: 최상위 패키지(점 없는 이름)별 누적 시간 상위 top개
+    - total_ms: 최상위(depth 0) import 누적 시간 합
+    """
+    def _median_ms(values):
+        return round(statistics.median(values) / 1000, 1)
+
+    modules = measurements[0]["modules"]
+    cumulative = {} # 모듈 -> [run별 누적 us] (같은 run에서 여러 번 나오면 처음 값)
+    totals = []
+    for measurement in measurements:
+        seen = set()
+        totals.append(sum(entry["cumulative_us"] for entry in measurement["entries"] if entry["depth"] == 0))
+        for entry in measurement["entries"]:
+            if entry["module"] in seen: continue
+            seen.add(entry["module"])
+            cumulative.setdefault(entry["module"], []).append(entry["cumulative_us"])
+
+    app_modules = [{"module": name, "cumulative_ms": _median_ms(cumulative[name]) if name in cumulative else None}
+                   for name in modules]
+    heavy_packages = sorted(({"module": name, "cumulative_ms": _median_ms(values)} for name, values in cumulative.items()
+                             if "." not in name and name not in modules),
+                            key=lambda row: row["cumulative_ms"], reverse=True)[:top]
+    return {"total_ms": _median_ms(totals) if totals else 0.0, "runs": len(measurements),
+            "app_modules": app_modules, "heavy_packages": heavy_packages, "errors": measurements[-1]["errors"]}
+
+
+def format_table(summary):
+    """summarize 결과를 터미널 표 문자열로 만듭니다. (앱 모듈이 불러온 패키지는 그 모듈 시간에 이미 포함)"""
+    lines = [f"Startup imports: {summary['total_ms']:.1f} ms (median of {summary['runs']} runs)", "",
+             f"{'app module':<28}{'cumulative ms':>14}"]
+    for row in summary["app_modules"]:
+        cumulative_text = "-" if row["cumulative_ms"] is None else f"{row['cumulative_ms']:.1f}"
+        lines.append(f"{row['module']:<28}{cumulative_text:>14}")
+    lines += ["", f"{'heavy package':<28}{'cumulative ms':>14}"]
+    for row in summary["heavy_packages"]:
+        lines.append(f"{row['module']:<28}{row['cumulative_ms']:>14.1f}")
+    for module, error in summary["errors"].items():
+        lines.append(f"! {module}: {error}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="앱 시작 import 시간 보고서 (-X importtime)")
+    parser.add_argument("--top", type=int, default=15, help="표시할 무거운 패키지 수")
+    parser.add_argument("--runs", type=int, default=3, help="측정 횟수 (중앙값 사용)")
+    parser.add_argument("--json", dest="json_path", default=None, help="요약을 JSON 파일로도 저장 (추이 기록용)")
+    parser.add_argument("modules", nargs="*", help="측정할 모듈 (기본: app.py 최상위 import)")
+    args = parser.parse_args(argv)
+
+    measurements = [measure_startup_imports(args.modules or None) for _ in range(max(1, args.runs))]
+    summary = summarize(measurements, top=args.top)
+    print(format_table(summary))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as json_file:
+            json.dump(summary, json_file, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,85 @@
+# lazy_imports.py
+# 무거운 외부 라이브러리(reportlab, pdf2image, PIL, googleapiclient, openpyxl, pandas, requests, smtplib 등)를
+# 실제로 처음 사용할 때 import하기 위한 작은 대리 모듈.
+# 대부분의 세션은 파일을 생성하지 않으므로 첫 화면 표시 전에 이 라이브러리들을 불러오지 않습니다.
+# 설치 여부(_REPORTLAB_AVAILABLE 등)는 module_available로 import 없이 확인합니다.
+# 시작 시 import 시간은 importtime_report.py로 확인합니다.
+
+import importlib
+import importlib.util
+import threading
+import time
+import types
+
+_import_lock = threading.RLock()
+_availability_cache = {}
+_load_times = {} # 모듈 이름 -> 처음 불러올 때 걸린 시간(ms)
+
+
+def module_available(name):
+    """모듈을 import하지 않고 설치 여부만 확인합니다 (패키지 하위 모듈은 상위 패키지의 __init__만 실행될 수 있음)."""
+    available = _availability_cache.get(name)
+    if available is None:
+        try: available = importlib.util.find_spec(name) is not None
+        except (ImportError, ValueError): available = False
+        _availability_cache[name] = available
+    return available
+
+
+class LazyModule(types.ModuleType):
+    """처음 속성에 접근할 때 실제 모듈을 import해 그 속성을 돌려주는 대리 모듈."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = None
+
+    def _lazy_load(self):
+        module = self.__dict__["_lazy_target"]
+        if module is None:
+            with _import_lock:
+                module = self.__dict__["_lazy_target"]
+                if module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    _load_times[self.__name__] = round((time.perf_counter() - started) * 1000, 1)
+                    print(f"DEBUG [LazyImport]: '{self.__name__}' loaded in {_load_times[self.__name__]} ms")
+                    self.__dict__["_lazy_target"] = module
+        return module
+
+    def __getattr__(self, attribute):
+        # __getattr__은 대리 모듈 자체에 없는 속성일 때만 호출됨
+        if attribute.startswith("__") and attribute.endswith("__"):
+            raise AttributeError(attribute)
+        return getattr(self._lazy_load(), attribute)
+
+    def __dir__(self):
+        return dir(self._lazy_load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_lazy_target"] is not None else "not loaded"
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_module(name):
+    """
+    name 모듈의 대리 모듈을 반환합니다. 이미 import되어 있으면 실제 모듈을 그대로 반환합니다.
+    설치되어 있지 않으면 일반 import와 같이 ImportError(ModuleNotFoundError)를 발생시킵니다.
+    """
+    module = importlib.sys.modules.get(name)
+    if module is not None:
+        return module
+    if not module_available(name):
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return LazyModule(name)
+
+
+def is_loaded(module):
+    """대리 모듈이면 실제 모듈을 불러왔는지, 일반 모듈이면 True."""
+    if isinstance(module, LazyModule):
+        return module.__dict__["_lazy_target"] is not None
+    return module is not None
+
+
+def get_load_times():
+    """대리 모듈별로 처음 불러올 때 걸린 시간(ms)."""
+    return dict(_load_times)
\ No newline at end of file
@@ -1,8 +1,32 @@
 # mms_utils.py
+# 견적서 이미지 MMS 발송 (알리고 게이트웨이)
+# 게이트웨이 요청은 프로세스 안에서 하나의 requests.Session으로 보냅니다 (keep-alive 연결 풀).
+# - 매 발송마다 TCP/TLS 연결을 새로 맺지 않습니다.
+# - 연결/응답 대기 시간을 따로 제한해 게이트웨이가 멈춰도 작업 스레드가 무한정 기다리지 않습니다.
+# - 요청이 게이트웨이에 닿지 않은 실패(연결 실패, 429/503 거절)만 자동으로 다시 보냅니다.
+#   응답 대기 중 끊긴 요청과 그 밖의 5xx 응답은 이미 발송되었을 수 있으므로 다시 보내지 않고
+#   실패로 남깁니다 (알리고 발송 내역에서 확인 후 직접 다시 발송, 중복 MMS 방지).
+# 여러 사람에게 보내는 안내 문자(SMS/LMS)는 알리고 대량 발송(send_mass)으로 한 요청에 최대 500명씩 보냅니다 (deliver_mass).
+# 로컬 가짜 알리고 서버로 점검: python -m pytest tests/test_mms_utils.py
+
+import atexit
+import json
+import threading
 import streamlit as st
-import requests
 import traceback
 import re
+from lazy_imports import lazy_module
+import outbox
+
+requests = lazy_module("requests") # 실제 발송할 때 import (첫 화면 지연 방지)
+
+try:
+    import image_utils # MMS 첨부 용량 제한에 맞춘 JPEG 인코딩
+except ImportError:
+    image_utils = None
+
+# 알리고 MMS 첨부 이미지 최대 용량 (secrets의 mms_credentials.max_image_bytes로 변경 가능)
+MMS_IMAGE_MAX_BYTES = 300 * 1024
 
 def normalize_phone_number(phone_number_str):
     if not phone_number_str or not isinstance(phone_number_str, str):
@@ -16,28 +40,155 @@ def normalize_phone_number(phone_number_str):
     # st.warning(f"전화번호({phone_number_str})가 표준 형식에 맞지 않을 수 있습니다. MMS 게이트웨이 요구사항을 확인하세요.")
     return digits
 
-def send_mms_with_image(recipient_phone, image_bytes, filename="견적서.jpg", text_message="견적서가 도착했습니다."):
-    st.info(f"MMS 발송 시도: 수신자={recipient_phone}, 파일명={filename}")
-    if not recipient_phone:
-        st.error("수신자 전화번호가 없습니다.")
-        return False
+MMS_CONNECT_TIMEOUT_SEC = 5         # 게이트웨이 연결 대기 시간 (secrets의 mms_credentials.connect_timeout으로 변경 가능)
+MMS_REQUEST_TIMEOUT_SEC = 30        # 게이트웨이 응답 대기 시간 (mms_credentials.read_timeout으로 변경 가능)
+MMS_CONNECT_RETRIES = 2             # 연결 실패 시 다시 시도하는 횟수 (요청이 전송되지 않았으므로 안전)
+MMS_REJECTED_RETRIES = 2            # 게이트웨이가 처리하지 않고 거절한 응답(429/503)에 다시 시도하는 횟수
+MMS_RETRY_BACKOFF_SEC = 0.5         # 다시 시도 간격 (0.5초, 1초, ... / Retry-After 헤더가 있으면 그 값)
+MMS_POOL_MAXSIZE = 4                # 게이트웨이 호스트당 유지할 keep-alive 연결 수 (발송 대기열 작업 스레드 수 이상)
+_REJECTED_STATUS_CODES = (429, 503) # 요청을 처리하지 않았다고 볼 수 있는 응답 코드
+ALIGO_MASS_MAX_RECIPIENTS = 500     # 알리고 대량 발송 한 요청당 최대 받는 사람 수 (mms_credentials.mass_max_recipients로 줄일 수 있음)
+SMS_MAX_BYTES = 90                  # SMS 본문 최대 바이트 (EUC-KR 기준), 넘으면 LMS로 발송
+
+_session = None
+_session_lock = threading.Lock()
+
+def _load_mms_credentials():
+    return dict(st.secrets.get("mms_credentials", {}))
+
+def _get_session():
+    """게이트웨이용 requests.Session (프로세스당 하나, 처음 발송할 때 생성)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            retry_policy = Retry(
+                total=MMS_CONNECT_RETRIES + MMS_REJECTED_RETRIES,
+                connect=MMS_CONNECT_RETRIES,
+                read=False,  # 응답을 기다리다 끊긴 POST는 이미 발송되었을 수 있음 (원래 예외 그대로 전달)
+                other=0,
+                status=MMS_REJECTED_RETRIES,
+                status_forcelist=_REJECTED_STATUS_CODES,
+                allowed_methods=frozenset({"POST"}),  # status_forcelist의 거절 응답에만 적용 (read=False)
+                backoff_factor=MMS_RETRY_BACKOFF_SEC,
+                respect_retry_after_header=True,
+                raise_on_status=False,  # 마지막 응답을 그대로 받아 상태 코드로 판단
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MMS_POOL_MAXSIZE, max_retries=retry_policy)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+def close_session():
+    """게이트웨이 keep-alive 연결을 닫습니다 (프로세스 종료 시 자동 호출)."""
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
+
+atexit.register(close_session)
+
+def _gateway_timeout(mms_creds):
+    """(연결 대기, 응답 대기) 초"""
+    return (float(mms_creds.get("connect_timeout", MMS_CONNECT_TIMEOUT_SEC)), float(mms_creds.get("read_timeout", MMS_REQUEST_TIMEOUT_SEC)))
+
+def _parse_aligo_response(response):
+    """
+    알리고 응답을 {'ok', 'error', 'retryable', 'msg_id'}로 해석합니다.
+    - result_code는 "1"/1이면 성공, 음수면 실패 (문자열/숫자 모두 허용)
+    - 성공 코드여도 success_cnt가 0이고 error_cnt가 있으면 실패로 봅니다
+    - JSON이 아니거나(점검 페이지 등) 형식이 다르면 실패로 봅니다
+    - 429/503(처리하지 않고 거절)만 다시 시도 대상입니다. 그 밖의 5xx는 게이트웨이가 요청을 처리하다 실패했을 수 있어
+      (이미 발송되었을 수 있음) 다시 보내지 않고 발송 내역 확인을 안내합니다
+    """
+    status_code = response.status_code
+    retryable_status = status_code in _REJECTED_STATUS_CODES
+    try:
+        result = json.loads(response.content.decode("utf-8-sig").strip() or "null")
+    except (UnicodeDecodeError, ValueError):
+        result = None
+    if not isinstance(result, dict):
+        result = None
+        message = response.text[:80].strip() if response.content else ""
+    else:
+        message = str(result.get("message") or "").strip()
+    if retryable_status:
+        return {"ok": False, "error": f"MMS 게이트웨이 거절 (HTTP {status_code}): {message}", "retryable": True, "msg_id": None}
+    if status_code >= 500:
+        return {"ok": False, "error": f"MMS 게이트웨이 오류 (HTTP {status_code}, 발송 여부를 알리고 발송 내역에서 확인하세요): {message}", "retryable": False, "msg_id": None}
+    if result is None:
+        return {"ok": False, "error": f"MMS 게이트웨이 응답 형식 오류 (HTTP {status_code}): {message}", "retryable": False, "msg_id": None}
+
+    result_code = str(result.get("result_code", "")).strip()
+    if result_code != "1":
+        return {"ok": False, "error": f"MMS 발송 실패 (코드 {result_code or '없음'}): {message or '알 수 없는 오류'}", "retryable": False, "msg_id": None}
+    try:
+        success_count = int(result.get("success_cnt", 1))
+        error_count = int(result.get("error_cnt", 0))
+    except (TypeError, ValueError):
+        success_count, error_count = 1, 0
+    if success_count == 0 and error_count > 0:
+        return {"ok": False, "error": f"MMS 발송 실패 (수신 거부/번호 오류 {error_count}건): {message}", "retryable": False, "msg_id": None}
+    return {"ok": True, "error": None, "retryable": False, "msg_id": result.get("msg_id")}
+
+def _never_reached_gateway(error):
+    """요청 예외가 연결을 맺기 전 실패(연결 거부/연결 시간 초과/이름 해석 실패)인지 - 요청이 전송되지 않았으므로 다시 보내도 안전"""
+    from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None # urllib3 MaxRetryError.reason
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+def _post_to_gateway(url, payload, files, timeout):
+    """게이트웨이 요청 하나를 보내고 결과를 {'ok', 'error', 'retryable', 'msg_id'}로 반환합니다 (요청 예외도 결과로 변환)."""
+    try:
+        response = _get_session().post(url, data=payload, files=files, timeout=timeout)
+        return _parse_aligo_response(response)
+    except (requests.exceptions.ReadTimeout, requests.exceptions.ChunkedEncodingError) as e:
+        # 요청은 전송되었고 응답만 받지 못함 -> 발송되었을 수 있으므로 자동으로 다시 보내지 않음
+        print(f"ERROR [MMS]: gateway response not received: {e}")
+        return {"ok": False, "error": f"MMS 게이트웨이 응답 없음 (발송 여부를 알리고 발송 내역에서 확인하세요): {e}", "retryable": False, "msg_id": None}
+    except requests.exceptions.RequestException as e:
+        if _never_reached_gateway(e):
+            print(f"ERROR [MMS]: gateway connection failed: {e}")
+            return {"ok": False, "error": f"MMS 게이트웨이 연결 오류: {e}", "retryable": True, "msg_id": None}
+        # 보내는 도중 연결이 끊김(Connection aborted 등) -> 게이트웨이가 받았는지 알 수 없으므로 다시 보내지 않음
+        print(f"ERROR [MMS]: gateway request interrupted: {e}")
+        return {"ok": False, "error": f"MMS 게이트웨이 요청 중단 (발송 여부를 알리고 발송 내역에서 확인하세요): {e}", "retryable": False, "msg_id": None}
+
+def deliver_mms(recipient_phone, image_bytes, filename="견적서.jpg", text_message="견적서가 도착했습니다.", creds=None):
+    """
+    MMS를 게이트웨이(알리고)로 바로 발송합니다. 화면 표시 없이 결과만 반환합니다 (발송 대기열 작업 스레드에서 사용).
+    반환: {'ok', 'error', 'retryable'(, 'msg_id')} - retryable: 연결 실패/429·503 거절처럼 요청이 게이트웨이에 닿지 않아 다시 보내도 되는 실패
+    (발송 설정이 없으면 다시 시도해도 실패하므로 retryable이 아님, 설정 후 관리자 화면에서 다시 시도)
+    """
     normalized_phone = normalize_phone_number(recipient_phone)
     if not normalized_phone:
-        st.error(f"유효하지 않은 전화번호 형식입니다: {recipient_phone}")
-        return False
+        return {"ok": False, "error": f"유효하지 않은 전화번호 형식입니다: {recipient_phone}", "retryable": False}
     if not image_bytes:
-        st.error("이미지 데이터가 없습니다.")
-        return False
+        return {"ok": False, "error": "이미지 데이터가 없습니다.", "retryable": False}
     try:
-        mms_creds = st.secrets.get("mms_credentials", {})
+        mms_creds = creds if creds is not None else _load_mms_credentials()
         api_key = mms_creds.get("api_key")
         aligo_id = mms_creds.get("userid")
         sender_number = mms_creds.get("sender_number")
         gateway_url = mms_creds.get("gateway_url", "https://apis.aligo.in/send/")
-
         if not all([api_key, aligo_id, sender_number]):
-            st.error("secrets.toml 파일에 api_key, userid, sender_number가 설정되어 있어야 합니다.")
-            return False
+            return {"ok": False, "error": "secrets.toml 파일에 api_key, userid, sender_number가 설정되어 있어야 합니다.", "retryable": False}
+
+        # 첨부 용량 제한에 맞게 JPEG 품질/해상도 조정 (이미 제한 이하인 JPEG는 그대로 사용)
+        max_image_bytes = int(mms_creds.get("max_image_bytes", MMS_IMAGE_MAX_BYTES))
+        if image_utils is not None:
+            fitted_image_bytes = image_utils.fit_jpeg_to_budget(image_bytes, max_image_bytes)
+            if not fitted_image_bytes:
+                return {"ok": False, "error": f"견적서 이미지를 MMS 용량 제한({max_image_bytes // 1024}KB) 이하로 줄일 수 없습니다.", "retryable": False}
+            image_bytes = fitted_image_bytes
+        elif len(image_bytes) > max_image_bytes:
+            print(f"WARNING [MMS]: image {len(image_bytes) // 1024}KB exceeds MMS limit {max_image_bytes // 1024}KB, gateway may reject it")
 
         payload = {
             "key": api_key,
@@ -53,19 +204,140 @@ def send_mms_with_image(recipient_phone, image_bytes, filename="견적서.jpg",
             "image": (filename, image_bytes, "image/jpeg")
         }
 
-        response = requests.post(gateway_url, data=payload, files=files)
-        result = response.json()
-        if result.get("result_code") == "1":
-            st.success("MMS 발송 성공")
-            return True
+        return _post_to_gateway(gateway_url, payload, files, _gateway_timeout(mms_creds))
+
+    except Exception as e:
+        traceback.print_exc()
+        return {"ok": False, "error": f"예외 발생: {e}", "retryable": False}
+
+def _text_msg_type(texts):
+    """본문이 모두 SMS 길이(EUC-KR 90바이트) 이하면 'SMS', 아니면 'LMS'"""
+    for text in texts:
+        try: size = len(text.encode("cp949"))
+        except UnicodeEncodeError: size = len(text.encode("utf-8")) # 이모지 등 EUC-KR에 없는 문자
+        if size > SMS_MAX_BYTES: return "LMS"
+    return "SMS"
+
+def deliver_mass(messages, title="", creds=None):
+    """
+    받는 사람마다 다른 문자를 알리고 대량 발송(send_mass)으로 바로 보냅니다. 화면 표시 없이 결과만 반환합니다.
+    한 요청에 최대 ALIGO_MASS_MAX_RECIPIENTS명씩 나누어 보내며, 요청마다 본문 길이에 따라 SMS/LMS를 고릅니다.
+    messages: [{'recipient': 전화번호, 'text': 본문}]
+    반환: messages 순서대로 [{'ok', 'error', 'retryable', 'msg_id'}] - 같은 요청으로 보낸 받는 사람은 결과가 같습니다
+    (알리고 대량 발송 응답에는 받는 사람별 실패 내역이 없음).
+    """
+    results = [None] * len(messages)
+    valid_messages = [] # (messages 위치, 정규화한 번호, 본문)
+    for index, message in enumerate(messages):
+        normalized_phone = normalize_phone_number(message.get("recipient"))
+        if not normalized_phone:
+            results[index] = {"ok": False, "error": f"유효하지 않은 전화번호 형식입니다: {message.get('recipient')}", "retryable": False, "msg_id": None}
+        elif not message.get("text"):
+            results[index] = {"ok": False, "error": "문자 내용이 없습니다.", "retryable": False, "msg_id": None}
         else:
-            st.error(f"MMS 발송 실패: {result.get('message')}")
-            return False
+            valid_messages.append((index, normalized_phone, message["text"]))
+    if not valid_messages: return results
+    try:
+        mms_creds = creds if creds is not None else _load_mms_credentials()
+        api_key = mms_creds.get("api_key")
+        aligo_id = mms_creds.get("userid")
+        sender_number = mms_creds.get("sender_number")
+        if not all([api_key, aligo_id, sender_number]):
+            for index, _, _ in valid_messages:
+                results[index] = {"ok": False, "error": "secrets.toml 파일에 api_key, userid, sender_number가 설정되어 있어야 합니다.", "retryable": False, "msg_id": None}
+            return results
+        gateway_url = mms_creds.get("gateway_url", "https://apis.aligo.in/send/")
+        mass_gateway_url = mms_creds.get("mass_gateway_url") or gateway_url.rstrip("/").rsplit("/", 1)[0] + "/send_mass/"
+        chunk_size = max(1, min(ALIGO_MASS_MAX_RECIPIENTS, int(mms_creds.get("mass_max_recipients", ALIGO_MASS_MAX_RECIPIENTS))))
+        timeout = _gateway_timeout(mms_creds)
 
+        for start in range(0, len(valid_messages), chunk_size):
+            chunk = valid_messages[start:start + chunk_size]
+            payload = {
+                "key": api_key,
+                "userid": aligo_id,
+                "sender": sender_number,
+                "cnt": len(chunk),
+                "msg_type": _text_msg_type(text for _, _, text in chunk),
+                "title": title,
+            }
+            for number, (_, normalized_phone, text) in enumerate(chunk, 1):
+                payload[f"rec_{number}"] = normalized_phone
+                payload[f"msg_{number}"] = text
+            result = _post_to_gateway(mass_gateway_url, payload, None, timeout)
+            for index, _, _ in chunk:
+                results[index] = result
     except Exception as e:
-        st.error(f"예외 발생: {e}")
         traceback.print_exc()
+        for index, _, _ in valid_messages:
+            if results[index] is None:
+                results[index] = {"ok": False, "error": f"예외 발생: {e}", "retryable": False, "msg_id": None}
+    return results
+
+def send_mms_with_image(recipient_phone, image_bytes, filename="견적서.jpg", text_message="견적서가 도착했습니다.", revision=None, resend=False):
+    """
+    견적서 이미지 MMS를 발송 대기열(outbox)에 등록합니다. 실제 발송은 대기열 작업 스레드가 합니다.
+    revision(견적 내용 해시)이 같고 받는 번호가 같으면 한 번만 등록됩니다 (실패한 건은 다시 대기,
+    이미 발송한 건은 resend=True일 때만 다시 발송).
+    반환: 'queued'(등록), 'duplicate'(이미 대기/발송 중이거나 발송됨), 실패하면 False.
+    대기열을 쓸 수 없으면 바로 발송하고 성공하면 'sent'를 반환합니다.
+    """
+    if not recipient_phone:
+        st.error("수신자 전화번호가 없습니다.")
+        return False
+    normalized_phone = normalize_phone_number(recipient_phone)
+    if not normalized_phone:
+        st.error(f"유효하지 않은 전화번호 형식입니다: {recipient_phone}")
         return False
+    if not image_bytes:
+        st.error("이미지 데이터가 없습니다.")
+        return False
+    try:
+        entry = outbox.enqueue("mms", normalized_phone, {"filename": filename, "text_message": text_message},
+                               attachment=image_bytes, revision=revision, resend=resend)
+    except Exception as e:
+        print(f"ERROR [MMS]: outbox enqueue failed, sending directly: {e}")
+        traceback.print_exc()
+        result = deliver_mms(normalized_phone, image_bytes, filename, text_message)
+        if not result["ok"]: st.error(result["error"])
+        return "sent" if result["ok"] else False
+    return "duplicate" if entry["duplicate"] else "queued"
+
+def _send_outbox_batch(entries, settings=None):
+    """발송 대기열(outbox) 작업 스레드가 호출: 대기 중인 MMS를 차례로 보냅니다."""
+    return [deliver_mms(entry["recipient"], entry["attachment"], entry["payload"].get("filename", "견적서.jpg"),
+                        entry["payload"].get("text_message", ""), creds=settings) for entry in entries]
+
+outbox.register_channel("mms", _send_outbox_batch, batch_size=5)
+
+def queue_texts(messages, title="", revision=None):
+    """
+    안내 문자(SMS/LMS) 여러 건을 발송 대기열에 한 번에 등록합니다 (대기열 작업 스레드가 대량 발송으로 묶어서 보냄).
+    messages: [{'recipient': 전화번호, 'text': 본문}]
+    revision(예: 안내 문자 캠페인 ID)이 같고 받는 번호가 같으면 한 번만 등록됩니다.
+    반환: messages 순서대로 outbox.enqueue 결과 {'id', 'status', 'duplicate'}. 번호가 유효하지 않은 항목이 있으면 ValueError
+    """
+    queued = []
+    for message in messages:
+        normalized_phone = normalize_phone_number(message.get("recipient"))
+        if not normalized_phone:
+            raise ValueError(f"유효하지 않은 전화번호 형식입니다: {message.get('recipient')}")
+        queued.append((normalized_phone, {"text": message["text"], "title": title}, None))
+    return outbox.enqueue_many("sms", queued, revision=revision)
+
+def _send_outbox_text_batch(entries, settings=None):
+    """발송 대기열(outbox) 작업 스레드가 호출: 대기 중인 문자를 제목별로 묶어 대량 발송합니다."""
+    results = [None] * len(entries)
+    indexes_by_title = {}
+    for index, entry in enumerate(entries):
+        indexes_by_title.setdefault(entry["payload"].get("title", ""), []).append(index)
+    for title, indexes in indexes_by_title.items():
+        messages = [{"recipient": entries[index]["recipient"], "text": entries[index]["payload"].get("text", "")} for index in indexes]
+        for index, result in zip(indexes, deliver_mass(messages, title=title, creds=settings)):
+            results[index] = result
+    return results
+
+outbox.register_channel("sms", _send_outbox_text_batch, batch_size=ALIGO_MASS_MAX_RECIPIENTS)
 
 # from pathlib import Path
 # # Save the modified `mms_utils.py` to disk to give the user
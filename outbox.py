@@ -0,0 +1,359 @@
+# outbox.py
+# 발송 대기열 (이메일, MMS, 안내 문자)
+# 화면의 발송 버튼은 대기열(SQLite 파일)에 메시지를 등록만 하고 바로 돌아옵니다.
+# 작업 스레드가 대기열을 비우며 실제로 발송하고, 실패하면 점점 긴 간격으로 다시 시도합니다.
+# - 프로세스가 중간에 종료되어도 등록된 메시지는 파일에 남아 다음 시작 때 이어서 발송됩니다.
+# - 같은 견적 내용(revision) + 채널 + 받는 사람은 한 번만 등록됩니다 (버튼 중복 클릭, 새로고침).
+#   이미 발송한 메시지를 일부러 다시 보낼 때는 resend=True로 등록합니다.
+# - 오래된 발송 완료 기록은 작업 스레드를 시작할 때 지웁니다 (SENT_RETENTION_DAYS).
+# - 채널별 발송 함수는 email_utils/mms_utils가 register_channel로 등록합니다 (email, mms, sms).
+# 로컬 SMTP/게이트웨이 대역 서버로 처리량/대기 시간 측정: python tests/bench_outbox.py [메시지 수]
+
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from contextlib import closing
+
+OUTBOX_DB_PATH = os.environ.get("MOVE24DAY_OUTBOX_DB", os.path.join(tempfile.gettempdir(), "move24day_outbox.sqlite3"))
+OUTBOX_WORKERS = 2               # 대기열 작업 스레드 수
+POLL_INTERVAL_SEC = 2.0          # 새 메시지 알림이 없을 때 재시도 시각을 확인하는 간격
+MAX_ATTEMPTS = 6                 # 이 횟수만큼 실패하면 'failed' (관리자 화면에서 다시 시도 가능)
+RETRY_BASE_DELAY_SEC = 30        # 첫 재시도 대기 시간 (이후 두 배씩)
+RETRY_MAX_DELAY_SEC = 30 * 60    # 재시도 대기 시간 상한
+SENDING_STALE_SEC = 10 * 60      # 'sending' 상태로 이보다 오래 남은 메시지는 발송 중 종료된 것으로 보고 다시 대기
+STALE_CHECK_INTERVAL_SEC = 60    # 작업 스레드가 오래된 'sending' 메시지를 확인하는 간격
+SENT_RETENTION_DAYS = 30         # 발송 완료 기록 보관 기간 (작업 스레드 시작 시 정리)
+
+STATUS_LABELS = {"pending": "발송 대기", "sending": "발송 중", "sent": "발송 완료", "failed": "발송 실패"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    dedupe_key TEXT NOT NULL UNIQUE,
+    revision TEXT,
+    recipient TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attachment BLOB,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    sent_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (channel, status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS outbox_revision ON outbox (revision);
+"""
+
+_db_path = OUTBOX_DB_PATH
+_init_lock = threading.Lock()
+_initialized_path = None
+_channels = {} # 채널 -> {"send_batch": 함수(entries, settings) -> [{'ok', 'error', 'retryable'}], "batch_size"}
+_channel_settings = {} # 채널 -> 발송 설정 (없으면 각 채널이 Streamlit Secrets 사용)
+_wakeup = threading.Event()
+_workers_lock = threading.Lock()
+_workers = []
+_stop_event = threading.Event()
+_last_stale_check = 0.0 # time.monotonic() 기준 마지막 recover_stale 시각
+
+
+def configure(db_path=None):
+    """대기열 파일 위치를 바꿉니다 (벤치마크/점검용)."""
+    global _db_path, _initialized_path
+    with _init_lock:
+        _db_path = db_path or OUTBOX_DB_PATH
+        _initialized_path = None
+
+
+def register_channel(channel, send_batch, batch_size=10):
+    """채널 발송 함수 등록: send_batch(entries, settings) -> entries 순서대로 [{'ok', 'error', 'retryable'}]"""
+    _channels[channel] = {"send_batch": send_batch, "batch_size": batch_size}
+
+
+def set_channel_settings(channel, settings):
+    """채널 발송 설정을 지정합니다 (None이면 Streamlit Secrets, 벤치마크에서 대역 서버 지정용)."""
+    if settings is None: _channel_settings.pop(channel, None)
+    else: _channel_settings[channel] = settings
+
+
+def _connect():
+    """호출마다 새 연결 (스레드 간 공유하지 않음). WAL 모드라 읽기와 쓰기가 서로 막지 않습니다."""
+    global _initialized_path
+    conn = sqlite3.connect(_db_path, timeout=10, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    if _initialized_path != _db_path:
+        with _init_lock:
+            if _initialized_path != _db_path:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _initialized_path = _db_path
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def make_dedupe_key(channel, recipient, revision=None):
+    """중복 등록 방지 키: 채널 + 견적 내용 해시 + 받는 사람 (revision이 없으면 매번 새 키)"""
+    return f"{channel}:{revision or uuid.uuid4().hex}:{recipient}"
+
+
+def _insert_entry(conn, channel, recipient, payload, attachment, revision, now, resend=False):
+    """열린 트랜잭션 안에서 메시지 하나를 등록합니다 (enqueue/enqueue_many 공용). 반환: {'id', 'status', 'duplicate'}"""
+    dedupe_key = make_dedupe_key(channel, recipient, revision)
+    payload_json = json.dumps(payload, ensure_ascii=False)
+    attachment_blob = sqlite3.Binary(attachment) if attachment else None
+    cursor = conn.execute(
+        "INSERT INTO outbox (channel, dedupe_key, revision, recipient, payload, attachment, status, next_attempt_at, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?) ON CONFLICT(dedupe_key) DO NOTHING",
+        (channel, dedupe_key, revision, recipient, payload_json, attachment_blob, now, now, now))
+    if cursor.rowcount:
+        return {"id": cursor.lastrowid, "status": "pending", "duplicate": False}
+    row = conn.execute("SELECT id, status FROM outbox WHERE dedupe_key = ?", (dedupe_key,)).fetchone()
+    if row["status"] == "failed" or (resend and row["status"] == "sent"):
+        conn.execute("UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ?, updated_at = ?, sent_at = NULL, "
+                     "last_error = NULL, payload = ?, attachment = ? WHERE id = ?", (now, now, payload_json, attachment_blob, row["id"]))
+        return {"id": row["id"], "status": "pending", "duplicate": False}
+    return {"id": row["id"], "status": row["status"], "duplicate": True}
+
+
+def enqueue(channel, recipient, payload, attachment=None, revision=None, resend=False):
+    """
+    메시지를 대기열에 등록합니다.
+    같은 키(채널, revision, 받는 사람)가 이미 있으면 새로 등록하지 않고 그 상태를 반환하며,
+    이전 등록이 'failed'였다면(resend=True면 'sent'였어도) 새 내용으로 다시 대기 상태로 돌립니다.
+    대기/발송 중인 메시지는 resend=True여도 다시 등록하지 않습니다 (곧 발송됨).
+    반환: {'id', 'status', 'duplicate'}
+    """
+    return enqueue_many(channel, [(recipient, payload, attachment)], revision=revision, resend=resend)[0]
+
+
+def enqueue_many(channel, messages, revision=None, resend=False):
+    """
+    여러 메시지를 한 트랜잭션으로 등록합니다 (안내 문자 캠페인 등). 작업 스레드는 커밋 후에 한꺼번에 보게 되므로
+    대량 발송 채널이 등록 도중의 일부만 먼저 가져가지 않습니다.
+    messages: [(받는 사람, payload, 첨부 또는 None)] - 중복 처리는 enqueue와 같음
+    반환: messages 순서대로 [{'id', 'status', 'duplicate'}]
+    """
+    if channel not in _channels:
+        raise ValueError(f"등록되지 않은 발송 채널: {channel}")
+    now = time.time()
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            entries = [_insert_entry(conn, channel, recipient, payload, attachment, revision, now, resend)
+                       for recipient, payload, attachment in messages]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    if any(entry["status"] == "pending" for entry in entries): _wakeup.set()
+    return entries
+
+
+def _retry_delay(attempts):
+    delay = min(RETRY_MAX_DELAY_SEC, RETRY_BASE_DELAY_SEC * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.8, 1.2) # 여러 메시지가 같은 시각에 몰리지 않도록
+
+
+def _claim(channel, limit):
+    """발송 시각이 된 대기 메시지를 최대 limit개 'sending'으로 바꾸고 가져옵니다 (다른 작업 스레드와 겹치지 않음)."""
+    now = time.time()
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT * FROM outbox WHERE channel = ? AND status = 'pending' AND next_attempt_at <= ? "
+                                "ORDER BY next_attempt_at, id LIMIT ?", (channel, now, limit)).fetchall()
+            if rows:
+                conn.executemany("UPDATE outbox SET status = 'sending', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                                 [(now, row["id"]) for row in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return [{"id": row["id"], "channel": row["channel"], "recipient": row["recipient"], "revision": row["revision"],
+             "payload": json.loads(row["payload"]), "attachment": bytes(row["attachment"]) if row["attachment"] is not None else None,
+             "attempts": row["attempts"] + 1} for row in rows]
+
+
+def _complete(entries, results):
+    """발송 결과 기록: 성공은 'sent'(첨부 삭제), 재시도 가능한 실패는 다음 시각에 다시 대기, 그 외/횟수 초과는 'failed'."""
+    now = time.time()
+    updates = []
+    for entry, result in zip(entries, results):
+        if result.get("ok"):
+            updates.append(("UPDATE outbox SET status = 'sent', sent_at = ?, updated_at = ?, attachment = NULL, last_error = NULL WHERE id = ?",
+                            (now, now, entry["id"])))
+        elif result.get("retryable") and entry["attempts"] < MAX_ATTEMPTS:
+            updates.append(("UPDATE outbox SET status = 'pending', next_attempt_at = ?, updated_at = ?, last_error = ? WHERE id = ?",
+                            (now + _retry_delay(entry["attempts"]), now, result.get("error"), entry["id"])))
+        else:
+            updates.append(("UPDATE outbox SET status = 'failed', updated_at = ?, last_error = ? WHERE id = ?",
+                            (now, result.get("error"), entry["id"])))
+            print(f"ERROR [Outbox]: {entry['channel']} to {entry['recipient']} failed after {entry['attempts']} attempt(s): {result.get('error')}")
+    with closing(_connect()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for sql, params in updates:
+            conn.execute(sql, params)
+        conn.execute("COMMIT")
+
+
+def recover_stale(stale_sec=SENDING_STALE_SEC):
+    """발송 중 프로세스가 종료되어 'sending'으로 남은 메시지를 다시 대기 상태로 돌립니다. 반환: 복구한 수"""
+    now = time.time()
+    with closing(_connect()) as conn:
+        cursor = conn.execute("UPDATE outbox SET status = 'pending', next_attempt_at = ?, updated_at = ? "
+                              "WHERE status = 'sending' AND updated_at < ?", (now, now, now - stale_sec))
+        return cursor.rowcount
+
+
+def process_due():
+    """채널마다 발송 시각이 된 메시지를 한 묶음씩 발송합니다. 반환: 처리한 메시지 수"""
+    processed = 0
+    for channel, spec in list(_channels.items()):
+        entries = _claim(channel, spec["batch_size"])
+        if not entries: continue
+        try:
+            results = spec["send_batch"](entries, _channel_settings.get(channel))
+        except Exception as e:
+            print(f"ERROR [Outbox]: {channel} sender raised: {e}")
+            traceback.print_exc()
+            results = [{"ok": False, "error": f"발송 중 오류: {e}", "retryable": True}] * len(entries)
+        _complete(entries, results)
+        processed += len(entries)
+    return processed
+
+
+def _recover_stale_if_due():
+    """STALE_CHECK_INTERVAL_SEC마다 오래된 'sending' 메시지를 다시 대기시킵니다.
+    대기열 파일은 다른 프로세스(다른 앱 인스턴스, 안내 문자 명령줄 도구)와 함께 쓰므로 시작할 때 바로 되돌리지 않고,
+    SENDING_STALE_SEC가 지나 종료된 것으로 볼 수 있을 때 작업 스레드가 되돌립니다."""
+    global _last_stale_check
+    if time.monotonic() - _last_stale_check < STALE_CHECK_INTERVAL_SEC: return
+    _last_stale_check = time.monotonic()
+    recovered = recover_stale()
+    if recovered: print(f"INFO [Outbox]: {recovered} message(s) left in 'sending' re-queued")
+
+
+def _worker_loop():
+    while not _stop_event.is_set():
+        try:
+            _recover_stale_if_due()
+            if process_due(): continue
+        except Exception as e:
+            print(f"ERROR [Outbox]: worker iteration failed: {e}")
+            traceback.print_exc()
+        _wakeup.wait(POLL_INTERVAL_SEC)
+        _wakeup.clear()
+
+
+def start_workers(count=OUTBOX_WORKERS):
+    """
+    대기열 작업 스레드를 시작합니다 (프로세스당 한 번, 여러 번 호출해도 됨).
+    보관 기간이 지난 발송 완료 기록을 지웁니다 (대기열 파일이 계속 커지지 않도록).
+    이전 프로세스가 발송 중 종료되어 남은 'sending' 메시지는 SENDING_STALE_SEC가 지난 뒤 작업 스레드가 다시 대기시킵니다
+    (다른 프로세스가 지금 발송 중인 메시지를 되돌려 두 번 보내지 않도록).
+    """
+    with _workers_lock:
+        if any(worker.is_alive() for worker in _workers):
+            return list(_workers)
+        _stop_event.clear()
+        try:
+            purged = purge_sent()
+            if purged: print(f"INFO [Outbox]: {purged} sent message(s) older than {SENT_RETENTION_DAYS} days purged")
+        except Exception as e:
+            print(f"ERROR [Outbox]: purge of sent messages failed: {e}")
+        _workers[:] = [threading.Thread(target=_worker_loop, name=f"outbox-worker-{i}", daemon=True) for i in range(count)]
+        for worker in _workers:
+            worker.start()
+        return list(_workers)
+
+
+def stop_workers(timeout=10):
+    """작업 스레드를 멈춥니다 (벤치마크/점검용, 발송 중인 묶음은 끝까지 처리)."""
+    with _workers_lock:
+        _stop_event.set()
+        _wakeup.set()
+        for worker in _workers:
+            worker.join(timeout)
+        _workers.clear()
+
+
+def get_summary(revision=None):
+    """채널별 상태별 메시지 수: {채널: {상태: 수}} (revision을 주면 그 견적/캠페인의 메시지만)"""
+    query, params = "SELECT channel, status, COUNT(*) AS n FROM outbox", []
+    if revision:
+        query += " WHERE revision = ?"
+        params.append(revision)
+    with closing(_connect()) as conn:
+        rows = conn.execute(query + " GROUP BY channel, status", params).fetchall()
+    summary = {}
+    for row in rows:
+        summary.setdefault(row["channel"], {})[row["status"]] = row["n"]
+    return summary
+
+
+def list_entries(limit=50, status=None, revision=None):
+    """최근 메시지 목록 (첨부 제외, 관리자 화면용). status/revision으로 거를 수 있습니다."""
+    query = ("SELECT id, channel, recipient, revision, status, attempts, created_at, updated_at, sent_at, next_attempt_at, last_error "
+             "FROM outbox")
+    conditions, params = [], []
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    if revision:
+        conditions.append("revision = ?")
+        params.append(revision)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    with closing(_connect()) as conn:
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+
+def get_status(channel, recipient, revision):
+    """해당 견적 내용/받는 사람의 발송 상태 {'status', 'attempts', 'last_error', 'sent_at'} (없으면 None)"""
+    if not revision: return None
+    with closing(_connect()) as conn:
+        row = conn.execute("SELECT status, attempts, last_error, sent_at FROM outbox WHERE dedupe_key = ?",
+                           (make_dedupe_key(channel, recipient, revision),)).fetchone()
+    return dict(row) if row else None
+
+
+def retry_failed(entry_ids=None):
+    """'failed' 메시지를 다시 대기 상태로 돌립니다 (entry_ids가 없으면 전부). 반환: 다시 대기시킨 수"""
+    now = time.time()
+    query = "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ?, updated_at = ? WHERE status = 'failed'"
+    params = [now, now]
+    if entry_ids:
+        query += f" AND id IN ({','.join('?' * len(entry_ids))})"
+        params += list(entry_ids)
+    with closing(_connect()) as conn:
+        count = conn.execute(query, params).rowcount
+    if count: _wakeup.set()
+    return count
+
+
+def purge_sent(older_than_days=SENT_RETENTION_DAYS):
+    """오래된 발송 완료 기록을 지웁니다. 반환: 지운 수"""
+    with closing(_connect()) as conn:
+        return conn.execute("DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?",
+                            (time.time() - older_than_days * 86400,)).rowcount
+
+
+def wait_until_drained(timeout=60):
+    """대기/발송 중 메시지가 없어질 때까지 기다립니다 (벤치마크/점검용). 반환: 모두 처리되었으면 True"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with closing(_connect()) as conn:
+            remaining = conn.execute("SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')").fetchone()[0]
+        if not remaining: return True
+        time.sleep(0.05)
+    return False
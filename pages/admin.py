@@ -0,0 +1,221 @@
+# pages/admin.py
+# 관리자 페이지: 이사일 기준 견적서 PDF 일괄 생성 (팀 브리핑용 ZIP)
+
+import streamlit as st
+
+st.set_page_config(page_title="이삿날 관리자", layout="wide", page_icon="🛠️")
+
+import os
+import tempfile
+import traceback
+from datetime import datetime
+
+import pytz
+
+try:
+    import bulk_pdf_export
+    import dispatch_report
+    import warmup
+    import outbox
+    import email_utils # 발송 채널 등록 (관리자 페이지가 먼저 열려도 대기열을 처리할 수 있도록)
+    import mms_utils
+    import reminder_campaign
+except ImportError as ie:
+    st.error(f"관리자 페이지: 일괄 처리 모듈 로딩 실패 - {ie}.")
+    st.stop()
+
+warmup.start_warmup() # 관리자 페이지로 먼저 들어온 경우에도 프로세스당 한 번 시작
+outbox.start_workers()
+st.markdown("<h2 style='text-align: center;'>🛠️ 관리자 도구</h2>", unsafe_allow_html=True)
+
+# secrets에 admin_password가 설정된 경우에만 비밀번호 확인
+try: admin_password = st.secrets.get("admin_password")
+except Exception: admin_password = None # secrets.toml 없음
+if admin_password and not st.session_state.get("_admin_authenticated", False):
+    entered_password = st.text_input("관리자 비밀번호", type="password", key="admin_password_input")
+    if entered_password and entered_password == admin_password:
+        st.session_state._admin_authenticated = True
+        st.rerun()
+    elif entered_password:
+        st.error("비밀번호가 올바르지 않습니다.")
+    st.stop()
+
+st.subheader("📦 이사일별 견적서 PDF 일괄 생성")
+st.caption("선택한 이사일의 저장된 견적을 모두 PDF로 만들어 하나의 ZIP 파일로 내려받습니다.")
+
+try: default_date = datetime.now(pytz.timezone("Asia/Seoul")).date()
+except Exception: default_date = datetime.now().date()
+
+col_date, col_workers = st.columns([2, 1])
+with col_date:
+    bulk_moving_date = st.date_input("이사일", value=default_date, key="admin_bulk_moving_date")
+with col_workers:
+    bulk_workers = st.number_input("PDF 생성 프로세스 수", min_value=1, max_value=8,
+                                   value=bulk_pdf_export.BULK_DEFAULT_WORKERS, step=1, key="admin_bulk_workers")
+
+if st.button("PDF 일괄 생성", key="admin_bulk_export_btn", type="primary"):
+    output_path = os.path.join(tempfile.gettempdir(), f"quotes_{bulk_moving_date.isoformat()}.zip")
+    progress_bar = st.progress(0.0, text="견적 불러오는 중...")
+
+    def _on_progress(done, total):
+        progress_bar.progress(min(1.0, done / total) if total else 0.0, text=f"PDF 생성 중... {done}/{total}")
+
+    try:
+        report = bulk_pdf_export.export_quotes_for_date(bulk_moving_date, output_path, max_workers=int(bulk_workers),
+                                                        progress_callback=_on_progress)
+        progress_bar.progress(1.0, text="완료")
+        st.session_state.admin_bulk_report = report
+    except Exception as e:
+        progress_bar.empty()
+        st.error(f"PDF 일괄 생성 중 오류 발생: {e}")
+        print(f"ERROR [Admin]: Bulk PDF export failed: {e}")
+        traceback.print_exc()
+        st.session_state.admin_bulk_report = None
+
+bulk_report = st.session_state.get("admin_bulk_report")
+if bulk_report:
+    if bulk_report["selected"] == 0:
+        st.info(f"{bulk_report['moving_date']} 이사일로 저장된 견적이 없습니다.")
+    else:
+        st.success(f"{bulk_report['moving_date']}: {bulk_report['exported']}/{bulk_report['selected']}건 생성 "
+                   f"({bulk_report['elapsed_sec']}초, 초당 {bulk_report['pdfs_per_sec']}건, 프로세스 {bulk_report['workers']}개)")
+        for failure in bulk_report["failed"]:
+            st.warning(f"실패: {failure['name']} - {failure['error']}")
+        if bulk_report["exported"] and os.path.exists(bulk_report["output_path"]):
+            with open(bulk_report["output_path"], "rb") as zip_file:
+                st.download_button(label=f"📥 ZIP 다운로드 ({bulk_report['zip_bytes'] / 1024 / 1024:.1f} MB)",
+                                   data=zip_file, file_name=os.path.basename(bulk_report["output_path"]),
+                                   mime="application/zip", key="admin_bulk_download_btn")
+
+st.divider()
+st.subheader("🚚 배차표 (Excel)")
+st.caption("이사일 범위의 저장된 견적으로 작업별 배차 목록과 차량별/날짜별 인원 합계를 만듭니다. 금액은 현재 요금 기준으로 다시 계산합니다.")
+
+default_dispatch_start, default_dispatch_end = dispatch_report.next_day_range(default_date)
+col_start, col_end = st.columns(2)
+with col_start:
+    dispatch_start = st.date_input("시작 이사일", value=default_dispatch_start, key="admin_dispatch_start")
+with col_end:
+    dispatch_end = st.date_input("종료 이사일", value=default_dispatch_end, key="admin_dispatch_end")
+
+if st.button("배차표 생성", key="admin_dispatch_btn", type="primary"):
+    if dispatch_end < dispatch_start:
+        st.error("종료 이사일이 시작 이사일보다 빠릅니다.")
+    else:
+        dispatch_path = os.path.join(tempfile.gettempdir(), f"dispatch_{dispatch_start.isoformat()}_{dispatch_end.isoformat()}.xlsx")
+        try:
+            with st.spinner("견적 불러오는 중..."):
+                st.session_state.admin_dispatch_report = dispatch_report.generate_dispatch_report(dispatch_start, dispatch_end, output_path=dispatch_path)
+        except Exception as e:
+            st.error(f"배차표 생성 중 오류 발생: {e}")
+            print(f"ERROR [Admin]: Dispatch report failed: {e}")
+            traceback.print_exc()
+            st.session_state.admin_dispatch_report = None
+
+dispatch_result = st.session_state.get("admin_dispatch_report")
+if dispatch_result:
+    crew = dispatch_result["crew"]
+    st.success(f"{dispatch_result['start_date']} ~ {dispatch_result['end_date']}: 작업 {dispatch_result['jobs']}건, "
+               f"인원 {crew['men'] + crew['women']}명 (남 {crew['men']}, 여 {crew['women']}), {dispatch_result['elapsed_sec']}초")
+    for failure in dispatch_result["failed"]:
+        st.warning(f"실패: {failure['name']} - {failure['error']}")
+    if os.path.exists(dispatch_result["output_path"]):
+        with open(dispatch_result["output_path"], "rb") as dispatch_file:
+            st.download_button(label="📥 배차표 다운로드", data=dispatch_file, file_name=os.path.basename(dispatch_result["output_path"]),
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="admin_dispatch_download_btn")
+
+st.divider()
+st.subheader("📨 이사 전날 안내 문자")
+st.caption("선택한 이사일의 저장된 견적 고객에게 안내 문자를 보냅니다. 알리고 대량 발송으로 최대 500명씩 묶어 보내며, 같은 이사일에 다시 실행해도 이미 등록된 번호에는 다시 보내지 않습니다.")
+
+reminder_date = st.date_input("이사일", value=reminder_campaign.default_moving_date(), key="admin_reminder_date")
+reminder_template = st.text_area("문자 내용", value=reminder_campaign.REMINDER_TEMPLATE, height=160, key="admin_reminder_template",
+                                 help="사용 가능한 항목: " + ", ".join("{" + field + "}" for field in reminder_campaign.REMINDER_FIELDS))
+col_preview, col_send = st.columns(2)
+with col_preview:
+    reminder_preview_clicked = st.button("미리보기 (발송 안 함)", key="admin_reminder_preview_btn")
+with col_send:
+    reminder_send_clicked = st.button("안내 문자 발송", key="admin_reminder_send_btn", type="primary")
+if reminder_preview_clicked or reminder_send_clicked:
+    try:
+        with st.spinner("견적 불러오는 중..."):
+            st.session_state.admin_reminder_report = reminder_campaign.start_reminder_campaign(
+                reminder_date, template=reminder_template, dry_run=reminder_preview_clicked)
+        st.session_state.admin_reminder_report["dry_run"] = reminder_preview_clicked
+    except Exception as e:
+        st.error(f"안내 문자 준비 중 오류 발생: {e}")
+        print(f"ERROR [Admin]: Reminder campaign failed: {e}")
+        traceback.print_exc()
+        st.session_state.admin_reminder_report = None
+
+reminder_report = st.session_state.get("admin_reminder_report")
+if reminder_report:
+    if reminder_report["selected"] == 0:
+        st.info(f"{reminder_report['moving_date']} 이사일로 저장된 견적이 없습니다.")
+    elif reminder_report["dry_run"]:
+        st.info(f"{reminder_report['moving_date']}: 발송 대상 {reminder_report['queued']}명 (견적 {reminder_report['selected']}건)")
+        for preview in reminder_report["previews"]:
+            st.text(f"[{preview['recipient']}]\n{preview['text']}")
+    else:
+        st.success(f"{reminder_report['moving_date']}: {reminder_report['queued']}명 발송 대기열 등록"
+                   + (f", 이미 등록된 {reminder_report['duplicates']}명 제외" if reminder_report["duplicates"] else ""))
+        try:
+            progress = reminder_campaign.get_campaign_progress(reminder_report["campaign"])
+            if progress["total"]:
+                st.progress(progress["sent"] / progress["total"],
+                            text=f"발송 완료 {progress['sent']}/{progress['total']}명 (대기 {progress['pending'] + progress['sending']}, 실패 {progress['failed']})")
+            failed_recipients = [entry for entry in progress["recipients"] if entry["status"] == "failed"]
+            if failed_recipients:
+                st.dataframe([{"받는 사람": entry["recipient"], "시도": entry["attempts"], "오류": entry["last_error"] or ""}
+                              for entry in failed_recipients], use_container_width=True, hide_index=True)
+            if progress["pending"] + progress["sending"] and st.button("발송 상태 새로고침", key="admin_reminder_refresh_btn"):
+                st.rerun()
+        except Exception as e:
+            st.error(f"발송 상태 조회 중 오류: {e}")
+            traceback.print_exc()
+    for skipped in reminder_report["skipped"]:
+        st.warning(f"제외: {skipped['name']} - {skipped['error']}")
+
+st.divider()
+st.subheader("📮 발송 대기열 (이메일/MMS/문자)")
+st.caption("견적서 이메일/MMS와 안내 문자는 대기열에 등록된 뒤 백그라운드에서 발송됩니다. 일시적인 오류는 간격을 늘려가며 자동으로 다시 시도합니다.")
+_OUTBOX_CHANNEL_LABELS = {"email": "이메일", "mms": "MMS", "sms": "안내 문자"}
+try:
+    outbox_summary = outbox.get_summary()
+    if not outbox_summary:
+        st.info("대기열에 메시지가 없습니다.")
+    for channel, status_counts in outbox_summary.items():
+        counts_text = ", ".join(f"{outbox.STATUS_LABELS.get(status, status)} {count}건" for status, count in sorted(status_counts.items()))
+        st.write(f"{_OUTBOX_CHANNEL_LABELS.get(channel, channel)}: {counts_text}")
+    outbox_entries = outbox.list_entries(50)
+    if outbox_entries:
+        kst = pytz.timezone("Asia/Seoul")
+        st.dataframe([{
+            "ID": entry["id"], "채널": _OUTBOX_CHANNEL_LABELS.get(entry["channel"], entry["channel"]), "받는 사람": entry["recipient"],
+            "상태": outbox.STATUS_LABELS.get(entry["status"], entry["status"]), "시도": entry["attempts"],
+            "등록": datetime.fromtimestamp(entry["created_at"], kst).strftime("%m-%d %H:%M:%S"),
+            "발송": datetime.fromtimestamp(entry["sent_at"], kst).strftime("%m-%d %H:%M:%S") if entry["sent_at"] else "",
+            "오류": entry["last_error"] or "",
+        } for entry in outbox_entries], use_container_width=True, hide_index=True)
+    outbox_cols = st.columns(2)
+    with outbox_cols[0]:
+        failed_count = sum(status_counts.get("failed", 0) for status_counts in outbox_summary.values())
+        if st.button(f"실패 항목 다시 시도 ({failed_count}건)", key="admin_outbox_retry_btn", disabled=not failed_count):
+            st.success(f"{outbox.retry_failed()}건을 다시 대기열에 넣었습니다.")
+    with outbox_cols[1]:
+        if st.button("대기열 새로고침", key="admin_outbox_refresh_btn"):
+            st.rerun()
+except Exception as e:
+    st.error(f"발송 대기열 조회 중 오류: {e}")
+    traceback.print_exc()
+
+st.divider()
+st.subheader("⚙️ 서버 준비 상태")
+st.caption("서버 시작 시 백그라운드에서 미리 준비하는 자원입니다. 준비 전에 들어온 요청은 필요한 자원만 기다립니다.")
+_WARMUP_STATE_LABELS = {"pending": "⏳ 대기", "running": "🔄 준비 중", "ready": "✅ 완료", "skipped": "➖ 건너뜀 (설정 없음)", "failed": "❌ 실패"}
+for task in warmup.get_warmup_status():
+    elapsed_text = f" ({task['elapsed_ms']:,.0f} ms)" if task["elapsed_ms"] is not None else ""
+    error_text = f" - {task['error']}" if task["error"] else ""
+    st.write(f"{task['label']}: {_WARMUP_STATE_LABELS.get(task['state'], task['state'])}{elapsed_text}{error_text}")
+if not warmup.is_ready() and st.button("상태 새로고침", key="admin_warmup_refresh_btn"):
+    st.rerun()
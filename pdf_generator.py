@@ -1,51 +1,61 @@
 # pdf_generator.py
 
-import pandas as pd
 import io
 import streamlit as st
 import traceback
-import utils # utils.py 필요
 import data # data.py 필요
+import quote_report # 모든 출력 형식이 공통으로 쓰는 견적 보고서 모델
 import os
-from datetime import date, datetime # datetime 추가
-
-# --- ReportLab 관련 모듈 임포트 ---
-try:
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.units import cm
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.platypus import Paragraph # Spacer는 사용 안 함
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-    _REPORTLAB_AVAILABLE = True
-except ImportError as reportlab_error:
-    st.error(f"ReportLab 라이브러리를 찾을 수 없습니다: {reportlab_error}")
-    print(f"ERROR [PDF]: ReportLab not found. PDF generation disabled. {reportlab_error}")
-    _REPORTLAB_AVAILABLE = False
-
-# --- 이미지 변환 관련 모듈 임포트 ---
-_PDF2IMAGE_AVAILABLE = False
-_PILLOW_AVAILABLE = False
-try:
-    from pdf2image import convert_from_bytes
+import threading
+from lazy_imports import lazy_module, module_available
+
+# --- ReportLab / pdf2image / Pillow: 설치 여부만 먼저 확인하고 실제 import는 처음 사용할 때 (첫 화면 지연 방지) ---
+_REPORTLAB_AVAILABLE = module_available("reportlab")
+_PDF2IMAGE_AVAILABLE = module_available("pdf2image")
+_PILLOW_AVAILABLE = module_available("PIL")
+
+canvas = pdfmetrics = ttfonts = rl_config = None
+if _REPORTLAB_AVAILABLE:
+    canvas = lazy_module("reportlab.pdfgen.canvas")
+    pdfmetrics = lazy_module("reportlab.pdfbase.pdfmetrics")
+    ttfonts = lazy_module("reportlab.pdfbase.ttfonts")
+    rl_config = lazy_module("reportlab.rl_config")
+else:
+    st.error("ReportLab 라이브러리를 찾을 수 없습니다.")
+    print("ERROR [PDF]: ReportLab not found. PDF generation disabled.")
+
+# reportlab.lib.units.cm / reportlab.lib.pagesizes.A4와 같은 값 (레이아웃 상수 계산에 reportlab import 불필요)
+cm = 72.0 / 2.54
+A4 = (210 * cm * 0.1, 297 * cm * 0.1)
+
+pdf2image = None
+if _PDF2IMAGE_AVAILABLE:
     # Poppler 경로 설정 (필요한 경우)
     # import platform
     # if platform.system() == "Windows":
     #     # 예: poppler_path = r"C:\path\to\poppler-xx.xx.x\bin"
     #     # os.environ["PATH"] += os.pathsep + poppler_path
     #     pass # 사용자가 환경에 맞게 설정하도록 안내
-    _PDF2IMAGE_AVAILABLE = True
-except ImportError:
+    pdf2image = lazy_module("pdf2image")
+else:
     print("Warning [PDF_GENERATOR]: pdf2image 라이브러리를 찾을 수 없습니다. PDF를 이미지로 변환하는 기능이 비활성화됩니다.")
     st.warning("pdf2image 라이브러리가 설치되지 않았거나 Poppler 유틸리티 경로가 설정되지 않았습니다. PDF의 이미지 변환 기능이 제한됩니다.")
 
+Image = ImageDraw = ImageFont = None
+if _PILLOW_AVAILABLE:
+    Image = lazy_module("PIL.Image")
+    ImageDraw = lazy_module("PIL.ImageDraw")
+    ImageFont = lazy_module("PIL.ImageFont")
+else:
+    print("Warning [PDF_GENERATOR]: Pillow 라이브러리를 찾을 수 없습니다. 이미지 처리에 문제가 발생할 수 있습니다.")
+
 try:
-    from PIL import Image
-    _PILLOW_AVAILABLE = True
+    import pdf_raster # Poppler 변환을 프로세스 풀에서 페이지별로 실행 (제한 시간 포함)
 except ImportError:
-    print("Warning [PDF_GENERATOR]: Pillow 라이브러리를 찾을 수 없습니다. 이미지 처리에 문제가 발생할 수 있습니다.")
+    pdf_raster = None
+
+# 요약 Excel 스트리밍 작성 (처음 사용할 때 import하므로 불러오기 실패는 generate_excel에서 처리)
+excel_summary_generator = lazy_module("excel_summary_generator")
 
 
 # --- 회사 정보 상수 정의 ---
@@ -54,12 +64,329 @@ COMPANY_PHONE_1 = "010-5047-1111"
 COMPANY_PHONE_2 = "1577-3101"
 COMPANY_EMAIL = "move24day@gmail.com"
 
+def _or_default(value, default):
+    """보고서 값이 없으면(None) 이 출력 형식의 기본 표기."""
+    return default if value is None else value
+
+def _ensure_report(report, state_data, calculated_cost_items, total_cost, personnel_info):
+    return report or quote_report.build_quote_report(state_data, calculated_cost_items, total_cost, personnel_info)
+
 # --- 폰트 경로 설정 ---
-NANUM_GOTHIC_FONT_PATH = "NanumGothic.ttf" # 실제 폰트 파일 경로
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+NANUM_GOTHIC_FONT_PATH = os.path.join(_BASE_DIR, "NanumGothic.ttf") # 실제 폰트 파일 경로
+NANUM_GOTHIC_BOLD_FONT_PATH = os.path.join(_BASE_DIR, "NanumGothicExtraBold.ttf") # 제목/강조용 굵은 글꼴
+_font_lock = threading.Lock()
+
+# --- 폰트 등록 (프로세스당 한 번) ---
+def register_fonts():
+    """
+    NanumGothic(본문)과 NanumGothicBold(NanumGothicExtraBold.ttf)를 ReportLab에 등록합니다.
+    이미 등록되어 있으면 바로 True를 반환합니다. ReportLab은 TTF를 문서에 사용된 글리프만
+    서브셋으로 임베드하므로 PDF에는 4MB 폰트 전체가 아니라 실제 사용한 글자만 들어갑니다.
+    """
+    if not _REPORTLAB_AVAILABLE: return False
+    registered = pdfmetrics.getRegisteredFontNames()
+    if 'NanumGothic' in registered and 'NanumGothicBold' in registered: return True
+    with _font_lock:
+        registered = pdfmetrics.getRegisteredFontNames()
+        try:
+            if 'NanumGothic' not in registered:
+                pdfmetrics.registerFont(ttfonts.TTFont('NanumGothic', NANUM_GOTHIC_FONT_PATH))
+            if 'NanumGothicBold' not in registered:
+                bold_path = NANUM_GOTHIC_BOLD_FONT_PATH if os.path.exists(NANUM_GOTHIC_BOLD_FONT_PATH) else NANUM_GOTHIC_FONT_PATH
+                pdfmetrics.registerFont(ttfonts.TTFont('NanumGothicBold', bold_path))
+            print("DEBUG [PDF]: NanumGothic fonts registered.")
+            return True
+        except Exception as font_e:
+            print(f"ERROR [PDF]: Failed to load/register fonts: {font_e}")
+            traceback.print_exc()
+            return False
+
+# --- 공통 레이아웃 상수 (모듈 로드 시 한 번 생성) ---
+QUOTE_TITLE_TEXT = "이삿날 견적서(계약서)"
+QUOTE_SERVICE_TEXT = """고객님의 이사를 안전하고 신속하게 책임지는 이삿날입니다."""
+
+if _REPORTLAB_AVAILABLE:
+    PAGE_WIDTH, PAGE_HEIGHT = A4
+    MARGIN_X = 1.5*cm
+    MARGIN_Y = 1.5*cm
+    LINE_HEIGHT = 0.6*cm # 기본 줄 간격
+    RIGHT_MARGIN_X = PAGE_WIDTH - MARGIN_X # 오른쪽 정렬 기준
+    PAGE_CONTENT_TOP_Y = PAGE_HEIGHT - MARGIN_Y - 1*cm # 새 페이지 본문 시작 위치
+    COST_COL1_X = MARGIN_X
+    COST_COL2_X = MARGIN_X + 8*cm
+    COST_COL3_X = MARGIN_X + 11*cm
+
+# 문단 스타일: (글꼴, 크기, 줄 간격)
+CENTER_STYLE = ('NanumGothic', 10, 14)
+INFO_VALUE_STYLE = ('NanumGothic', 11, 13)
+COST_DESC_STYLE = ('NanumGothic', 9, 11)
+COST_AMOUNT_STYLE = ('NanumGothic', 9, 11)
+COST_NOTE_STYLE = ('NanumGothic', 9, 11)
+NOTES_STYLE = ('NanumGothic', 10, 12)
+
+# 페이지마다 같은 내용인 고정 요소. PDF에서는 문서당 한 번 폼(XObject)으로 그리고 참조로 배치
+FORM_PAGE_HEADER = "QuotePageHeader"   # 상단 회사 정보 (모든 페이지)
+FORM_TITLE_BLOCK = "QuoteTitleBlock"   # 제목 + 안내 문구 (첫 페이지)
+FORM_COST_HEADER = "QuoteCostHeader"   # 비용표 머리글 + 구분선 (y=0 기준, 배치 시 세로 위치 지정)
+
+# --- 레이아웃 모델 ---
+# 견적서 한 부는 {"pages": [페이지별 그리기 명령 목록], "forms": {폼 이름: 그리기 명령 목록}} 으로 표현합니다.
+# 좌표는 PDF 기준(pt, 왼쪽 아래 원점)이며, PDF 렌더러와 이미지 렌더러가 같은 모델을 그립니다.
+#   ("text", x, y, 문자열, 글꼴, 크기, 정렬)  정렬: "left" | "right" | "center", y는 기준선
+#   ("line", x1, y1, x2, y2)                 선 두께 1pt
+#   ("form", 폼 이름, dy)                      폼 명령을 dy만큼 올려서 배치
+
+def _text_width(text, font_name, font_size):
+    return pdfmetrics.stringWidth(text, font_name, font_size)
+
+def _wrap_text_lines(text, font_name, font_size, max_width):
+    """
+    텍스트를 max_width에 맞춰 줄 단위로 나눕니다 (공백 기준, 한 단어가 너무 길면 글자 단위).
+    줄바꿈 문자는 그대로 줄을 나누고, 연속 공백은 하나로 취급합니다. 빈 텍스트는 빈 목록.
+    ReportLab Paragraph와 같이 단어 사이 공백이 spaceShrinkage 비율만큼 줄어드는 것을 허용합니다.
+    """
+    text = str(text or '')
+    if not text.strip(): return []
+    space_shrink = _text_width(' ', font_name, font_size) * getattr(rl_config, 'spaceShrinkage', 0)
+    lines = []
+    for raw_line in text.replace('\r\n', '\n').split('\n'):
+        current = ''
+        for word in raw_line.split():
+            candidate = f"{current} {word}" if current else word
+            if _text_width(candidate, font_name, font_size) - space_shrink * candidate.count(' ') <= max_width:
+                current = candidate
+                continue
+            if current: lines.append(current)
+            current = ''
+            for ch in word:
+                if current and _text_width(current + ch, font_name, font_size) > max_width:
+                    lines.append(current); current = ''
+                current += ch
+        lines.append(current)
+    return lines
+
+def _text_block_ops(lines, style, x, top_y, width=None, align="left"):
+    """줄 목록을 top_y 아래로 그리는 명령을 반환합니다 (첫 줄 기준선 = top_y - 글자 크기)."""
+    font_name, font_size, leading = style
+    if align == "right": anchor_x = x + width
+    elif align == "center": anchor_x = x + width / 2.0
+    else: anchor_x = x
+    return [("text", anchor_x, top_y - font_size - i * leading, line, font_name, font_size, align)
+            for i, line in enumerate(lines)]
+
+_PAGE_FORM_OPS = None
+
+def _page_form_ops():
+    """고정 요소(회사 정보, 제목 블록, 비용표 머리글)의 그리기 명령. 한 번 만들어 재사용합니다."""
+    global _PAGE_FORM_OPS
+    if _PAGE_FORM_OPS is not None: return _PAGE_FORM_OPS
+
+    company_info_line_height = 0.35 * cm
+    company_info_y = PAGE_HEIGHT - MARGIN_Y
+    header_ops = []
+    for info_line in (f"주소: {COMPANY_ADDRESS}", f"전화: {COMPANY_PHONE_1} | {COMPANY_PHONE_2}", f"이메일: {COMPANY_EMAIL}"):
+        header_ops.append(("text", RIGHT_MARGIN_X, company_info_y, info_line, 'NanumGothic', 7, "right"))
+        company_info_y -= company_info_line_height
+
+    title_ops = [("text", PAGE_WIDTH / 2.0, PAGE_CONTENT_TOP_Y, QUOTE_TITLE_TEXT, 'NanumGothicBold', 18, "center")]
+    service_width = PAGE_WIDTH - MARGIN_X * 2
+    service_lines = _wrap_text_lines(QUOTE_SERVICE_TEXT, CENTER_STYLE[0], CENTER_STYLE[1], service_width)
+    title_ops += _text_block_ops(service_lines, CENTER_STYLE, MARGIN_X, PAGE_CONTENT_TOP_Y - LINE_HEIGHT * 2, service_width, "center")
+    title_block_height = LINE_HEIGHT * 2 + CENTER_STYLE[2] * len(service_lines) + LINE_HEIGHT
+
+    cost_header_ops = [
+        ("text", COST_COL1_X, 0, "항목", 'NanumGothicBold', 10, "left"),
+        ("text", COST_COL2_X + 2*cm, 0, "금액", 'NanumGothicBold', 10, "right"),
+        ("text", COST_COL3_X, 0, "비고", 'NanumGothicBold', 10, "left"),
+        ("line", COST_COL1_X, -0.2*cm, RIGHT_MARGIN_X, -0.2*cm),
+    ]
+    _PAGE_FORM_OPS = ({FORM_PAGE_HEADER: header_ops, FORM_TITLE_BLOCK: title_ops, FORM_COST_HEADER: cost_header_ops},
+                      title_block_height)
+    return _PAGE_FORM_OPS
+
+def build_quote_layout(report):
+    """
+    견적 보고서(quote_report.build_quote_report)로 견적서의 페이지 나눔과 모든 글자/선의 위치를 계산해 레이아웃 모델로 반환합니다.
+    generate_pdf(PDF)와 generate_quote_image(이미지)가 이 결과를 공통으로 사용합니다.
+    """
+    forms, title_block_height = _page_form_ops()
+    width, height = PAGE_WIDTH, PAGE_HEIGHT
+    margin_x = MARGIN_X
+    margin_y = MARGIN_Y
+    line_height = LINE_HEIGHT
+    right_margin_x = RIGHT_MARGIN_X
+    pages = []
+
+    def new_page():
+        pages.append([("form", FORM_PAGE_HEADER, 0)])
+        return pages[-1]
+
+    # --- 초기 페이지: 회사 정보, 제목 및 안내 문구 ---
+    ops = new_page()
+    ops.append(("form", FORM_TITLE_BLOCK, 0))
+    current_y = PAGE_CONTENT_TOP_Y - title_block_height
+
+    # --- 기본 정보 ---
+    customer, locations = report["customer"], report["locations"]
+    info_pairs = [
+        ("고 객 명:", _or_default(customer["name"], '-')),
+        ("연 락 처:", _or_default(customer["phone"], '-')),
+        ("이 사 일:", _or_default(report["moving_date_str"], '-')),
+        ("견 적 일:", report["quote_date"]),
+        ("출 발 지:", _or_default(locations["from"], '-')),
+        ("도 착 지:", _or_default(locations["to"], '-')),
+    ]
+
+    if report["via_point"]:
+        info_pairs.append(("경 유 지:", _or_default(report["via_point"]["location"], '-')))
+        info_pairs.append(("경유 작업:", _or_default(report["via_point"]["method"], '-')))
+
+    storage = report["storage"]
+    if storage:
+        default_storage_type = data.DEFAULT_STORAGE_TYPE if data and hasattr(data, 'DEFAULT_STORAGE_TYPE') else "-"
+        info_pairs.append(("보관 기간:", f"{_or_default(storage['duration'], 1)} 일"))
+        info_pairs.append(("보관 유형:", _or_default(storage["type"], default_storage_type)))
+        if storage["use_electricity"]:
+             info_pairs.append(("보관 중 전기사용:", "예"))
+
+    info_pairs.append(("작업 인원:", report["personnel"]["text"]))
+    info_pairs.append(("선택 차량:", _or_default(report["vehicle"]["selected"], '미선택')))
+
+    label_width = 3 * cm
+    value_x = margin_x + label_width
+    value_max_width = width - value_x - margin_x
+
+    for label, value in info_pairs:
+         value_lines = _wrap_text_lines(value, INFO_VALUE_STYLE[0], INFO_VALUE_STYLE[1], value_max_width)
+         value_height = INFO_VALUE_STYLE[2] * len(value_lines)
+         row_height = max(line_height, value_height + 0.1*cm)
+
+         if current_y - row_height < margin_y:
+             ops = new_page(); current_y = height - margin_y - 1*cm
+
+         label_y_pos = current_y - row_height + (row_height - 11) / 2 + 2
+         ops.append(("text", margin_x, label_y_pos, label, 'NanumGothic', 11, "left"))
+
+         value_bottom_y = current_y - row_height + (row_height - value_height) / 2
+         ops += _text_block_ops(value_lines, INFO_VALUE_STYLE, value_x, value_bottom_y + value_height)
+         current_y -= row_height
+    current_y -= line_height * 0.5
+
+    # --- 비용 상세 내역 ---
+    current_y -= 0.5*cm
+
+    if current_y < margin_y + 5*cm :
+        ops = new_page(); current_y = height - margin_y - 1*cm
+
+    ops.append(("text", margin_x, current_y, "[ 비용 상세 내역 ]", 'NanumGothicBold', 12, "left"))
+    current_y -= line_height * 1.2
+
+    cost_col1_x = COST_COL1_X
+    cost_col2_x = COST_COL2_X
+    cost_col3_x = COST_COL3_X
+    ops.append(("form", FORM_COST_HEADER, current_y)) # 항목/금액/비고 머리글 + 구분선
+    current_y -= 0.2*cm
+    current_y -= line_height * 0.8
+
+    # 고객용 비용 목록 (날짜 할증은 기본 운임에 합쳐 표시)
+    cost_items_processed = [(line.label, line.amount, line.note) for line in report["customer_cost_lines"]]
+
+    if cost_items_processed:
+        desc_width = cost_col2_x - cost_col1_x - 0.5*cm
+        note_width = right_margin_x - cost_col3_x
+        cost_height = COST_AMOUNT_STYLE[2] # 금액은 항상 한 줄 (오른쪽 정렬)
+
+        for item_desc, item_cost, item_note in cost_items_processed:
+            cost_str = f"{item_cost:,.0f} 원" if item_cost is not None else "0 원"
+            desc_lines = _wrap_text_lines(item_desc, COST_DESC_STYLE[0], COST_DESC_STYLE[1], desc_width)
+            note_lines = _wrap_text_lines(item_note, COST_NOTE_STYLE[0], COST_NOTE_STYLE[1], note_width)
+            desc_height = COST_DESC_STYLE[2] * len(desc_lines)
+            note_height = COST_NOTE_STYLE[2] * len(note_lines)
+            max_row_height = max(desc_height, cost_height, note_height, line_height * 0.8)
+
+            if current_y - max_row_height < margin_y:
+                ops = new_page(); current_y = height - margin_y - 1*cm
+                ops.append(("form", FORM_COST_HEADER, current_y))
+                current_y -= 0.2*cm; current_y -= line_height * 0.8
+
+            ops += _text_block_ops(desc_lines, COST_DESC_STYLE, cost_col1_x, current_y)
+            ops.append(("text", cost_col2_x + 2*cm, current_y - COST_AMOUNT_STYLE[1], cost_str, COST_AMOUNT_STYLE[0], COST_AMOUNT_STYLE[1], "right"))
+            ops += _text_block_ops(note_lines, COST_NOTE_STYLE, cost_col3_x, current_y)
+            current_y -= (max_row_height + 0.2*cm)
+    else:
+         if current_y < margin_y + 3*cm :
+             ops = new_page(); current_y = height - margin_y - 1*cm
+         ops.append(("text", cost_col1_x, current_y, "계산된 비용 내역이 없습니다.", 'NanumGothic', 10, "left"))
+         current_y -= line_height
+
+    # --- 비용 요약 ---
+    if current_y < margin_y + line_height * 5 :
+        ops = new_page(); current_y = height - margin_y - 1*cm
+
+    ops.append(("line", cost_col1_x, current_y, right_margin_x, current_y))
+    current_y -= line_height
+
+    summary_rows = [
+        ("총 견적 비용 (VAT 별도)", f"{report['total']:,.0f} 원", ('NanumGothicBold', 12), ('NanumGothicBold', 14)),
+        ("계약금 (-)", f"{report['deposit']:,.0f} 원", ('NanumGothic', 11), ('NanumGothic', 12)),
+        ("잔금 (VAT 별도)", f"{report['balance']:,.0f} 원", ('NanumGothicBold', 12), ('NanumGothicBold', 14)),
+    ]
+    for row_label, row_amount, label_font, amount_font in summary_rows:
+        ops.append(("text", cost_col1_x, current_y, row_label, label_font[0], label_font[1], "left"))
+        ops.append(("text", right_margin_x, current_y, row_amount, amount_font[0], amount_font[1], "right"))
+        current_y -= line_height
+
+    # --- 고객요구사항 ---
+    if report["special_notes"]:
+        if current_y < margin_y + line_height * 3 :
+            ops = new_page(); current_y = height - margin_y - 1*cm
+        else:
+            current_y -= line_height
+
+        ops.append(("text", margin_x, current_y, "[ 고객요구사항 ]", 'NanumGothicBold', 11, "left"))
+        current_y -= line_height * 1.2
+
+        available_width = width - margin_x * 2
+        for note_part in report["note_parts"]:
+            part_lines = _wrap_text_lines(note_part, NOTES_STYLE[0], NOTES_STYLE[1], available_width)
+            part_height = NOTES_STYLE[2] * len(part_lines)
+
+            if current_y - part_height < margin_y:
+                ops = new_page(); current_y = height - margin_y - 1*cm
+
+            ops += _text_block_ops(part_lines, NOTES_STYLE, margin_x, current_y)
+            current_y -= (part_height + line_height * 0.2)
+
+    return {"pages": pages, "forms": forms}
+
+# --- PDF 렌더러 ---
+def _draw_ops_on_canvas(c, ops, forms_as_xobjects=True):
+    """레이아웃 명령을 ReportLab 캔버스에 그립니다."""
+    current_font = None
+    for op in ops:
+        kind = op[0]
+        if kind == "text":
+            _, x, y, text, font_name, font_size, align = op
+            if current_font != (font_name, font_size):
+                c.setFont(font_name, font_size); current_font = (font_name, font_size)
+            if align == "right": c.drawRightString(x, y, text)
+            elif align == "center": c.drawCentredString(x, y, text)
+            else: c.drawString(x, y, text)
+        elif kind == "line":
+            _, x1, y1, x2, y2 = op
+            c.line(x1, y1, x2, y2)
+        elif kind == "form":
+            _, form_name, dy = op
+            c.saveState()
+            if dy: c.translate(0, dy)
+            c.doForm(form_name)
+            c.restoreState()
+            current_font = None
 
 # --- PDF 생성 함수 ---
-def generate_pdf(state_data, calculated_cost_items, total_cost, personnel_info):
-    """주어진 데이터를 기반으로 견적서 PDF를 생성합니다."""
+def generate_pdf(state_data, calculated_cost_items, total_cost, personnel_info, report=None):
+    """주어진 데이터를 기반으로 견적서 PDF를 생성합니다. (report: 이미 만든 견적 보고서가 있으면 재사용)"""
     print("--- DEBUG [PDF]: Starting generate_pdf function ---")
     if not _REPORTLAB_AVAILABLE:
         st.error("PDF 생성을 위한 ReportLab 라이브러리가 없어 PDF를 생성할 수 없습니다.")
@@ -67,326 +394,29 @@ def generate_pdf(state_data, calculated_cost_items, total_cost, personnel_info):
 
     buffer = io.BytesIO()
     try:
-        # --- 폰트 파일 확인 및 등록 ---
-        font_path = NANUM_GOTHIC_FONT_PATH
-        if not os.path.exists(font_path):
-            st.error(f"PDF 생성 오류: 폰트 파일 '{font_path}'을(를) 찾을 수 없습니다.")
-            print(f"ERROR [PDF]: Font file not found at '{font_path}'")
+        # --- 폰트 등록 확인 (워밍업에서 이미 등록되었다면 즉시 반환) ---
+        if not register_fonts():
+            st.error(f"PDF 생성 오류: 폰트 로딩/등록 실패 ('{NANUM_GOTHIC_FONT_PATH}').")
             return None
-        try:
-            if 'NanumGothic' not in pdfmetrics.getRegisteredFontNames():
-                pdfmetrics.registerFont(TTFont('NanumGothic', font_path))
-                pdfmetrics.registerFont(TTFont('NanumGothicBold', font_path)) # Bold 폰트가 별도로 없다면 일반으로 대체
-                print("DEBUG [PDF]: NanumGothic font registered.")
-            else:
-                print("DEBUG [PDF]: NanumGothic font already registered.")
-        except Exception as font_e:
-            st.error(f"PDF 생성 오류: 폰트 로딩/등록 실패 ('{font_path}'). 상세: {font_e}")
-            print(f"ERROR [PDF]: Failed to load/register font '{font_path}': {font_e}")
-            traceback.print_exc()
-            return None
-
-        # --- Canvas 및 기본 설정 ---
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        margin_x = 1.5*cm
-        margin_y = 1.5*cm
-        line_height = 0.6*cm # 기본 줄 간격
-        right_margin_x = width - margin_x # 오른쪽 정렬 기준
-        page_number = 1
-
-        # --- 페이지 템플릿 (상단 회사 정보) ---
-        def draw_page_template(canvas_obj, page_num):
-            canvas_obj.saveState()
-            canvas_obj.setFont('NanumGothic', 7)
-            company_info_line_height = 0.35 * cm
-            company_info_y = height - margin_y
-            canvas_obj.drawRightString(right_margin_x, company_info_y, f"주소: {COMPANY_ADDRESS}")
-            company_info_y -= company_info_line_height
-            canvas_obj.drawRightString(right_margin_x, company_info_y, f"전화: {COMPANY_PHONE_1} | {COMPANY_PHONE_2}")
-            company_info_y -= company_info_line_height
-            canvas_obj.drawRightString(right_margin_x, company_info_y, f"이메일: {COMPANY_EMAIL}")
-            canvas_obj.restoreState()
-
-        # --- 초기 페이지 그리기 및 제목 ---
-        current_y = height - margin_y - 1*cm 
-        draw_page_template(c, page_number) 
-        c.setFont('NanumGothicBold', 18)
-        c.drawCentredString(width / 2.0, current_y, "이삿날 견적서(계약서)")
-        current_y -= line_height * 2
-
-        # --- 안내 문구 ---
-        styles = getSampleStyleSheet()
-        center_style = ParagraphStyle(name='CenterStyle', fontName='NanumGothic', fontSize=10, leading=14, alignment=TA_CENTER)
-        service_text = """고객님의 이사를 안전하고 신속하게 책임지는 이삿날입니다."""
-        p_service = Paragraph(service_text, center_style)
-        p_service_width, p_service_height = p_service.wrapOn(c, width - margin_x*2, 5*cm) 
-        if current_y - p_service_height < margin_y: 
-            c.showPage(); page_number += 1; draw_page_template(c, page_number); current_y = height - margin_y - 1*cm
-        p_service.drawOn(c, margin_x, current_y - p_service_height)
-        current_y -= (p_service_height + line_height)
-
-
-        # --- 기본 정보 그리기 ---
-        c.setFont('NanumGothic', 11)
-        is_storage = state_data.get('is_storage_move')
-        has_via_point = state_data.get('has_via_point', False) 
-
-        kst_date_str = utils.get_current_kst_time_str("%Y-%m-%d") if utils and hasattr(utils, 'get_current_kst_time_str') else datetime.now().strftime("%Y-%m-%d")
-        customer_name = state_data.get('customer_name', '-')
-        customer_phone = state_data.get('customer_phone', '-')
-        moving_date_val = state_data.get('moving_date', '-')
-        moving_date_str = str(moving_date_val)
-        if isinstance(moving_date_val, date): 
-             moving_date_str = moving_date_val.strftime('%Y-%m-%d')
-
-        from_location = state_data.get('from_location', '-')
-        to_location = state_data.get('to_location', '-')
-        
-        p_info = personnel_info if isinstance(personnel_info, dict) else {}
-        final_men = p_info.get('final_men', 0)
-        final_women = p_info.get('final_women', 0)
-        personnel_text = f"남성 {final_men}명" + (f", 여성 {final_women}명" if final_women > 0 else "")
-        selected_vehicle = state_data.get('final_selected_vehicle', '미선택')
-
-        info_pairs = [
-            ("고 객 명:", customer_name),
-            ("연 락 처:", customer_phone),
-            ("이 사 일:", moving_date_str),
-            ("견 적 일:", kst_date_str),
-            ("출 발 지:", from_location),
-            ("도 착 지:", to_location),
-        ]
-        
-        if has_via_point:
-            info_pairs.append(("경 유 지:", state_data.get('via_point_location', '-')))
-            info_pairs.append(("경유 작업:", state_data.get('via_point_method', '-')))
-
-        if is_storage:
-            storage_duration_str = f"{state_data.get('storage_duration', 1)} 일"
-            storage_type = state_data.get('storage_type', data.DEFAULT_STORAGE_TYPE if data and hasattr(data, 'DEFAULT_STORAGE_TYPE') else "-")
-            info_pairs.append(("보관 기간:", storage_duration_str))
-            info_pairs.append(("보관 유형:", storage_type))
-            if state_data.get('storage_use_electricity', False):
-                 info_pairs.append(("보관 중 전기사용:", "예"))
 
-            
-        info_pairs.append(("작업 인원:", personnel_text))
-        info_pairs.append(("선택 차량:", selected_vehicle))
-
-        value_style = ParagraphStyle(name='InfoValueStyle', fontName='NanumGothic', fontSize=11, leading=13)
-        label_width = 3 * cm 
-        value_x = margin_x + label_width
-        value_max_width = width - value_x - margin_x 
-
-        for label, value in info_pairs:
-             value_para = Paragraph(str(value), value_style)
-             value_para_width, value_para_height = value_para.wrapOn(c, value_max_width, line_height * 3) 
-             row_height = max(line_height, value_para_height + 0.1*cm) 
-
-             if current_y - row_height < margin_y: 
-                 c.showPage(); page_number += 1; draw_page_template(c, page_number); current_y = height - margin_y - 1*cm
-                 c.setFont('NanumGothic', 11) 
-             
-             label_y_pos = current_y - row_height + (row_height - 11) / 2 + 2 
-             c.drawString(margin_x, label_y_pos, label)
-             
-             para_y_pos = current_y - row_height + (row_height - value_para_height) / 2
-             value_para.drawOn(c, value_x, para_y_pos)
-             current_y -= row_height
-        current_y -= line_height * 0.5 
-
-        # --- 비용 상세 내역 ---
-        cost_start_y = current_y 
-        current_y -= 0.5*cm 
-
-        if current_y < margin_y + 5*cm : 
-            c.showPage(); page_number += 1; draw_page_template(c, page_number)
-            current_y = height - margin_y - 1*cm 
-            c.setFont('NanumGothic', 11) 
-
-        c.setFont('NanumGothicBold', 12)
-        c.drawString(margin_x, current_y, "[ 비용 상세 내역 ]")
-        current_y -= line_height * 1.2 
-
-        c.setFont('NanumGothicBold', 10)
-        cost_col1_x = margin_x          
-        cost_col2_x = margin_x + 8*cm   
-        cost_col3_x = margin_x + 11*cm  
-        c.drawString(cost_col1_x, current_y, "항목")
-        c.drawRightString(cost_col2_x + 2*cm, current_y, "금액") 
-        c.drawString(cost_col3_x, current_y, "비고")
-        c.setFont('NanumGothic', 10) 
-        current_y -= 0.2*cm 
-        c.line(cost_col1_x, current_y, right_margin_x, current_y) 
-        current_y -= line_height * 0.8 
-
-        cost_items_processed = []
-        date_surcharge_amount = 0
-        date_surcharge_index = -1
-        temp_items = []
-        if calculated_cost_items and isinstance(calculated_cost_items, list):
-            temp_items = [list(item) for item in calculated_cost_items if isinstance(item, (list, tuple)) and len(item) >= 2 and "오류" not in str(item[0])]
-
-        for i, item in enumerate(temp_items):
-             if str(item[0]) == "날짜 할증":
-                 try: date_surcharge_amount = int(item[1] or 0) 
-                 except (ValueError, TypeError): date_surcharge_amount = 0
-                 date_surcharge_index = i
-                 break 
-
-        base_fare_index = -1
-        for i, item in enumerate(temp_items):
-              if str(item[0]) == "기본 운임":
-                 base_fare_index = i
-                 if date_surcharge_index != -1 and date_surcharge_amount > 0 : 
-                     try:
-                         current_base_fare = int(item[1] or 0)
-                         item[1] = current_base_fare + date_surcharge_amount 
-                         selected_vehicle_remark = state_data.get('final_selected_vehicle', '') 
-                         item[2] = f"{selected_vehicle_remark} (이사 집중일 운영 요금 적용)" 
-                     except Exception as e:
-                         print(f"Error merging date surcharge into base fare: {e}")
-                 break 
-        
-        if date_surcharge_index != -1 and base_fare_index != -1 and date_surcharge_amount > 0: 
-              if date_surcharge_index < len(temp_items):
-                  try:
-                      del temp_items[date_surcharge_index] 
-                  except IndexError:
-                      print(f"Warning: Could not remove date surcharge item at index {date_surcharge_index}")
-              else:
-                   print(f"Warning: date_surcharge_index {date_surcharge_index} out of range for temp_items")
-
-
-        for item_data in temp_items:
-             item_desc = str(item_data[0])
-             item_cost_int = 0
-             item_note = ""
-             try: item_cost_int = int(item_data[1] or 0) 
-             except (ValueError, TypeError): item_cost_int = 0
-             if len(item_data) > 2:
-                 item_note = str(item_data[2] or '') 
-             cost_items_processed.append((item_desc, item_cost_int, item_note))
-        
-        if cost_items_processed:
-            styleDesc = ParagraphStyle(name='CostDesc', fontName='NanumGothic', fontSize=9, leading=11, alignment=TA_LEFT)
-            styleCost = ParagraphStyle(name='CostAmount', fontName='NanumGothic', fontSize=9, leading=11, alignment=TA_RIGHT)
-            styleNote = ParagraphStyle(name='CostNote', fontName='NanumGothic', fontSize=9, leading=11, alignment=TA_LEFT)
-
-            for item_desc, item_cost, item_note in cost_items_processed:
-                cost_str = f"{item_cost:,.0f} 원" if item_cost is not None else "0 원"
-                note_str = item_note if item_note else ""
-
-                p_desc = Paragraph(item_desc, styleDesc)
-                p_cost = Paragraph(cost_str, styleCost)
-                p_note = Paragraph(note_str, styleNote)
-
-                desc_width = cost_col2_x - cost_col1_x - 0.5*cm 
-                cost_width = (cost_col3_x - cost_col2_x) + 1.5*cm 
-                note_width = right_margin_x - cost_col3_x     
-                
-                desc_height = p_desc.wrap(desc_width, 1000)[1] 
-                cost_height = p_cost.wrap(cost_width, 1000)[1]
-                note_height = p_note.wrap(note_width, 1000)[1]
-                max_row_height = max(desc_height, cost_height, note_height, line_height * 0.8) 
-
-                if current_y - max_row_height < margin_y: 
-                    c.showPage(); page_number += 1; draw_page_template(c, page_number)
-                    current_y = height - margin_y - 1*cm
-                    c.setFont('NanumGothicBold', 10)
-                    c.drawString(cost_col1_x, current_y, "항목")
-                    c.drawRightString(cost_col2_x + 2*cm, current_y, "금액")
-                    c.drawString(cost_col3_x, current_y, "비고")
-                    current_y -= 0.2*cm; c.line(cost_col1_x, current_y, right_margin_x, current_y); current_y -= line_height * 0.8
-                    c.setFont('NanumGothic', 10) 
-
-                y_draw_base = current_y - max_row_height 
-                p_desc.drawOn(c, cost_col1_x, y_draw_base + (max_row_height - desc_height)) 
-                p_cost.drawOn(c, cost_col2_x + 2*cm - cost_width, y_draw_base + (max_row_height - cost_height)) 
-                p_note.drawOn(c, cost_col3_x, y_draw_base + (max_row_height - note_height))
-                current_y -= (max_row_height + 0.2*cm) 
-        else: 
-             if current_y < margin_y + 3*cm : 
-                 c.showPage(); page_number += 1; draw_page_template(c, page_number)
-                 current_y = height - margin_y - 1*cm
-             c.drawString(cost_col1_x, current_y, "계산된 비용 내역이 없습니다.")
-             current_y -= line_height
-
-        # --- 비용 요약 ---
-        summary_start_y = current_y
-        if summary_start_y < margin_y + line_height * 5 : 
-            c.showPage(); page_number += 1; draw_page_template(c, page_number)
-            summary_start_y = height - margin_y - 1*cm
-            c.setFont('NanumGothic', 11) 
-        
-        current_y = summary_start_y
-        c.line(cost_col1_x, current_y, right_margin_x, current_y) 
-        current_y -= line_height
-
-        total_cost_num = 0
-        if isinstance(total_cost, (int, float)):
-            total_cost_num = int(total_cost)
-            
-        deposit_amount_raw = state_data.get('deposit_amount', state_data.get('tab3_deposit_amount', 0))
-        deposit_amount = 0
-        try: deposit_amount = int(deposit_amount_raw or 0) 
-        except (ValueError, TypeError): deposit_amount = 0
-        remaining_balance = total_cost_num - deposit_amount
-
-        c.setFont('NanumGothicBold', 12)
-        c.drawString(cost_col1_x, current_y, "총 견적 비용 (VAT 별도)")
-        total_cost_str = f"{total_cost_num:,.0f} 원"
-        c.setFont('NanumGothicBold', 14) 
-        c.drawRightString(right_margin_x, current_y, total_cost_str)
-        current_y -= line_height
-
-        c.setFont('NanumGothic', 11)
-        c.drawString(cost_col1_x, current_y, "계약금 (-)")
-        deposit_str = f"{deposit_amount:,.0f} 원"
-        c.setFont('NanumGothic', 12)
-        c.drawRightString(right_margin_x, current_y, deposit_str)
-        current_y -= line_height
+        layout = build_quote_layout(_ensure_report(report, state_data, calculated_cost_items, total_cost, personnel_info))
 
-        c.setFont('NanumGothicBold', 12)
-        c.drawString(cost_col1_x, current_y, "잔금 (VAT 별도)")
-        remaining_str = f"{remaining_balance:,.0f} 원"
-        c.setFont('NanumGothicBold', 14) 
-        c.drawRightString(right_margin_x, current_y, remaining_str)
-        current_y -= line_height
+        # invariant=1: 생성 시각/문서 ID를 고정해 같은 견적이면 같은 바이트가 나오도록 함 (산출물 캐시 재사용)
+        c = canvas.Canvas(buffer, pagesize=A4, invariant=1)
 
-        # --- 고객요구사항 그리기 ---
-        special_notes = state_data.get('special_notes', '').strip()
-        if special_notes:
-            notes_section_start_y = current_y
-            if notes_section_start_y < margin_y + line_height * 3 : 
-                c.showPage(); page_number += 1; draw_page_template(c, page_number)
-                current_y = height - margin_y - 1*cm; notes_section_start_y = current_y
-                c.setFont('NanumGothic', 11) 
+        # 고정 요소는 문서당 한 번 폼으로 정의 (비용표 머리글은 기준선 아래 구분선/글자가 잘리지 않도록 BBox 지정)
+        for form_name, form_ops in layout["forms"].items():
+            if form_name == FORM_COST_HEADER:
+                c.beginForm(form_name, lowerx=0, lowery=-1*cm, upperx=PAGE_WIDTH, uppery=1*cm)
             else:
-                current_y -= line_height 
+                c.beginForm(form_name)
+            _draw_ops_on_canvas(c, form_ops)
+            c.endForm()
 
-            c.setFont('NanumGothicBold', 11)
-            c.drawString(margin_x, current_y, "[ 고객요구사항 ]")
-            current_y -= line_height * 1.2 
+        for page_index, page_ops in enumerate(layout["pages"]):
+            if page_index > 0: c.showPage()
+            _draw_ops_on_canvas(c, page_ops)
 
-            styleNotes = ParagraphStyle(name='NotesParagraph', fontName='NanumGothic', fontSize=10, leading=12, alignment=TA_LEFT)
-            available_width = width - margin_x * 2 
-            
-            notes_parts = [part.strip().replace('\n', '<br/>') for part in special_notes.split('.') if part.strip()]
-
-            for note_part in notes_parts:
-                p_part = Paragraph(note_part, styleNotes)
-                part_width, part_height = p_part.wrapOn(c, available_width, 1000) 
-
-                if current_y - part_height < margin_y: 
-                    c.showPage(); page_number += 1; draw_page_template(c, page_number)
-                    current_y = height - margin_y - 1*cm 
-                    c.setFont('NanumGothic', 11) 
-                
-                p_part.drawOn(c, margin_x, current_y - part_height)
-                current_y -= (part_height + line_height * 0.2) 
-        
         c.save()
         buffer.seek(0)
         print("--- DEBUG [PDF]: PDF generation successful ---")
@@ -395,14 +425,122 @@ def generate_pdf(state_data, calculated_cost_items, total_cost, personnel_info):
     except Exception as e:
         st.error(f"PDF 생성 중 예외 발생: {e}")
         print(f"Error during PDF generation: {e}")
-        traceback.print_exc() 
+        traceback.print_exc()
+        return None
+
+# --- 견적서 이미지 직접 생성 (PDF/Poppler 변환 없이 Pillow로 그리기) ---
+QUOTE_IMAGE_DPI = 200 # pdf2image 기본값과 같은 해상도
+_pil_font_cache = {}
+_form_mask_cache = {} # {(폼 이름, dpi): (잉크 마스크 이미지, 마스크 상단의 폼 기준 y(pt))}
+_pil_font_lock = threading.Lock()
+
+_PIL_FONT_PATHS = {
+    'NanumGothic': NANUM_GOTHIC_FONT_PATH,
+    'NanumGothicBold': NANUM_GOTHIC_BOLD_FONT_PATH,
+}
+
+def _get_pil_font(font_name, size_px):
+    """Pillow용 TrueType 글꼴을 (글꼴, 픽셀 크기)별로 한 번만 로드합니다."""
+    cache_key = (font_name, size_px)
+    font = _pil_font_cache.get(cache_key)
+    if font is not None: return font
+    with _pil_font_lock:
+        font = _pil_font_cache.get(cache_key)
+        if font is None:
+            font_path = _PIL_FONT_PATHS.get(font_name, NANUM_GOTHIC_FONT_PATH)
+            try:
+                font = ImageFont.truetype(font_path, size_px)
+            except (TypeError, ValueError): # 소수 크기를 지원하지 않는 Pillow 버전
+                font = ImageFont.truetype(font_path, max(1, int(round(size_px))))
+            _pil_font_cache[cache_key] = font
+    return font
+
+def _draw_ops_on_image(draw, ops, scale, top_y=None, ink=(0, 0, 0)):
+    """레이아웃 명령(text/line)을 Pillow ImageDraw에 그립니다. pt → px 변환 시 top_y(pt)가 이미지 맨 위가 됩니다."""
+    top_y = PAGE_HEIGHT if top_y is None else top_y
+    anchors = {"left": "ls", "right": "rs", "center": "ms"}
+    line_width = max(1, int(round(scale)))
+    for op in ops:
+        kind = op[0]
+        if kind == "text":
+            _, x, y, text, font_name, font_size, align = op
+            draw.text((x * scale, (top_y - y) * scale), text, font=_get_pil_font(font_name, font_size * scale),
+                      fill=ink, anchor=anchors.get(align, "ls"))
+        elif kind == "line":
+            _, x1, y1, x2, y2 = op
+            draw.line([(x1 * scale, (top_y - y1) * scale), (x2 * scale, (top_y - y2) * scale)], fill=ink, width=line_width)
+
+def _get_form_mask(form_name, form_ops, dpi):
+    """
+    고정 요소 폼을 (폼, 해상도)별로 한 번만 래스터화해 잉크 마스크(L 모드)로 보관합니다.
+    PDF의 폼 XObject처럼, 견적서마다 다시 그리지 않고 마스크를 찍어 배치합니다.
+    """
+    cache_key = (form_name, dpi)
+    cached = _form_mask_cache.get(cache_key)
+    if cached is not None: return cached
+    scale = dpi / 72.0
+    # 폼 명령이 차지하는 세로 범위 (글자 윗부분/아랫부분 여유 포함)
+    y_values = []
+    for op in form_ops:
+        if op[0] == "text": y_values += [op[2] + op[5] * 1.2, op[2] - op[5] * 0.5]
+        elif op[0] == "line": y_values += [op[2] + 2, op[4] - 2]
+    mask_top_y, mask_bottom_y = max(y_values), min(y_values)
+    mask = Image.new("L", (int(round(PAGE_WIDTH * scale)), int(round((mask_top_y - mask_bottom_y) * scale)) + 1), 0)
+    _draw_ops_on_image(ImageDraw.Draw(mask), form_ops, scale, top_y=mask_top_y, ink=255)
+    _form_mask_cache[cache_key] = (mask, mask_top_y)
+    return _form_mask_cache[cache_key]
+
+def _render_layout_page(layout, page_index, dpi):
+    """레이아웃의 한 페이지를 Pillow RGB 이미지로 그립니다."""
+    scale = dpi / 72.0
+    img = Image.new("RGB", (int(round(PAGE_WIDTH * scale)), int(round(PAGE_HEIGHT * scale))), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    page_ops = layout["pages"][page_index]
+    for op in page_ops:
+        if op[0] == "form":
+            _, form_name, form_dy = op
+            mask, mask_top_y = _get_form_mask(form_name, layout["forms"][form_name], dpi)
+            img.paste((0, 0, 0), (0, int(round((PAGE_HEIGHT - mask_top_y - form_dy) * scale))), mask)
+    _draw_ops_on_image(draw, [op for op in page_ops if op[0] != "form"], scale)
+    return img
+
+def generate_quote_image(state_data, calculated_cost_items, total_cost, personnel_info, image_format='JPEG', dpi=QUOTE_IMAGE_DPI, all_pages=True, report=None):
+    """
+    견적서를 PDF와 같은 레이아웃 모델로 Pillow 캔버스에 직접 그려 이미지 바이트로 반환합니다.
+    all_pages=True면 모든 페이지를 위에서 아래로 이어 붙인 한 장, False면 첫 페이지만.
+    Poppler가 필요 없으며, 실패 시 None을 반환합니다 (호출 측에서 PDF 변환 방식으로 대체 가능).
+    """
+    if not (_REPORTLAB_AVAILABLE and _PILLOW_AVAILABLE):
+        print("Warning [QUOTE_IMAGE]: ReportLab/Pillow 미설치로 직접 이미지 생성 불가.")
+        return None
+    try:
+        if not register_fonts(): return None # 줄바꿈/정렬 계산에 글꼴 폭 정보 사용
+        layout = build_quote_layout(_ensure_report(report, state_data, calculated_cost_items, total_cost, personnel_info))
+        page_count = len(layout["pages"]) if all_pages else 1
+        page_images = [_render_layout_page(layout, page_index, dpi) for page_index in range(page_count)]
+        if len(page_images) == 1:
+            img = page_images[0]
+        else:
+            img = Image.new("RGB", (page_images[0].width, sum(page.height for page in page_images)), (255, 255, 255))
+            y_offset = 0
+            for page in page_images:
+                img.paste(page, (0, y_offset)); y_offset += page.height
+
+        img_byte_arr = io.BytesIO()
+        img.save(img_byte_arr, format=image_format)
+        print(f"--- DEBUG [QUOTE_IMAGE]: Quote rendered directly to {image_format} ---")
+        return img_byte_arr.getvalue()
+    except Exception as e:
+        print(f"Error rendering quote image directly: {e}")
+        traceback.print_exc()
         return None
 
 # --- PDF를 이미지로 변환하는 함수 ---
-def generate_quote_image_from_pdf(pdf_bytes, image_format='JPEG', poppler_path=None):
+def generate_quote_image_from_pdf(pdf_bytes, image_format='JPEG', poppler_path=None, all_pages=True):
     """
     PDF 바이트를 이미지 바이트로 변환합니다.
-    첫 번째 페이지만 이미지로 변환합니다.
+    pdf_raster가 있으면 모든 페이지를 프로세스 풀에서 병렬 변환(페이지별 제한 시간)해 한 장으로 이어 붙이고,
+    없으면 이 프로세스에서 첫 번째 페이지만 변환합니다.
     poppler_path: Windows에서 Poppler 바이너리 경로 (선택 사항)
     """
     if not _PDF2IMAGE_AVAILABLE:
@@ -415,12 +553,21 @@ def generate_quote_image_from_pdf(pdf_bytes, image_format='JPEG', poppler_path=N
         st.error("이미지로 변환할 PDF 데이터가 없습니다.")
         return None
 
+    if all_pages and pdf_raster is not None and pdf_raster.is_available():
+        image_bytes = pdf_raster.rasterize_pdf(pdf_bytes, image_format=image_format, stitch=True, poppler_path=poppler_path)
+        if image_bytes:
+            print(f"--- DEBUG [PDF_TO_IMAGE]: PDF converted to {image_format} in worker processes ---")
+            return image_bytes
+        st.error("PDF를 이미지로 변환하지 못했습니다 (변환 실패 또는 제한 시간 초과).")
+        st.info("Poppler가 시스템에 설치되어 있고 PATH에 등록되었는지 확인해주세요. Windows의 경우 Poppler 바이너리 경로를 직접 지정해야 할 수 있습니다.")
+        return None
+
     try:
         # convert_from_bytes에 poppler_path 인자 전달 (필요한 경우)
         if poppler_path:
-             images = convert_from_bytes(pdf_bytes, fmt=image_format.lower(), first_page=1, last_page=1, poppler_path=poppler_path)
+             images = pdf2image.convert_from_bytes(pdf_bytes, fmt=image_format.lower(), first_page=1, last_page=1, poppler_path=poppler_path)
         else:
-             images = convert_from_bytes(pdf_bytes, fmt=image_format.lower(), first_page=1, last_page=1)
+             images = pdf2image.convert_from_bytes(pdf_bytes, fmt=image_format.lower(), first_page=1, last_page=1)
 
 
         if images:
@@ -446,222 +593,88 @@ def generate_quote_image_from_pdf(pdf_bytes, image_format='JPEG', poppler_path=N
 
 
 # --- 엑셀 생성 함수 (generate_excel) ---
-# (기존 generate_excel 함수 내용은 변경 없이 유지됩니다)
-def generate_excel(state_data, calculated_cost_items, total_cost, personnel_info):
+# (시트 작성은 excel_summary_generator의 스트리밍 작성기를 사용합니다)
+def generate_excel(state_data, calculated_cost_items, total_cost, personnel_info, report=None):
     """
-    주어진 데이터를 기반으로 요약 정보를 Excel 형식으로 생성합니다.
-    (ui_tab3.py의 요약 표시에 사용됨, utils.get_item_qty 호출)
+    견적 보고서(quote_report)를 바탕으로 요약 정보를 Excel 형식으로 생성합니다.
+    (ui_tab3.py의 요약 표시에 사용됨, report: 이미 만든 견적 보고서가 있으면 재사용)
     경유지 정보 추가
     """
     print("--- DEBUG [Excel Summary]: Starting generate_excel function ---")
-    output = io.BytesIO()
     try:
-        # --- 기본 정보 준비 ---
-        is_storage = state_data.get('is_storage_move', False)
-        is_long_distance = state_data.get('apply_long_distance', False)
-        is_waste = state_data.get('has_waste_check', False)
-        has_via = state_data.get('has_via_point', False) # 경유지 유무
-
-        from_method = state_data.get('from_method', '-')
-        to_method = state_data.get('to_method', '-')
-        to_floor = state_data.get('to_floor', '-') 
-        use_sky_from = (from_method == "스카이 🏗️")
-        use_sky_to = (to_method == "스카이 🏗️")
-        
-        p_info = personnel_info if isinstance(personnel_info, dict) else {}
-        final_men = p_info.get('final_men', 0)
-        final_women = p_info.get('final_women', 0)
-        personnel_text = f"남성 {final_men}명" + (f", 여성 {final_women}명" if final_women > 0 else "")
-        dest_address = state_data.get('to_location', '-')
-        
-        kst_excel_date = ''
-        if utils and hasattr(utils, 'get_current_kst_time_str'):
-            try: kst_excel_date = utils.get_current_kst_time_str("%Y-%m-%d")
-            except Exception as e_time: print(f"Warning: Error calling utils.get_current_kst_time_str: {e_time}"); kst_excel_date = datetime.now().strftime("%Y-%m-%d")
-        else: print("Warning: utils module or get_current_kst_time_str not available."); kst_excel_date = datetime.now().strftime("%Y-%m-%d")
-
-        # 1. '견적 정보' 시트 데이터 생성 (경유지 정보 추가)
-        ALL_INFO_LABELS = [
-            "회사명", "주소", "연락처", "이메일", "", 
-            "고객명", "고객 연락처", "견적일", "이사 종류", "",
-            "이사일", "출발지", "도착지", "출발층", "도착층", "출발 작업", "도착 작업", "",
-            "경유지 이사", "경유지 주소", "경유지 작업방법", "", 
-            "보관 이사", "보관 기간", "보관 유형", "보관 중 전기사용", "", # 전기사용 추가
-            "장거리 적용", "장거리 구간", "",
-            "스카이 사용 시간", "", "폐기물 처리(톤)", "", "날짜 할증 선택", "",
-            "총 작업 인원", "", "선택 차량", "자동 추천 차량",
-            "이사짐 총 부피", "이사짐 총 무게", "", "고객요구사항"
+        report = _ensure_report(report, state_data, calculated_cost_items, total_cost, personnel_info)
+        customer, locations, vehicle = report["customer"], report["locations"], report["vehicle"]
+        via_point, storage, long_distance, waste = report["via_point"], report["storage"], report["long_distance"], report["waste"]
+        dash = lambda value: _or_default(value, '-')
+
+        sky_details = []
+        if locations["from_method"] == "스카이 🏗️": sky_details.append(f"출발지 {_or_default(locations['sky_hours_from'], 1)}시간")
+        if locations["to_method"] == "스카이 🏗️": sky_details.append(f"도착지 {_or_default(locations['sky_hours_to'], 1)}시간")
+        if storage:
+            storage_duration = f"{storage['duration']} 일" if storage["duration"] is not None else '-'
+            storage_electricity = '예' if storage["use_electricity"] else '아니오'
+
+        # 1. '견적 정보' 시트 (빈 항목명은 구분용 빈 줄)
+        info_data_list = [
+            ("회사명", "(주)이사데이"), ("주소", COMPANY_ADDRESS), ("연락처", f"{COMPANY_PHONE_1} | {COMPANY_PHONE_2}"), ("이메일", COMPANY_EMAIL), ("", ""),
+            ("고객명", dash(customer["name"])), ("고객 연락처", dash(customer["phone"])), ("견적일", report["quote_date"]),
+            ("이사 종류", dash(report["move_type"])), ("", ""),
+            ("이사일", dash(report["moving_date_str"])), ("출발지", dash(locations["from"])), ("도착지", dash(locations["to"])),
+            ("출발층", dash(locations["from_floor"])), ("도착층", dash(locations["to_floor"])),
+            ("출발 작업", dash(locations["from_method"])), ("도착 작업", dash(locations["to_method"])), ("", ""),
+            ("경유지 이사", '예' if via_point else '아니오'),
+            ("경유지 주소", dash(via_point["location"]) if via_point else '-'),
+            ("경유지 작업방법", dash(via_point["method"]) if via_point else '-'), ("", ""),
+            ("보관 이사", '예' if storage else '아니오'),
+            ("보관 기간", storage_duration if storage else '-'),
+            ("보관 유형", dash(storage["type"]) if storage else '-'),
+            ("보관 중 전기사용", storage_electricity if storage else '-'), ("", ""),
+            ("장거리 적용", '예' if long_distance else '아니오'),
+            ("장거리 구간", dash(long_distance["selector"]) if long_distance else '-'), ("", ""),
+            ("스카이 사용 시간", ", ".join(sky_details) if sky_details else '-'), ("", ""),
+            ("폐기물 처리(톤)", f"예 ({_or_default(waste['tons'], 0.5):.1f} 톤)" if waste else '아니오'), ("", ""),
+            ("날짜 할증 선택", ", ".join(report["date_options"]) if report["date_options"] else '없음'), ("", ""),
+            ("총 작업 인원", report["personnel"]["text"]), ("", ""),
+            ("선택 차량", _or_default(vehicle["selected"], '미선택')), ("자동 추천 차량", dash(vehicle["recommended"])),
+            ("이사짐 총 부피", f"{_or_default(report['total_volume'], 0.0):.2f} m³"),
+            ("이사짐 총 무게", f"{_or_default(report['total_weight'], 0.0):.2f} kg"), ("", ""),
+            ("고객요구사항", report["special_notes"] or '-'),
         ]
-        info_data_list = []
-        for label in ALL_INFO_LABELS:
-            value = '-' 
-            if not label: 
-                info_data_list.append(("", ""))
-                continue
-            
-            if label == "회사명": value = "(주)이사데이"
-            elif label == "주소": value = COMPANY_ADDRESS
-            elif label == "연락처": value = f"{COMPANY_PHONE_1} | {COMPANY_PHONE_2}"
-            elif label == "이메일": value = COMPANY_EMAIL
-            elif label == "고객명": value = state_data.get('customer_name', '-')
-            elif label == "고객 연락처": value = state_data.get('customer_phone', '-')
-            elif label == "견적일": value = kst_excel_date
-            elif label == "이사 종류": value = state_data.get('base_move_type', '-')
-            elif label == "이사일": value = str(state_data.get('moving_date', '-'))
-            elif label == "출발지": value = state_data.get('from_location', '-')
-            elif label == "도착지": value = dest_address
-            elif label == "출발층": value = state_data.get('from_floor', '-')
-            elif label == "도착층": value = to_floor
-            elif label == "출발 작업": value = from_method
-            elif label == "도착 작업": value = to_method
-            elif label == "경유지 이사": value = '예' if has_via else '아니오' 
-            elif label == "경유지 주소": value = state_data.get('via_point_location', '-') if has_via else '-' 
-            elif label == "경유지 작업방법": value = state_data.get('via_point_method', '-') if has_via else '-' 
-            elif label == "보관 이사": value = '예' if is_storage else '아니오'
-            elif label == "보관 기간": 
-                duration = state_data.get('storage_duration', '-')
-                value = f"{duration} 일" if is_storage and duration != '-' else '-'
-            elif label == "보관 유형": value = state_data.get('storage_type', '-') if is_storage else '-'
-            elif label == "보관 중 전기사용": value = '예' if is_storage and state_data.get('storage_use_electricity', False) else ('아니오' if is_storage else '-')
-            elif label == "장거리 적용": value = '예' if is_long_distance else '아니오'
-            elif label == "장거리 구간": value = state_data.get('long_distance_selector', '-') if is_long_distance else '-'
-            elif label == "스카이 사용 시간":
-                 sky_details = []
-                 if use_sky_from: sky_details.append(f"출발지 {state_data.get('sky_hours_from', 1)}시간")
-                 if use_sky_to: sky_details.append(f"도착지 {state_data.get('sky_hours_final', 1)}시간")
-                 value = ", ".join(sky_details) if sky_details else '-'
-            elif label == "폐기물 처리(톤)": value = f"예 ({state_data.get('waste_tons_input', 0.5):.1f} 톤)" if is_waste else '아니오'
-            elif label == "날짜 할증 선택":
-                 date_options_list = ["이사많은날 🏠", "손없는날 ✋", "월말 📅", "공휴일 🎉", "금요일 📅"]
-                 date_keys = [f"date_opt_{i}_widget" for i in range(len(date_options_list))]
-                 selected_dates_excel = [date_options_list[i] for i, key in enumerate(date_keys) if state_data.get(key, False)]
-                 value = ", ".join(selected_dates_excel) if selected_dates_excel else '없음'
-            elif label == "총 작업 인원": value = personnel_text
-            elif label == "선택 차량": value = state_data.get('final_selected_vehicle', '미선택')
-            elif label == "자동 추천 차량": value = state_data.get('recommended_vehicle_auto', '-')
-            elif label == "이사짐 총 부피": value = f"{state_data.get('total_volume', 0.0):.2f} m³"
-            elif label == "이사짐 총 무게": value = f"{state_data.get('total_weight', 0.0):.2f} kg"
-            elif label == "고객요구사항": value = state_data.get('special_notes', '').strip() or '-'
-            info_data_list.append((label, value))
-        df_info = pd.DataFrame(info_data_list, columns=["항목", "내용"])
-
-        # 2. '전체 품목 수량' 시트 데이터 생성 (utils.get_item_qty 사용)
-        all_items_data = []
-        current_move_type = state_data.get('base_move_type', '')
-        item_defs = data.item_definitions.get(current_move_type, {}) if data and hasattr(data, 'item_definitions') else {}
-        processed_all_items = set() 
-        if isinstance(item_defs, dict):
-            for section, item_list in item_defs.items():
-                if section == "폐기 처리 품목 🗑️": continue
-                if isinstance(item_list, list):
-                    for item_name in item_list:
-                         if item_name in processed_all_items: continue
-                         if data and hasattr(data, 'items') and item_name in data.items:
-                              qty = 0
-                              if utils and hasattr(utils, 'get_item_qty'):
-                                   try: qty = utils.get_item_qty(state_data, item_name)
-                                   except Exception as e_get_qty: print(f"Error calling utils.get_item_qty for {item_name}: {e_get_qty}")
-                              else: print(f"Warning: utils module or get_item_qty not available.")
-                              all_items_data.append({"품목명": item_name, "수량": qty})
-                              processed_all_items.add(item_name)
-        
-        if all_items_data:
-            df_all_items = pd.DataFrame(all_items_data, columns=["품목명", "수량"])
-        else: 
-            df_all_items = pd.DataFrame({"정보": ["정의된 품목 없음"]})
-
-
-        # 3. '비용 내역 및 요약' 시트 데이터 생성 (경유지 추가요금 포함)
-        cost_details_excel = []
-        if calculated_cost_items and isinstance(calculated_cost_items, list):
-            for item in calculated_cost_items: 
-                 if isinstance(item, (list, tuple)) and len(item) >= 2:
-                    item_desc = str(item[0])
-                    item_cost = 0
-                    item_note = ""
-                    try: item_cost = int(item[1] or 0) 
-                    except (ValueError, TypeError): item_cost = 0
-                    if len(item) > 2:
-                         try: item_note = str(item[2] or '') 
-                         except Exception: item_note = ''
-                    
-                    if "오류" not in item_desc: 
-                        cost_details_excel.append({"항목": item_desc, "금액": item_cost, "비고": item_note})
-
-        if cost_details_excel:
-            df_costs = pd.DataFrame(cost_details_excel, columns=["항목", "금액", "비고"])
-        else: 
-            df_costs = pd.DataFrame([{"항목": "계산된 비용 없음", "금액": 0, "비고": ""}])
-
-        num_total = total_cost if isinstance(total_cost,(int,float)) else 0
-        deposit_raw = state_data.get('deposit_amount', state_data.get('tab3_deposit_amount',0))
-        try: deposit_amount = int(deposit_raw or 0)
-        except (ValueError, TypeError): deposit_amount = 0
-
-        remaining_balance = num_total - deposit_amount
-        summary_data = [
-            {"항목": "--- 비용 요약 ---", "금액": "", "비고": ""}, 
-            {"항목": "총 견적 비용 (VAT 별도)", "금액": num_total, "비고": "모든 항목 합계"},
-            {"항목": "계약금 (-)", "금액": deposit_amount, "비고": ""},
-            {"항목": "잔금 (VAT 별도)", "금액": remaining_balance, "비고": "총 견적 비용 - 계약금"}
+
+        # 2. '전체 품목 수량' 시트 (현재 이사 유형에 정의된 품목, 폐기 품목 제외)
+        if report["items"]:
+            items_sheet = ('전체 품목 수량', ["품목명", "수량"], report["items"], {})
+        else:
+            items_sheet = ('전체 품목 수량', ["정보"], [("정의된 품목 없음",)], {})
+
+        # 3. '비용 내역 및 요약' 시트 (경유지 추가요금 포함, 날짜 할증은 별도 항목)
+        cost_details_excel = [(line.label, line.amount, line.note) for line in report["cost_lines"]]
+        if not cost_details_excel:
+            cost_details_excel = [("계산된 비용 없음", 0, "")]
+        cost_details_excel += [
+            ("--- 비용 요약 ---", "", ""),
+            ("총 견적 비용 (VAT 별도)", report["total"], "모든 항목 합계"),
+            ("계약금 (-)", report["deposit"], ""),
+            ("잔금 (VAT 별도)", report["balance"], "총 견적 비용 - 계약금"),
         ]
-        df_summary = pd.DataFrame(summary_data, columns=["항목", "금액", "비고"])
-        df_costs_final = pd.concat([df_costs, df_summary], ignore_index=True)
-
-
-        # 4. 엑셀 파일 쓰기 및 서식 지정 (컬럼 너비 계산 수정됨)
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df_info.to_excel(writer, sheet_name='견적 정보', index=False)
-            df_all_items.to_excel(writer, sheet_name='전체 품목 수량', index=False)
-            df_costs_final.to_excel(writer, sheet_name='비용 내역 및 요약', index=False)
-
-            for sheet_name in writer.sheets:
-                worksheet = writer.sheets[sheet_name]
-                for col in worksheet.columns:
-                    max_length = 0
-                    column = col[0].column_letter 
-                    
-                    try:
-                        header_value = worksheet[f"{column}1"].value 
-                        header_len = len(str(header_value)) if header_value is not None else 0
-                    except Exception:
-                        header_len = 0 
-                    max_length = header_len
-
-                    for cell in col:
-                        try:
-                            if cell.value is not None:
-                                cell_value_str = str(cell.value)
-                                lines = cell_value_str.split('\n') 
-                                cell_len = 0
-                                if lines:
-                                     try:
-                                          line_lengths = [len(str(line or '')) for line in lines]
-                                          if line_lengths: cell_len = max(line_lengths)
-                                     except Exception as max_err:
-                                          print(f"Warning: Error calculating max line length for cell {cell.coordinate}: {max_err}")
-                                          cell_len = len(lines[0]) if lines else 0 
-                                if cell_len > max_length:
-                                    max_length = cell_len
-                        except Exception as cell_proc_err:
-                             print(f"Warning: Error processing cell {cell.coordinate} for width calculation: {cell_proc_err}")
-                    
-                    adjusted_width = (max_length + 2) * 1.2 
-                    adjusted_width = min(adjusted_width, 60) 
-                    adjusted_width = max(adjusted_width, header_len + 2) 
-                    worksheet.column_dimensions[column].width = adjusted_width
-
-        excel_data = output.getvalue()
+
+        # 4. 엑셀 파일 쓰기 (write-only 시트, 열 너비는 행을 모으면서 한글 가중치로 계산)
+        excel_data = excel_summary_generator.build_summary_workbook_bytes([
+            ('견적 정보', ["항목", "내용"], info_data_list, {}),
+            items_sheet,
+            ('비용 내역 및 요약', ["항목", "금액", "비고"], cost_details_excel, {}),
+        ], max_width=60)
         print("--- DEBUG [Excel Summary]: generate_excel function finished successfully ---")
         return excel_data
+    except ImportError as e: # excel_summary_generator 또는 openpyxl을 처음 불러올 때 실패
+        st.error(f"엑셀 파일 생성 중 오류: excel_summary_generator 모듈을 불러올 수 없습니다. ({e})")
+        print(f"Error during Excel generation (import): {e}")
+        traceback.print_exc()
+        return None
     except Exception as e:
         st.error(f"엑셀 파일 생성 중 오류: {e}")
         print(f"Error during Excel generation: {e}")
         traceback.print_exc()
         return None
-    finally:
-        if 'output' in locals() and output is not None:
-             try: output.close()
-             except Exception as close_e: print(f"Error closing Excel buffer: {close_e}")
 
 # pdf_generator.py 파일 끝
@@ -0,0 +1,208 @@
+# pdf_raster.py
+# PDF → 이미지 변환(Poppler)을 제한된 프로세스 풀에서 페이지 단위로 병렬 실행하고,
+# 작업마다 제한 시간을 두어 멈춘 변환이 사용자 세션을 붙잡지 않도록 합니다.
+# Streamlit 스크립트 스레드는 submit_raster_job()으로 작업만 등록하고 get_raster_job()으로 상태를 확인합니다.
+
+import io
+import math
+import multiprocessing
+import re
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from lazy_imports import lazy_module, module_available
+
+# 설치 여부만 먼저 확인하고 실제 import는 처음 변환할 때
+_PDF2IMAGE_AVAILABLE = module_available("pdf2image")
+_PILLOW_AVAILABLE = module_available("PIL")
+pdf2image = lazy_module("pdf2image") if _PDF2IMAGE_AVAILABLE else None
+Image = lazy_module("PIL.Image") if _PILLOW_AVAILABLE else None
+if not _PDF2IMAGE_AVAILABLE:
+    print("Warning [PDF_RASTER]: pdf2image 라이브러리를 찾을 수 없습니다. 프로세스 풀 변환이 비활성화됩니다.")
+if not _PILLOW_AVAILABLE:
+    print("Warning [PDF_RASTER]: Pillow 라이브러리를 찾을 수 없습니다. 프로세스 풀 변환이 비활성화됩니다.")
+
+RASTER_MAX_WORKERS = 2          # 동시에 실행할 Poppler 변환 프로세스 수
+RASTER_PAGE_TIMEOUT_SEC = 30    # 페이지 하나 변환 제한 시간 (pdftoppm 강제 종료)
+RASTER_DEFAULT_DPI = 200
+RASTER_JOB_RETENTION_SEC = 600  # 완료된 작업 결과 보관 시간
+
+_pool = None
+_pool_lock = threading.Lock()
+_jobs = {} # {job_id: job dict}
+_jobs_lock = threading.Lock()
+
+
+def is_available():
+    return _PDF2IMAGE_AVAILABLE and _PILLOW_AVAILABLE
+
+
+def _get_pool():
+    """프로세스당 하나의 제한된 변환 풀. 멀티스레드 서버에서 fork하지 않도록 spawn 방식을 사용합니다."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=RASTER_MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool():
+    """작업자 프로세스가 비정상 종료되어 풀이 깨졌을 때 다음 작업을 위해 새로 만듭니다."""
+    global _pool
+    with _pool_lock:
+        broken_pool, _pool = _pool, None
+    if broken_pool is not None:
+        broken_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def count_pdf_pages(pdf_bytes, timeout=RASTER_PAGE_TIMEOUT_SEC, poppler_path=None):
+    """PDF 페이지 수. ReportLab이 만든 PDF는 페이지 객체를 세고, 그 외에는 pdfinfo를 사용합니다."""
+    page_count = len(re.findall(rb"/Type\s*/Page(?![a-zA-Z])", pdf_bytes))
+    if page_count: return page_count
+    info = pdf2image.pdfinfo_from_bytes(pdf_bytes, poppler_path=poppler_path, timeout=timeout)
+    return int(info.get("Pages", 1))
+
+
+def _rasterize_page(pdf_bytes, page_number, dpi, timeout, poppler_path):
+    """(작업자 프로세스) 한 페이지를 변환해 (모드, 크기, 원시 픽셀 바이트)로 반환합니다."""
+    images = pdf2image.convert_from_bytes(pdf_bytes, dpi=dpi, first_page=page_number, last_page=page_number,
+                                poppler_path=poppler_path, timeout=timeout)
+    if not images:
+        raise RuntimeError(f"페이지 {page_number} 변환 결과가 없습니다.")
+    page_image = images[0].convert("RGB")
+    return page_image.mode, page_image.size, page_image.tobytes()
+
+
+def stitch_images_vertically(images):
+    """페이지 이미지를 위에서 아래로 이어 붙여 한 장으로 만듭니다."""
+    if len(images) == 1: return images[0]
+    total_width = max(img.width for img in images)
+    stitched = Image.new("RGB", (total_width, sum(img.height for img in images)), (255, 255, 255))
+    y_offset = 0
+    for img in images:
+        stitched.paste(img, (0, y_offset))
+        y_offset += img.height
+    return stitched
+
+
+def _encode_image(img, image_format):
+    out = io.BytesIO()
+    if image_format.upper() == "JPEG":
+        img.save(out, format="JPEG", progressive=True)
+    else:
+        img.save(out, format=image_format)
+    return out.getvalue()
+
+
+def submit_raster_job(pdf_bytes, dpi=RASTER_DEFAULT_DPI, image_format='JPEG', stitch=True,
+                      timeout=RASTER_PAGE_TIMEOUT_SEC, poppler_path=None):
+    """
+    PDF의 모든 페이지를 프로세스 풀에 페이지별 작업으로 등록하고 작업 ID를 바로 반환합니다.
+    stitch=True면 완료 후 한 장의 세로 이미지로, False면 페이지별 이미지 목록으로 결과를 만듭니다.
+    """
+    if not is_available():
+        raise RuntimeError("pdf2image/Pillow가 없어 PDF를 이미지로 변환할 수 없습니다.")
+    _cleanup_old_jobs()
+    page_count = count_pdf_pages(pdf_bytes, timeout=timeout, poppler_path=poppler_path)
+    pool = _get_pool()
+    futures = [pool.submit(_rasterize_page, pdf_bytes, page_number, dpi, timeout, poppler_path)
+               for page_number in range(1, page_count + 1)]
+    job_id = uuid.uuid4().hex
+    # 대기열에서 기다리는 시간까지 고려한 작업 전체 마감 시각
+    deadline = time.monotonic() + timeout * math.ceil(page_count / RASTER_MAX_WORKERS) + 5
+    with _jobs_lock:
+        _jobs[job_id] = {
+            "futures": futures, "total_pages": page_count, "deadline": deadline,
+            "image_format": image_format, "stitch": stitch,
+            "status": "running", "result": None, "error": None, "finished_at": None,
+        }
+    print(f"DEBUG [PDF_RASTER]: Job {job_id} submitted ({page_count} pages, dpi={dpi})")
+    return job_id
+
+
+def _finish_job(job, status, result=None, error=None):
+    job["status"], job["result"], job["error"] = status, result, error
+    job["finished_at"] = time.monotonic()
+    if status != "done":
+        for future in job["futures"]: future.cancel()
+
+
+def get_raster_job(job_id):
+    """
+    작업 상태를 확인합니다 (기다리지 않음). 모든 페이지가 끝났으면 이 호출에서 결과를 조립합니다.
+    반환: {"status": "running"|"done"|"error"|"timeout"|"unknown", "done_pages", "total_pages", "result", "error"}
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return {"status": "unknown", "done_pages": 0, "total_pages": 0, "result": None, "error": "작업을 찾을 수 없습니다."}
+
+        futures = job["futures"]
+        done_pages = sum(1 for future in futures if future.done())
+        if job["status"] == "running":
+            failed = next((future for future in futures if future.done() and not future.cancelled() and future.exception()), None)
+            if failed is not None:
+                error = failed.exception()
+                print(f"ERROR [PDF_RASTER]: Job {job_id} failed: {error}")
+                if "BrokenProcessPool" in type(error).__name__: _reset_pool()
+                _finish_job(job, "error", error=str(error))
+            elif done_pages == len(futures):
+                try:
+                    page_images = [Image.frombytes(mode, size, raw) for mode, size, raw in (future.result() for future in futures)]
+                    if job["stitch"]:
+                        result = _encode_image(stitch_images_vertically(page_images), job["image_format"])
+                    else:
+                        result = [_encode_image(img, job["image_format"]) for img in page_images]
+                    _finish_job(job, "done", result=result)
+                except Exception as e:
+                    traceback.print_exc()
+                    _finish_job(job, "error", error=str(e))
+            elif time.monotonic() > job["deadline"]:
+                print(f"ERROR [PDF_RASTER]: Job {job_id} timed out ({done_pages}/{len(futures)} pages)")
+                _finish_job(job, "timeout", error=f"변환 제한 시간 초과 ({done_pages}/{len(futures)} 페이지 완료)")
+
+        return {"status": job["status"], "done_pages": done_pages, "total_pages": job["total_pages"],
+                "result": job["result"], "error": job["error"]}
+
+
+def discard_raster_job(job_id):
+    """결과를 가져간 작업을 정리합니다."""
+    with _jobs_lock:
+        job = _jobs.pop(job_id, None)
+    if job and job["status"] == "running":
+        for future in job["futures"]: future.cancel()
+
+
+def _cleanup_old_jobs():
+    now = time.monotonic()
+    with _jobs_lock:
+        expired = [job_id for job_id, job in _jobs.items()
+                   if job["finished_at"] is not None and now - job["finished_at"] > RASTER_JOB_RETENTION_SEC]
+        for job_id in expired: _jobs.pop(job_id, None)
+
+
+def rasterize_pdf(pdf_bytes, dpi=RASTER_DEFAULT_DPI, image_format='JPEG', stitch=True,
+                  timeout=RASTER_PAGE_TIMEOUT_SEC, poppler_path=None, poll_interval=0.1):
+    """
+    submit_raster_job + 완료 대기 (UI 밖의 동기 호출용). 제한 시간을 넘기거나 실패하면 None.
+    """
+    try:
+        job_id = submit_raster_job(pdf_bytes, dpi=dpi, image_format=image_format, stitch=stitch,
+                                   timeout=timeout, poppler_path=poppler_path)
+    except Exception as e:
+        print(f"Error submitting raster job: {e}")
+        traceback.print_exc()
+        return None
+    try:
+        while True:
+            job = get_raster_job(job_id)
+            if job["status"] == "done": return job["result"]
+            if job["status"] != "running":
+                print(f"Error [PDF_RASTER]: {job['status']} - {job['error']}")
+                return None
+            time.sleep(poll_interval)
+    finally:
+        discard_raster_job(job_id)
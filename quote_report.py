@@ -0,0 +1,228 @@
+# quote_report.py
+# 견적 보고서 모델
+# 견적 한 건(state_data + 비용 계산 결과)을 모든 출력 형식이 함께 쓰는 형태로 한 번만 정리합니다.
+# - pdf_generator.build_quote_layout (PDF, 견적 이미지), pdf_generator.generate_excel (요약 Excel)
+# - excel_filler.fill_final_excel_template (최종 견적서 Excel), excel_summary_generator.generate_summary_excel
+# - ui_tab3 최종 견적 화면 (비용 표, 이사 정보 요약 문구)
+# 같은 견적 내용이면 artifact_cache.get_quote_report가 한 번 만든 보고서를 재사용합니다.
+# 보고서는 일반 dict이며, 값이 없는 항목은 None으로 두고 각 출력 형식이 자기 기본 표기('-', '' 등)를 적용합니다.
+
+import re
+from datetime import date
+
+import utils
+from cost_ledger import CostCode, CostLedger, LIFT_COST_CODES, TAX_FEE_COST_CODES
+
+try:
+    import data
+except ImportError:
+    data = None
+
+DATE_OPTION_LABELS = ["이사많은날 🏠", "손없는날 ✋", "월말 📅", "공휴일 🎉", "금요일 📅"] # date_opt_{i}_widget 순서
+DATE_SURCHARGE_NOTE = "이사 집중일 운영 요금 적용" # 고객용 견적서에서 날짜 할증을 기본 운임에 합칠 때 비고
+WASTE_SECTION_NAME = "폐기 처리 품목 🗑️"
+DISPATCHED_VEHICLE_KEYS = [("1톤", "dispatched_1t"), ("2.5톤", "dispatched_2_5t"), ("3.5톤", "dispatched_3_5t"), ("5톤", "dispatched_5t")]
+BASKET_ITEM_NAMES = [("바구니", ("바구니",)), ("중박스", ("중박스", "중자바구니")), ("책바구니", ("책바구니",))] # (표시 이름, 품목명 후보)
+
+
+def _to_int(value):
+    try: return int(value or 0)
+    except (ValueError, TypeError): return 0
+
+
+def _cost_ledger(calculated_cost_items):
+    """비용 항목 목록 -> (오류 항목을 뺀 CostLedger, 첫 오류 항목의 비고 또는 None). 금액은 정수로 맞춥니다."""
+    if not isinstance(calculated_cost_items, list):
+        return CostLedger(), None
+    ledger = CostLedger.from_items(calculated_cost_items)
+    cost_error = ledger.error_note
+    lines = ledger.without_errors()
+    if any(not isinstance(line.amount, int) for line in lines): # 폐기물 처리 등 float 금액
+        lines = CostLedger(line._replace(amount=_to_int(line.amount)) for line in lines)
+    return lines, cost_error
+
+
+def _customer_cost_lines(cost_lines, selected_vehicle):
+    """고객용 견적서 비용 목록: 날짜 할증이 있으면 기본 운임에 합치고 비고를 바꿉니다."""
+    date_line = cost_lines.first(CostCode.DATE_SURCHARGE)
+    base_line = cost_lines.first(CostCode.BASE_FARE)
+    if not date_line or not base_line or date_line.amount <= 0:
+        return list(cost_lines)
+    merged_base = base_line._replace(amount=base_line.amount + date_line.amount,
+                                     note=f"{selected_vehicle or ''} ({DATE_SURCHARGE_NOTE})")
+    return [merged_base if line is base_line else line for line in cost_lines if line is not date_line]
+
+
+def _vehicle_tonnage(selected_vehicle):
+    """선택 차량 이름에서 톤수 숫자만 (예: '2.5톤' -> '2.5', 최종 견적서 Excel B7)."""
+    if isinstance(selected_vehicle, str) and selected_vehicle.strip():
+        match = re.search(r'(\d+(\.\d+)?)', selected_vehicle)
+        if match: return match.group(1)
+        return re.sub(r'[^\d.]', '', selected_vehicle)
+    return str(selected_vehicle) if selected_vehicle else ''
+
+
+def _vehicle_tonnage_label(selected_vehicle):
+    """선택 차량 이름에서 'N톤' 부분 (없으면 이름 그대로, 화면 요약 문구)."""
+    if isinstance(selected_vehicle, str):
+        match = re.search(r'(\d+(\.\d+)?\s*톤)', selected_vehicle)
+        if match: return match.group(1).strip()
+    return selected_vehicle
+
+
+def _defined_item_quantities(move_type, qty_index):
+    """현재 이사 유형에 정의된 품목(폐기 품목 제외)의 (품목명, 수량)을 정의 순서대로, 중복 없이."""
+    item_defs = data.item_definitions.get(move_type, {}) if data and hasattr(data, 'item_definitions') else {}
+    known_items = data.items if data and isinstance(getattr(data, 'items', None), dict) else {}
+    quantities, seen = [], set()
+    if isinstance(item_defs, dict):
+        for section, item_list in item_defs.items():
+            if section == WASTE_SECTION_NAME or not isinstance(item_list, list): continue
+            for item_name in item_list:
+                if item_name in seen or item_name not in known_items: continue
+                quantities.append((item_name, qty_index.get(item_name, 0)))
+                seen.add(item_name)
+    return quantities
+
+
+def build_quote_report(state_data, calculated_cost_items, total_cost, personnel_info, revision=None):
+    """
+    견적 보고서(dict)를 만듭니다. revision은 견적 내용 해시(artifact_cache.quote_fingerprint)로, 캐시 키와 추적용입니다.
+    주요 항목: customer, moving_date(_str), locations, via_point, storage, personnel, vehicle,
+    items/qty_index/baskets, cost_lines(CostLedger, 코드로 조회)/customer_cost_lines, total/deposit/balance, special_notes/note_parts
+    """
+    state_data = state_data or {}
+    get = state_data.get
+    moving_date = get('moving_date')
+    if isinstance(moving_date, date): moving_date_str = moving_date.strftime('%Y-%m-%d')
+    else: moving_date_str = str(moving_date) if moving_date is not None else None
+
+    p_info = personnel_info if isinstance(personnel_info, dict) else {}
+    men, women = _to_int(p_info.get('final_men', 0)), _to_int(p_info.get('final_women', 0))
+
+    selected_vehicle = get('final_selected_vehicle')
+    qty_index = utils.build_item_qty_index(state_data)
+    baskets = {}
+    for display_name, item_names in BASKET_ITEM_NAMES:
+        found_name = next((name for name in item_names if name in qty_index), None)
+        baskets[display_name] = qty_index[found_name] if found_name else 0
+
+    cost_lines, cost_error = _cost_ledger(calculated_cost_items)
+    total = int(total_cost) if isinstance(total_cost, (int, float)) else 0
+    deposit = _to_int(get('deposit_amount', get('tab3_deposit_amount', 0)))
+    special_notes = str(get('special_notes', '') or '').strip()
+
+    return {
+        "revision": revision,
+        "state": state_data, # 매핑 표 등에서 개별 키를 직접 읽을 때 사용
+        "quote_date": utils.get_current_kst_time_str("%Y-%m-%d"),
+        "customer": {"name": get('customer_name'), "phone": get('customer_phone'), "email": get('customer_email')},
+        "move_type": get('base_move_type'),
+        "moving_date": moving_date,
+        "moving_date_str": moving_date_str,
+        "locations": {
+            "from": get('from_location'), "to": get('to_location'),
+            "from_floor": get('from_floor'), "to_floor": get('to_floor'),
+            "from_method": get('from_method'), "to_method": get('to_method'),
+            "sky_hours_from": get('sky_hours_from'), "sky_hours_to": get('sky_hours_final'),
+        },
+        "via_point": {"location": get('via_point_location'), "method": get('via_point_method')} if get('has_via_point', False) else None,
+        "storage": {"duration": get('storage_duration'), "type": get('storage_type'),
+                    "use_electricity": bool(get('storage_use_electricity', False))} if get('is_storage_move', False) else None,
+        "long_distance": {"selector": get('long_distance_selector')} if get('apply_long_distance', False) else None,
+        "waste": {"tons": get('waste_tons_input')} if get('has_waste_check', False) else None,
+        "date_options": [label for i, label in enumerate(DATE_OPTION_LABELS) if get(f"date_opt_{i}_widget", False)],
+        "payment": {"tax_invoice": bool(get("issue_tax_invoice", False)), "card": bool(get("card_payment", False))},
+        "personnel": {"men": men, "women": women,
+                      "text": f"남성 {men}명" + (f", 여성 {women}명" if women > 0 else "")},
+        "vehicle": {
+            "selected": selected_vehicle,
+            "tonnage": _vehicle_tonnage(selected_vehicle),
+            "tonnage_label": _vehicle_tonnage_label(selected_vehicle),
+            "recommended": get('recommended_vehicle_auto'),
+            "dispatched": [(label, _to_int(get(key, 0))) for label, key in DISPATCHED_VEHICLE_KEYS],
+        },
+        "total_volume": get('total_volume'),
+        "total_weight": get('total_weight'),
+        "qty_index": qty_index,
+        "items": _defined_item_quantities(get('base_move_type', ''), qty_index),
+        "baskets": baskets,
+        "cost_lines": cost_lines,
+        "customer_cost_lines": _customer_cost_lines(cost_lines, get('final_selected_vehicle', '')),
+        "cost_error": cost_error,
+        "total": total,
+        "deposit": deposit,
+        "balance": total - deposit,
+        "special_notes": special_notes,
+        "note_parts": [part.strip() for part in special_notes.split('.') if part.strip()],
+    }
+
+
+def summary_text_lines(report):
+    """
+    최종 견적 화면의 '이사 정보 요약' 문구를 줄 단위로 반환합니다 (배차 담당자에게 복사해 전달하는 형식).
+    비용은 기본 운임 -> 기타 -> 사다리/스카이 -> 부가세/카드 수수료 순 (0원 제외)
+    """
+    customer, locations, vehicle = report["customer"], report["locations"], report["vehicle"]
+    vehicle_text = vehicle["tonnage_label"] if vehicle["tonnage_label"] else vehicle["selected"]
+    men, women = report["personnel"]["men"], report["personnel"]["women"]
+    people_text = f"{men}+{women}명" if women > 0 else f"{men}명"
+    email = customer["email"] or ''
+    from_address = locations["from"] if locations["from"] is not None else '정보 없음'
+    to_address = locations["to"] if locations["to"] is not None else '정보 없음'
+
+    def _method_name(method):
+        method_str = str(method if method is not None else '').strip()
+        return method_str.split(" ")[0] if method_str else "정보 없음"
+
+    storage = report["storage"]
+    storage_details = ""
+    if storage:
+        storage_type = storage["type"] if storage["type"] is not None else '정보 없음'
+        storage_details = f"{storage_type} {'(전기사용)' if storage['use_electricity'] else ''}".strip()
+    payment_texts = []
+    if report["payment"]["tax_invoice"]: payment_texts.append("세금계산서 발행 요청")
+    if report["payment"]["card"]: payment_texts.append("카드 결제 예정")
+
+    first_line = f"{from_address if from_address else '출발지 정보 없음'} -> {to_address if to_address else '도착지 정보 없음'} {'(보관) ' if storage else ''}{vehicle_text}".strip()
+    if email and email != '-': first_line += f" {email}"
+    lines = [first_line]
+    if customer["name"]: lines.append(f"{customer['name']}")
+    if customer["phone"] and customer["phone"] != '-': lines.append(f"{customer['phone']}")
+    if email and email != '-': lines.append(email)
+    lines += ["", f"{vehicle_text} / {people_text}", "",
+              f"출발지: {_method_name(locations['from_method'])}", f"도착지: {_method_name(locations['to_method'])}"]
+    if report["via_point"]: lines.append(f"경유지: {_method_name(report['via_point']['method'])}")
+    lines += ["", f"계약금 {report['deposit']:,.0f}원 / 잔금 {report['balance']:,.0f}원"]
+    if payment_texts: lines.append(f"({' / '.join(payment_texts)})")
+    lines += ["", f"총 {report['total']:,.0f}원 중"]
+
+    shown = set()
+    base_line = report["cost_lines"].first(CostCode.BASE_FARE)
+    if base_line and base_line.amount != 0:
+        lines.append(f"이사비 {base_line.amount:,}")
+        shown.add(base_line.label)
+    cost_groups = [lambda code: code not in LIFT_COST_CODES + TAX_FEE_COST_CODES,
+                   lambda code: code in LIFT_COST_CODES,
+                   lambda code: code in TAX_FEE_COST_CODES]
+    for in_group in cost_groups:
+        for line in report["cost_lines"]:
+            if line.label not in shown and in_group(line.code) and line.amount != 0:
+                lines.append(f"{line.label} {line.amount:,}")
+                shown.add(line.label)
+    if not shown: lines.append(f"기타 비용 합계 {report['total']:,}" if report["total"] != 0 else "세부 비용 내역 없음")
+    lines.append("")
+
+    lines += ["출발지 주소:", from_address]
+    if storage and storage_details: lines.append(storage_details)
+    lines += ["", "도착지 주소:", to_address, ""]
+    if report["via_point"]:
+        via_location = report["via_point"]["location"]
+        lines += ["경유지 주소:", via_location if via_location is not None else '정보 없음', ""]
+    basket_parts = [f"{name} {qty}개" for name, qty in report["baskets"].items() if qty > 0]
+    lines += [", ".join(basket_parts) if basket_parts else "바구니 정보 없음", ""]
+    raw_notes = report["state"].get('special_notes', '')
+    if raw_notes and raw_notes.strip() and raw_notes != '-':
+        lines.append("요구사항:")
+        lines += [note_line.strip() for note_line in raw_notes.strip().replace('\r\n', '\n').split('\n')]
+    return lines
\ No newline at end of file
@@ -0,0 +1,187 @@
+# reminder_campaign.py
+# 이사 전날 안내 문자 캠페인: 이사일이 같은 저장된 견적을 모두 불러와 고객별 안내 문자를 만들고 발송 대기열에 등록합니다.
+# - 문자는 mms_utils의 'sms' 채널로 등록되고, 대기열 작업 스레드가 알리고 대량 발송(send_mass)으로 최대 500명씩 묶어 보냅니다.
+# - 캠페인 ID(reminder-<이사일>)가 대기열의 revision이므로 같은 날 캠페인을 다시 실행해도 같은 번호에는 한 번만 발송됩니다.
+# - 받는 사람별 진행 상태(대기/발송 중/완료/실패)는 발송 대기열에서 캠페인 ID로 조회합니다 (get_campaign_progress).
+# 잔금/인원/차량은 배차표와 같은 방식(dispatch_report.build_job_record)으로 다시 계산합니다.
+#
+# CLI: python reminder_campaign.py [2024-06-15] [--dry-run]
+#      (로컬 가짜 알리고 서버로 한 건씩 발송 vs 대량 발송 비교: python tests/bench_reminder.py 300)
+
+import argparse
+import sys
+import time
+import traceback
+from datetime import date, datetime, timedelta
+
+import pytz
+import dispatch_report
+import mms_utils
+import outbox
+import state_manager
+
+try:
+    import google_drive_helper as gdrive
+except ImportError as e:
+    print(f"Warning [REMINDER]: google_drive_helper 로드 실패. 저장된 견적을 불러올 수 없습니다. {e}")
+    gdrive = None
+
+REMINDER_TITLE = "[이삿날] 이사 안내"
+REMINDER_TEMPLATE = ("[이삿날] {customer_name}님, {moving_date} 이사 예정입니다.\n"
+                     "출발: {from_location}\n"
+                     "도착: {to_location}\n"
+                     "차량 {vehicle} / 작업 인원 {crew}명\n"
+                     "잔금: {balance}\n"
+                     "문의: {company_phone}")
+REMINDER_FIELDS = ("customer_name", "moving_date", "from_location", "to_location", "vehicle", "crew", "balance", "company_phone")
+COMPANY_PHONE = "1577-3101"
+_WEEKDAYS = "월화수목금토일"
+
+
+def _to_date(value):
+    if isinstance(value, datetime): return value.date()
+    if isinstance(value, date): return value
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def campaign_id_for(moving_date):
+    """이사일별 안내 문자 캠페인 ID (발송 대기열 revision, 같은 날 같은 번호 중복 발송 방지)"""
+    return f"reminder-{_to_date(moving_date).isoformat()}"
+
+
+def default_moving_date():
+    """기본 대상 이사일: 한국 시간 기준 내일"""
+    try: today = datetime.now(pytz.timezone("Asia/Seoul")).date()
+    except Exception: today = date.today()
+    return today + timedelta(days=1)
+
+
+def validate_template(template):
+    """문자 형식에 알 수 없는 항목({...})이 있으면 ValueError"""
+    try:
+        template.format_map({field: "" for field in REMINDER_FIELDS})
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"안내 문자 형식 오류: {e} (사용 가능: {', '.join('{' + f + '}' for f in REMINDER_FIELDS)})") from e
+
+
+def render_reminder(state_data, template=REMINDER_TEMPLATE):
+    """견적 상태 하나로 안내 문자 본문을 만듭니다. 비용 계산 오류면 ValueError"""
+    job = dispatch_report.build_job_record(state_data)
+    moving_date = _to_date(state_data.get('moving_date'))
+    fields = {
+        "customer_name": (state_data.get('customer_name') or "고객").strip(),
+        "moving_date": f"{moving_date.month}월 {moving_date.day}일({_WEEKDAYS[moving_date.weekday()]})",
+        "from_location": (state_data.get('from_location') or "").strip(),
+        "to_location": (state_data.get('to_location') or "").strip(),
+        "vehicle": job['vehicle'] or "미정",
+        "crew": job['men'] + job['women'],
+        "balance": f"{job['balance']:,}원",
+        "company_phone": COMPANY_PHONE,
+    }
+    return template.format_map(fields)
+
+
+def _iter_quote_states(moving_date, root_folder_id):
+    """인덱스로 고른 견적을 (파일명, 상태 또는 None, 오류) 순서로 불러옵니다. 이사일이 인덱스에 없던 후보는 불러온 내용으로 다시 확인합니다."""
+    target_date = moving_date.isoformat()
+    for entry, saved_data in gdrive.iter_loaded_quotes(gdrive.find_quotes_by_moving_date(moving_date, root_folder_id=root_folder_id)):
+        if saved_data is None:
+            yield entry["name"], None, "견적 불러오기 실패"
+            continue
+        if not entry["verified"] and str(saved_data.get("moving_date") or "")[:10] != target_date:
+            continue
+        try:
+            yield entry["name"], state_manager.build_quote_state(saved_data), None
+        except Exception as e:
+            traceback.print_exc()
+            yield entry["name"], None, f"견적 변환 실패: {e}"
+
+
+def queue_reminders(quote_states, campaign_id, template=REMINDER_TEMPLATE, title=REMINDER_TITLE, dry_run=False):
+    """
+    quote_states: (파일명, 견적 상태 또는 None, 오류 메시지) iterable.
+    고객별 안내 문자를 모두 만든 뒤 발송 대기열에 campaign_id로 한 번에 등록합니다 (dry_run이면 문자만 만들고 등록하지 않음).
+    반환: {'campaign', 'selected', 'queued', 'duplicates', 'skipped': [{'name', 'error'}], 'previews': 처음 3건, 'elapsed_sec'}
+    """
+    validate_template(template)
+    started = time.perf_counter()
+    report = {"campaign": campaign_id, "selected": 0, "queued": 0, "duplicates": 0, "skipped": [], "previews": []}
+    messages = []
+    for source_name, state_data, error in quote_states:
+        report["selected"] += 1
+        if error is None:
+            phone = mms_utils.normalize_phone_number(state_data.get('customer_phone'))
+            if not phone or len(phone) < 10:
+                error = f"전화번호 없음/형식 오류: {state_data.get('customer_phone') or ''}"
+        if error is None:
+            try:
+                messages.append({"recipient": phone, "text": render_reminder(state_data, template)})
+            except Exception as e:
+                error = str(e)
+        if error is not None:
+            report["skipped"].append({"name": source_name, "error": error})
+    report["previews"] = messages[:3]
+
+    if dry_run:
+        report["queued"] = len(messages)
+    elif messages:
+        entries = mms_utils.queue_texts(messages, title=title, revision=campaign_id)
+        report["duplicates"] = sum(1 for entry in entries if entry["duplicate"])
+        report["queued"] = len(entries) - report["duplicates"]
+    report["elapsed_sec"] = round(time.perf_counter() - started, 2)
+    return report
+
+
+def start_reminder_campaign(moving_date=None, template=REMINDER_TEMPLATE, title=REMINDER_TITLE, root_folder_id=None, dry_run=False):
+    """
+    이사일이 moving_date(기본: 내일)인 저장된 견적 고객에게 안내 문자를 보냅니다 (발송 대기열에 등록).
+    반환: queue_reminders의 보고 딕셔너리 (+ moving_date)
+    """
+    if gdrive is None:
+        raise RuntimeError("google_drive_helper를 불러오지 못해 저장된 견적을 조회할 수 없습니다.")
+    moving_date = _to_date(moving_date) if moving_date else default_moving_date()
+    root_folder_id = root_folder_id or gdrive.get_root_folder_id()
+    report = queue_reminders(_iter_quote_states(moving_date, root_folder_id), campaign_id_for(moving_date),
+                             template=template, title=title, dry_run=dry_run)
+    report["moving_date"] = moving_date.isoformat()
+    print(f"INFO [REMINDER]: {report['campaign']} - {report['queued']} queued, {report['duplicates']} already queued, "
+          f"{len(report['skipped'])} skipped of {report['selected']} quotes{' (dry run)' if dry_run else ''}")
+    return report
+
+
+def get_campaign_progress(campaign_id, limit=2000):
+    """캠페인의 받는 사람별 발송 상태. 반환: {'total', 'pending', 'sending', 'sent', 'failed', 'recipients': [대기열 항목]}"""
+    status_counts = outbox.get_summary(revision=campaign_id).get("sms", {})
+    progress = {status: status_counts.get(status, 0) for status in outbox.STATUS_LABELS}
+    progress["total"] = sum(status_counts.values())
+    progress["recipients"] = outbox.list_entries(limit, revision=campaign_id)
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="이사 전날 안내 문자 발송 (알리고 대량 발송)")
+    parser.add_argument("moving_date", nargs="?", help="이사일 (YYYY-MM-DD, 기본: 내일)")
+    parser.add_argument("--dry-run", action="store_true", help="문자만 만들어 보고 발송 대기열에는 등록하지 않음")
+    parser.add_argument("--root-folder-id", default=None, help="견적 저장 Drive 폴더 ID (기본: secrets의 drive_folder_id)")
+    args = parser.parse_args(argv)
+
+    try:
+        moving_date = _to_date(args.moving_date) if args.moving_date else default_moving_date()
+    except ValueError:
+        parser.error(f"이사일 형식이 올바르지 않습니다: {args.moving_date}")
+    report = start_reminder_campaign(moving_date, root_folder_id=args.root_folder_id, dry_run=args.dry_run)
+    for preview in report["previews"]:
+        print(f"--- {preview['recipient']}\n{preview['text']}")
+    for skipped in report["skipped"]:
+        print(f"  제외: {skipped['name']} - {skipped['error']}")
+    if not args.dry_run:
+        outbox.start_workers()
+        outbox.wait_until_drained(timeout=120)
+        progress = get_campaign_progress(report["campaign"])
+        print(f"발송 완료 {progress['sent']}건, 실패 {progress['failed']}건, 대기 {progress['pending']}건")
+        return 0 if not progress["failed"] and not progress["pending"] else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -186,31 +186,39 @@ def initialize_session_state(update_basket_callback=None):
         update_basket_callback()
 
 
-def prepare_state_for_save():
-    state_to_save = {}
-    keys_to_exclude = {
-        "_app_initialized", "base_move_type_widget_tab1", "base_move_type_widget_tab3",
-        "gdrive_selected_filename_widget", "pdf_data_customer", "final_excel_data",
-        "gdrive_search_results", "gdrive_file_options_map",
-        # UI-specific input fields that are mapped to tab3_ counterparts for saving
-        "deposit_amount", "adjustment_amount", "regional_ladder_surcharge",
-        # via_point_surcharge is directly saved via STATE_KEYS_TO_SAVE
-        "date_opt_0_widget", "date_opt_1_widget", "date_opt_2_widget",
-        "date_opt_3_widget", "date_opt_4_widget",
+_SAVE_KEYS_TO_EXCLUDE = {
+    "_app_initialized", "base_move_type_widget_tab1", "base_move_type_widget_tab3",
+    "gdrive_selected_filename_widget", "pdf_data_customer", "final_excel_data",
+    "gdrive_search_results", "gdrive_file_options_map",
+    # UI-specific input fields that are mapped to tab3_ counterparts for saving
+    "deposit_amount", "adjustment_amount", "regional_ladder_surcharge",
+    # via_point_surcharge is directly saved via STATE_KEYS_TO_SAVE
+    "date_opt_0_widget", "date_opt_1_widget", "date_opt_2_widget",
+    "date_opt_3_widget", "date_opt_4_widget",
+}
+
+def _ui_to_save_key_values(state):
+    """UI 입력 키 -> 저장용 tab3_ 키 매핑 값"""
+    mapped = {
+        "tab3_deposit_amount": state.get("deposit_amount", 0),
+        "tab3_adjustment_amount": state.get("adjustment_amount", 0),
+        "tab3_regional_ladder_surcharge": state.get("regional_ladder_surcharge", 0),
     }
-    # Ensure mapping from UI keys to saveable keys
-    st.session_state.tab3_deposit_amount = st.session_state.get("deposit_amount", 0)
-    st.session_state.tab3_adjustment_amount = st.session_state.get("adjustment_amount", 0)
-    st.session_state.tab3_regional_ladder_surcharge = st.session_state.get("regional_ladder_surcharge", 0)
     for i in range(5):
-        st.session_state[f"tab3_date_opt_{i}_widget"] = st.session_state.get(f"date_opt_{i}_widget", False)
+        mapped[f"tab3_date_opt_{i}_widget"] = state.get(f"date_opt_{i}_widget", False)
+    return mapped
+
+def _saveable_state(state):
+    """state(세션 상태 등 매핑)에서 저장 대상 데이터를 만듭니다. state는 읽기만 합니다 (UI 키 매핑은 결과에만 반영)."""
+    state_to_save = {}
+    mapped = _ui_to_save_key_values(state)
 
     # Use the global STATE_KEYS_TO_SAVE which now includes dynamic item keys
-    actual_keys_to_save = [key for key in STATE_KEYS_TO_SAVE if key not in keys_to_exclude]
+    actual_keys_to_save = [key for key in STATE_KEYS_TO_SAVE if key not in _SAVE_KEYS_TO_EXCLUDE]
 
     for key in actual_keys_to_save:
-        if key in st.session_state:
-            value = st.session_state[key]
+        if key in mapped or key in state:
+            value = mapped[key] if key in mapped else state[key]
             if isinstance(value, date):
                 try: state_to_save[key] = value.isoformat()
                 except Exception: print(f"Warning: Could not serialize date key '{key}' for saving.")
@@ -221,14 +229,62 @@ def prepare_state_for_save():
                  except Exception: print(f"Warning: Skipping non-serializable key '{key}' of type {type(value)} during save.")
     # Ensure uploaded_image_paths is always a list, even if empty
     if "uploaded_image_paths" not in state_to_save or not isinstance(state_to_save.get("uploaded_image_paths"), list):
-        state_to_save["uploaded_image_paths"] = st.session_state.get("uploaded_image_paths", [])
+        state_to_save["uploaded_image_paths"] = state.get("uploaded_image_paths", [])
     return state_to_save
 
-def load_state_from_data(loaded_data, update_basket_callback):
-    if not isinstance(loaded_data, dict):
-        st.error("잘못된 형식의 파일입니다 (딕셔셔리가 아님).")
-        return False
+def prepare_state_for_save():
+    # Ensure mapping from UI keys to saveable keys (저장 시에는 세션의 tab3_ 키도 함께 맞춤)
+    st.session_state.update(_ui_to_save_key_values(st.session_state))
+    return _saveable_state(st.session_state)
 
+def compute_current_content_hash():
+    """현재 세션의 저장 대상 데이터로 내용 해시를 계산합니다 (Drive 저장 시와 같은 정규화 방식).
+    저장 상태 표시에서 매번 호출되므로 session_state에 아무것도 쓰지 않습니다."""
+    return utils.compute_content_hash(_saveable_state(st.session_state))
+
+def mark_state_saved(content_hash=None):
+    """현재 상태(또는 주어진 해시)를 마지막 저장/불러오기 기준으로 기록합니다."""
+    st.session_state.gdrive_saved_content_hash = content_hash or compute_current_content_hash()
+
+def has_unsaved_changes():
+    """마지막 저장/불러오기 이후 저장 대상 데이터가 바뀌었는지 반환합니다. 기준이 없으면 None."""
+    saved_hash = st.session_state.get("gdrive_saved_content_hash")
+    if not saved_hash: return None
+    return compute_current_content_hash() != saved_hash
+
+def diff_quote_states(base_data, local_data, remote_data):
+    """
+    불러올 때의 내용(base), 현재 세션(local), 서버 최신본(remote)을 필드 단위로 비교합니다.
+    local과 remote 값이 다른 필드만 반환하며, 양쪽 모두 base에서 바뀐 필드는 '충돌'로 표시합니다.
+    """
+    base_data, local_data, remote_data = base_data or {}, local_data or {}, remote_data or {}
+    rows = []
+    for key in sorted(set(local_data) | set(remote_data)):
+        base_val, local_val, remote_val = base_data.get(key), local_data.get(key), remote_data.get(key)
+        if local_val == remote_val: continue
+        local_changed, remote_changed = local_val != base_val, remote_val != base_val
+        if local_changed and remote_changed: status = "충돌"
+        elif remote_changed: status = "서버 변경"
+        else: status = "내 변경"
+        rows.append({"필드": key, "불러올 때": base_val, "내 값": local_val, "서버 값": remote_val, "상태": status})
+    return rows
+
+def merge_remote_changes(base_data, local_data, remote_data):
+    """내가 바꾸지 않은 필드는 서버 값을, 내가 바꾼 필드(충돌 포함)는 내 값을 사용해 병합합니다."""
+    base_data, local_data, remote_data = base_data or {}, local_data or {}, remote_data or {}
+    merged = dict(remote_data)
+    for key, local_val in local_data.items():
+        if key not in base_data or local_val != base_data.get(key):
+            merged[key] = local_val
+    return merged
+
+def coerce_loaded_data(loaded_data):
+    """
+    저장된 견적 딕셔너리를 세션 상태와 같은 형태의 새 딕셔너리로 변환합니다
+    (날짜/숫자/불리언 변환, 누락 키 기본값, tab3_ 저장 키 -> UI 키 동기화).
+    session_state를 사용하지 않으므로 일괄 PDF 생성 작업자 프로세스 등 UI 밖에서도 호출할 수 있습니다.
+    """
+    state = {}
     try: kst = pytz.timezone("Asia/Seoul"); default_date = datetime.now(kst).date()
     except Exception: default_date = datetime.now().date()
     current_move_type_options = globals().get("MOVE_TYPE_OPTIONS")
@@ -302,27 +358,52 @@ def load_state_from_data(loaded_data, update_basket_callback):
                     target_value = value if isinstance(value, list) else defaults_for_recovery.get(key, [])
                 else: # For other types like string, directly assign or use default
                     target_value = value if value is not None else defaults_for_recovery.get(key, "")
-                st.session_state[key] = target_value
+                state[key] = target_value
             except (ValueError, TypeError):
-                st.session_state[key] = defaults_for_recovery.get(key) # Fallback to default on error
+                state[key] = defaults_for_recovery.get(key) # Fallback to default on error
         else: # Key not in loaded_data, set to default
-            st.session_state[key] = defaults_for_recovery.get(key)
+            state[key] = defaults_for_recovery.get(key)
 
     # Sync UI-specific keys from loaded 'tab3_' counterparts
-    st.session_state.deposit_amount = st.session_state.get("tab3_deposit_amount", 0)
-    st.session_state.adjustment_amount = st.session_state.get("tab3_adjustment_amount", 0)
-    st.session_state.regional_ladder_surcharge = st.session_state.get("tab3_regional_ladder_surcharge", 0)
+    state["deposit_amount"] = state.get("tab3_deposit_amount", 0)
+    state["adjustment_amount"] = state.get("tab3_adjustment_amount", 0)
+    state["regional_ladder_surcharge"] = state.get("tab3_regional_ladder_surcharge", 0)
     for i in range(5):
-        st.session_state[f"date_opt_{i}_widget"] = st.session_state.get(f"tab3_date_opt_{i}_widget", False)
+        state[f"date_opt_{i}_widget"] = state.get(f"tab3_date_opt_{i}_widget", False)
 
     # Sync base_move_type with tab-specific widgets
-    if "base_move_type" in st.session_state:
-        st.session_state.base_move_type_widget_tab1 = st.session_state.base_move_type
-        st.session_state.base_move_type_widget_tab3 = st.session_state.base_move_type
+    if "base_move_type" in state:
+        state["base_move_type_widget_tab1"] = state["base_move_type"]
+        state["base_move_type_widget_tab3"] = state["base_move_type"]
 
     # Ensure uploaded_image_paths is correctly initialized as a list
-    if "uploaded_image_paths" not in st.session_state or not isinstance(st.session_state.uploaded_image_paths, list):
-        st.session_state.uploaded_image_paths = []
+    if not isinstance(state.get("uploaded_image_paths"), list):
+        state["uploaded_image_paths"] = []
+    return state
+
+def build_quote_state(saved_data):
+    """
+    저장된 견적 JSON을 견적 탭(tab3)에서 비용/PDF를 계산할 때와 같은 상태 딕셔너리로 만듭니다.
+    (타입 변환/기본값, 총 부피·무게 및 추천 차량, 보관 이사 기간) 일괄 PDF/배차표 등 세션 밖 작업에서 사용합니다.
+    """
+    import calculations # calculations는 data만 사용하므로 순환 참조 없음
+    state_data = coerce_loaded_data(saved_data)
+    move_type = state_data.get("base_move_type")
+    volume, weight = calculations.calculate_total_volume_weight(state_data, move_type)
+    recommended_vehicle, _ = calculations.recommend_vehicle(volume, weight, move_type)
+    state_data.update({"total_volume": volume, "total_weight": weight, "recommended_vehicle_auto": recommended_vehicle})
+    if state_data.get("is_storage_move"):
+        m_dt, a_dt = state_data.get("moving_date"), state_data.get("arrival_date")
+        state_data["storage_duration"] = max(1, (a_dt - m_dt).days + 1) if isinstance(m_dt, date) and isinstance(a_dt, date) and a_dt >= m_dt else 1
+    return state_data
+
+def load_state_from_data(loaded_data, update_basket_callback):
+    if not isinstance(loaded_data, dict):
+        st.error("잘못된 형식의 파일입니다 (딕셔셔리가 아님).")
+        return False
+
+    for key, value in coerce_loaded_data(loaded_data).items():
+        st.session_state[key] = value
 
     if callable(update_basket_callback):
         update_basket_callback()
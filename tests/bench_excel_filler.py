@@ -0,0 +1,39 @@
+# tests/bench_excel_filler.py
+# final.xlsx 채우기: 시트 XML 패치 방식과 openpyxl 방식의 생성 시간을 비교합니다 (결과 동일성은 test_excel_filler.py).
+#   python tests/bench_excel_filler.py [반복 횟수]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import calculations # noqa: E402
+import excel_filler # noqa: E402
+import quote_report # noqa: E402
+from test_excel_filler import SAMPLE_STATE # noqa: E402
+
+REPEAT = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+
+def run(repeat):
+    total, items, personnel = calculations.calculate_total_moving_cost(SAMPLE_STATE)
+    cell_values = excel_filler._build_cell_values(quote_report.build_quote_report(SAMPLE_STATE, items, total, personnel))
+    excel_filler._write_with_xml_patch(cell_values) # 템플릿 분석 포함 첫 실행
+
+    timings = {}
+    for name, writer in (("xml_patch", excel_filler._write_with_xml_patch), ("openpyxl", excel_filler._write_with_openpyxl)):
+        started = time.perf_counter()
+        for _ in range(repeat): writer(cell_values)
+        timings[name] = (time.perf_counter() - started) / repeat * 1000
+    return {
+        "repeat": repeat,
+        "xml_patch_ms": round(timings["xml_patch"], 2),
+        "openpyxl_ms": round(timings["openpyxl"], 2),
+        "speedup": round(timings["openpyxl"] / timings["xml_patch"], 1) if timings["xml_patch"] else None,
+    }
+
+
+if __name__ == "__main__":
+    for key, value in run(REPEAT).items():
+        print(f"  {key:20s} {value}")
\ No newline at end of file
@@ -0,0 +1,47 @@
+# tests/bench_excel_summary.py
+# 품목 40개짜리 가상 견적으로 여러 견적 합산 요약(write_quotes_summary_excel)을 만들어
+# 소요 시간과 파이썬 메모리 최대 사용량(tracemalloc)을 잽니다. tracemalloc을 켜면 느려지므로 시간은 따로 잽니다.
+#   python tests/bench_excel_summary.py [견적 수 (기본 2500 = 10만 품목 행)]
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data # noqa: E402
+import excel_summary_generator # noqa: E402
+
+QUOTE_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 2500
+
+
+def synthetic_quotes(quote_count):
+    move_type = list(data.item_definitions.keys())[0]
+    qty_keys = [f"qty_{move_type}_{section}_{item_name}" for section, item_list in data.item_definitions[move_type].items()
+                if section != excel_summary_generator._WASTE_SECTION and isinstance(item_list, list)
+                for item_name in item_list if item_name in data.items]
+    for quote_idx in range(quote_count):
+        state_data = {"base_move_type": move_type, "customer_name": f"고객{quote_idx:05d}", "customer_phone": f"010{quote_idx:08d}",
+                      "moving_date": "2024-06-15", "from_location": "서울 은평구 진관동", "to_location": "경기 고양시 덕양구",
+                      "total_volume": 12.5, "total_weight": 1800.0}
+        state_data.update({key: 1 + (quote_idx + key_idx) % 3 for key_idx, key in enumerate(qty_keys[:40])})
+        yield state_data, 1_250_000 + quote_idx
+
+
+def run(quote_count, trace_memory=False):
+    output_path = os.path.join(tempfile.gettempdir(), "quotes_summary_benchmark.xlsx")
+    if trace_memory: tracemalloc.start()
+    try:
+        result = excel_summary_generator.write_quotes_summary_excel(synthetic_quotes(quote_count), output_path)
+        if trace_memory: result["peak_python_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+    finally:
+        if trace_memory: tracemalloc.stop()
+    result["xlsx_bytes"] = os.path.getsize(output_path)
+    return result
+
+
+if __name__ == "__main__":
+    for trace_memory in (False, True):
+        print("memory" if trace_memory else "time")
+        for key, value in run(QUOTE_COUNT, trace_memory).items():
+            print(f"  {key:20s} {value}")
\ No newline at end of file
@@ -0,0 +1,98 @@
+# tests/bench_outbox.py
+# 로컬 대역 서버(fake_servers.py의 SMTP, 알리고 형식 게이트웨이)로 발송 대기열 처리량과 대기 시간을 잽니다.
+#   python tests/bench_outbox.py [메시지 수] [게이트웨이 응답 지연 ms]
+# - direct_*_ms: 버튼 처리 중에 바로 보낼 때 한 건당 시간 (이메일은 매번 새 연결/로그인)
+# - enqueue_ms: 대기열 등록 한 건당 시간 (버튼 처리 중에 드는 시간)
+# - throughput_per_sec, latency_p50/p95_ms: 한꺼번에 등록할 때 처리량, 등록부터 발송 완료까지 시간
+# - idle_latency_ms: 대기열이 비어 있을 때 한 건 등록부터 발송 완료까지 시간
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import closing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import email_utils # noqa: E402 (email 채널 등록)
+import mms_utils # noqa: E402 (mms 채널 등록)
+import outbox # noqa: E402
+from fake_servers import fake_aligo_gateway, local_smtp_server # noqa: E402
+from PIL import Image # noqa: E402
+
+MESSAGE_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+GATEWAY_DELAY_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+
+def sent_latency_ms(entry_id):
+    with closing(outbox._connect()) as conn:
+        row = conn.execute("SELECT created_at, sent_at FROM outbox WHERE id = ?", (entry_id,)).fetchone()
+    return (row["sent_at"] - row["created_at"]) * 1000
+
+
+def run(message_count, workers=outbox.OUTBOX_WORKERS):
+    image_buffer = io.BytesIO()
+    Image.new("RGB", (600, 800), "white").save(image_buffer, "JPEG", quality=80)
+    image_bytes, pdf_bytes = image_buffer.getvalue(), b"%PDF-1.4 " + os.urandom(60 * 1024)
+
+    with local_smtp_server() as smtp, fake_aligo_gateway(delay_ms=GATEWAY_DELAY_MS) as gateway:
+        outbox.configure(os.path.join(tempfile.mkdtemp(prefix="outbox_bench_"), "outbox.sqlite3"))
+        outbox.set_channel_settings("email", smtp.settings)
+        outbox.set_channel_settings("mms", gateway.creds)
+        try:
+            direct_count = min(10, message_count)
+            started = time.perf_counter()
+            for i in range(direct_count):
+                email_utils.close_pool() # 대기열 이전 방식: 메일마다 새 연결
+                email_utils.send_quote_email_now(f"direct{i}@example.com", "견적서", "본문", pdf_bytes, settings=smtp.settings)
+            direct_email_ms = (time.perf_counter() - started) * 1000 / direct_count
+            started = time.perf_counter()
+            for i in range(direct_count):
+                mms_utils.deliver_mms(f"0101234{i:04d}", image_bytes, creds=gateway.creds)
+            direct_mms_ms = (time.perf_counter() - started) * 1000 / direct_count
+
+            outbox.start_workers(workers)
+            enqueue_times, entry_ids = [], []
+            started = time.perf_counter()
+            for i in range(message_count):
+                enqueue_started = time.perf_counter()
+                entry_ids.append(outbox.enqueue("email", f"customer{i}@example.com", {"subject": "견적서", "body": "본문", "pdf_filename": "견적서.pdf"},
+                                                attachment=pdf_bytes, revision=f"rev{i}")["id"])
+                entry_ids.append(outbox.enqueue("mms", f"0105555{i:04d}", {"filename": "견적서.jpg", "text_message": "견적서입니다."},
+                                                attachment=image_bytes, revision=f"rev{i}")["id"])
+                enqueue_times.append((time.perf_counter() - enqueue_started) * 1000 / 2)
+            drained = outbox.wait_until_drained(timeout=300)
+            drain_sec = time.perf_counter() - started
+            latencies = [sent_latency_ms(entry_id) for entry_id in entry_ids]
+
+            idle_latencies = [] # 대기열이 비어 있을 때 한 건 (평소 버튼 클릭)
+            for i in range(5):
+                entry = outbox.enqueue("email", f"single{i}@example.com", {"subject": "견적서", "body": "본문"}, attachment=pdf_bytes, revision=f"single{i}")
+                outbox.wait_until_drained(timeout=30)
+                idle_latencies.append(sent_latency_ms(entry["id"]))
+            outbox.stop_workers()
+            return {
+                "messages": message_count * 2, "workers": workers, "drained": drained,
+                "direct_email_ms": round(direct_email_ms, 1), "direct_mms_ms": round(direct_mms_ms, 1),
+                "enqueue_ms": round(statistics.mean(enqueue_times), 2),
+                "throughput_per_sec": round(message_count * 2 / drain_sec, 1),
+                "latency_p50_ms": round(statistics.median(latencies), 1),
+                "latency_p95_ms": round(statistics.quantiles(latencies, n=20)[-1], 1) if len(latencies) > 1 else None,
+                "idle_latency_ms": round(statistics.median(idle_latencies), 1),
+                "summary": outbox.get_summary(), "pool": email_utils.get_pool_stats(),
+            }
+        finally:
+            outbox.stop_workers()
+            email_utils.close_pool()
+            mms_utils.close_session()
+            outbox.set_channel_settings("email", None)
+            outbox.set_channel_settings("mms", None)
+            outbox.configure(None)
+
+
+if __name__ == "__main__":
+    print(f"gateway delay {GATEWAY_DELAY_MS:.0f} ms")
+    for key, value in run(MESSAGE_COUNT).items():
+        print(f"  {key:20s} {value}")
\ No newline at end of file
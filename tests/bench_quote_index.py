@@ -0,0 +1,124 @@
+# tests/bench_quote_index.py
+# 가짜 Drive(fake_drive.py)에 견적 10만 건을 만들어, 평면 폴더(기존 방식)와 월 파티션 + 인덱스(delta) 방식의
+# 검색/목록/저장 비용을 요청 수, 전송 바이트, 그리고 아래 지연 모델로 환산한 시간으로 비교합니다.
+#   python tests/bench_quote_index.py [견적 수] [요청당 왕복 ms]
+# 지연 모델: 요청당 왕복 RTT + 업로드 1 MB/s + 다운로드 10 MB/s. Drive 서버 내부의 검색 비용은 포함하지 않습니다.
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import google_drive_helper as gdrive # noqa: E402
+from fake_drive import FakeDriveService, fake_http # noqa: E402
+
+QUOTE_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+RTT_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 100.0
+UPLOAD_BYTES_PER_MS = 1_000_000 / 1000
+DOWNLOAD_BYTES_PER_MS = 10_000_000 / 1000
+QUOTE_JSON = json.dumps({"customer_name": "홍길동", "moving_date": "2024-05-01", "special_notes": "x" * 2000}, ensure_ascii=False).encode("utf-8")
+
+
+def use_drive(drive):
+    gdrive.get_drive_service = gdrive._build_drive_service = lambda: drive
+    gdrive.googleapiclient_http = fake_http
+
+
+def new_process():
+    """프로세스 내 캐시를 비워 새 프로세스(다른 서버 인스턴스)를 흉내 냅니다."""
+    for name in ("_quote_index_cache", "_folder_id_cache", "_last_saved_hashes", "_archive_bundle_cache"):
+        setattr(gdrive, name, {})
+
+
+def measure(drive, label, action):
+    drive.reset_stats()
+    started = time.perf_counter()
+    result = action()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    requests = sum(drive.calls.values())
+    modeled_ms = requests * RTT_MS + drive.bytes_up / UPLOAD_BYTES_PER_MS + drive.bytes_down / DOWNLOAD_BYTES_PER_MS
+    print(f"  {label:52s} requests {requests:5d}  up {drive.bytes_up / 1e6:7.2f} MB  down {drive.bytes_down / 1e6:7.2f} MB"
+          f"  modeled {modeled_ms:9.0f} ms  (in-process {elapsed_ms:7.1f} ms)")
+    return result
+
+
+def phones(count):
+    rng = random.Random(26)
+    return [f"010{number:08d}" for number in rng.sample(range(100_000_000), count)]
+
+
+def moving_date(i):
+    return f"{2023 + (i % 24) // 12}-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}"
+
+
+def bench_flat(phone_list):
+    """기존 방식: 모든 견적이 루트 폴더에 평면으로 저장되고, 검색은 'name contains' 목록 조회."""
+    drive = FakeDriveService()
+    use_drive(drive)
+    new_process()
+    for phone in phone_list:
+        drive.add_file(f"{phone}.json", b"{}", mime_type="application/json")
+    target = phone_list[QUOTE_COUNT // 2]
+    print(f"flat folder ({QUOTE_COUNT:,} files, before)")
+    measure(drive, "search by last 4 digits", lambda: gdrive.find_files_by_name_contains(target[-4:], mime_types="application/json", folder_id="root"))
+    measure(drive, "list whole folder", lambda: gdrive.find_files_by_name_contains("", folder_id="root"))
+    measure(drive, "save existing quote (find by name + update)",
+            lambda: gdrive._upload_bytes(f"{target}.json", QUOTE_JSON, "application/json",
+                                         existing_file_id=gdrive.find_file_id_by_exact_name(f"{target}.json", folder_id="root")))
+
+
+def bench_partitioned(phone_list):
+    """새 방식: 월 파티션 + 인덱스 파일 + 저장마다 delta 하나."""
+    drive = FakeDriveService()
+    use_drive(drive)
+    new_process()
+    quotes = {}
+    folders = {}
+    for i, phone in enumerate(phone_list):
+        partition = gdrive.month_partition_name(moving_date(i))
+        if partition not in folders:
+            folders[partition] = drive.add_file(partition, mime_type=gdrive.FOLDER_MIME_TYPE)["id"]
+        file = drive.add_file(f"{phone}.json", b"{}", parent=folders[partition], mime_type="application/json")
+        quotes[phone] = {"file_id": file["id"], "folder_id": folders[partition], "partition": partition,
+                         "moving_date": moving_date(i), "customer_name": "홍길동"}
+    payload = json.dumps({"version": 1, "quotes": quotes}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    compressed = gzip.compress(json.dumps({"version": 2, "quotes": quotes, "folded_deltas": []}, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    drive.add_file(gdrive.QUOTE_INDEX_FILE_NAME, compressed, mime_type="application/gzip")
+    target = phone_list[QUOTE_COUNT // 2]
+    print(f"month partitions + index ({QUOTE_COUNT:,} quotes, {len(folders)} partitions, "
+          f"index file {len(compressed) / 1e6:.1f} MB gzip / {len(payload) / 1e6:.1f} MB JSON, after)")
+
+    measure(drive, "cold start: load index (once per process)", lambda: gdrive.load_quote_index())
+    measure(drive, "search by last 4 digits (warm)", lambda: gdrive.search_quotes(target[-4:]))
+    partition = quotes[target]["partition"]
+    measure(drive, f"list one month partition ({partition})", lambda: list(gdrive._iter_folder_files(folders[partition], drive)))
+    gdrive.save_quote_json(target, {"customer_name": "홍길동", "moving_date": quotes[target]["moving_date"]}) # 해시 캐시 준비
+    measure(drive, "save changed quote, same month (no index write)",
+            lambda: gdrive.save_quote_json(target, {"customer_name": "홍길동", "moving_date": quotes[target]["moving_date"], "memo": "1"}))
+    moved = measure(drive, "save quote whose moving month changed (+1 delta)",
+                    lambda: gdrive.save_quote_json(target, {"customer_name": "홍길동", "moving_date": "2030-01-05", "memo": "2"}))
+    assert moved["status"] == "updated"
+    print(f"  {'(user-026 as first committed: + full index upload)':52s} requests +1     up {len(payload) / 1e6:7.2f} MB"
+          f"                  modeled +{RTT_MS + len(payload) / UPLOAD_BYTES_PER_MS:8.0f} ms per index change")
+
+    cached = gdrive._quote_index_cache[gdrive._root_key(None)]
+    cached["checked_at"] -= gdrive.QUOTE_INDEX_REFRESH_SECONDS
+    measure(drive, "periodic refresh (sees other processes' deltas)", lambda: gdrive.load_quote_index())
+
+    for i in range(gdrive.QUOTE_INDEX_COMPACT_AFTER_DELTAS):
+        gdrive._record_index_entry(None, phone_list[i], dict(quotes[phone_list[i]], customer_name=f"고객{i}"))
+    measure(drive, f"compaction of {gdrive.QUOTE_INDEX_COMPACT_AFTER_DELTAS} deltas (archiver thread)", lambda: gdrive.compact_quote_index())
+    new_process()
+    assert gdrive.load_quote_index()[phone_list[3]]["customer_name"] == "고객3"
+
+
+if __name__ == "__main__":
+    phone_list = phones(QUOTE_COUNT)
+    print(f"latency model: {RTT_MS:.0f} ms per request, upload 1 MB/s, download 10 MB/s\n")
+    bench_flat(phone_list)
+    print()
+    bench_partitioned(phone_list)
\ No newline at end of file
@@ -0,0 +1,75 @@
+# tests/bench_reminder.py
+# 로컬 가짜 알리고 게이트웨이(fake_servers.py)로 이사 전날 안내 문자를 한 건씩 보낼 때와 대량 발송(send_mass)으로 보낼 때를 비교하고,
+# 발송 대기열을 거친 캠페인(등록 -> 작업 스레드 대량 발송 -> 받는 사람별 상태) 시간을 잽니다.
+#   python tests/bench_reminder.py [받는 사람 수] [게이트웨이 응답 지연 ms]
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import mms_utils # noqa: E402
+import outbox # noqa: E402
+import reminder_campaign # noqa: E402
+import state_manager # noqa: E402
+from fake_servers import fake_aligo_gateway # noqa: E402
+
+RECIPIENT_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+GATEWAY_DELAY_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+
+def quote_states(recipient_count, moving_date):
+    return [(f"quote_{i}.json", state_manager.build_quote_state({
+        "customer_name": f"고객{i}", "customer_phone": f"010{10000000 + i:08d}", "moving_date": moving_date.isoformat(),
+        "from_location": "서울 은평구 가좌로 10", "to_location": "경기 고양시 덕양구", "final_selected_vehicle": "5톤",
+        "tab3_deposit_amount": 100000}), None) for i in range(recipient_count)]
+
+
+def run(recipient_count):
+    moving_date = reminder_campaign.default_moving_date()
+    states = quote_states(recipient_count, moving_date)
+    messages = [{"recipient": state["customer_phone"], "text": reminder_campaign.render_reminder(state)} for _, state, _ in states]
+
+    with fake_aligo_gateway(delay_ms=GATEWAY_DELAY_MS) as gateway:
+        outbox.configure(os.path.join(tempfile.mkdtemp(prefix="reminder_bench_"), "outbox.sqlite3"))
+        outbox.set_channel_settings("sms", gateway.creds)
+        mms_utils.close_session()
+        report = {"recipients": recipient_count}
+        try:
+            started = time.perf_counter()
+            one_by_one = [mms_utils.deliver_mass([message], creds=gateway.creds)[0] for message in messages]
+            report["one_by_one_sec"] = round(time.perf_counter() - started, 2)
+            report["one_by_one_requests"] = len(gateway.mass_counts)
+
+            gateway.mass_counts.clear()
+            started = time.perf_counter()
+            mass = mms_utils.deliver_mass(messages, creds=gateway.creds)
+            report["mass_sec"] = round(time.perf_counter() - started, 3)
+            report["mass_requests"] = len(gateway.mass_counts)
+            report["speedup"] = round(report["one_by_one_sec"] / report["mass_sec"], 1) if report["mass_sec"] > 0 else None
+            report["all_ok"] = all(r["ok"] for r in one_by_one + mass)
+
+            gateway.mass_counts.clear()
+            outbox.start_workers()
+            started = time.perf_counter()
+            campaign_id = reminder_campaign.campaign_id_for(moving_date)
+            report["queue_sec"] = reminder_campaign.queue_reminders(iter(states), campaign_id)["elapsed_sec"]
+            report["drained"] = outbox.wait_until_drained(timeout=60)
+            report["campaign_sec"] = round(time.perf_counter() - started, 2)
+            progress = reminder_campaign.get_campaign_progress(campaign_id)
+            report["campaign"] = {status: progress[status] for status in ("total", "sent", "failed", "pending")}
+            report["campaign_requests"] = len(gateway.mass_counts)
+            return report
+        finally:
+            outbox.stop_workers()
+            outbox.set_channel_settings("sms", None)
+            outbox.configure(None)
+            mms_utils.close_session()
+
+
+if __name__ == "__main__":
+    print(f"gateway delay {GATEWAY_DELAY_MS:.0f} ms")
+    for key, value in run(RECIPIENT_COUNT).items():
+        print(f"  {key:20s} {value}")
\ No newline at end of file
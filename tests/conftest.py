@@ -0,0 +1,25 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (ROOT_DIR, TESTS_DIR):
+    if path not in sys.path: sys.path.insert(0, path)
+
+from fake_drive import FakeDriveService, fake_http # noqa: E402
+
+
+@pytest.fixture
+def fake_drive(monkeypatch):
+    """google_drive_helper가 가짜 Drive를 쓰도록 바꾸고, 프로세스 내 캐시를 비운 상태로 시작합니다."""
+    import google_drive_helper as gdrive
+    drive = FakeDriveService()
+    monkeypatch.setattr(gdrive, "get_drive_service", lambda: drive)
+    monkeypatch.setattr(gdrive, "_build_drive_service", lambda: drive)
+    monkeypatch.setattr(gdrive, "googleapiclient_http", fake_http)
+    for name in ("_quote_index_cache", "_folder_id_cache", "_last_saved_hashes", "_archive_bundle_cache"):
+        monkeypatch.setattr(gdrive, name, {})
+    return drive
\ No newline at end of file
@@ -0,0 +1,190 @@
+# tests/fake_drive.py
+# google_drive_helper가 사용하는 Drive v3 API 일부(files().list/get/create/update/get_media)를 메모리로 흉내 내는 가짜 백엔드.
+# 요청 수와 주고받은 바이트를 기록하므로 테스트와 벤치마크(bench_quote_index.py)에서 함께 사용합니다.
+import random
+import re
+import string
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+_ID_CHARS = string.ascii_letters + string.digits + "-_"
+_CLAUSE_PATTERNS = {
+    "name_eq": re.compile(r"name = '((?:[^'\\]|\\.)*)'"),
+    "name_contains": re.compile(r"name contains '((?:[^'\\]|\\.)*)'"),
+    "parent": re.compile(r"'([^']*)' in parents"),
+    "mime": re.compile(r"mimeType\s*=\s*'([^']*)'"),
+    "created_since": re.compile(r"createdTime >= '([^']*)'"),
+}
+
+
+class _Request:
+    def __init__(self, drive, method, run):
+        self._drive, self._method, self._run = drive, method, run
+
+    def execute(self):
+        self._drive.calls[self._method] += 1
+        return self._run()
+
+
+class _BatchRequest:
+    """service.new_batch_http_request() 대용: 담긴 호출을 한 번의 요청으로 세고, 호출마다 callback(request_id, response, exception)."""
+    def __init__(self, drive, callback=None):
+        self._drive, self._callback, self._requests = drive, callback, []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((request, callback or self._callback, request_id or str(len(self._requests))))
+
+    def execute(self):
+        self._drive.calls["batch"] += 1
+        for request, callback, request_id in self._requests:
+            try:
+                response, exception = request._run(), None
+            except Exception as e:
+                response, exception = None, e
+            if callback: callback(request_id, response, exception)
+
+
+class _MediaRequest:
+    """files().get_media() 결과 (FakeMediaIoBaseDownload가 내용을 씀)."""
+    def __init__(self, drive, file_id):
+        self.drive, self.file_id = drive, file_id
+
+
+class FakeMediaIoBaseUpload:
+    def __init__(self, fh, mimetype=None, resumable=False):
+        self.content, self.mimetype = fh.getvalue(), mimetype
+
+
+class FakeMediaIoBaseDownload:
+    def __init__(self, fh, request):
+        self._fh, self._request = fh, request
+
+    def next_chunk(self):
+        drive = self._request.drive
+        content = drive.files_by_id[self._request.file_id]["content"]
+        drive.calls["get_media"] += 1
+        drive.bytes_down += len(content)
+        self._fh.write(content)
+        return None, True
+
+
+# google_drive_helper.googleapiclient_http 대신 넣어 쓰는 모듈 대용
+fake_http = SimpleNamespace(MediaIoBaseUpload=FakeMediaIoBaseUpload, MediaIoBaseDownload=FakeMediaIoBaseDownload)
+
+
+class _Files:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def list(self, q="", spaces=None, fields=None, pageSize=100, pageToken=None, orderBy=None):
+        def run():
+            matched = self._drive.query(q, orderBy)
+            start = int(pageToken or 0)
+            page = matched[start:start + pageSize]
+            response = {"files": [self._drive.metadata(f) for f in page]}
+            if start + pageSize < len(matched): response["nextPageToken"] = str(start + pageSize)
+            return response
+        return _Request(self._drive, "list", run)
+
+    def get(self, fileId, fields=None):
+        return _Request(self._drive, "get", lambda: self._drive.metadata(self._drive.files_by_id[fileId]))
+
+    def get_media(self, fileId):
+        return _MediaRequest(self._drive, fileId)
+
+    def create(self, body, media_body=None, fields=None):
+        def run():
+            content = media_body.content if media_body else b""
+            self._drive.bytes_up += len(content)
+            return self._drive.metadata(self._drive.add_file(
+                body["name"], content, parent=(body.get("parents") or ["root"])[0],
+                mime_type=body.get("mimeType"), app_properties=body.get("appProperties")))
+        return _Request(self._drive, "create", run)
+
+    def update(self, fileId, body=None, media_body=None, addParents=None, removeParents=None, fields=None):
+        def run():
+            file = self._drive.files_by_id[fileId]
+            if media_body:
+                file["content"] = media_body.content
+                self._drive.bytes_up += len(media_body.content)
+            for key, value in (body or {}).items():
+                if key == "appProperties": file["appProperties"].update(value)
+                else: file[key] = value
+            if addParents:
+                file["parents"] = [p for p in file["parents"] if p != removeParents] + [addParents]
+            file["version"] += 1
+            self._drive.changed()
+            return self._drive.metadata(file)
+        return _Request(self._drive, "update", run)
+
+
+class FakeDriveService:
+    """파일을 {id: 메타데이터 + content} 사전으로 보관하는 Drive 서비스 대용. calls/bytes_up/bytes_down에 사용량을 기록합니다."""
+    def __init__(self):
+        self.files_by_id = {}
+        self._random = random.Random(0)
+        self._clock = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.calls = Counter()
+        self.bytes_up = self.bytes_down = 0
+        self._query_cache = {} # 페이지를 넘길 때마다 10만 개를 다시 거르지 않도록 (파일이 바뀌면 비움)
+
+    def files(self):
+        return _Files(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _BatchRequest(self, callback)
+
+    def reset_stats(self):
+        self.calls = Counter()
+        self.bytes_up = self.bytes_down = 0
+
+    def add_file(self, name, content=b"", parent="root", mime_type=None, app_properties=None):
+        """파일을 직접 추가합니다 (요청 수에는 포함되지 않음). 합성 데이터 준비에도 사용."""
+        self._clock += timedelta(microseconds=1)
+        file = {"id": self._new_id(), "name": name, "mimeType": mime_type, "parents": [parent],
+                "content": content, "appProperties": dict(app_properties or {}), "version": 1, "trashed": False,
+                "createdTime": self._clock.strftime("%Y-%m-%dT%H:%M:%S.%fZ")}
+        self.files_by_id[file["id"]] = file
+        self.changed()
+        return file
+
+    def _new_id(self):
+        """실제 Drive 파일 ID처럼 무작위 33자 (압축률 등 크기 측정이 실제와 비슷하도록)."""
+        return "1" + "".join(self._random.choices(_ID_CHARS, k=32))
+
+    def children(self, parent, name=None):
+        return [f for f in self.files_by_id.values() if parent in f["parents"] and not f["trashed"] and (name is None or f["name"] == name)]
+
+    @staticmethod
+    def metadata(file):
+        return {key: value for key, value in file.items() if key != "content"}
+
+    def changed(self):
+        self._query_cache.clear()
+
+    def query(self, query, order_by=None):
+        key = (query, order_by)
+        if key not in self._query_cache:
+            predicate = self.compile_query(query)
+            matched = [f for f in self.files_by_id.values() if predicate(f)]
+            if order_by == "createdTime": matched.sort(key=lambda f: f["createdTime"])
+            self._query_cache[key] = matched
+        return self._query_cache[key]
+
+    @staticmethod
+    def compile_query(query):
+        found = {key: pattern.findall(query) for key, pattern in _CLAUSE_PATTERNS.items()}
+        names = [name.replace("\\'", "'") for name in found["name_eq"]]
+        parts = [part.replace("\\'", "'") for part in found["name_contains"]]
+        skip_trashed = "trashed = false" in query
+
+        def predicate(file):
+            if skip_trashed and file["trashed"]: return False
+            if any(name != file["name"] for name in names): return False
+            if any(part not in file["name"] for part in parts): return False
+            if any(parent not in file["parents"] for parent in found["parent"]): return False
+            if found["mime"] and file["mimeType"] not in found["mime"]: return False
+            if any(file["createdTime"] < since for since in found["created_since"]): return False
+            return True
+        return predicate
\ No newline at end of file
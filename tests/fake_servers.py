@@ -0,0 +1,119 @@
+# tests/fake_servers.py
+# 발송 점검용 로컬 대역 서버: SMTP(aiosmtpd)와 알리고 형식 HTTP 게이트웨이.
+# 테스트와 벤치마크(bench_outbox.py, bench_reminder.py)에서 함께 사용합니다.
+import json
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+SMTP_PASSWORD = "secret"
+ALIGO_MASS_MAX_RECIPIENTS = 500
+
+
+def free_port():
+    """지금 비어 있는 로컬 포트 (연결 거부 확인용으로도 사용)."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@contextmanager
+def local_smtp_server():
+    """
+    비밀번호가 SMTP_PASSWORD인 계정만 로그인되는 로컬 SMTP 서버 (aiosmtpd 필요).
+    반환 객체: settings (email_utils 설정), received (받은 메일의 받는 사람), logins (로그인을 시도한 SMTP 세션)
+    """
+    from aiosmtpd.controller import Controller
+    from aiosmtpd.smtp import AuthResult
+
+    # 로그인 실패 시 smtplib이 다른 방식으로 다시 시도하므로 세션 단위로 기록
+    server = SimpleNamespace(received=[], logins=[], settings=None)
+
+    class _Handler:
+        async def handle_DATA(self, smtp, session, envelope):
+            server.received.append(envelope.rcpt_tos[0])
+            return "250 OK"
+
+    def _authenticator(smtp, session, envelope, mechanism, auth_data):
+        if session not in server.logins: server.logins.append(session)
+        return AuthResult(success=auth_data.password == SMTP_PASSWORD.encode(), handled=False)
+
+    port = free_port()
+    controller = Controller(_Handler(), hostname="127.0.0.1", port=port, authenticator=_authenticator, auth_require_tls=False)
+    controller.start()
+    server.settings = {"sender_email": "quote@example.com", "sender_password": SMTP_PASSWORD, "smtp_server": "127.0.0.1", "smtp_port": port}
+    try:
+        yield server
+    finally:
+        controller.stop()
+
+
+@contextmanager
+def fake_aligo_gateway(delay_ms=0):
+    """
+    알리고 형식으로 응답하는 로컬 HTTP 게이트웨이 (/send/: MMS 한 건, /send_mass/: 받는 사람별 문자 최대 500명).
+    반환 객체:
+      creds       - mms_utils 발송 설정 (gateway_url이 이 서버)
+      responses   - 다음 요청에 돌려줄 (HTTP 상태, 본문 dict/bytes, 지연 초) 목록. 비어 있으면 성공 응답, 상태가 None이면 응답 없이 연결을 끊음
+      requests    - 받은 요청 경로 목록, connections - 받은 TCP 연결 (클라이언트 포트)
+      mass_counts - 대량 발송 요청별 받는 사람 수, delivered - 대량 발송으로 받은 {번호: 본문}
+    """
+    gateway = SimpleNamespace(responses=[], requests=[], connections=set(), mass_counts=[], delivered={}, lock=threading.Lock())
+
+    class _FakeAligoHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # keep-alive
+        disable_nagle_algorithm = True # 헤더와 본문을 따로 써도 지연 ACK 대기 없음
+
+        def do_POST(self):
+            raw_request = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with gateway.lock:
+                gateway.connections.add(self.client_address[1])
+                gateway.requests.append(self.path)
+                queued = gateway.responses.pop(0) if gateway.responses else None
+            if delay_ms: time.sleep(delay_ms / 1000)
+            status_code, body, delay = queued or (200, self._success_body(raw_request), 0)
+            if delay: time.sleep(delay)
+            if status_code is None:
+                self.close_connection = True # 요청을 받은 뒤 응답 없이 끊김 (클라이언트에는 Connection aborted)
+                return
+            raw_body = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+            try:
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                if status_code in (429, 503): self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", str(len(raw_body)))
+                self.end_headers()
+                self.wfile.write(raw_body)
+            except OSError:
+                pass # 클라이언트가 시간 초과로 먼저 끊음
+
+        def _success_body(self, raw_request):
+            if not self.path.startswith("/send_mass"):
+                return {"result_code": "1", "message": "success", "msg_id": len(gateway.requests), "success_cnt": 1, "error_cnt": 0}
+            form = {key: values[0] for key, values in parse_qs(raw_request.decode("utf-8")).items()}
+            count = int(form.get("cnt", 0))
+            if count < 1 or count > ALIGO_MASS_MAX_RECIPIENTS or any(f"rec_{n}" not in form for n in range(1, count + 1)):
+                return {"result_code": "-105", "message": "수신자 수 오류"}
+            with gateway.lock:
+                gateway.mass_counts.append(count)
+                for n in range(1, count + 1): gateway.delivered[form[f"rec_{n}"]] = form[f"msg_{n}"]
+            return {"result_code": "1", "message": "success", "msg_id": len(gateway.requests), "success_cnt": count, "error_cnt": 0,
+                    "msg_type": form.get("msg_type")}
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeAligoHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    gateway.creds = {"api_key": "key", "userid": "user", "sender_number": "0212345678",
+                     "gateway_url": f"http://127.0.0.1:{server.server_address[1]}/send/"}
+    try:
+        yield gateway
+    finally:
+        server.shutdown()
+        server.server_close()
\ No newline at end of file
@@ -0,0 +1,95 @@
+# tests/test_artifact_cache.py
+# 견적서 산출물 캐시: 같은 견적 내용이면 같은 바이트(PDF/xlsx), 내용 해시, 적중/생성 집계, 오래된 항목 제거
+import time
+
+import pytest
+
+import artifact_cache
+import calculations
+import data
+import state_manager
+
+MOVE_TYPE = list(data.item_definitions)[0]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    artifact_cache.clear_cache()
+    yield
+    artifact_cache.clear_cache()
+
+
+@pytest.fixture(scope="module")
+def priced_quote():
+    state_data = state_manager.build_quote_state({"customer_name": "홍길동", "customer_phone": "01012345678", "moving_date": "2026-11-02",
+                                                  "base_move_type": MOVE_TYPE, "final_selected_vehicle": "5톤", "from_floor": "5"})
+    total_cost, cost_items, personnel_info = calculations.calculate_total_moving_cost(state_data)
+    return state_data, cost_items, total_cost, personnel_info
+
+
+class CountingBuilder:
+    def __init__(self, result):
+        self.result, self.calls = result, 0
+
+    def __call__(self):
+        self.calls += 1
+        if isinstance(self.result, Exception): raise self.result
+        return self.result
+
+
+@pytest.mark.parametrize("get_artifact, magic", [(artifact_cache.get_quote_pdf, b"%PDF-"), (artifact_cache.get_quote_excel, b"PK")])
+def test_rebuilt_artifact_has_identical_bytes(priced_quote, get_artifact, magic):
+    first = get_artifact(*priced_quote)
+    assert first and first.startswith(magic)
+    artifact_cache.clear_cache()
+    time.sleep(1.1) # 생성 시각이 문서/zip 항목에 들어가면 초 단위로 달라짐
+    assert get_artifact(*priced_quote) == first
+    assert artifact_cache.get_cache_stats()["misses"] == 1
+
+
+def test_fingerprint_follows_quote_content(priced_quote, monkeypatch):
+    state_data, cost_items, total_cost, personnel_info = priced_quote
+    fingerprint = artifact_cache.quote_fingerprint(state_data, cost_items, total_cost, personnel_info)
+    assert artifact_cache.quote_fingerprint(dict(state_data), cost_items, total_cost, personnel_info) == fingerprint
+    assert artifact_cache.quote_fingerprint(dict(state_data, unrelated_widget=True), cost_items, total_cost, personnel_info) == fingerprint
+    changed = [
+        artifact_cache.quote_fingerprint(dict(state_data, customer_name="김철수"), cost_items, total_cost, personnel_info),
+        artifact_cache.quote_fingerprint(dict(state_data, deposit_amount=50000), cost_items, total_cost, personnel_info),
+        artifact_cache.quote_fingerprint(state_data, cost_items, total_cost + 1, personnel_info),
+    ]
+    monkeypatch.setattr(artifact_cache, "TEMPLATE_VERSION", "test")
+    changed.append(artifact_cache.quote_fingerprint(state_data, cost_items, total_cost, personnel_info))
+    assert len(set(changed + [fingerprint])) == 5
+
+
+def test_hits_and_misses_are_counted():
+    builder = CountingBuilder(b"12345")
+    assert artifact_cache.get_or_build("test", "a", builder) == b"12345"
+    assert artifact_cache.get_or_build("test", "a", builder) == b"12345"
+    assert artifact_cache.get_or_build("other", "a", builder) == b"12345" # 종류가 다르면 다른 항목
+    assert builder.calls == 2
+    stats = artifact_cache.get_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["bytes_saved"], stats["bytes_built"]) == (1, 2, 5, 10)
+    assert stats["hit_rate"] == pytest.approx(1 / 3) and (stats["entries"], stats["cached_bytes"]) == (2, 10)
+
+
+@pytest.mark.parametrize("result", [None, b"", ValueError("생성 실패")])
+def test_failed_builds_are_not_cached(result):
+    builder = CountingBuilder(result)
+    assert not artifact_cache.get_or_build("test", "a", builder)
+    assert not artifact_cache.get_or_build("test", "a", builder)
+    assert builder.calls == 2 and artifact_cache.get_cache_stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    monkeypatch.setattr(artifact_cache, "MAX_CACHE_BYTES", 12)
+    for key in ("a", "b"):
+        artifact_cache.get_or_build("test", key, lambda: b"x" * 5)
+    artifact_cache.get_or_build("test", "a", CountingBuilder(b"unused")) # a를 최근 사용으로
+    artifact_cache.get_or_build("test", "c", lambda: b"x" * 5)
+    assert list(artifact_cache._cache) == [("test", "a"), ("test", "c")]
+    assert artifact_cache.get_cache_stats()["cached_bytes"] == 10
+
+    builder = CountingBuilder(b"y" * 5)
+    artifact_cache.get_or_build("test", "b", builder) # 제거된 항목은 다시 생성
+    assert builder.calls == 1 and ("test", "a") not in artifact_cache._cache
\ No newline at end of file
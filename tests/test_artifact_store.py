@@ -0,0 +1,40 @@
+# tests/test_artifact_store.py
+# 디스크 산출물 저장소: st.download_button에 넘기는 값이 파일 핸들을 남기지 않는지 확인
+import os
+
+import pytest
+
+import artifact_store
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, "STORE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def open_fd_count():
+    return len(os.listdir("/proc/self/fd"))
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="/proc 필요")
+@pytest.mark.parametrize("deferred", [True, False])
+def test_download_data_returns_bytes_without_leaking_files(store_dir, monkeypatch, deferred):
+    monkeypatch.setattr(artifact_store, "_DEFERRED_DOWNLOAD_SUPPORTED", deferred)
+    handle = artifact_store.put_artifact(b"%PDF-1.4 test", "pdf")
+    before = open_fd_count()
+    for _ in range(20): # 화면을 다시 그릴 때마다 호출됨
+        data = artifact_store.download_data(handle)
+        assert (data() if deferred else data) == b"%PDF-1.4 test"
+    assert open_fd_count() == before
+
+
+@pytest.mark.parametrize("deferred", [True, False])
+def test_download_data_for_missing_artifact(store_dir, monkeypatch, deferred):
+    monkeypatch.setattr(artifact_store, "_DEFERRED_DOWNLOAD_SUPPORTED", deferred)
+    assert artifact_store.download_data(None) is None
+    handle = artifact_store.put_artifact(b"x", "jpg")
+    data = artifact_store.download_data(handle)
+    os.remove(store_dir / handle) # 클릭 전에 정리된 경우
+    if deferred: assert data() == b""
+    assert artifact_store.download_data(handle) is None
\ No newline at end of file
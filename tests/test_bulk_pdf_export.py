@@ -0,0 +1,67 @@
+# tests/test_bulk_pdf_export.py
+# 이사일 기준 견적서 PDF 일괄 생성: ZIP 항목 이름(같은 고객명/번호 구분), 실패 목록, 임시 파일 교체
+import zipfile
+
+import pytest
+
+import bulk_pdf_export
+import data
+import google_drive_helper as gdrive
+
+MOVE_TYPE = list(data.item_definitions)[0]
+
+
+def saved_quote(name, phone, moving_date="2026-11-02", vehicle="5톤"):
+    return {"customer_name": name, "customer_phone": phone, "moving_date": moving_date, "base_move_type": MOVE_TYPE,
+            "final_selected_vehicle": vehicle}
+
+
+@pytest.fixture
+def saved_quotes(fake_drive):
+    quotes = {
+        "01000000001": saved_quote("홍 길동", "010-1111-2222"),
+        "01000000002": saved_quote("홍 길동", "010-1111-2222"), # 고객명/번호가 같은 다른 견적
+        "01000000003": saved_quote("김철수", "", vehicle="2.5톤"),
+        "01000000004": saved_quote("차량없음", "01044445555", vehicle=""),
+        "01000000005": saved_quote("깨진파일", "01055556666"),
+        "01000000006": saved_quote("다른날", "01066667777", moving_date="2026-11-03"),
+    }
+    for phone, quote in quotes.items():
+        assert gdrive.save_quote_json(phone, quote)
+    broken_id = gdrive.load_quote_index()["01000000005"]["file_id"]
+    fake_drive.files_by_id[broken_id]["content"] = b"{broken"
+    return quotes
+
+
+def test_export_writes_one_pdf_per_quote(saved_quotes, tmp_path):
+    output_path = tmp_path / "quotes.zip"
+    output_path.write_bytes(b"previous export")
+    progress = []
+    report = bulk_pdf_export.export_quotes_for_date("2026-11-02", str(output_path), max_workers=1,
+                                                    progress_callback=lambda done, total: progress.append(done))
+
+    assert (report["selected"], report["exported"]) == (5, 3)
+    assert sorted((f["name"], f["error"].split(":")[0]) for f in report["failed"]) == [
+        ("01000000004.json", "비용 계산 오류"), ("01000000005.json", "견적 불러오기 실패")]
+    assert progress[-1] == 5
+    with zipfile.ZipFile(output_path) as zip_file:
+        names = zip_file.namelist()
+        assert sorted(names) == ["견적서_김철수_01000000003.pdf", "견적서_홍_길동_01011112222.pdf",
+                                 "견적서_홍_길동_01011112222_01000000002.pdf"]
+        assert all(zip_file.read(name).startswith(b"%PDF-") for name in names)
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in zip_file.infolist())
+        assert report["pdf_bytes"] == sum(info.file_size for info in zip_file.infolist())
+    assert report["zip_bytes"] == output_path.stat().st_size
+    assert not (tmp_path / "quotes.zip.part").exists()
+
+
+def test_failed_export_keeps_previous_zip(saved_quotes, tmp_path):
+    output_path = tmp_path / "quotes.zip"
+    output_path.write_bytes(b"previous export")
+
+    def cancel(done, total):
+        raise RuntimeError("취소")
+    with pytest.raises(RuntimeError, match="취소"):
+        bulk_pdf_export.export_quotes_for_date("2026-11-02", str(output_path), max_workers=1, progress_callback=cancel)
+    assert output_path.read_bytes() == b"previous export"
+    assert not (tmp_path / "quotes.zip.part").exists()
\ No newline at end of file
@@ -0,0 +1,80 @@
+# tests/test_cost_ledger.py
+# 비용 원장: 이전 형식 목록 변환(라벨 -> 코드), 오류 항목, 코드별 합계, 색인이 어긋나는 변경 금지
+import copy
+import pickle
+
+import pytest
+
+from cost_ledger import CostCode, CostLedger, CostLine, error_ledger
+
+
+def test_from_items_maps_legacy_labels_to_codes():
+    ledger = CostLedger.from_items([("기본 운임", 1000000, "5톤 기준"), ["할증 조정 금액", 50000], ("할인 조정 금액", -20000, None),
+                                    ("도착지 스카이 장비", 300000, ""), ("새 항목", 10000, "비고"), ("짧음",)])
+    assert [(line.code, line.amount) for line in ledger] == [
+        (CostCode.BASE_FARE, 1000000), (CostCode.ADJUSTMENT, 50000), (CostCode.ADJUSTMENT, -20000),
+        (CostCode.SKY_TO, 300000), (CostCode.OTHER, 10000)]
+    assert ledger.first(CostCode.BASE_FARE) == CostLine("기본 운임", 1000000, "5톤 기준", CostCode.BASE_FARE)
+    assert ledger.first(CostCode.ADJUSTMENT).note == "" and ledger.amount(CostCode.ADJUSTMENT) == 30000
+    assert CostLedger.from_items(ledger) is ledger and list(CostLedger.from_items(None)) == []
+
+
+def test_error_lines():
+    ledger = CostLedger.from_items([("기본 운임", 1000000, ""), ("계산 오류", 0, "가격 정보 없음"), ("오류", 0, "")])
+    assert ledger.has_error and CostCode.ERROR in ledger
+    assert ledger.error_note == "가격 정보 없음"
+    assert error_ledger("").error_note == "알 수 없는 오류"
+    cleaned = ledger.without_errors()
+    assert [line.code for line in cleaned] == [CostCode.BASE_FARE] and not cleaned.has_error and cleaned.error_note is None
+    assert len(ledger) == 3 # 원래 원장은 그대로
+    no_errors = CostLedger.from_items([("기본 운임", 1, "")])
+    assert no_errors.without_errors() is no_errors
+
+
+def test_amount_sums_lines_with_the_same_code():
+    ledger = CostLedger()
+    ledger.add(CostCode.SKY_FROM, "출발지 스카이 장비", 300000)
+    ledger.add(CostCode.SKY_TO, "도착지 스카이 장비", 370000)
+    ledger.add(CostCode.SKY_TO, "도착지 스카이 장비", 30000)
+    assert ledger.amount(CostCode.SKY_FROM) + ledger.amount(CostCode.SKY_TO) == 700000
+    assert ledger.amount(CostCode.SKY_TO) == 400000 and ledger.amount(CostCode.VAT) == 0
+    assert ledger.total() == 700000 and len(ledger.lines(CostCode.SKY_TO)) == 2
+
+
+def test_list_style_additions_keep_the_index():
+    ledger = CostLedger()
+    ledger.append(CostLine("기본 운임", 1000000, "", CostCode.BASE_FARE))
+    ledger.extend([CostLine("부가세 (10%)", 100000, "", CostCode.VAT)])
+    ledger += [CostLine("카드결제 수수료 (13%)", 10000, "", CostCode.CARD_FEE)]
+    combined = ledger + [CostLine("보관료", 5000, "", CostCode.STORAGE)]
+    assert ledger.amount(CostCode.CARD_FEE) == 10000 and CostCode.STORAGE not in ledger
+    assert isinstance(combined, CostLedger) and combined.amount(CostCode.STORAGE) == 5000
+    with pytest.raises(TypeError):
+        ledger.append(("기본 운임", 1, "")) # 코드 없는 튜플은 from_items로 변환
+
+
+def test_slices_and_copies_are_indexed_ledgers():
+    ledger = CostLedger.from_items([("기본 운임", 1000000, ""), ("부가세 (10%)", 100000, ""), ("오류", 0, "x")])
+    head = ledger[:2]
+    assert isinstance(head, CostLedger) and head.amount(CostCode.VAT) == 100000 and not head.has_error
+    assert ledger[0].code == CostCode.BASE_FARE
+    for duplicate in (ledger.copy(), copy.copy(ledger), copy.deepcopy(ledger), pickle.loads(pickle.dumps(ledger))):
+        assert isinstance(duplicate, CostLedger) and list(duplicate) == list(ledger)
+        assert duplicate.has_error and duplicate.amount(CostCode.BASE_FARE) == 1000000
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda ledger: ledger.insert(0, CostLine("보관료", 1, "", CostCode.STORAGE)),
+    lambda ledger: ledger.__setitem__(0, CostLine("보관료", 1, "", CostCode.STORAGE)),
+    lambda ledger: ledger.__delitem__(slice(0, 1)),
+    lambda ledger: ledger.pop(),
+    lambda ledger: ledger.remove(ledger[0]),
+    lambda ledger: ledger.clear(),
+    lambda ledger: ledger.sort(),
+    lambda ledger: ledger.reverse(),
+])
+def test_changes_that_would_break_the_index_are_rejected(mutate):
+    ledger = CostLedger.from_items([("기본 운임", 1000000, ""), ("부가세 (10%)", 100000, "")])
+    with pytest.raises(TypeError):
+        mutate(ledger)
+    assert len(ledger) == 2 and ledger.amount(CostCode.BASE_FARE) == 1000000
\ No newline at end of file
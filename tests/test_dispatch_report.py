@@ -0,0 +1,85 @@
+# tests/test_dispatch_report.py
+# 배차표: 저장된 견적(가짜 Drive)으로 배차 목록/차량별 합계/날짜별 인원 합계를 만들고, 금액은 가격 엔진으로 다시 계산하는지
+import pytest
+
+import calculations
+import data
+import dispatch_report
+import google_drive_helper as gdrive
+import state_manager
+
+openpyxl = pytest.importorskip("openpyxl")
+
+MOVE_TYPE = list(data.item_definitions)[0]
+
+
+def saved_quote(name, moving_date, vehicle="5톤", **extra):
+    quote = {"customer_name": name, "customer_phone": "010", "moving_date": moving_date, "base_move_type": MOVE_TYPE,
+             "final_selected_vehicle": vehicle, "from_floor": "5", "to_floor": "3", "from_method": "승강기 🛗", "to_method": "승강기 🛗",
+             "tab3_deposit_amount": 100000,
+             # 예전 가격표로 저장된 금액/인원: 배차표는 이 값을 쓰지 않음
+             "total_cost": 1, "balance": 1, "final_men": 99}
+    quote.update(extra)
+    return quote
+
+
+def expected_cost(saved):
+    total_cost, _, personnel_info = calculations.calculate_total_moving_cost(state_manager.build_quote_state(saved))
+    return total_cost, personnel_info["final_men"], personnel_info["final_women"]
+
+
+def sheet_rows(workbook, name):
+    return list(workbook[name].iter_rows(min_row=2, values_only=True))
+
+
+def test_job_record_recalculates_costs():
+    saved = saved_quote("김배차", "2026-11-02", from_method=dispatch_report.LADDER_METHOD,
+                        to_method=dispatch_report.SKY_METHOD, sky_hours_final=2, dispatched_5t=1, dispatched_1t=1)
+    job = dispatch_report.build_job_record(state_manager.build_quote_state(saved))
+    total_cost, men, women = expected_cost(saved)
+    assert total_cost > 100000 and men != 99
+    assert (job["total_cost"], job["balance"], job["men"], job["women"]) == (total_cost, total_cost - 100000, men, women)
+    assert job["dispatched"] == {"1톤": 1, "2.5톤": 0, "3.5톤": 0, "5톤": 1}
+    assert job["ladder"] and job["sky"]
+    row = dict(zip(dispatch_report.JOB_HEADERS, job["row"]))
+    assert row["사다리차"] == "출발" and row["스카이"] == "도착 2시간" and row["배차 2.5톤"] is None
+
+
+def test_job_record_without_vehicle_is_an_error():
+    with pytest.raises(ValueError, match="차량 선택 필요"):
+        dispatch_report.build_job_record(state_manager.build_quote_state(saved_quote("차량없음", "2026-11-02", vehicle="")))
+
+
+def test_report_from_saved_quotes_has_totals(fake_drive, tmp_path):
+    quotes = {
+        "01000000001": saved_quote("첫째", "2026-11-02", dispatched_5t=2),
+        "01000000002": saved_quote("둘째", "2026-11-02", vehicle="1톤", from_method=dispatch_report.LADDER_METHOD),
+        "01000000003": saved_quote("셋째", "2026-11-03", vehicle="2.5톤", dispatched_2_5t=1),
+        "01000000004": saved_quote("차량없음", "2026-11-03", vehicle=""),
+        "01000000005": saved_quote("범위밖", "2026-11-04"),
+    }
+    for phone, quote in quotes.items():
+        assert gdrive.save_quote_json(phone, quote)
+    output_path = tmp_path / "dispatch.xlsx"
+    report = dispatch_report.generate_dispatch_report("2026-11-02", "2026-11-03", output_path=str(output_path))
+
+    assert report["jobs"] == 3
+    assert [f["name"] for f in report["failed"]] == ["01000000004.json"] and "차량 선택 필요" in report["failed"][0]["error"]
+    costs = {phone: expected_cost(quotes[phone]) for phone in ("01000000001", "01000000002", "01000000003")}
+    workbook = openpyxl.load_workbook(output_path)
+    assert workbook.sheetnames == ["배차 목록", "차량별 합계", "날짜별 인원 합계", "실패 목록"]
+
+    jobs = [dict(zip(dispatch_report.JOB_HEADERS, row)) for row in sheet_rows(workbook, "배차 목록")]
+    assert [job["고객명"] for job in jobs] == ["첫째", "둘째", "셋째"]
+    assert [job["잔금"] for job in jobs] == [costs[phone][0] - 100000 for phone in costs]
+
+    assert sheet_rows(workbook, "차량별 합계") == [("1톤", 1, 0), ("2.5톤", 1, 1), ("5톤", 1, 2), ("합계", 3, 3)]
+    day_1 = [costs["01000000001"], costs["01000000002"]]
+    crew = sheet_rows(workbook, "날짜별 인원 합계")
+    assert crew[0] == ("2026-11-02", 2, sum(c[1] for c in day_1), sum(c[2] for c in day_1), sum(c[1] + c[2] for c in day_1),
+                       1, 0, sum(c[0] for c in day_1), sum(c[0] for c in day_1) - 200000)
+    total_cost = sum(c[0] for c in costs.values())
+    assert crew[-1][0] == "합계" and crew[-1][1] == 3 and crew[-1][-2:] == (total_cost, total_cost - 300000)
+    assert report["crew"]["total_cost"] == total_cost
+    assert sheet_rows(workbook, "실패 목록")[0][:2] == ("01000000004.json", "2026-11-03")
+    assert not (tmp_path / "dispatch.xlsx.part").exists()
\ No newline at end of file
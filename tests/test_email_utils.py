@@ -0,0 +1,95 @@
+# tests/test_email_utils.py
+# SMTP 연결 풀 / 발송 결과 (로컬 aiosmtpd 서버 사용)
+import socket
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+import email_utils # noqa: E402
+from fake_servers import local_smtp_server # noqa: E402
+
+
+@pytest.fixture
+def smtp():
+    with local_smtp_server() as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool(monkeypatch):
+    monkeypatch.setattr(email_utils, "_idle_connections", {})
+    monkeypatch.setattr(email_utils, "_parked_logins", {})
+    yield
+    email_utils.close_pool()
+
+
+def emails(count, prefix="customer"):
+    return [{"recipient": f"{prefix}{i}@example.com", "subject": f"견적서 {i}", "body": "본문",
+             "pdf_bytes": b"%PDF-1.4 test", "pdf_filename": f"견적서_{i}.pdf"} for i in range(count)]
+
+
+def idle_connection(settings):
+    return email_utils._idle_connections[email_utils._pool_key(settings)][-1]
+
+
+def test_send_many_logs_in_once_and_reports_invalid_recipient(smtp):
+    results = email_utils.send_many(emails(5) + [{"recipient": "not-an-email", "subject": "x", "body": "x"}], settings=smtp.settings)
+    assert [r["ok"] for r in results] == [True] * 5 + [False]
+    assert "유효하지 않은" in results[-1]["error"] and not results[-1]["retryable"]
+    assert len(smtp.logins) == 1 and len(smtp.received) == 5
+
+
+def test_single_send_reuses_pooled_connection(smtp):
+    email_utils.send_many(emails(1), settings=smtp.settings)
+    assert email_utils.send_quote_email_now("single@example.com", "견적서", "본문", None, settings=smtp.settings)
+    assert len(smtp.logins) == 1 and smtp.received[-1] == "single@example.com"
+
+
+def test_idle_connection_is_checked_with_noop(smtp):
+    email_utils.send_many(emails(1), settings=smtp.settings)
+    idle_connection(smtp.settings)["last_used"] -= email_utils.NOOP_CHECK_AFTER_SEC + 1
+    noops = email_utils.get_pool_stats()["noops"]
+    assert email_utils.send_quote_email_now("noop@example.com", "견적서", "본문", None, settings=smtp.settings)
+    assert email_utils.get_pool_stats()["noops"] == noops + 1 and len(smtp.logins) == 1
+
+
+def test_dropped_connection_is_replaced_and_message_resent(smtp):
+    email_utils.send_many(emails(1), settings=smtp.settings)
+    idle_connection(smtp.settings)["server"].sock.shutdown(socket.SHUT_RDWR) # 서버가 연결을 끊은 상황 (NOOP 확인 전)
+    assert email_utils.send_quote_email_now("reconnect@example.com", "견적서", "본문", None, settings=smtp.settings)
+    assert smtp.received[-1] == "reconnect@example.com" and len(smtp.logins) == 2
+
+
+def test_connection_is_replaced_after_message_limit(smtp, monkeypatch):
+    monkeypatch.setattr(email_utils, "MAX_MESSAGES_PER_CONNECTION", 2)
+    assert all(r["ok"] for r in email_utils.send_many(emails(5), settings=smtp.settings))
+    assert len(smtp.logins) == 3 and len(smtp.received) == 5
+
+
+def test_auth_failure_is_permanent_and_parks_login_until_settings_change(smtp):
+    bad_settings = dict(smtp.settings, sender_password="wrong")
+    results = email_utils.send_many(emails(3), settings=bad_settings)
+    assert not any(r["ok"] or r["retryable"] for r in results)
+    assert len({r["error"] for r in results}) == 1 # 첫 실패 후 남은 메일은 로그인하지 않음
+    assert len(smtp.logins) == 1
+
+    again = email_utils.send_many(emails(2), settings=bad_settings) # 다음 대기열 묶음
+    assert not any(r["ok"] or r["retryable"] for r in again)
+    assert len(smtp.logins) == 1 # 같은 설정으로는 다시 로그인하지 않음 (계정 잠김 방지)
+
+    fixed = email_utils.send_many(emails(2), settings=smtp.settings) # 설정을 고친 뒤
+    assert all(r["ok"] for r in fixed) and len(smtp.logins) == 2
+    assert email_utils._parked_logins == {}
+
+
+def test_auth_failure_fails_outbox_entry_on_first_attempt(smtp, tmp_path, monkeypatch):
+    outbox = email_utils.outbox
+    monkeypatch.setattr(outbox, "_channel_settings", {"email": dict(smtp.settings, sender_password="wrong")})
+    outbox.configure(str(tmp_path / "outbox.sqlite3"))
+    try:
+        outbox.enqueue("email", "a@example.com", {"subject": "s", "body": "b"}, revision="r1")
+        assert outbox.process_due() == 1
+        status = outbox.get_status("email", "a@example.com", "r1")
+    finally:
+        outbox.configure(None)
+    assert status["status"] == "failed" and status["attempts"] == 1
\ No newline at end of file
@@ -0,0 +1,73 @@
+# tests/test_excel_filler.py
+# final.xlsx 채우기: 시트 XML 패치 결과가 openpyxl로 채운 결과와 같은지, 바뀌지 않아야 할 zip 항목은 그대로인지
+import io
+import zipfile
+from datetime import date
+
+import pytest
+
+import calculations
+import excel_filler
+import quote_report
+
+openpyxl = pytest.importorskip("openpyxl")
+
+SAMPLE_STATE = {
+    "base_move_type": "가정 이사 🏠", "customer_name": "홍길동", "customer_phone": "01012345678",
+    "moving_date": date(2024, 6, 15), "from_location": "서울 은평구", "to_location": "경기 고양시",
+    "from_floor": "5", "to_floor": "12", "from_method": "사다리차 🪜", "to_method": "계단 🚶",
+    "final_selected_vehicle": "5톤", "has_via_point": True, "via_point_location": "서울 마포구 <1층 & 옥탑>",
+    "via_point_method": "계단 🚶", "dispatched_5t": 1, "deposit_amount": 100000,
+    "special_notes": "피아노 조심. 냉장고 분리 필요. 아침 8시 시작",
+    "qty_가정 이사 🏠_주요 품목_장롱": 10, "qty_가정 이사 🏠_주요 품목_4도어 냉장고": 1,
+}
+
+
+def sheet_snapshot(excel_bytes):
+    """시트의 (값, 날짜 셀 표시 형식)을 셀 주소별로 읽습니다. 빈 셀과 수식은 제외."""
+    ws = openpyxl.load_workbook(io.BytesIO(excel_bytes))[excel_filler.TEMPLATE_SHEET_NAME]
+    return {cell.coordinate: (cell.value, cell.number_format if cell.is_date else None)
+            for row in ws.iter_rows() for cell in row if cell.value is not None and cell.data_type != "f"}
+
+
+@pytest.fixture(scope="module")
+def cell_values():
+    total, items, personnel = calculations.calculate_total_moving_cost(SAMPLE_STATE)
+    return excel_filler._build_cell_values(quote_report.build_quote_report(SAMPLE_STATE, items, total, personnel))
+
+
+@pytest.fixture(scope="module")
+def patched(cell_values):
+    return excel_filler._write_with_xml_patch(cell_values)
+
+
+def test_xml_patch_matches_openpyxl(cell_values, patched):
+    assert sheet_snapshot(patched) == sheet_snapshot(excel_filler._write_with_openpyxl(cell_values))
+
+
+def test_patched_cells_hold_quote_values(cell_values, patched):
+    snapshot = sheet_snapshot(patched)
+    assert snapshot["K3"][0].date() == date(2024, 6, 15) and snapshot["K3"][1] == "yyyy-mm-dd"
+    assert snapshot["G4"][0] == "서울 마포구 <1층 & 옥탑>" # XML 특수 문자 이스케이프
+    assert snapshot["D5"][0] == "5층" and snapshot["D6"][0] == "12층"
+    assert snapshot["F25"][0] == cell_values["F25"] and snapshot["J24"][0] == cell_values["J24"]
+    assert [snapshot[f"B{26 + i}"][0] for i in range(3)] == ["피아노 조심", "냉장고 분리 필요", "아침 8시 시작"]
+
+
+def test_cleared_cells_are_empty(cell_values):
+    cleared = dict(cell_values, G4="", K6="", B26=None)
+    snapshot = sheet_snapshot(excel_filler._write_with_xml_patch(cleared))
+    assert "G4" not in snapshot and "K6" not in snapshot and "B26" not in snapshot
+
+
+def test_same_input_gives_same_bytes(cell_values, patched):
+    assert excel_filler._write_with_xml_patch(cell_values) == patched
+
+
+def test_untouched_zip_entries_are_copied_verbatim(patched):
+    template_zip = zipfile.ZipFile(io.BytesIO(excel_filler._get_template_bytes()))
+    patched_zip = zipfile.ZipFile(io.BytesIO(patched))
+    changed = {excel_filler._find_sheet_path(template_zip, excel_filler.TEMPLATE_SHEET_NAME), "xl/sharedStrings.xml", "xl/styles.xml"}
+    assert patched_zip.namelist() == template_zip.namelist()
+    for name in template_zip.namelist():
+        if name not in changed: assert patched_zip.read(name) == template_zip.read(name), name
\ No newline at end of file
@@ -0,0 +1,46 @@
+# tests/test_excel_summary_generator.py
+# 요약 Excel 스트리밍 작성: 임시 파일로 나눠 모은 행이 빠짐없이 순서대로 기록되는지, 열 너비/숫자 서식
+import pytest
+
+import excel_summary_generator as summary
+
+openpyxl = pytest.importorskip("openpyxl")
+
+
+@pytest.mark.parametrize("text, width", [("abc", 3), ("홍길동", 5.4), ("a\n가나다라", 7.2), ("ｆｕｌｌ", 7.2)])
+def test_text_display_width(text, width):
+    assert summary.text_display_width(text) == pytest.approx(width)
+
+
+def test_spooled_rows_are_written_in_order_with_widths(tmp_path, monkeypatch):
+    monkeypatch.setattr(summary, "SPOOL_BATCH_ROWS", 7) # 여러 묶음으로 나뉘어 임시 파일에 기록되도록
+    spool = summary.new_sheet_spool("목록", ["이름", "금액"], {2: '#,##0'})
+    for i in range(30): summary.spool_row(spool, (f"고객{i}", 1_000_000 * i))
+    summary.spool_row(spool, ("서울특별시 은평구 진관동 아주 긴 주소 " * 5, 1))
+    output_path = tmp_path / "summary.xlsx"
+    summary.write_summary_workbook(str(output_path), [spool])
+
+    ws = openpyxl.load_workbook(output_path)["목록"]
+    rows = list(ws.iter_rows(values_only=True))
+    assert rows[0] == ("이름", "금액") and len(rows) == 32
+    assert rows[1:31] == [(f"고객{i}", 1_000_000 * i) for i in range(30)]
+    assert ws["B3"].number_format == '#,##0'
+    assert ws.column_dimensions["A"].width == summary.SUMMARY_MAX_WIDTH # 긴 주소는 최대 너비로 제한
+    assert ws.column_dimensions["B"].width == len("29,000,000") + summary.SUMMARY_WIDTH_PADDING
+
+
+def test_quotes_summary_has_quote_and_item_sheets(tmp_path):
+    move_type = list(summary.data.item_definitions.keys())[0]
+    section, item_list = next((s, items) for s, items in summary.data.item_definitions[move_type].items()
+                              if s != summary._WASTE_SECTION and isinstance(items, list) and items)
+    quotes = [({"base_move_type": move_type, "customer_name": f"고객{i}", "customer_phone": f"0101234000{i}", "moving_date": "2024-06-15",
+                f"qty_{move_type}_{section}_{item_list[0]}": i + 1}, 1_000_000 + i) for i in range(3)]
+    output_path = tmp_path / "quotes.xlsx"
+    result = summary.write_quotes_summary_excel(iter(quotes), str(output_path))
+    assert result["quotes"] == 3 and result["item_rows"] == 3
+
+    workbook = openpyxl.load_workbook(output_path)
+    assert workbook.sheetnames == ["견적 목록", "품목 수량"]
+    assert [row[-1] for row in workbook["견적 목록"].iter_rows(min_row=2, values_only=True)] == [1_000_000, 1_000_001, 1_000_002]
+    assert [row[5] for row in workbook["품목 수량"].iter_rows(min_row=2, values_only=True)] == [1, 2, 3]
+    assert not (tmp_path / "quotes.xlsx.part").exists()
\ No newline at end of file
@@ -0,0 +1,57 @@
+# tests/test_image_utils.py
+# 용량 예산 JPEG 인코더
+import io
+import random
+
+import pytest
+
+PIL_Image = pytest.importorskip("PIL.Image")
+import image_utils # noqa: E402
+
+SIZE = (600, 900)
+
+
+def noise_image(seed=0):
+    rng = random.Random(seed)
+    return PIL_Image.frombytes("RGB", SIZE, bytes(rng.getrandbits(8) for _ in range(SIZE[0] * SIZE[1] * 3)))
+
+
+def plain_image():
+    img = PIL_Image.new("RGB", SIZE, (255, 255, 255))
+    img.paste((30, 30, 30), (50, 50, 550, 120))
+    return img
+
+
+@pytest.fixture(autouse=True)
+def empty_params_cache(monkeypatch):
+    monkeypatch.setattr(image_utils, "_chosen_params_cache", {})
+
+
+def test_result_fits_budget_and_params_are_reused():
+    encoded = image_utils.encode_jpeg_within_budget(plain_image(), 20_000)
+    assert encoded and len(encoded) <= 20_000 and encoded[:3] == b"\xff\xd8\xff"
+    assert image_utils._chosen_params_cache[SIZE + (20_000,)] == (image_utils.JPEG_MAX_QUALITY, 1.0)
+
+
+def test_failed_image_does_not_block_later_images_of_same_size():
+    assert image_utils.encode_jpeg_within_budget(noise_image(), 3_000) is None # 무작위 잡음은 예산에 맞출 수 없음
+    assert SIZE + (3_000,) not in image_utils._chosen_params_cache
+    encoded = image_utils.encode_jpeg_within_budget(plain_image(), 3_000)
+    assert encoded is not None and len(encoded) <= 3_000
+
+
+def test_cached_params_that_no_longer_fit_trigger_a_new_search():
+    budget = 60_000
+    image_utils._chosen_params_cache[SIZE + (budget,)] = (image_utils.JPEG_MAX_QUALITY, 1.0) # 가벼운 견적서로 정해진 설정
+    encoded = image_utils.encode_jpeg_within_budget(noise_image(1), budget)
+    assert encoded is not None and len(encoded) <= budget
+    quality, scale = image_utils._chosen_params_cache[SIZE + (budget,)]
+    assert (quality, scale) != (image_utils.JPEG_MAX_QUALITY, 1.0)
+
+
+def test_fit_keeps_jpeg_already_under_budget():
+    out = io.BytesIO()
+    plain_image().save(out, format="JPEG", quality=50)
+    jpeg = out.getvalue()
+    assert image_utils.fit_jpeg_to_budget(jpeg, len(jpeg)) is jpeg
+    assert len(image_utils.fit_jpeg_to_budget(jpeg, len(jpeg) - 1)) < len(jpeg)
\ No newline at end of file
@@ -0,0 +1,165 @@
+# tests/test_mms_utils.py
+# 알리고 게이트웨이 발송: 응답 해석, keep-alive 연결 재사용, 거절 응답 재시도, 응답 대기 시간 제한, 대량 발송 나누기
+import io
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+import mms_utils
+from fake_servers import fake_aligo_gateway, free_port
+
+
+def aligo_response(status_code, body):
+    raw_body = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+    return SimpleNamespace(status_code=status_code, content=raw_body, text=raw_body.decode("utf-8", "replace"))
+
+
+@pytest.fixture
+def gateway():
+    mms_utils.close_session()
+    with fake_aligo_gateway() as fake:
+        yield fake
+    mms_utils.close_session()
+
+
+@pytest.fixture(scope="module")
+def image_bytes():
+    image_buffer = io.BytesIO()
+    Image.new("RGB", (60, 40), "white").save(image_buffer, "JPEG")
+    return image_buffer.getvalue()
+
+
+@pytest.mark.parametrize("body, msg_id", [
+    ({"result_code": "1", "message": "success", "msg_id": 12, "success_cnt": 1, "error_cnt": 0}, 12),
+    ({"result_code": 1, "message": "success", "msg_id": "13"}, "13"),
+    ("\ufeff".encode("utf-8") + b'{"result_code":"1","message":"success","msg_id":"77"}', "77"),
+])
+def test_success_codes_are_parsed(body, msg_id):
+    assert mms_utils._parse_aligo_response(aligo_response(200, body)) == {"ok": True, "error": None, "retryable": False, "msg_id": msg_id}
+
+
+@pytest.mark.parametrize("body, expected_in_error", [
+    ({"result_code": -101, "message": "인증오류입니다."}, "-101"),
+    ({"result_code": "-201", "message": "잔액 부족"}, "잔액 부족"),
+    ({"result_code": "1", "message": "success", "success_cnt": 0, "error_cnt": 1}, "1건"),
+    ({"message": "no code"}, "코드 없음"),
+    (b"<html>maintenance</html>", "응답 형식 오류"),
+    (b"", "응답 형식 오류"),
+    (b'["1"]', "응답 형식 오류"),
+])
+def test_failures_on_200_are_permanent(body, expected_in_error):
+    result = mms_utils._parse_aligo_response(aligo_response(200, body))
+    assert not result["ok"] and not result["retryable"] and expected_in_error in result["error"]
+
+
+@pytest.mark.parametrize("status_code", [429, 503])
+def test_rejected_status_is_retryable(status_code):
+    for body in ({"message": "busy"}, b"Service Unavailable"):
+        result = mms_utils._parse_aligo_response(aligo_response(status_code, body))
+        assert not result["ok"] and result["retryable"] and str(status_code) in result["error"]
+
+
+@pytest.mark.parametrize("status_code", [500, 502, 504])
+def test_other_server_errors_need_manual_review(status_code):
+    for body in ({"result_code": "1", "message": "internal"}, b"<html>Bad Gateway</html>"):
+        result = mms_utils._parse_aligo_response(aligo_response(status_code, body)) # 처리 도중 실패했을 수 있음
+        assert not result["ok"] and not result["retryable"] and "발송 내역" in result["error"]
+
+
+def test_session_reuses_one_keep_alive_connection(gateway, image_bytes):
+    results = [mms_utils.deliver_mms("010-1234-5678", image_bytes, creds=gateway.creds) for _ in range(5)]
+    assert all(r["ok"] for r in results) and [r["msg_id"] for r in results] == [1, 2, 3, 4, 5]
+    assert len(gateway.connections) == 1 and gateway.requests == ["/send/"] * 5
+
+
+def test_rejected_response_is_retried_by_session(gateway, image_bytes):
+    gateway.responses.extend([(503, {"message": "busy"}, 0), (429, {"message": "too many"}, 0)])
+    assert mms_utils.deliver_mms("01012345678", image_bytes, creds=gateway.creds)["ok"]
+    assert len(gateway.requests) == 3
+
+
+def test_rejected_response_gives_up_after_retries(gateway, image_bytes):
+    gateway.responses.extend([(503, {"message": "busy"}, 0)] * (mms_utils.MMS_REJECTED_RETRIES + 1))
+    result = mms_utils.deliver_mms("01012345678", image_bytes, creds=gateway.creds)
+    assert not result["ok"] and result["retryable"]
+    assert len(gateway.requests) == mms_utils.MMS_REJECTED_RETRIES + 1
+
+
+def test_server_error_is_not_resent(gateway, image_bytes):
+    gateway.responses.append((502, b"<html>Bad Gateway</html>", 0))
+    result = mms_utils.deliver_mms("01012345678", image_bytes, creds=gateway.creds)
+    assert not result["ok"] and not result["retryable"]
+    assert len(gateway.requests) == 1
+
+
+def test_connection_dropped_after_request_is_not_retryable(gateway, image_bytes):
+    gateway.responses.append((None, None, 0))
+    result = mms_utils.deliver_mms("01012345678", image_bytes, creds=gateway.creds)
+    assert not result["ok"] and not result["retryable"] and "발송 내역" in result["error"]
+    assert len(gateway.requests) == 1
+
+
+def test_mass_send_server_error_is_not_retryable(gateway):
+    gateway.responses.append((500, {"message": "internal"}, 0))
+    results = mms_utils.deliver_mass([{"recipient": f"0105555{i:04d}", "text": "안내"} for i in range(3)], creds=gateway.creds)
+    assert [r["retryable"] for r in results] == [False] * 3 and len(gateway.requests) == 1
+
+
+def test_read_timeout_is_bounded_and_not_resent(gateway, image_bytes):
+    gateway.responses.append((200, {"result_code": "1", "message": "success"}, 3))
+    started = time.monotonic()
+    result = mms_utils.deliver_mms("01012345678", image_bytes, creds=dict(gateway.creds, read_timeout=1))
+    assert time.monotonic() - started < 3
+    assert not result["ok"] and not result["retryable"] and "발송 내역" in result["error"]
+    assert len(gateway.requests) == 1
+
+
+def test_connection_refused_is_retryable(image_bytes):
+    mms_utils.close_session()
+    try:
+        creds = {"api_key": "key", "userid": "user", "sender_number": "0212345678", "gateway_url": f"http://127.0.0.1:{free_port()}/send/"}
+        result = mms_utils.deliver_mms("01012345678", image_bytes, creds=creds)
+    finally:
+        mms_utils.close_session()
+    assert not result["ok"] and result["retryable"]
+
+
+def test_missing_credentials_are_not_sent(image_bytes):
+    result = mms_utils.deliver_mms("01012345678", image_bytes, creds={"api_key": "key"})
+    assert not result["ok"] and "sender_number" in result["error"]
+    assert not result["retryable"] # 설정 전까지 재시도해도 실패하므로 대기열에서 바로 'failed'
+
+
+def test_mass_send_without_credentials_is_not_retryable():
+    results = mms_utils.deliver_mass([{"recipient": "01012345678", "text": "안내"}], title="안내", creds={"userid": "user"})
+    assert not results[0]["ok"] and "api_key" in results[0]["error"] and not results[0]["retryable"]
+
+
+def test_mass_send_splits_into_chunks(gateway):
+    messages = [{"recipient": f"010-5555-{i:04d}", "text": f"안내 {i}"} for i in range(7)]
+    results = mms_utils.deliver_mass(messages, title="안내", creds=dict(gateway.creds, mass_max_recipients=3))
+    assert all(r["ok"] for r in results)
+    assert gateway.mass_counts == [3, 3, 1] and gateway.requests == ["/send_mass/"] * 3
+    assert gateway.delivered == {f"0105555{i:04d}": f"안내 {i}" for i in range(7)}
+    assert results[0] is results[2] and results[3] is not results[0] # 같은 요청으로 보낸 받는 사람은 결과가 같음
+
+
+def test_mass_send_skips_invalid_entries(gateway):
+    results = mms_utils.deliver_mass([{"recipient": "", "text": "x"}, {"recipient": "01012345678", "text": ""},
+                                      {"recipient": "01012345678", "text": "안내"}], creds=gateway.creds)
+    assert [r["ok"] for r in results] == [False, False, True]
+    assert gateway.mass_counts == [1]
+
+
+@pytest.mark.parametrize("texts, msg_type", [(["짧은 안내"], "SMS"), (["가" * 45], "SMS"), (["짧음", "가" * 46], "LMS"), (["🚚" * 30], "LMS")])
+def test_text_msg_type(texts, msg_type):
+    assert mms_utils._text_msg_type(texts) == msg_type
+
+
+@pytest.mark.parametrize("raw, normalized", [("010-1234-5678", "01012345678"), ("1012345678", "01012345678"),
+                                             ("02-123-4567", "021234567"), ("", None), (None, None)])
+def test_normalize_phone_number(raw, normalized):
+    assert mms_utils.normalize_phone_number(raw) == normalized
\ No newline at end of file
@@ -0,0 +1,184 @@
+# tests/test_outbox.py
+# 발송 대기열: 중복 등록 방지, 재시도/실패 처리, 발송 중 종료 복구, 작업 스레드
+import time
+from contextlib import closing
+
+import pytest
+
+import outbox
+
+
+class FakeChannel:
+    """등록된 메시지를 받아 results에 넣어 둔 결과를 차례로 돌려주는 발송 함수 (없으면 성공)."""
+    def __init__(self):
+        self.sent, self.results = [], []
+
+    def __call__(self, entries, settings):
+        self.sent.extend(entries)
+        return [self.results.pop(0) if self.results else {"ok": True} for _ in entries]
+
+
+@pytest.fixture
+def channel(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbox, "_channels", {})
+    monkeypatch.setattr(outbox, "_channel_settings", {})
+    outbox.configure(str(tmp_path / "outbox.sqlite3"))
+    fake = FakeChannel()
+    outbox.register_channel("test", fake, batch_size=10)
+    yield fake
+    outbox.stop_workers()
+    outbox.configure(None)
+
+
+def row(entry_id):
+    with closing(outbox._connect()) as conn:
+        return dict(conn.execute("SELECT * FROM outbox WHERE id = ?", (entry_id,)).fetchone())
+
+
+def make_due(entry_id):
+    with closing(outbox._connect()) as conn:
+        conn.execute("UPDATE outbox SET next_attempt_at = 0 WHERE id = ?", (entry_id,))
+
+
+def test_same_revision_and_recipient_is_queued_once(channel):
+    first = outbox.enqueue("test", "a@example.com", {"n": 1}, attachment=b"pdf", revision="r1")
+    again = outbox.enqueue("test", "a@example.com", {"n": 2}, attachment=b"pdf", revision="r1")
+    other_recipient = outbox.enqueue("test", "b@example.com", {"n": 1}, revision="r1")
+    other_revision = outbox.enqueue("test", "a@example.com", {"n": 1}, revision="r2")
+    assert not first["duplicate"] and again == {"id": first["id"], "status": "pending", "duplicate": True}
+    assert len({first["id"], other_recipient["id"], other_revision["id"]}) == 3
+    assert outbox.process_due() == 3
+    assert sorted((e["recipient"], e["revision"]) for e in channel.sent) == [("a@example.com", "r1"), ("a@example.com", "r2"), ("b@example.com", "r1")]
+
+
+def test_without_revision_every_enqueue_is_new(channel):
+    ids = {outbox.enqueue("test", "a@example.com", {})["id"] for _ in range(3)}
+    assert len(ids) == 3
+
+
+def test_unknown_channel_is_rejected(channel):
+    with pytest.raises(ValueError):
+        outbox.enqueue("nope", "a@example.com", {})
+
+
+def test_success_marks_sent_and_drops_attachment(channel):
+    entry = outbox.enqueue("test", "a@example.com", {"subject": "견적서"}, attachment=b"%PDF", revision="r1")
+    assert outbox.process_due() == 1
+    assert channel.sent[0]["payload"] == {"subject": "견적서"} and channel.sent[0]["attachment"] == b"%PDF"
+    saved = row(entry["id"])
+    assert saved["status"] == "sent" and saved["attachment"] is None and saved["sent_at"] and saved["attempts"] == 1
+    assert outbox.get_status("test", "a@example.com", "r1")["status"] == "sent"
+
+
+def test_retryable_failure_backs_off_then_fails_after_max_attempts(channel, monkeypatch):
+    monkeypatch.setattr(outbox, "MAX_ATTEMPTS", 3)
+    entry = outbox.enqueue("test", "a@example.com", {}, revision="r1")
+    channel.results = [{"ok": False, "error": "일시 오류", "retryable": True}] * 3
+
+    started = time.time()
+    assert outbox.process_due() == 1
+    saved = row(entry["id"])
+    assert saved["status"] == "pending" and saved["attempts"] == 1 and saved["last_error"] == "일시 오류"
+    assert started + outbox.RETRY_BASE_DELAY_SEC * 0.8 <= saved["next_attempt_at"] <= time.time() + outbox.RETRY_BASE_DELAY_SEC * 1.2
+    assert outbox.process_due() == 0 # 재시도 시각 전에는 가져가지 않음
+
+    make_due(entry["id"])
+    assert outbox.process_due() == 1
+    assert row(entry["id"])["next_attempt_at"] >= time.time() + outbox.RETRY_BASE_DELAY_SEC * 2 * 0.8 - 1 # 두 배로 늘어남
+
+    make_due(entry["id"])
+    assert outbox.process_due() == 1
+    assert row(entry["id"])["status"] == "failed" and row(entry["id"])["attempts"] == 3
+
+
+def test_permanent_failure_fails_immediately_and_can_be_requeued(channel):
+    entry = outbox.enqueue("test", "a@example.com", {"v": 1}, revision="r1")
+    channel.results = [{"ok": False, "error": "수신 거부", "retryable": False}]
+    outbox.process_due()
+    assert row(entry["id"])["status"] == "failed"
+
+    requeued = outbox.enqueue("test", "a@example.com", {"v": 2}, revision="r1") # 실패한 건은 다시 등록하면 새 내용으로 대기
+    assert requeued == {"id": entry["id"], "status": "pending", "duplicate": False}
+    assert row(entry["id"])["attempts"] == 0
+    outbox.process_due()
+    assert channel.sent[-1]["payload"] == {"v": 2} and row(entry["id"])["status"] == "sent"
+
+
+def test_retry_failed_requeues_selected_entries(channel):
+    entries = [outbox.enqueue("test", f"{i}@example.com", {}) for i in range(3)]
+    channel.results = [{"ok": False, "error": "x", "retryable": False}] * 3
+    outbox.process_due()
+    assert outbox.retry_failed([entries[0]["id"]]) == 1
+    assert [row(e["id"])["status"] for e in entries] == ["pending", "failed", "failed"]
+    assert outbox.retry_failed() == 2
+
+
+def test_sender_exception_is_retried(channel):
+    entry = outbox.enqueue("test", "a@example.com", {})
+    outbox.register_channel("test", lambda entries, settings: 1 / 0)
+    assert outbox.process_due() == 1
+    saved = row(entry["id"])
+    assert saved["status"] == "pending" and "division by zero" in saved["last_error"]
+
+
+def test_entries_left_sending_are_recovered(channel):
+    entry = outbox.enqueue("test", "a@example.com", {})
+    assert outbox._claim("test", 10)[0]["id"] == entry["id"] # 발송 중 프로세스 종료
+    assert outbox.process_due() == 0
+    assert outbox.recover_stale() == 0 # 아직 오래되지 않음
+    assert outbox.recover_stale(stale_sec=0) == 1
+    assert outbox.process_due() == 1 and row(entry["id"])["status"] == "sent"
+
+
+
+def test_worker_start_leaves_entries_sending_in_another_process(channel, monkeypatch):
+    monkeypatch.setattr(outbox, "_last_stale_check", 0.0)
+    monkeypatch.setattr(outbox, "POLL_INTERVAL_SEC", 0.05)
+    entry = outbox.enqueue("test", "a@example.com", {})
+    outbox._claim("test", 10) # 대기열 파일을 함께 쓰는 다른 프로세스가 발송 중
+    outbox.start_workers(1)
+    time.sleep(0.2)
+    assert row(entry["id"])["status"] == "sending" and channel.sent == []
+
+    with closing(outbox._connect()) as conn: # 그 프로세스가 종료되어 SENDING_STALE_SEC가 지남
+        conn.execute("UPDATE outbox SET updated_at = ? WHERE id = ?", (time.time() - outbox.SENDING_STALE_SEC - 1, entry["id"]))
+    monkeypatch.setattr(outbox, "_last_stale_check", 0.0)
+    assert outbox.wait_until_drained(timeout=5)
+    assert row(entry["id"])["status"] == "sent" and len(channel.sent) == 1
+
+def test_enqueue_many_registers_all_in_one_batch(channel):
+    results = outbox.enqueue_many("test", [(f"010{i:08d}", {"text": f"안내 {i}"}, None) for i in range(25)], revision="campaign-1")
+    assert [r["duplicate"] for r in results] == [False] * 25
+    assert all(r["duplicate"] for r in outbox.enqueue_many("test", [(f"010{i:08d}", {"text": "x"}, None) for i in range(25)], revision="campaign-1"))
+    assert outbox.process_due() == 10 # batch_size씩
+    assert outbox.get_summary("campaign-1") == {"test": {"sent": 10, "pending": 15}}
+
+
+def test_workers_drain_queue(channel):
+    outbox.start_workers(2)
+    for i in range(20): outbox.enqueue("test", f"{i}@example.com", {}, revision="r")
+    assert outbox.wait_until_drained(timeout=10)
+    assert len(channel.sent) == 20 and len({e["id"] for e in channel.sent}) == 20 # 작업 스레드끼리 겹치지 않음
+
+def test_sent_entry_is_resent_only_when_asked(channel):
+    entry = outbox.enqueue("test", "a@example.com", {"v": 1}, revision="r1")
+    outbox.process_due()
+    assert outbox.enqueue("test", "a@example.com", {"v": 1}, revision="r1") == {"id": entry["id"], "status": "sent", "duplicate": True}
+
+    resent = outbox.enqueue("test", "a@example.com", {"v": 2}, attachment=b"new", revision="r1", resend=True)
+    assert resent == {"id": entry["id"], "status": "pending", "duplicate": False}
+    assert row(entry["id"])["sent_at"] is None
+    assert outbox.enqueue("test", "a@example.com", {"v": 3}, revision="r1", resend=True)["duplicate"] # 대기 중이면 다시 등록하지 않음
+    outbox.process_due()
+    assert [e["payload"] for e in channel.sent] == [{"v": 1}, {"v": 2}] and channel.sent[-1]["attachment"] == b"new"
+
+
+def test_worker_start_purges_old_sent_entries(channel):
+    old, recent, failed = (outbox.enqueue("test", f"{i}@example.com", {}) for i in range(3))
+    channel.results = [{"ok": True}, {"ok": True}, {"ok": False, "error": "x", "retryable": False}]
+    outbox.process_due()
+    with closing(outbox._connect()) as conn:
+        conn.execute("UPDATE outbox SET sent_at = ? WHERE id = ?", (time.time() - (outbox.SENT_RETENTION_DAYS + 1) * 86400, old["id"]))
+    outbox.start_workers(1)
+    remaining = {e["id"] for e in outbox.list_entries()}
+    assert remaining == {recent["id"], failed["id"]}
\ No newline at end of file
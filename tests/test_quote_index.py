@@ -0,0 +1,219 @@
+# tests/test_quote_index.py
+# 월 파티션 저장 + 전화번호 인덱스(delta 파일 / compaction / 다른 프로세스 변경 반영) 동작 확인
+import gzip
+import json
+import threading
+
+import pytest
+
+import fake_drive as fake_drive_module
+import google_drive_helper as gdrive
+
+PROCESS_CACHE_NAMES = ("_quote_index_cache", "_folder_id_cache", "_last_saved_hashes", "_archive_bundle_cache")
+
+
+def use_process(state):
+    """프로세스마다 따로인 모듈 캐시를 state 사전의 것으로 바꿔 끼워, 한 테스트 안에서 여러 프로세스를 흉내 냅니다."""
+    for name in PROCESS_CACHE_NAMES:
+        setattr(gdrive, name, state.setdefault(name, {}))
+
+
+def quote(moving_date, name="홍길동"):
+    return {"customer_name": name, "moving_date": moving_date, "customer_phone": "x"}
+
+
+def index_file(drive):
+    found = drive.children("root", gdrive.QUOTE_INDEX_FILE_NAME)
+    assert len(found) == 1
+    return found[0]
+
+
+def delta_files(drive):
+    folder = drive.children("root", gdrive.QUOTE_INDEX_DELTA_FOLDER_NAME)[0]
+    return drive.children(folder["id"])
+
+
+def test_save_appends_small_delta_instead_of_rewriting_index(fake_drive):
+    gdrive.load_quote_index() # 인덱스 파일 최초 생성
+    index_version = index_file(fake_drive)["version"]
+    fake_drive.reset_stats()
+
+    for i in range(3):
+        result = gdrive.save_quote_json(f"0101234000{i}", quote("2024-05-0{}".format(i + 1)))
+        assert result["status"] == "created"
+
+    assert index_file(fake_drive)["version"] == index_version # 인덱스 파일은 다시 올리지 않음
+    assert sorted(f["name"] for f in delta_files(fake_drive)) == [f"0101234000{i}.delta" for i in range(3)]
+    assert fake_drive.bytes_up < 3 * 500 # 견적 JSON 3개만 업로드 (delta는 내용 없는 메타데이터)
+    assert [r["name"] for r in gdrive.search_quotes("0002")] == ["01012340002.json"]
+
+
+def test_unchanged_save_writes_no_delta(fake_drive):
+    gdrive.save_quote_json("01055556666", quote("2024-05-01"))
+    fake_drive.reset_stats()
+    assert gdrive.save_quote_json("01055556666", quote("2024-05-01"))["status"] == "unchanged"
+    assert fake_drive.calls["create"] == 0 and fake_drive.calls["update"] == 0
+
+
+def test_moving_date_change_moves_file_and_records_new_partition(fake_drive):
+    first = gdrive.save_quote_json("01055556666", quote("2024-05-01"))
+    second = gdrive.save_quote_json("01055556666", quote("2024-07-15"))
+    assert second["id"] == first["id"]
+    entry = gdrive.load_quote_index()["01055556666"]
+    assert entry["partition"] == "2024-07" and entry["moving_date"] == "2024-07-15"
+    july_folder = fake_drive.children("root", "2024-07")[0]
+    assert fake_drive.files_by_id[first["id"]]["parents"] == [july_folder["id"]]
+
+
+def test_other_process_sees_new_entries_after_refresh_interval(fake_drive, monkeypatch):
+    process_a, process_b = {}, {}
+    use_process(process_a)
+    gdrive.load_quote_index()
+    use_process(process_b)
+    assert gdrive.search_quotes("7777") == [] # B가 인덱스를 캐시함
+
+    use_process(process_a)
+    gdrive.save_quote_json("01033337777", quote("2024-06-01"))
+
+    use_process(process_b)
+    assert gdrive.search_quotes("7777") == [] # 갱신 주기 전에는 캐시 사용
+    monkeypatch.setattr(gdrive, "QUOTE_INDEX_REFRESH_SECONDS", 0)
+    fake_drive.reset_stats()
+    assert [r["name"] for r in gdrive.search_quotes("7777")] == ["01033337777.json"]
+    assert fake_drive.calls["get_media"] == 0 # 인덱스 파일은 다시 내려받지 않고 delta 목록만 조회
+
+
+def test_compaction_folds_deltas_into_index_and_other_process_reloads(fake_drive, monkeypatch):
+    process_a, process_b = {}, {}
+    use_process(process_b)
+    gdrive.load_quote_index()
+    use_process(process_a)
+    for i in range(5):
+        gdrive.save_quote_json(f"0109999000{i}", quote("2024-05-01", name=f"고객{i}"))
+    assert gdrive.compact_quote_index(min_deltas=10) == 0 # 기준 미만이면 그대로
+    assert gdrive.compact_quote_index(min_deltas=1) == 5
+
+    assert delta_files(fake_drive) == []
+    saved = json.loads(gzip.decompress(index_file(fake_drive)["content"]))["quotes"]
+    assert sorted(saved) == [f"0109999000{i}" for i in range(5)]
+    assert saved["01099990003"]["customer_name"] == "고객3"
+
+    use_process(process_b)
+    monkeypatch.setattr(gdrive, "QUOTE_INDEX_REFRESH_SECONDS", 0)
+    assert len(gdrive.search_quotes("0109999")) == 5 # 인덱스 version이 바뀌어 다시 읽음
+
+
+def test_plain_json_index_from_earlier_version_is_read(fake_drive):
+    legacy = {"version": 1, "quotes": {"01011112222": {"file_id": "x1", "folder_id": "d", "partition": "2024-01",
+                                                       "moving_date": "2024-01-02", "customer_name": "예전"}}}
+    fake_drive.add_file(gdrive.QUOTE_INDEX_FILE_NAME, json.dumps(legacy).encode("utf-8"), mime_type="application/json")
+    assert [r["id"] for r in gdrive.search_quotes("2222")] == ["x1"]
+
+
+def test_folded_delta_left_behind_by_failed_trash_is_not_reapplied(fake_drive, monkeypatch):
+    gdrive.save_quote_json("01077778888", quote("2024-05-01", name="처음"))
+    [stale_delta] = delta_files(fake_drive)
+    gdrive.save_quote_json("01077778888", quote("2024-05-01", name="나중"))
+
+    # 예전 delta만 휴지통 이동에 실패
+    trash_files = gdrive._trash_files
+    failing = {stale_delta["id"]}
+    monkeypatch.setattr(gdrive, "_trash_files", lambda file_ids, service, on_trashed=None:
+                        trash_files([i for i in file_ids if i not in failing], service, on_trashed))
+    assert gdrive.compact_quote_index(min_deltas=1) == 2
+    assert [f["id"] for f in delta_files(fake_drive)] == [stale_delta["id"]]
+
+    gdrive._quote_index_cache.clear() # 새 프로세스: 남은 예전 delta를 다시 적용하면 안 됨
+    assert gdrive.load_quote_index()["01077778888"]["customer_name"] == "나중"
+
+    failing.clear() # 다음 compaction에서 남은 delta도 정리
+    assert gdrive.compact_quote_index(min_deltas=1) == 1
+    assert delta_files(fake_drive) == []
+
+
+def test_delta_round_trip_matches_saved_entries():
+    entry = {"file_id": "f1", "folder_id": "d1", "partition": "2024-05", "moving_date": "2024-05-01", "customer_name": "홍길동"}
+    assert gdrive._decode_index_delta(gdrive._encode_index_delta(entry)) == entry
+    archived = {"partition": "2023-01", "moving_date": "2023-01-09", "customer_name": "", "archive_file_id": "b1"}
+    assert gdrive._decode_index_delta(gdrive._encode_index_delta(archived)) == archived
+    long_name = gdrive._encode_index_delta(dict(entry, customer_name="가" * 100))["n"]
+    assert len(long_name.encode("utf-8")) + 1 <= 124 # appProperties 키+값 제한
+
+
+def test_archived_quotes_stay_loadable_after_reload(fake_drive, monkeypatch):
+    gdrive.save_quote_json("01012121212", quote("2020-03-05", name="보관고객"))
+    gdrive.save_quote_json("01034343434", quote("2099-01-01"))
+    assert gdrive.archive_old_quotes(older_than_months=12) == 1
+
+    monkeypatch.setattr(gdrive, "_quote_index_cache", {})
+    monkeypatch.setattr(gdrive, "_archive_bundle_cache", {})
+    [result] = gdrive.search_quotes("1212")
+    assert result["id"].startswith(gdrive.ARCHIVE_LOCATION_PREFIX)
+    assert gdrive.load_quote(result["id"])["customer_name"] == "보관고객"
+    assert [r["name"] for r in gdrive.search_quotes("3434")] == ["01034343434.json"]
+
+
+@pytest.mark.parametrize("moving_date, expected", [("2024-05-31", "2024-05"), ("", gdrive.UNDATED_PARTITION_NAME), ("bad", gdrive.UNDATED_PARTITION_NAME)])
+def test_month_partition_name(moving_date, expected):
+    assert gdrive.month_partition_name(moving_date) == expected
+
+
+def lock_is_free():
+    """다른 세션(스레드)이 지금 인덱스 잠금을 잡을 수 있는지"""
+    result = []
+    def probe():
+        acquired = gdrive._index_lock.acquire(blocking=False)
+        if acquired: gdrive._index_lock.release()
+        result.append(acquired)
+    thread = threading.Thread(target=probe)
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_index_lock_is_not_held_during_drive_writes(fake_drive, monkeypatch):
+    gdrive.save_quote_json("01012345678", quote("2024-05-01"))
+    gdrive.save_quote_json("01011112222", quote("2020-01-01"))
+    lock_states = []
+    execute = fake_drive_module._Request.execute
+    def recording_execute(self):
+        if self._method in ("create", "update", "get", "list"): lock_states.append((self._method, lock_is_free()))
+        return execute(self)
+    monkeypatch.setattr(fake_drive_module._Request, "execute", recording_execute)
+
+    gdrive.save_quote_json("01087654321", quote("2024-05-02")) # delta 파일 생성
+    gdrive.compact_quote_index(min_deltas=1) # 인덱스 파일 업로드
+    assert gdrive.archive_old_quotes(older_than_months=12) > 0 # 묶음 업로드, 인덱스 저장, 원본 휴지통 이동
+    monkeypatch.setattr(gdrive, "QUOTE_INDEX_REFRESH_SECONDS", 0)
+    gdrive.load_quote_index() # 주기적 갱신
+    assert {method for method, _ in lock_states} >= {"create", "update", "get"}
+    assert all(free for _, free in lock_states), lock_states
+
+
+def test_archiving_keeps_quotes_saved_during_the_run(fake_drive, monkeypatch):
+    for i in range(3):
+        gdrive.save_quote_json(f"0102020000{i}", quote("2020-03-05", name=f"보관{i}"))
+    folder = fake_drive.children("root", "2020-03")[0]
+    changed_id = gdrive.load_quote_index()["01020200001"]["file_id"]
+
+    # 묶음을 올리는 동안 한 견적이 다시 저장되고, 같은 월 폴더에 새 견적이 저장됨
+    upload_bytes = gdrive._upload_bytes
+    def upload_during_saves(file_name, *args, **kwargs):
+        if file_name == "2020-03.json.gz":
+            gdrive.save_quote_json("01020200001", quote("2020-03-05", name="보관 중 수정"))
+            gdrive.save_quote_json("01020209999", quote("2020-03-20", name="새 견적"))
+        return upload_bytes(file_name, *args, **kwargs)
+    monkeypatch.setattr(gdrive, "_upload_bytes", upload_during_saves)
+    assert gdrive.archive_old_quotes(older_than_months=12) == 2
+    monkeypatch.setattr(gdrive, "_upload_bytes", upload_bytes)
+
+    assert not fake_drive.files_by_id[folder["id"]]["trashed"] # 비어 있지 않은 폴더는 남김
+    assert sorted(f["name"] for f in fake_drive.children(folder["id"])) == ["01020200001.json", "01020209999.json"]
+    index = gdrive.load_quote_index()
+    assert index["01020200001"]["file_id"] == changed_id and "archive_file_id" in index["01020200000"]
+    assert gdrive.load_quote(gdrive.search_quotes("01020200001")[0]["id"])["customer_name"] == "보관 중 수정"
+
+    assert gdrive.archive_old_quotes(older_than_months=12) == 2 # 다음 보관 때 나머지를 묶고 빈 폴더 정리
+    assert fake_drive.files_by_id[folder["id"]]["trashed"]
+    assert gdrive.load_quote(gdrive.search_quotes("01020200001")[0]["id"])["customer_name"] == "보관 중 수정"
+    assert len(gdrive.search_quotes("0102020")) == 4
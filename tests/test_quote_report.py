@@ -0,0 +1,91 @@
+# tests/test_quote_report.py
+# 견적 보고서: 고객용 비용 목록(날짜 할증 합치기), 값이 없는 항목의 기본값, 이사 정보 요약 문구 순서
+import pytest
+
+import quote_report
+from cost_ledger import CostCode, CostLedger, CostLine
+
+
+def ledger(*lines):
+    cost_lines = CostLedger()
+    for code, label, amount, *note in lines:
+        cost_lines.add(code, label, amount, *note)
+    return cost_lines
+
+
+SAMPLE_STATE = {
+    "customer_name": "홍길동", "customer_phone": "01012345678", "final_selected_vehicle": "5톤",
+    "from_location": "서울 A", "to_location": "부산 B", "from_method": "사다리차 🪜", "to_method": "승강기 🛗",
+    "has_via_point": True, "via_point_location": "대전 C", "via_point_method": "계단 🚶",
+    "deposit_amount": 100000, "issue_tax_invoice": True, "special_notes": "피아노 있음\n주차 어려움",
+}
+
+
+def test_date_surcharge_is_merged_into_base_fare_for_customers():
+    cost_lines = ledger((CostCode.BASE_FARE, "기본 운임", 1000000, "5톤 기준"), (CostCode.DATE_SURCHARGE, "날짜 할증", 200000),
+                        (CostCode.LADDER_FROM, "출발지 사다리차", 150000))
+    report = quote_report.build_quote_report({"final_selected_vehicle": "5톤"}, cost_lines, 1350000, {})
+    assert report["customer_cost_lines"] == [
+        CostLine("기본 운임", 1200000, f"5톤 ({quote_report.DATE_SURCHARGE_NOTE})", CostCode.BASE_FARE),
+        CostLine("출발지 사다리차", 150000, "", CostCode.LADDER_FROM),
+    ]
+    assert list(report["cost_lines"]) == list(cost_lines) # 내부용 목록은 그대로
+
+
+@pytest.mark.parametrize("lines", [
+    [(CostCode.BASE_FARE, "기본 운임", 1000000, "5톤 기준"), (CostCode.DATE_SURCHARGE, "날짜 할증", 0)],
+    [(CostCode.DATE_SURCHARGE, "날짜 할증", 200000)], # 기본 운임이 없으면 합칠 곳이 없음
+])
+def test_customer_cost_lines_unchanged_without_mergeable_surcharge(lines):
+    cost_lines = ledger(*lines)
+    assert quote_report.build_quote_report({}, cost_lines, 0, {})["customer_cost_lines"] == list(cost_lines)
+
+
+def test_legacy_cost_items_are_converted_without_errors():
+    report = quote_report.build_quote_report({}, [("기본 운임", 1000000, "5톤 기준"), ("폐기물 처리", 12345.6, ""),
+                                                  ("오류", 0, "가격 정보 없음")], 1012345, {})
+    assert report["cost_error"] == "가격 정보 없음"
+    assert [(line.code, line.amount) for line in report["cost_lines"]] == [(CostCode.BASE_FARE, 1000000), (CostCode.WASTE, 12345)]
+
+
+def test_missing_values_use_defaults():
+    report = quote_report.build_quote_report(None, None, None, None)
+    assert report["via_point"] is None and report["storage"] is None and report["long_distance"] is None
+    assert (report["total"], report["deposit"], report["balance"]) == (0, 0, 0)
+    assert report["personnel"]["text"] == "남성 0명" and report["cost_error"] is None
+    assert list(report["cost_lines"]) == [] and report["customer_cost_lines"] == []
+    assert report["baskets"] == {"바구니": 0, "중박스": 0, "책바구니": 0}
+
+
+def test_via_point_and_storage_only_when_enabled():
+    state = dict(SAMPLE_STATE, has_via_point=False, is_storage_move=True, storage_duration=3, storage_type="컨테이너 보관 📦")
+    report = quote_report.build_quote_report(state, [], 0, {})
+    assert report["via_point"] is None
+    assert report["storage"] == {"duration": 3, "type": "컨테이너 보관 📦", "use_electricity": False}
+    assert quote_report.build_quote_report(SAMPLE_STATE, [], 0, {})["via_point"] == {"location": "대전 C", "method": "계단 🚶"}
+
+
+def test_summary_text_lines_order():
+    cost_lines = ledger((CostCode.VAT, "부가세 (10%)", 150000), (CostCode.LADDER_FROM, "출발지 사다리차", 150000),
+                        (CostCode.BASE_FARE, "기본 운임", 1000000, "5톤 기준"), (CostCode.DATE_SURCHARGE, "날짜 할증", 200000),
+                        (CostCode.VIA_POINT, "경유지 추가요금", 0), (CostCode.ADJUSTMENT, "할인 조정 금액", -50000))
+    report = quote_report.build_quote_report(SAMPLE_STATE, cost_lines, 1450000, {"final_men": 3, "final_women": 1})
+    assert quote_report.summary_text_lines(report) == [
+        "서울 A -> 부산 B 5톤", "홍길동", "01012345678", "",
+        "5톤 / 3+1명", "",
+        "출발지: 사다리차", "도착지: 승강기", "경유지: 계단", "",
+        "계약금 100,000원 / 잔금 1,350,000원", "(세금계산서 발행 요청)", "",
+        "총 1,450,000원 중",
+        # 기본 운임 -> 기타 -> 사다리/스카이 -> 부가세/카드 수수료 (0원 제외)
+        "이사비 1,000,000", "날짜 할증 200,000", "할인 조정 금액 -50,000", "출발지 사다리차 150,000", "부가세 (10%) 150,000", "",
+        "출발지 주소:", "서울 A", "", "도착지 주소:", "부산 B", "", "경유지 주소:", "대전 C", "",
+        "바구니 정보 없음", "",
+        "요구사항:", "피아노 있음", "주차 어려움",
+    ]
+
+
+def test_summary_text_without_cost_lines_or_addresses():
+    report = quote_report.build_quote_report({"final_selected_vehicle": "2.5톤 트럭"}, [], 0, {"final_men": 2})
+    lines = quote_report.summary_text_lines(report)
+    assert lines[0] == "정보 없음 -> 정보 없음 2.5톤" and lines[1:4] == ["", "2.5톤 / 2명", ""]
+    assert "세부 비용 내역 없음" in lines and lines.count("정보 없음") == 2 # 출발지/도착지 주소
\ No newline at end of file
@@ -0,0 +1,72 @@
+# tests/test_quote_revisions.py
+# 동시 편집 확인: 불러온 version과 내용이 어긋나지 않는지, 내용이 같은 저장은 최신 version을 이어받는지
+import io
+import json
+
+import google_drive_helper as gdrive
+from fake_drive import FakeMediaIoBaseUpload
+
+PHONE = "01055556666"
+
+
+def quote(name, moving_date="2024-05-01"):
+    return {"customer_name": name, "moving_date": moving_date, "customer_phone": PHONE}
+
+
+def fake_drive_media(data):
+    return FakeMediaIoBaseUpload(io.BytesIO(json.dumps(data, ensure_ascii=False).encode("utf-8")))
+
+
+def test_unchanged_save_returns_version_of_identical_content(fake_drive):
+    created = gdrive.save_quote_json(PHONE, quote("처음"))
+    file_id, loaded_version = created["id"], created["version"] # 세션 A, B가 같은 version을 불러옴
+
+    saved_by_a = gdrive.save_quote_json(PHONE, quote("수정"), expected_file_id=file_id, expected_version=loaded_version)
+    assert saved_by_a["status"] == "updated" and saved_by_a["version"] != loaded_version
+
+    # B가 같은 내용으로 저장: 업로드하지 않고 A가 저장한 version을 이어받음
+    same_by_b = gdrive.save_quote_json(PHONE, quote("수정"), expected_file_id=file_id, expected_version=loaded_version)
+    assert same_by_b["status"] == "unchanged" and same_by_b["version"] == saved_by_a["version"]
+
+    edit_by_b = gdrive.save_quote_json(PHONE, quote("B 수정"), expected_file_id=file_id, expected_version=same_by_b["version"])
+    assert edit_by_b["status"] == "updated"
+
+
+def test_edit_from_other_process_is_still_a_conflict(fake_drive):
+    created = gdrive.save_quote_json(PHONE, quote("처음"))
+    fake_drive.files().update(fileId=created["id"], body={"appProperties": {gdrive.CONTENT_HASH_PROPERTY: "other"}}).execute()
+    result = gdrive.save_quote_json(PHONE, quote("내 수정"), expected_file_id=created["id"], expected_version=created["version"])
+    assert result["status"] == "conflict" and result["remote_version"] != created["version"]
+
+def test_load_reads_version_before_content(fake_drive, monkeypatch):
+    created = gdrive.save_quote_json(PHONE, quote("처음"))
+    gdrive._last_saved_hashes.clear() # 다른 프로세스에서 불러오기
+    fake_drive.reset_stats()
+    loaded, version = gdrive.load_quote_with_version(created["id"])
+    assert loaded["customer_name"] == "처음" and version == created["version"]
+    assert fake_drive.calls["get"] == 1 and fake_drive.calls["get_media"] == 1
+
+    # 메타데이터를 읽은 뒤 내려받기 전에 다른 코디가 저장
+    download_bytes = gdrive._download_bytes
+    def save_then_download(file_id, service):
+        other = {"customer_name": "다른 코디", "moving_date": "2024-05-01", "customer_phone": PHONE}
+        fake_drive.files().update(fileId=file_id, media_body=fake_drive_media(other),
+                                  body={"appProperties": {gdrive.CONTENT_HASH_PROPERTY: gdrive.utils.compute_content_hash(other)}}).execute()
+        return download_bytes(file_id, service)
+    monkeypatch.setattr(gdrive, "_download_bytes", save_then_download)
+    loaded, version = gdrive.load_quote_with_version(created["id"])
+    monkeypatch.setattr(gdrive, "_download_bytes", download_bytes)
+    assert loaded["customer_name"] == "다른 코디" and version == created["version"] # 내용보다 오래된 version
+
+    # 불러온 내용을 고쳐 저장하면 덮어쓰지 않고 충돌로 알림
+    result = gdrive.save_quote_json(PHONE, dict(loaded, customer_name="내 수정"), expected_file_id=created["id"], expected_version=version)
+    assert result["status"] == "conflict"
+    assert result["remote_data"]["customer_name"] == "다른 코디" and result["remote_version"] == fake_drive.files_by_id[created["id"]]["version"]
+
+
+def test_archived_quote_has_no_version(fake_drive):
+    gdrive.save_quote_json(PHONE, quote("보관", moving_date="2020-01-10"))
+    gdrive.archive_old_quotes(older_than_months=12)
+    [found] = gdrive.search_quotes(PHONE)
+    loaded, version = gdrive.load_quote_with_version(found["id"])
+    assert loaded["customer_name"] == "보관" and version is None
\ No newline at end of file
@@ -0,0 +1,77 @@
+# tests/test_reminder_campaign.py
+# 이사 전날 안내 문자: 문자 만들기, 제외 대상, 캠페인 중복 등록 방지, 대기열 -> 대량 발송까지
+from datetime import date
+
+import pytest
+
+import mms_utils
+import outbox
+import reminder_campaign
+import state_manager
+from fake_servers import fake_aligo_gateway
+
+MOVING_DATE = date(2024, 6, 15) # 토요일
+
+
+def quote_state(i, **overrides):
+    saved = {"customer_name": f"고객{i}", "customer_phone": f"010{10000000 + i:08d}", "moving_date": MOVING_DATE.isoformat(),
+             "from_location": "서울 은평구 가좌로 10", "to_location": "경기 고양시 덕양구", "final_selected_vehicle": "5톤",
+             "tab3_deposit_amount": 100000}
+    saved.update(overrides)
+    return (f"quote_{i}.json", state_manager.build_quote_state(saved), None)
+
+
+@pytest.fixture
+def gateway(tmp_path):
+    outbox.configure(str(tmp_path / "outbox.sqlite3"))
+    mms_utils.close_session()
+    with fake_aligo_gateway() as fake:
+        outbox.set_channel_settings("sms", fake.creds)
+        yield fake
+    outbox.stop_workers()
+    outbox.set_channel_settings("sms", None)
+    outbox.configure(None)
+    mms_utils.close_session()
+
+
+def test_render_reminder_fills_every_field():
+    _, state, _ = quote_state(1)
+    text = reminder_campaign.render_reminder(state)
+    assert text.startswith("[이삿날] 고객1님, 6월 15일(토) 이사 예정입니다.")
+    assert "출발: 서울 은평구 가좌로 10" in text and "도착: 경기 고양시 덕양구" in text
+    assert "차량 5톤" in text and text.endswith(f"문의: {reminder_campaign.COMPANY_PHONE}")
+    assert "{" not in text
+
+
+def test_unknown_template_field_is_rejected():
+    with pytest.raises(ValueError):
+        reminder_campaign.validate_template("{customer_name}님 {unknown}")
+    reminder_campaign.validate_template("{customer_name}님, {moving_date} 이사") # 사용 가능한 항목만이면 통과
+
+
+def test_campaign_id_is_per_moving_date():
+    assert reminder_campaign.campaign_id_for("2024-06-15T09:00") == reminder_campaign.campaign_id_for(MOVING_DATE) == "reminder-2024-06-15"
+
+
+def test_dry_run_builds_messages_without_queueing(gateway):
+    states = [quote_state(i) for i in range(5)] + [quote_state(9, customer_phone="")]
+    report = reminder_campaign.queue_reminders(iter(states), "reminder-test", dry_run=True)
+    assert report["selected"] == 6 and report["queued"] == 5 and len(report["previews"]) == 3
+    assert [s["name"] for s in report["skipped"]] == ["quote_9.json"]
+    assert outbox.list_entries() == []
+
+
+def test_campaign_sends_personalized_texts_once(gateway):
+    states = [quote_state(i) for i in range(7)] + [("broken.json", None, "견적 불러오기 실패")]
+    report = reminder_campaign.queue_reminders(iter(states), "reminder-test")
+    assert report["queued"] == 7 and report["duplicates"] == 0 and report["skipped"] == [{"name": "broken.json", "error": "견적 불러오기 실패"}]
+
+    assert outbox.process_due() == 7
+    assert gateway.mass_counts == [7] # 한 번의 대량 발송 요청
+    assert gateway.delivered == {state["customer_phone"].replace("-", ""): reminder_campaign.render_reminder(state) for _, state, _ in states[:7]}
+    progress = reminder_campaign.get_campaign_progress("reminder-test")
+    assert (progress["total"], progress["sent"], progress["failed"]) == (7, 7, 0)
+
+    rerun = reminder_campaign.queue_reminders(iter(states), "reminder-test") # 같은 캠페인을 다시 실행해도 다시 보내지 않음
+    assert rerun["queued"] == 0 and rerun["duplicates"] == 7
+    assert outbox.process_due() == 0
\ No newline at end of file
@@ -0,0 +1,51 @@
+# tests/test_state_manager.py
+# 저장 대상 데이터 / 내용 해시 / 변경 여부 판단
+from datetime import date
+
+import pytest
+
+import state_manager
+import utils
+
+
+class FakeSessionState(dict):
+    """st.session_state 대용 (속성 접근 지원)."""
+    def __getattr__(self, key):
+        try: return self[key]
+        except KeyError: raise AttributeError(key)
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
+@pytest.fixture
+def session(monkeypatch):
+    state = FakeSessionState(customer_name="홍길동", moving_date=date(2024, 5, 1), deposit_amount=50000,
+                             date_opt_1_widget=True, uploaded_image_paths=[])
+    monkeypatch.setattr(state_manager.st, "session_state", state)
+    return state
+
+
+def test_content_hash_does_not_write_session_state(session):
+    before = dict(session)
+    content_hash = state_manager.compute_current_content_hash()
+    assert dict(session) == before
+    assert content_hash == utils.compute_content_hash(state_manager.prepare_state_for_save())
+
+
+def test_saved_data_maps_ui_keys_to_tab3_keys(session):
+    saved = state_manager._saveable_state(session)
+    assert saved["tab3_deposit_amount"] == 50000
+    assert saved["tab3_date_opt_1_widget"] is True and saved["tab3_date_opt_0_widget"] is False
+    assert saved["moving_date"] == "2024-05-01"
+    assert "deposit_amount" not in saved
+
+
+def test_has_unsaved_changes_follows_content(session):
+    assert state_manager.has_unsaved_changes() is None # 저장/불러오기 기준 없음
+    state_manager.mark_state_saved()
+    keys_after_mark = set(session)
+    assert state_manager.has_unsaved_changes() is False
+    session["deposit_amount"] = 70000
+    assert state_manager.has_unsaved_changes() is True
+    assert set(session) == keys_after_mark # 확인만으로 tab3_ 키가 생기지 않음
\ No newline at end of file
@@ -16,7 +16,11 @@ try:
     from state_manager import (
         MOVE_TYPE_OPTIONS,
         prepare_state_for_save,
-        load_state_from_data
+        load_state_from_data,
+        mark_state_saved,
+        has_unsaved_changes,
+        diff_quote_states,
+        merge_remote_changes
     )
     import callbacks
 except ImportError as ie:
@@ -42,6 +46,7 @@ except Exception as e_path:
     st.error(f"오류: UPLOAD_DIR 경로 설정 중 문제 발생: {e_path}")
     UPLOAD_DIR = None
 
+@st.fragment(key=callbacks.FRAGMENT_TAB1)
 def render_tab1():
     if UPLOAD_DIR is None:
         st.warning("이미지 업로드 디렉토리 설정에 문제가 있어 이미지 관련 기능이 제한될 수 있습니다.")
@@ -55,12 +60,17 @@ def render_tab1():
 
     # Google Drive 폴더 ID (st.secrets에서 가져오기)
     # secrets.toml 파일의 [gcp_service_account] 섹션 내에 drive_folder_id가 설정되어 있는지 확인합니다.
-    gdrive_folder_id_from_secrets = st.secrets.get("gcp_service_account", {}).get("drive_folder_id")
+    gdrive_folder_id_from_secrets = gdrive.get_root_folder_id()
     # 또는 별도의 최상위 키로 GOOGLE_DRIVE_FOLDER_ID를 사용할 경우:
     # if not gdrive_folder_id_from_secrets:
     #     gdrive_folder_id_from_secrets = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID")
 
 
+    # 오래된 월 파티션 자동 보관 (프로세스당 한 번 시작)
+    if hasattr(gdrive, 'start_background_archiver'):
+        try: gdrive.start_background_archiver(gdrive_folder_id_from_secrets)
+        except Exception as archiver_err: print(f"ERROR [Tab1]: Failed to start quote archiver: {archiver_err}")
+
     with st.container(border=True): # Google Drive Section
         st.subheader("☁️ Google Drive 연동")
         if gdrive_folder_id_from_secrets:
@@ -80,22 +90,13 @@ def render_tab1():
                 st.session_state.gdrive_selected_filename = None
                 search_term_strip = search_term.strip()
                 if search_term_strip:
-                    with st.spinner("🔄 Google Drive에서 JSON 검색 중..."):
-                        all_gdrive_results = gdrive.find_files_by_name_contains(
+                    with st.spinner("🔄 견적 인덱스에서 검색 중..."):
+                        # 전화번호 -> 위치 인덱스 검색 (4자리는 끝자리 일치, 그 외는 부분 일치)
+                        processed_results = gdrive.search_quotes(
                             search_term_strip,
-                            mime_types="application/json",
-                            folder_id=gdrive_folder_id_from_secrets # 폴더 ID 전달
+                            root_folder_id=gdrive_folder_id_from_secrets # 폴더 ID 전달
                         )
-                    processed_results = []
-                    if all_gdrive_results:
-                        if len(search_term_strip) == 4 and search_term_strip.isdigit():
-                            for r_item in all_gdrive_results:
-                                file_name_stem = os.path.splitext(r_item['name'])[0]
-                                if file_name_stem.endswith(search_term_strip):
-                                    processed_results.append(r_item)
-                        else: # 전체 번호 검색 또는 기타 검색어
-                            processed_results = all_gdrive_results # Google Drive 'contains' 결과 그대로 사용
-                    
+
                     if processed_results:
                         st.session_state.gdrive_search_results = processed_results
                         st.session_state.gdrive_file_options_map = {pr_item['name']: pr_item['id'] for pr_item in processed_results}
@@ -143,7 +144,8 @@ def render_tab1():
                 selected_filename_display = st.session_state.get('gdrive_selected_filename', '선택된 파일')
                 if json_file_id:
                     with st.spinner(f"🔄 '{selected_filename_display}' 로딩 중..."):
-                        loaded_content = gdrive.load_json_file(json_file_id)
+                        # 월 파티션 파일 또는 보관 묶음 (version은 내용보다 먼저 읽은 값)
+                        loaded_content, loaded_version = gdrive.load_quote_with_version(json_file_id)
                     if loaded_content:
                         update_basket_callback_ref = getattr(callbacks, 'update_basket_quantities', lambda: None)
                         if 'uploaded_image_paths' not in loaded_content or \
@@ -151,6 +153,13 @@ def render_tab1():
                             loaded_content['uploaded_image_paths'] = []
                         load_success = load_state_from_data(loaded_content, update_basket_callback_ref)
                         if load_success:
+                            mark_state_saved() # 불러온 내용을 변경 여부 판단 기준으로 사용
+                            # 동시 편집 확인용: 불러온 파일의 리비전과 내용을 기억 (보관 묶음은 리비전 없음)
+                            is_archived_location = str(json_file_id).startswith(getattr(gdrive, 'ARCHIVE_LOCATION_PREFIX', 'archive:'))
+                            st.session_state.gdrive_loaded_file_id = None if is_archived_location else json_file_id
+                            st.session_state.gdrive_loaded_version = None if is_archived_location else loaded_version
+                            st.session_state.gdrive_loaded_snapshot = prepare_state_for_save()
+                            st.session_state.gdrive_save_conflict = None
                             st.session_state.image_uploader_key_counter +=1
                             st.success("✅ 견적 데이터 로딩 완료.")
                             st.rerun()
@@ -160,11 +169,14 @@ def render_tab1():
 
         with col_save:
             st.markdown("**현재 견적 저장**")
+            unsaved_state = has_unsaved_changes()
+            if unsaved_state is True: st.caption("✏️ 저장되지 않은 변경사항이 있습니다.")
+            elif unsaved_state is False: st.caption("✔️ 마지막 저장 이후 변경사항 없음.")
             with st.form(key="save_quote_form_tab1"):
                 raw_phone_for_display = st.session_state.get('customer_phone', '').strip()
                 example_sanitized_phone = utils.sanitize_phone_number(raw_phone_for_display)
                 example_json_fname = f"{example_sanitized_phone}.json" if example_sanitized_phone else "전화번호입력후생성.json"
-                st.caption(f"JSON 파일명 예시: `{example_json_fname}` (같은 번호로 저장 시 덮어쓰기)")
+                st.caption(f"JSON 파일명 예시: `{example_json_fname}` (이사일 기준 월 폴더에 저장, 같은 번호로 저장 시 덮어쓰기)")
 
                 submitted = st.form_submit_button("💾 Google Drive에 저장")
                 if submitted:
@@ -185,16 +197,78 @@ def render_tab1():
                              state_data_to_save['uploaded_image_paths'] = st.session_state.get('uploaded_image_paths', [])
                         try:
                             with st.spinner(f"🔄 '{json_filename}' 저장 중..."):
-                                save_json_result = gdrive.save_json_file(
-                                    json_filename,
+                                save_json_result = gdrive.save_quote_json(
+                                    sanitized_customer_phone,
                                     state_data_to_save,
-                                    folder_id=gdrive_folder_id_from_secrets # 폴더 ID 전달
+                                    root_folder_id=gdrive_folder_id_from_secrets, # 이사일 기준 월 폴더에 저장
+                                    expected_file_id=st.session_state.get('gdrive_loaded_file_id'),
+                                    expected_version=st.session_state.get('gdrive_loaded_version')
                                 )
-                            if save_json_result and save_json_result.get('id'):
+                            save_status = save_json_result.get('status') if save_json_result else None
+                            if save_status in ('created', 'updated', 'unchanged'):
+                                # 다음 저장의 리비전 확인 기준 갱신
+                                st.session_state.gdrive_loaded_file_id = save_json_result.get('id')
+                                st.session_state.gdrive_loaded_version = save_json_result.get('version') or st.session_state.get('gdrive_loaded_version')
+                                st.session_state.gdrive_loaded_snapshot = state_data_to_save
+                                st.session_state.gdrive_save_conflict = None
+                                mark_state_saved(save_json_result.get('content_hash'))
+
+                            if save_status == 'conflict':
+                                st.session_state.gdrive_save_conflict = {
+                                    "phone": sanitized_customer_phone,
+                                    "file_id": save_json_result.get('id'),
+                                    "remote_version": save_json_result.get('remote_version'),
+                                    "remote_data": save_json_result.get('remote_data') or {},
+                                }
+                                st.error(f"⚠️ '{json_filename}'은(는) 불러온 뒤 다른 사용자가 저장했습니다. 아래 변경 내역을 확인하세요.")
+                            elif save_status == 'unchanged':
+                                st.info(f"ℹ️ '{json_filename}' 변경사항이 없어 저장을 생략했습니다.")
+                            elif save_json_result and save_json_result.get('id'):
                                 st.success(f"✅ '{json_filename}' 저장 완료.")
                             else: st.error(f"❌ '{json_filename}' 저장 실패.")
                         except Exception as save_err:
                             st.error(f"❌ '{json_filename}' 저장 중 예외 발생: {save_err}")
+
+            save_conflict = st.session_state.get('gdrive_save_conflict')
+            if save_conflict:
+                with st.container(border=True):
+                    st.markdown("**⚠️ 동시 편집 충돌**")
+                    local_data_conflict = prepare_state_for_save()
+                    base_data_conflict = st.session_state.get('gdrive_loaded_snapshot') or {}
+                    diff_rows = diff_quote_states(base_data_conflict, local_data_conflict, save_conflict["remote_data"])
+                    if diff_rows:
+                        st.dataframe([{k: (str(v) if v is not None else "") for k, v in row.items()} for row in diff_rows], hide_index=True, use_container_width=True)
+                    else:
+                        st.caption("내용 차이는 없고 리비전만 다릅니다.")
+                    col_merge, col_overwrite = st.columns(2)
+                    if col_merge.button("🔀 서버 변경사항 병합", key="gdrive_conflict_merge_btn", help="내가 바꾸지 않은 필드는 서버 값으로 가져오고, 내가 바꾼 필드는 유지합니다."):
+                        merged_data = merge_remote_changes(base_data_conflict, local_data_conflict, save_conflict["remote_data"])
+                        if load_state_from_data(merged_data, getattr(callbacks, 'update_basket_quantities', lambda: None)):
+                            st.session_state.gdrive_loaded_file_id = save_conflict["file_id"]
+                            st.session_state.gdrive_loaded_version = save_conflict["remote_version"]
+                            st.session_state.gdrive_loaded_snapshot = save_conflict["remote_data"]
+                            mark_state_saved(utils.compute_content_hash(save_conflict["remote_data"]))
+                            st.session_state.gdrive_save_conflict = None
+                            st.rerun()
+                    if col_overwrite.button("💾 내 변경으로 덮어쓰기", key="gdrive_conflict_overwrite_btn"):
+                        with st.spinner("🔄 덮어쓰는 중..."):
+                            overwrite_result = gdrive.save_quote_json(
+                                save_conflict["phone"], local_data_conflict,
+                                root_folder_id=gdrive_folder_id_from_secrets,
+                                expected_file_id=save_conflict["file_id"],
+                                expected_version=save_conflict["remote_version"]
+                            )
+                        if overwrite_result and overwrite_result.get('status') in ('created', 'updated', 'unchanged'):
+                            st.session_state.gdrive_loaded_file_id = overwrite_result.get('id')
+                            st.session_state.gdrive_loaded_version = overwrite_result.get('version')
+                            st.session_state.gdrive_loaded_snapshot = local_data_conflict
+                            mark_state_saved(overwrite_result.get('content_hash'))
+                            st.session_state.gdrive_save_conflict = None
+                            st.rerun()
+                        elif overwrite_result and overwrite_result.get('status') == 'conflict':
+                            save_conflict.update(remote_version=overwrite_result.get('remote_version'), remote_data=overwrite_result.get('remote_data') or {})
+                            st.error("⚠️ 그 사이 서버 버전이 다시 변경되었습니다. 변경 내역을 다시 확인하세요.")
+                        else: st.error("❌ 덮어쓰기 실패.")
     st.divider()
 
     st.header("📝 고객 기본 정보")
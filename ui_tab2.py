@@ -1,6 +1,9 @@
 # ui_tab2.py
 import streamlit as st
 import math
+from lazy_imports import lazy_module
+
+pd = lazy_module("pandas") # 품목 수량 표(data_editor)를 그릴 때만 사용
 
 # Import necessary custom modules
 try:
@@ -14,6 +17,7 @@ except Exception as e:
     st.stop()
 
 
+@st.fragment(key=callbacks.FRAGMENT_TAB2)
 def render_tab2():
     """Renders the UI for Tab 2: Item Selection."""
 
@@ -28,62 +32,78 @@ def render_tab2():
             st.warning("이사 유형이 선택되지 않았습니다.")
             return # Stop rendering if no move type
 
-        # Ensure callbacks.handle_item_update is available
-        handle_item_update_callback = getattr(callbacks, "handle_item_update", None)
-        if not callable(handle_item_update_callback):
-            st.error("오류: 실시간 업데이트 콜백 함수(handle_item_update)를 찾을 수 없습니다. callbacks.py를 확인하세요.")
-            # Optionally, disable on_change or stop if critical
-            # return
+        # 섹션별 수량 표의 변경분을 '수량 적용' 한 번으로 모아서 반영 (품목마다 재실행하지 않음)
+        apply_item_grid_callback = getattr(callbacks, "apply_item_grid_edits", None)
+        if not callable(apply_item_grid_callback):
+            st.error("오류: 수량 적용 콜백 함수(apply_item_grid_edits)를 찾을 수 없습니다. callbacks.py를 확인하세요.")
+            return
 
         item_category_to_display = data.item_definitions.get(current_move_type, {})
         basket_section_name_check = "포장 자재 📦" # Used to identify the basket section
-
-        for section, item_list in item_category_to_display.items():
-            if section == "폐기 처리 품목 🗑️": continue # Skip waste section
-
-            valid_items_in_section = [item for item in item_list if hasattr(data, "items") and data.items is not None and item in data.items]
-            if not valid_items_in_section: continue
-
-            expander_label = f"{section} 품목 선택"
-            expanded_default = section == basket_section_name_check
-
-            with st.expander(expander_label, expanded=expanded_default):
-                if section == basket_section_name_check:
-                    selected_truck_tab2 = st.session_state.get("final_selected_vehicle")
-                    if selected_truck_tab2 and hasattr(data, "default_basket_quantities") and data.default_basket_quantities is not None and selected_truck_tab2 in data.default_basket_quantities:
-                        defaults = data.default_basket_quantities[selected_truck_tab2]
-                        basket_qty = defaults.get("바구니", 0)
-                        med_box_qty = defaults.get("중박스", defaults.get("중자바구니", 0))
-                        book_qty = defaults.get("책바구니", 0)
-                        st.info(f"💡 **{selected_truck_tab2}** 추천 기본값: 바구니 {basket_qty}개, 중박스 {med_box_qty}개, 책바구니 {book_qty}개 (현재 값이며, 직접 수정 가능합니다)")
-                    else:
-                        st.info("💡 비용 탭에서 차량 선택 시 추천 기본 바구니 개수가 여기에 표시됩니다.")
-
-                num_columns = 2
-                cols = st.columns(num_columns)
-                num_items = len(valid_items_in_section)
-                items_per_col = math.ceil(num_items / len(cols)) if num_items > 0 and len(cols) > 0 else 1
-
-                for idx, item in enumerate(valid_items_in_section):
-                    col_index = idx // items_per_col if items_per_col > 0 else 0
-                    if col_index < len(cols):
-                        with cols[col_index]:
-                            unit = "칸" if item == "장롱" else "개"
-                            key_prefix = "qty"
-                            widget_key = f"{key_prefix}_{current_move_type}_{section}_{item}"
-
-                            if widget_key not in st.session_state:
-                                st.session_state[widget_key] = 0
-                                # print(f"Warning: Initialized missing item key in Tab 2: {widget_key}")
-
-                            st.number_input(
-                                label=f"{item}",
-                                min_value=0,
-                                step=1,
-                                key=widget_key,
-                                help=f"{item}의 수량 ({unit})",
-                                on_change=handle_item_update_callback # Connect the callback
-                            )
+        qty_column = callbacks.ITEM_GRID_QTY_COLUMN
+        grid_version = st.session_state.get("item_grid_version", 0) # 적용 후 올려서 표의 편집 상태를 초기화
+        grid_row_keys = {} # 표 key -> 행 순서대로의 qty_ 세션 키 (콜백에서 edited_rows 행 번호를 품목으로 변환)
+
+        st.caption(f"표의 '{qty_column}' 칸을 수정한 뒤 아래 **수량 적용** 버튼을 누르면 물량, 추천 차량, 견적에 한 번에 반영됩니다.")
+        with st.form(key="item_grid_form_tab2", border=False):
+            for section, item_list in item_category_to_display.items():
+                if section == "폐기 처리 품목 🗑️": continue # Skip waste section
+
+                valid_items_in_section = [item for item in item_list if hasattr(data, "items") and data.items is not None and item in data.items]
+                if not valid_items_in_section: continue
+
+                expander_label = f"{section} 품목 선택"
+                expanded_default = section == basket_section_name_check
+
+                with st.expander(expander_label, expanded=expanded_default):
+                    if section == basket_section_name_check:
+                        selected_truck_tab2 = st.session_state.get("final_selected_vehicle")
+                        if selected_truck_tab2 and hasattr(data, "default_basket_quantities") and data.default_basket_quantities is not None and selected_truck_tab2 in data.default_basket_quantities:
+                            defaults = data.default_basket_quantities[selected_truck_tab2]
+                            basket_qty = defaults.get("바구니", 0)
+                            med_box_qty = defaults.get("중박스", defaults.get("중자바구니", 0))
+                            book_qty = defaults.get("책바구니", 0)
+                            st.info(f"💡 **{selected_truck_tab2}** 추천 기본값: 바구니 {basket_qty}개, 중박스 {med_box_qty}개, 책바구니 {book_qty}개 (현재 값이며, 직접 수정 가능합니다)")
+                        else:
+                            st.info("💡 비용 탭에서 차량 선택 시 추천 기본 바구니 개수가 여기에 표시됩니다.")
+
+                    row_keys = []
+                    row_qtys = []
+                    for item in valid_items_in_section:
+                        qty_key = f"qty_{current_move_type}_{section}_{item}"
+                        if qty_key not in st.session_state:
+                            st.session_state[qty_key] = 0
+                            # print(f"Warning: Initialized missing item key in Tab 2: {qty_key}")
+                        try: qty = int(st.session_state.get(qty_key, 0) or 0)
+                        except (ValueError, TypeError): qty = 0
+                        row_keys.append(qty_key)
+                        row_qtys.append(qty)
+
+                    grid_key = f"item_grid_{current_move_type}_{section}_{grid_version}"
+                    grid_row_keys[grid_key] = row_keys
+                    st.data_editor(
+                        pd.DataFrame({
+                            "품목": valid_items_in_section,
+                            "단위": ["칸" if item == "장롱" else "개" for item in valid_items_in_section],
+                            qty_column: row_qtys,
+                        }),
+                        key=grid_key,
+                        hide_index=True,
+                        num_rows="fixed",
+                        disabled=["품목", "단위"],
+                        use_container_width=True,
+                        column_config={
+                            qty_column: st.column_config.NumberColumn(qty_column, min_value=0, step=1, format="%d", required=True),
+                        },
+                    )
+
+            st.form_submit_button(
+                "✅ 수량 적용",
+                type="primary",
+                use_container_width=True,
+                on_click=apply_item_grid_callback,
+                args=(grid_row_keys,),
+            )
 
     st.write("---")
 
@@ -1,11 +1,12 @@
 # ui_tab3.py (결제 옵션 UI 제거, 요약 정보 표시 수정은 유지, Excel 및 이미지 생성/다운로드 통합)
 import streamlit as st
-import pandas as pd
 import io
 import pytz
 from datetime import datetime, date
 import traceback
-import re
+from lazy_imports import lazy_module
+
+pd = lazy_module("pandas") # 비용 표를 그릴 때만 사용
 
 # Import necessary custom modules
 try:
@@ -18,6 +19,11 @@ try:
     import callbacks
     from state_manager import MOVE_TYPE_OPTIONS
     import mms_utils # MMS 발송에 필요
+    import artifact_cache # PDF/이미지/Excel 한 번 생성 후 재사용
+    import quote_report # 견적 보고서 모델 (화면 요약 문구)
+    import pdf_raster # Poppler 변환 백그라운드 작업 (프로세스 풀)
+    import artifact_store # 생성 파일은 디스크에 두고 세션에는 핸들만 보관
+    import outbox # 이메일/MMS 발송 대기열 (발송 상태 표시)
 except ImportError as e:
     st.error(f"UI Tab 3: 필수 모듈 로딩 실패 - {e}")
     if hasattr(e, "name"):
@@ -33,6 +39,335 @@ except Exception as e:
     if "MOVE_TYPE_OPTIONS" not in globals(): MOVE_TYPE_OPTIONS = ["가정 이사 🏠", "사무실 이사 🏢"]
     st.stop()
 
+def _outbox_entry(channel, recipient, revision):
+    """현재 견적 내용(revision)을 이 받는 사람에게 보낸 발송 대기열 기록 (없거나 조회할 수 없으면 None)."""
+    if "outbox" not in globals() or not recipient: return None
+    try:
+        return outbox.get_status(channel, recipient, revision)
+    except Exception as e:
+        print(f"WARN [UI Tab3]: outbox status lookup failed: {e}")
+        return None
+
+def _send_result(channel_label, send_status):
+    """send_quote_email/send_mms_with_image 결과를 (표시 종류, 문구)로 바꿉니다."""
+    if send_status == "queued": return ("success", f"✅ {channel_label} 발송 요청 완료 (발송 대기열에서 곧 발송됩니다)")
+    if send_status == "sent": return ("success", f"✅ {channel_label} 발송 완료")
+    if send_status == "duplicate": return ("info", "ℹ️ 같은 견적서가 이미 발송 대기 중입니다. 아래 발송 상태를 확인하세요.")
+    return ("error", f"❌ {channel_label} 발송 실패.")
+
+def _show_result(result):
+    result_level, result_message = result
+    if result_level == "success": st.success(result_message)
+    elif result_level == "info": st.info(result_message)
+    else: st.error(result_message)
+
+def _show_outbox_status(channel, recipient, revision):
+    """현재 견적 내용(revision)을 이 받는 사람에게 보낸 발송 대기열 상태를 한 줄로 표시합니다."""
+    entry = _outbox_entry(channel, recipient, revision)
+    if not entry: return
+    status_label = outbox.STATUS_LABELS.get(entry["status"], entry["status"])
+    if entry["status"] == "failed": st.caption(f"📮 발송 상태: {status_label} ({entry['attempts']}회 시도) - {entry.get('last_error') or ''}")
+    elif entry["status"] == "sent" and entry.get("sent_at"):
+        sent_at_kst = datetime.fromtimestamp(entry["sent_at"], pytz.timezone("Asia/Seoul")).strftime("%H:%M:%S")
+        st.caption(f"📮 발송 상태: {status_label} ({sent_at_kst})")
+    else: st.caption(f"📮 발송 상태: {status_label} (시도 {entry['attempts']}회)")
+
+@st.fragment(run_every=1)
+def _poll_quote_image_job():
+    """백그라운드 PDF→이미지 변환 작업의 진행률을 1초마다 갱신하고, 끝나면 결과를 세션에 넣고 화면을 다시 그립니다."""
+    job_id = st.session_state.get('quote_image_job_id')
+    if not job_id: return
+    job = pdf_raster.get_raster_job(job_id)
+    if job["status"] == "running":
+        total_pages = max(1, job["total_pages"])
+        st.progress(job["done_pages"] / total_pages, text=f"견적서 이미지 변환 중... ({job['done_pages']}/{total_pages} 페이지)")
+        return
+    st.session_state['quote_image_job_id'] = None
+    pdf_raster.discard_raster_job(job_id)
+    image_handle = artifact_store.put_artifact(job["result"], "jpg") if job["status"] == "done" else None
+    if image_handle:
+        st.session_state['quote_image_handle'] = image_handle
+    else:
+        st.session_state['quote_image_job_error'] = job["error"] or job["status"]
+    st.rerun() # 다운로드 버튼 표시를 위해 전체 화면 갱신
+
+def _send_quote_mms(image_bytes, mms_request):
+    """견적서 이미지를 MMS 발송 대기열에 넣고, 결과 문구를 세션에 남깁니다 (MMS 칸에 표시)."""
+    customer_name_mms = mms_request["customer_name"]
+    mms_filename, mms_text_message = f"견적서_{customer_name_mms}_{utils.get_current_kst_time_str('%y%m%d')}.jpg", f"{customer_name_mms}님, 요청하신 이사 견적서입니다. 감사합니다."
+    mms_status = mms_utils.send_mms_with_image(recipient_phone=mms_request["customer_phone"], image_bytes=image_bytes, filename=mms_filename, text_message=mms_text_message, revision=mms_request["revision"], resend=mms_request["resend"])
+    st.session_state['mms_send_result'] = _send_result("MMS", mms_status)
+
+@st.fragment(run_every=1)
+def _poll_mms_image_job():
+    """MMS용 PDF→이미지 변환 작업을 1초마다 확인하고, 끝나면 바로 MMS 발송 대기열에 넣습니다."""
+    mms_request = st.session_state.get('mms_image_job')
+    if not mms_request: return
+    job = pdf_raster.get_raster_job(mms_request["job_id"])
+    if job["status"] == "running":
+        total_pages = max(1, job["total_pages"])
+        st.progress(job["done_pages"] / total_pages, text=f"MMS용 견적서 이미지 변환 중... ({job['done_pages']}/{total_pages} 페이지)")
+        return
+    st.session_state['mms_image_job'] = None
+    pdf_raster.discard_raster_job(mms_request["job_id"])
+    if job["status"] == "done" and job["result"]:
+        with st.spinner(f"{mms_request['customer_phone']}으로 MMS 발송 준비 중..."): _send_quote_mms(job["result"], mms_request)
+    else:
+        st.session_state['mms_send_result'] = ("error", f"❌ 견적서 이미지 변환 실패: {job['error'] or job['status']}")
+    st.rerun() # 발송 결과 표시를 위해 전체 화면 갱신
+
+@st.fragment(key=callbacks.FRAGMENT_QUOTE_VIEW)
+def _render_quote_view():
+    """최종 견적 결과, 이사 정보 요약, 견적서 생성/발송 버튼 (비용은 render_tab3에서 계산해 세션에 둔 값을 사용)"""
+    final_selected_vehicle_calc = st.session_state.get("final_selected_vehicle")
+    if not final_selected_vehicle_calc: # 차량 미선택 시
+        st.warning("⚠️ **차량을 먼저 선택해주세요.** 비용 계산, 요약 정보 표시 및 다운로드는 차량 선택 후 가능합니다.")
+        return
+
+    cost_items_display = st.session_state.get("calculated_cost_items_for_pdf", [])
+    total_cost_display = st.session_state.get("total_cost_for_pdf", 0)
+    personnel_info_display = st.session_state.get("personnel_info_for_pdf", {})
+    has_cost_error = bool(getattr(cost_items_display, "has_error", False))
+    try:
+        # 견적 보고서: 화면 요약과 PDF/이미지/Excel이 같은 견적 내용이면 한 번 만든 것을 함께 사용 (고객 정보만 바뀐 경우도 비용은 재계산하지 않음)
+        report_display = artifact_cache.get_quote_report(st.session_state.to_dict(), cost_items_display, total_cost_display, personnel_info_display)
+
+        st.subheader(f"💰 총 견적 비용: {report_display['total']:,.0f} 원")
+        st.subheader(f"➖ 계약금: {report_display['deposit']:,.0f} 원")
+        st.subheader(f"➡️ 잔금 (총 비용 - 계약금): {report_display['balance']:,.0f} 원")
+        st.write("")
+
+        st.subheader("📊 비용 상세 내역")
+        if has_cost_error:
+            st.error(f"비용 계산 오류: {report_display['cost_error'] or '알 수 없는 오류'}")
+        elif cost_items_display:
+            valid_costs = [(line.label, line.amount, line.note) for line in report_display["cost_lines"]]
+            if valid_costs:
+                st.dataframe(pd.DataFrame(valid_costs, columns=["항목", "금액", "비고"]).style.format({"금액": "{:,.0f}"}).set_properties(**{'text-align':'right'}, subset=['금액']).set_properties(**{'text-align':'left'}, subset=['항목','비고']), use_container_width=True, hide_index=True)
+            else: st.info("ℹ️ 유효한 비용 항목 없음.")
+        else: st.info("ℹ️ 계산된 비용 항목 없음.")
+        st.write("")
+
+        special_notes = st.session_state.get('special_notes')
+        if special_notes and special_notes.strip(): st.subheader("📝 고객요구사항"); st.info(special_notes)
+
+        st.subheader("📋 이사 정보 요약")
+        summary_display_possible = bool(final_selected_vehicle_calc) and not has_cost_error
+
+        if summary_display_possible:
+            try:
+                for summary_line in quote_report.summary_text_lines(report_display): st.text(summary_line)
+            except Exception as e_summary_direct:
+                st.error(f"❌ 요약 정보 생성 중 오류: {e_summary_direct}"); traceback.print_exc()
+                st.info("ℹ️ 요약 정보 표시 불가 (데이터 오류).")
+        elif not final_selected_vehicle_calc: st.info("ℹ️ 차량 미선택으로 요약 정보 표시 불가.")
+        else: st.info("ℹ️ 비용 계산 오류로 요약 정보 표시 불가.")
+        st.divider()
+
+        st.subheader("📄 견적서 생성, 발송 및 다운로드")
+        can_generate_anything = bool(final_selected_vehicle_calc) and not has_cost_error and st.session_state.get("calculated_cost_items_for_pdf") and st.session_state.get("total_cost_for_pdf", 0) > 0
+        cols_actions_main = st.columns([1, 1, 1]); cols_actions_email = st.columns(1)
+
+        with cols_actions_main[0]: # MMS
+            st.markdown("**① 이미지 견적서 (MMS)**")
+            mms_possible = (hasattr(mms_utils, "send_mms_with_image") and hasattr(pdf_generator, "generate_pdf") and hasattr(pdf_generator, "generate_quote_image_from_pdf") and can_generate_anything and st.session_state.get("customer_phone"))
+            if mms_possible:
+                # 이 견적 내용을 이미 보낸 번호면 버튼이 '다시 발송'이 되고, 누르면 중복 방지를 건너뛰고 다시 보냄
+                mms_entry = _outbox_entry("mms", mms_utils.normalize_phone_number(st.session_state.get("customer_phone")), report_display["revision"])
+                mms_resend = bool(mms_entry) and mms_entry["status"] == "sent"
+                if st.button("🖼️ MMS 다시 발송" if mms_resend else "🖼️ MMS 발송", key="mms_send_button_main"):
+                    mms_request = {"customer_phone": st.session_state.get("customer_phone"), "customer_name": st.session_state.get("customer_name", "고객"), "revision": report_display["revision"], "resend": mms_resend}
+                    pdf_args_mms = {"state_data": st.session_state.to_dict(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
+                    st.session_state.pop('mms_send_result', None)
+                    with st.spinner("견적서 이미지 생성 중..."): image_bytes_mms = artifact_cache.get_quote_image(**pdf_args_mms, pdf_fallback=False) # 직접 렌더링만 (기다리지 않음)
+                    if image_bytes_mms:
+                        with st.spinner(f"{mms_request['customer_phone']}으로 MMS 발송 준비 중..."): _send_quote_mms(image_bytes_mms, mms_request)
+                    elif pdf_raster.is_available():
+                        # 직접 렌더링 실패 시 Poppler 변환을 백그라운드 작업으로 등록하고, 완료되면 폴링 fragment에서 발송
+                        pdf_bytes_mms = artifact_cache.get_quote_pdf(**pdf_args_mms)
+                        try:
+                            if not pdf_bytes_mms: raise RuntimeError("견적서 PDF 생성 실패")
+                            st.session_state['mms_image_job'] = dict(mms_request, job_id=pdf_raster.submit_raster_job(pdf_bytes_mms, image_format='JPEG', stitch=True))
+                        except Exception as e_raster:
+                            st.error(f"❌ 견적서 이미지 변환 작업 등록 실패: {e_raster}")
+                            traceback.print_exc()
+                    else: st.error("❌ 견적서 이미지 생성 실패.")
+                if st.session_state.get('mms_image_job'): _poll_mms_image_job()
+                if st.session_state.get('mms_send_result'): _show_result(st.session_state.pop('mms_send_result'))
+                _show_outbox_status("mms", mms_utils.normalize_phone_number(st.session_state.get("customer_phone")), report_display["revision"])
+            elif not (hasattr(mms_utils, "send_mms_with_image") and hasattr(pdf_generator, "generate_pdf") and hasattr(pdf_generator, "generate_quote_image_from_pdf")): st.caption("MMS/PDF/이미지 생성 모듈 오류")
+            elif not can_generate_anything: st.caption("견적 내용 확인 필요")
+            elif not st.session_state.get("customer_phone"): st.caption("고객 전화번호 필요")
+            else: st.caption("MMS 발송 불가")
+
+        with cols_actions_main[1]: # PDF
+            st.markdown("**② 고객용 견적서 (PDF)**")
+            pdf_possible = hasattr(pdf_generator, "generate_pdf") and can_generate_anything
+            if pdf_possible:
+                if st.button("📄 PDF 생성 및 다운로드", key="pdf_customer_download_main"):
+                    pdf_args_download = {"state_data": st.session_state.to_dict(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
+                    with st.spinner("PDF 생성 중..."): pdf_data_cust_download = artifact_cache.get_quote_pdf(**pdf_args_download)
+                    pdf_handle_download = artifact_store.put_artifact(pdf_data_cust_download, "pdf")
+                    if pdf_handle_download:
+                        st.session_state['pdf_customer_handle'] = pdf_handle_download
+                        st.success("✅ PDF 생성 완료!")
+                    else:
+                        st.error("❌ PDF 생성 실패.")
+                        st.session_state.pop('pdf_customer_handle', None)
+                pdf_download_data = artifact_store.download_data(st.session_state.get('pdf_customer_handle'))
+                if pdf_download_data:
+                    fname_pdf_dl = f"견적서_{st.session_state.get('customer_name', '고객')}_{utils.get_current_kst_time_str('%y%m%d')}.pdf"
+                    st.download_button(label="📥 다운로드 (PDF)", data=pdf_download_data, file_name=fname_pdf_dl, mime="application/pdf", key='dl_btn_pdf_main')
+                elif pdf_possible : st.caption("생성 버튼을 눌러주세요.")
+            elif not hasattr(pdf_generator, "generate_pdf"): st.caption("PDF 생성 모듈 오류")
+            elif not can_generate_anything: st.caption("견적 내용 확인 필요")
+            else: st.caption("PDF 생성 불가")
+
+
+        # --- 수정된 "Excel 및 견적 이미지 생성" 섹션 ---
+        with cols_actions_main[2]:
+            st.markdown("**③ 견적서 파일 생성 (Excel, 이미지)**")
+
+            excel_possible = hasattr(excel_filler, "fill_final_excel_template") and bool(final_selected_vehicle_calc)
+            pdf_possible_for_image = hasattr(pdf_generator, "generate_pdf") and can_generate_anything
+            # 직접 렌더러(Pillow)만 있어도 이미지 생성 가능, Poppler 변환은 대체 경로
+            image_conversion_possible = (hasattr(pdf_generator, "generate_quote_image") and pdf_generator._PILLOW_AVAILABLE) or (hasattr(pdf_generator, "generate_quote_image_from_pdf") and pdf_generator._PDF2IMAGE_AVAILABLE and pdf_generator._PILLOW_AVAILABLE)
+
+            if st.button("📊 Excel 및 견적 이미지 생성", key="generate_excel_and_image_main"):
+                actions_success_excel = False
+                actions_success_image = False
+
+                # 1. Excel 생성
+                if excel_possible:
+                    latest_total_cost_excel, latest_cost_items_excel, latest_personnel_info_excel = calculations.calculate_total_moving_cost(st.session_state.to_dict())
+                    with st.spinner("Excel 파일 생성 중..."):
+                        filled_excel_data_dl = artifact_cache.get_quote_excel(st.session_state.to_dict(), latest_cost_items_excel, latest_total_cost_excel, latest_personnel_info_excel)
+                    excel_handle_dl = artifact_store.put_artifact(filled_excel_data_dl, "xlsx")
+                    if excel_handle_dl:
+                        st.session_state['final_excel_handle'] = excel_handle_dl
+                        st.success("✅ Excel 생성 완료!")
+                        actions_success_excel = True
+                    else:
+                        st.error("❌ Excel 파일 생성 실패.")
+                        st.session_state.pop('final_excel_handle', None)
+                else:
+                    st.warning("Excel을 생성할 수 없습니다. (조건 미충족)")
+
+                # 2. PDF 생성 및 이미지 변환
+                if pdf_possible_for_image and image_conversion_possible:
+                    customer_name_img = st.session_state.get("customer_name", "고객")
+                    pdf_args_img = {
+                        "state_data": st.session_state.to_dict(),
+                        "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []),
+                        "total_cost": st.session_state.get("total_cost_for_pdf", 0),
+                        "personnel_info": st.session_state.get("personnel_info_for_pdf", {})
+                    }
+                    with st.spinner("견적서 이미지 생성 중..."):
+                        image_bytes_converted = artifact_cache.get_quote_image(**pdf_args_img, pdf_fallback=False) # 직접 렌더링 (JPEG, 전체 페이지)
+
+                    image_handle_converted = artifact_store.put_artifact(image_bytes_converted, "jpg")
+                    if image_handle_converted:
+                        st.session_state['quote_image_handle'] = image_handle_converted
+                        st.success("✅ 견적서 이미지 생성 완료!")
+                        actions_success_image = True
+                    elif pdf_raster.is_available():
+                        # 직접 렌더링 실패 시 Poppler 변환을 백그라운드 작업으로 등록하고 완료를 폴링 (화면을 막지 않음)
+                        st.session_state.pop('quote_image_handle', None)
+                        pdf_bytes_img = artifact_cache.get_quote_pdf(**pdf_args_img)
+                        try:
+                            if not pdf_bytes_img: raise RuntimeError("견적서 PDF 생성 실패")
+                            st.session_state['quote_image_job_id'] = pdf_raster.submit_raster_job(pdf_bytes_img, image_format='JPEG', stitch=True)
+                            st.info("견적서 이미지 변환을 시작했습니다. 완료되면 다운로드 버튼이 표시됩니다.")
+                            actions_success_image = True
+                        except Exception as e_raster:
+                            st.error(f"❌ 견적서 이미지 변환 작업 등록 실패: {e_raster}")
+                            traceback.print_exc()
+                    else:
+                        st.error("❌ 견적서 이미지 생성 실패.")
+                        st.session_state.pop('quote_image_handle', None)
+                elif not pdf_possible_for_image:
+                     st.warning("견적서 이미지를 생성할 수 없습니다. (PDF 생성 조건 미충족)")
+                elif not image_conversion_possible:
+                     st.warning("견적서 이미지를 생성할 수 없습니다. (이미지 변환 모듈 또는 라이브러리 문제)")
+
+                if not actions_success_excel and not actions_success_image :
+                    st.error("Excel과 이미지 파일 생성 모두 실패했습니다.")
+                elif not actions_success_excel :
+                    st.warning("Excel 파일 생성에 실패했습니다.")
+                elif not actions_success_image :
+                     st.warning("견적서 이미지 생성에 실패했습니다.")
+
+
+            # --- 백그라운드 이미지 변환 진행 상황 ---
+            if st.session_state.get('quote_image_job_id'):
+                _poll_quote_image_job()
+            if st.session_state.get('quote_image_job_error'):
+                st.error(f"❌ 견적서 이미지 변환 실패: {st.session_state.pop('quote_image_job_error')}")
+
+            # --- 다운로드 버튼 영역 ---
+            # Excel 다운로드 버튼
+            excel_download_data = artifact_store.download_data(st.session_state.get('final_excel_handle')) if excel_possible else None
+            if excel_download_data:
+                fname_excel_dl = f"최종견적서_{st.session_state.get('customer_name', '고객')}_{utils.get_current_kst_time_str('%y%m%d')}.xlsx"
+                st.download_button(
+                    label="📥 다운로드 (Excel)",
+                    data=excel_download_data,
+                    file_name=fname_excel_dl,
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    key='dl_btn_excel_final_section'
+                )
+            elif excel_possible : st.caption("파일 생성 버튼을 눌러 Excel 파일을 준비하세요.")
+            else: st.caption("Excel 생성 불가 (견적 내용 또는 모듈 확인)")
+
+
+            # 이미지 다운로드 버튼
+            image_download_data = artifact_store.download_data(st.session_state.get('quote_image_handle')) if pdf_possible_for_image and image_conversion_possible else None
+            if image_download_data:
+                image_format_ext = 'jpg' # generate_quote_image_from_pdf 에서 JPEG로 저장한 경우
+                # image_format_ext = 'png' # PNG로 저장한 경우
+                fname_image_dl = f"견적서이미지_{st.session_state.get('customer_name', '고객')}_{utils.get_current_kst_time_str('%y%m%d')}.{image_format_ext}"
+                st.download_button(
+                    label=f"🖼️ 다운로드 (견적서 이미지 .{image_format_ext})",
+                    data=image_download_data,
+                    file_name=fname_image_dl,
+                    mime=f"image/{image_format_ext.lower()}", # image/jpeg 또는 image/png
+                    key='dl_btn_quote_image_final_section'
+                )
+            elif pdf_possible_for_image and image_conversion_possible: st.caption("파일 생성 버튼을 눌러 견적서 이미지를 준비하세요.")
+            else: st.caption("견적서 이미지 생성 불가 (견적 내용 또는 PDF/이미지 변환 모듈 확인)")
+        # --- 수정된 섹션 끝 ---
+
+        with cols_actions_email[0]: # Email
+            st.markdown("**④ 견적서 이메일 발송 (PDF 첨부)**")
+            email_possible = (hasattr(email_utils, "send_quote_email") and hasattr(pdf_generator, "generate_pdf") and can_generate_anything and st.session_state.get("customer_email"))
+            if email_possible:
+                email_entry = _outbox_entry("email", st.session_state.get("customer_email"), report_display["revision"])
+                email_resend = bool(email_entry) and email_entry["status"] == "sent"
+                if st.button("📧 이메일 다시 발송" if email_resend else "📧 이메일 발송", key="email_send_button_main"):
+                    recipient_email_send, customer_name_send = st.session_state.get("customer_email"), st.session_state.get("customer_name", "고객")
+                    pdf_args_email = {"state_data": st.session_state.to_dict(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
+                    with st.spinner("이메일 발송용 PDF 생성 중..."): pdf_email_bytes_send = artifact_cache.get_quote_pdf(**pdf_args_email)
+                    if pdf_email_bytes_send:
+                        subject_send, body_send, pdf_filename_send = f"[{customer_name_send}님] 이삿날 이사 견적서입니다.", f"{customer_name_send}님,\n\n요청하신 이사 견적서를 첨부 파일로 보내드립니다.\n\n감사합니다.\n이삿날 드림", f"견적서_{customer_name_send}_{utils.get_current_kst_time_str('%Y%m%d')}.pdf"
+                        with st.spinner(f"{recipient_email_send}(으)로 이메일 발송 중..."):
+                            email_sent_status = email_utils.send_quote_email(recipient_email_send, subject_send, body_send, pdf_email_bytes_send, pdf_filename_send, revision=report_display["revision"], resend=email_resend)
+                        _show_result(_send_result("이메일", email_sent_status))
+                    else: st.error("❌ 첨부 PDF 생성 실패 (이메일용).")
+                _show_outbox_status("email", st.session_state.get("customer_email"), report_display["revision"])
+            elif not (hasattr(email_utils, "send_quote_email") and hasattr(pdf_generator, "generate_pdf")): st.caption("이메일/PDF 생성 모듈 오류")
+            elif not can_generate_anything: st.caption("견적 내용 확인 필요")
+            elif not st.session_state.get("customer_email"): st.caption("고객 이메일 필요")
+            else: st.caption("이메일 발송 불가")
+
+        cache_stats = artifact_cache.get_cache_stats()
+        if cache_stats["hits"] + cache_stats["misses"] > 0:
+            st.caption(f"📦 견적서 파일 재사용: 적중률 {cache_stats['hit_rate']:.0%} (재사용 {cache_stats['hits']}회 / 생성 {cache_stats['misses']}회), 절약 {cache_stats['bytes_saved'] / 1024:,.0f} KB")
+
+    except Exception as e_quote_view:
+        st.error(f"최종 견적 표시 중 외부 오류 발생: {e_quote_view}")
+        traceback.print_exc()
+
+@st.fragment(key=callbacks.FRAGMENT_TAB3)
 def render_tab3():
     st.header("💰 계산 및 옵션 ")
     update_basket_quantities_callback = getattr(callbacks, "update_basket_quantities", None)
@@ -206,7 +541,6 @@ def render_tab3():
 
     st.header("💵 최종 견적 결과")
     final_selected_vehicle_calc = st.session_state.get("final_selected_vehicle")
-    total_cost_display, cost_items_display, personnel_info_display, has_cost_error = 0, [], {}, False
 
     if final_selected_vehicle_calc:
         try:
@@ -222,337 +556,15 @@ def render_tab3():
                     "total_cost_for_pdf": total_cost_display,
                     "personnel_info_for_pdf": personnel_info_display
                 })
-                if any(isinstance(item, (list, tuple)) and len(item) > 0 and str(item[0]) == "오류" for item in cost_items_display): has_cost_error = True
             else:
-                st.error("최종 비용 계산 함수 로드 실패."); has_cost_error = True
+                st.error("최종 비용 계산 함수 로드 실패.")
                 st.session_state.update({"calculated_cost_items_for_pdf": [], "total_cost_for_pdf": 0, "personnel_info_for_pdf": {}})
-
-            total_cost_num = int(total_cost_display) if isinstance(total_cost_display, (int, float)) else 0
-            deposit_val = st.session_state.get("deposit_amount", 0)
-            deposit_amount_num = int(deposit_val) if deposit_val is not None else 0
-            remaining_balance_num = total_cost_num - deposit_amount_num
-
-            st.subheader(f"💰 총 견적 비용: {total_cost_num:,.0f} 원")
-            st.subheader(f"➖ 계약금: {deposit_amount_num:,.0f} 원")
-            st.subheader(f"➡️ 잔금 (총 비용 - 계약금): {remaining_balance_num:,.0f} 원")
-            st.write("")
-
-            st.subheader("📊 비용 상세 내역")
-            if has_cost_error:
-                err_item = next((item for item in cost_items_display if isinstance(item, (list, tuple)) and len(item)>0 and str(item[0]) == "오류"), None)
-                st.error(f"비용 계산 오류: {err_item[2] if err_item and len(err_item) > 2 else '알 수 없는 오류'}")
-            elif cost_items_display:
-                valid_costs = [item for item in cost_items_display if not (isinstance(item, (list, tuple)) and len(item) > 0 and str(item[0]) == "오류")]
-                if valid_costs:
-                    st.dataframe(pd.DataFrame(valid_costs, columns=["항목", "금액", "비고"]).style.format({"금액": "{:,.0f}"}).set_properties(**{'text-align':'right'}, subset=['금액']).set_properties(**{'text-align':'left'}, subset=['항목','비고']), use_container_width=True, hide_index=True)
-                else: st.info("ℹ️ 유효한 비용 항목 없음.")
-            else: st.info("ℹ️ 계산된 비용 항목 없음.")
-            st.write("")
-
-            special_notes = st.session_state.get('special_notes')
-            if special_notes and special_notes.strip(): st.subheader("📝 고객요구사항"); st.info(special_notes)
-
-            st.subheader("📋 이사 정보 요약")
-            summary_display_possible = bool(final_selected_vehicle_calc) and not has_cost_error
-
-            if summary_display_possible:
-                try:
-                    customer_name_summary = st.session_state.get('customer_name', '')
-                    phone_summary = st.session_state.get('customer_phone', '')
-                    email_summary = st.session_state.get('customer_email', '')
-
-                    vehicle_type_summary = final_selected_vehicle_calc
-                    vehicle_tonnage_summary = ""
-                    if isinstance(vehicle_type_summary, str):
-                        match_summary = re.search(r'(\d+(\.\d+)?\s*톤)', vehicle_type_summary)
-                        vehicle_tonnage_summary = match_summary.group(1).strip() if match_summary else vehicle_type_summary
-
-                    p_info_summary = personnel_info_display
-                    men_summary = p_info_summary.get('final_men', 0)
-                    women_summary = p_info_summary.get('final_women', 0)
-
-                    if women_summary > 0:
-                        ppl_summary = f"{men_summary}+{women_summary}명"
-                    else:
-                        ppl_summary = f"{men_summary}명"
-
-                    def get_method_full_name(method_key):
-                        method_str = str(st.session_state.get(method_key, '')).strip()
-                        return method_str.split(" ")[0] if method_str else "정보 없음"
-                    from_method_full, to_method_full = get_method_full_name('from_method'), get_method_full_name('to_method')
-
-                    deposit_for_summary = int(st.session_state.get("deposit_amount", 0))
-                    calculated_total_for_summary = int(total_cost_display) if isinstance(total_cost_display, (int,float)) else 0
-                    remaining_for_summary = calculated_total_for_summary - deposit_for_summary
-
-                    from_addr_summary = st.session_state.get('from_location', '정보 없음')
-                    to_addr_summary = st.session_state.get('to_location', '정보 없음')
-
-                    b_name_summary, move_t_summary = "포장 자재 📦", st.session_state.get('base_move_type', '')
-                    q_b_s, q_mb_s, q_book_s = 0, 0, 0
-                    if move_t_summary:
-                        try:
-                            q_b_s = int(st.session_state.get(f"qty_{move_t_summary}_{b_name_summary}_바구니", 0))
-                            q_mb_s = int(st.session_state.get(f"qty_{move_t_summary}_{b_name_summary}_중박스", st.session_state.get(f"qty_{move_t_summary}_{b_name_summary}_중자바구니", 0)))
-                            q_book_s = int(st.session_state.get(f"qty_{move_t_summary}_{b_name_summary}_책바구니", 0))
-                        except: pass
-
-                    bask_display_parts = []
-                    if q_b_s > 0: bask_display_parts.append(f"바구니 {q_b_s}개")
-                    if q_mb_s > 0: bask_display_parts.append(f"중박스 {q_mb_s}개")
-                    if q_book_s > 0: bask_display_parts.append(f"책바구니 {q_book_s}개")
-                    bask_summary_str = ", ".join(bask_display_parts) if bask_display_parts else "바구니 정보 없음"
-
-                    note_summary = st.session_state.get('special_notes', '')
-
-                    is_storage_move = st.session_state.get('is_storage_move', False)
-                    storage_prefix_text = "(보관) " if is_storage_move else ""
-                    storage_details_text = ""
-                    if is_storage_move:
-                        storage_type = st.session_state.get('storage_type', '정보 없음')
-                        storage_electric_text = "(전기사용)" if st.session_state.get('storage_use_electricity', False) else ""
-                        storage_details_text = f"{storage_type} {storage_electric_text}".strip()
-
-                    payment_option_texts = []
-                    if st.session_state.get("issue_tax_invoice", False): payment_option_texts.append("세금계산서 발행 요청")
-                    if st.session_state.get("card_payment", False): payment_option_texts.append("카드 결제 예정")
-                    payment_options_summary = " / ".join(payment_option_texts) if payment_option_texts else ""
-
-                    first_line_display = f"{from_addr_summary if from_addr_summary else '출발지 정보 없음'} -> {to_addr_summary if to_addr_summary else '도착지 정보 없음'} {storage_prefix_text}{vehicle_tonnage_summary if vehicle_tonnage_summary else vehicle_type_summary}".strip()
-                    if email_summary and email_summary != '-': first_line_display += f" {email_summary}"
-                    st.text(first_line_display)
-
-                    if customer_name_summary: st.text(f"{customer_name_summary}")
-                    if phone_summary and phone_summary != '-': st.text(f"{phone_summary}")
-                    if email_summary and email_summary != '-': st.text(f"{email_summary}")
-                    st.text("")
-                    st.text(f"{vehicle_tonnage_summary if vehicle_tonnage_summary else vehicle_type_summary} / {ppl_summary}")
-                    st.text("")
-                    st.text(f"출발지: {from_method_full}")
-                    st.text(f"도착지: {to_method_full}")
-                    if st.session_state.get('has_via_point', False): st.text(f"경유지: {get_method_full_name('via_point_method')}")
-                    st.text("")
-                    st.text(f"계약금 {deposit_for_summary:,.0f}원 / 잔금 {remaining_for_summary:,.0f}원")
-                    if payment_options_summary: st.text(f"({payment_options_summary})")
-                    st.text("")
-                    st.text(f"총 {calculated_total_for_summary:,.0f}원 중")
-
-                    processed_for_summary = set()
-                    if isinstance(cost_items_display, list):
-                        for item_name_disp, item_cost_disp, _ in cost_items_display:
-                            if str(item_name_disp) == "기본 운임" and item_cost_disp != 0:
-                                st.text(f"이사비 {int(item_cost_disp):,}")
-                                processed_for_summary.add(str(item_name_disp))
-                                break
-                        for item_name_disp, item_cost_disp, _ in cost_items_display:
-                            name_str, cost_int = str(item_name_disp), int(item_cost_disp) if item_cost_disp is not None else 0
-                            if name_str not in processed_for_summary and "사다리차" not in name_str and "스카이" not in name_str and "부가세" not in name_str and "카드" not in name_str and cost_int != 0 :
-                                st.text(f"{name_str} {cost_int:,}")
-                                processed_for_summary.add(name_str)
-                        for item_name_disp, item_cost_disp, _ in cost_items_display:
-                            name_str, cost_int = str(item_name_disp), int(item_cost_disp) if item_cost_disp is not None else 0
-                            if name_str not in processed_for_summary and ("사다리차" in name_str or "스카이" in name_str) and cost_int != 0:
-                                st.text(f"{name_str} {cost_int:,}")
-                                processed_for_summary.add(name_str)
-                        for item_name_disp, item_cost_disp, _ in cost_items_display:
-                            name_str, cost_int = str(item_name_disp), int(item_cost_disp) if item_cost_disp is not None else 0
-                            if name_str not in processed_for_summary and ("부가세" in name_str or "카드" in name_str) and cost_int != 0:
-                                st.text(f"{name_str} {cost_int:,}")
-                                processed_for_summary.add(name_str)
-                    if not processed_for_summary and calculated_total_for_summary != 0 : st.text(f"기타 비용 합계 {calculated_total_for_summary:,}")
-                    elif not processed_for_summary and calculated_total_for_summary == 0: st.text("세부 비용 내역 없음")
-                    st.text("")
-
-                    st.text("출발지 주소:"); st.text(from_addr_summary)
-                    if is_storage_move and storage_details_text: st.text(storage_details_text)
-                    st.text("")
-                    st.text("도착지 주소:"); st.text(to_addr_summary)
-                    st.text("")
-                    if st.session_state.get('has_via_point', False):
-                        st.text("경유지 주소:"); st.text(st.session_state.get('via_point_location', '정보 없음'))
-                        st.text("")
-                    st.text(bask_summary_str)
-                    st.text("")
-                    if note_summary and note_summary.strip() and note_summary != '-':
-                        st.text("요구사항:")
-                        for note_line in note_summary.strip().replace('\r\n', '\n').split('\n'): st.text(note_line.strip())
-                except Exception as e_summary_direct:
-                    st.error(f"❌ 요약 정보 생성 중 오류: {e_summary_direct}"); traceback.print_exc()
-                    st.info("ℹ️ 요약 정보 표시 불가 (데이터 오류).")
-            elif not final_selected_vehicle_calc: st.info("ℹ️ 차량 미선택으로 요약 정보 표시 불가.")
-            else: st.info("ℹ️ 비용 계산 오류로 요약 정보 표시 불가.")
-            st.divider()
-
-            st.subheader("📄 견적서 생성, 발송 및 다운로드")
-            can_generate_anything = bool(final_selected_vehicle_calc) and not has_cost_error and st.session_state.get("calculated_cost_items_for_pdf") and st.session_state.get("total_cost_for_pdf", 0) > 0
-            cols_actions_main = st.columns([1, 1, 1]); cols_actions_email = st.columns(1)
-
-            with cols_actions_main[0]: # MMS
-                st.markdown("**① 이미지 견적서 (MMS)**")
-                mms_possible = (hasattr(mms_utils, "send_mms_with_image") and hasattr(pdf_generator, "generate_pdf") and hasattr(pdf_generator, "generate_quote_image_from_pdf") and can_generate_anything and st.session_state.get("customer_phone"))
-                if mms_possible:
-                    if st.button("🖼️ MMS 발송", key="mms_send_button_main"):
-                        customer_phone_mms, customer_name_mms = st.session_state.get("customer_phone"), st.session_state.get("customer_name", "고객")
-                        pdf_args_mms = {"state_data": st.session_state.to_dict(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
-                        with st.spinner("견적서 PDF 생성 중..."): pdf_bytes_mms = pdf_generator.generate_pdf(**pdf_args_mms)
-                        if pdf_bytes_mms:
-                            with st.spinner("PDF를 이미지로 변환 중..."): image_bytes_mms = pdf_generator.generate_quote_image_from_pdf(pdf_bytes_mms, poppler_path=None)
-                            if image_bytes_mms:
-                                with st.spinner(f"{customer_phone_mms}으로 MMS 발송 준비 중..."):
-                                    mms_filename, mms_text_message = f"견적서_{customer_name_mms}_{utils.get_current_kst_time_str('%y%m%d')}.jpg", f"{customer_name_mms}님, 요청하신 이사 견적서입니다. 감사합니다."
-                                    mms_sent = mms_utils.send_mms_with_image(recipient_phone=customer_phone_mms, image_bytes=image_bytes_mms, filename=mms_filename, text_message=mms_text_message)
-                                    if mms_sent: st.success(f"✅ MMS 발송 요청 완료")
-                                    else: st.error("❌ MMS 발송 실패.")
-                            else: st.error("❌ 견적서 이미지 생성 실패.")
-                        else: st.error("❌ 견적서 PDF 생성 실패 (MMS용).")
-                elif not (hasattr(mms_utils, "send_mms_with_image") and hasattr(pdf_generator, "generate_pdf") and hasattr(pdf_generator, "generate_quote_image_from_pdf")): st.caption("MMS/PDF/이미지 생성 모듈 오류")
-                elif not can_generate_anything: st.caption("견적 내용 확인 필요")
-                elif not st.session_state.get("customer_phone"): st.caption("고객 전화번호 필요")
-                else: st.caption("MMS 발송 불가")
-
-            with cols_actions_main[1]: # PDF
-                st.markdown("**② 고객용 견적서 (PDF)**")
-                pdf_possible = hasattr(pdf_generator, "generate_pdf") and can_generate_anything
-                if pdf_possible:
-                    if st.button("📄 PDF 생성 및 다운로드", key="pdf_customer_download_main"):
-                        pdf_args_download = {"state_data": st.session_state.to_dict(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
-                        with st.spinner("PDF 생성 중..."): pdf_data_cust_download = pdf_generator.generate_pdf(**pdf_args_download)
-                        if pdf_data_cust_download:
-                            st.session_state['pdf_data_customer_for_download'] = pdf_data_cust_download
-                            st.success("✅ PDF 생성 완료!")
-                        else:
-                            st.error("❌ PDF 생성 실패.")
-                            if 'pdf_data_customer_for_download' in st.session_state: del st.session_state['pdf_data_customer_for_download']
-                    if st.session_state.get('pdf_data_customer_for_download'):
-                        fname_pdf_dl = f"견적서_{st.session_state.get('customer_name', '고객')}_{utils.get_current_kst_time_str('%y%m%d')}.pdf"
-                        st.download_button(label="📥 다운로드 (PDF)", data=st.session_state['pdf_data_customer_for_download'], file_name=fname_pdf_dl, mime="application/pdf", key='dl_btn_pdf_main')
-                    elif 'pdf_data_customer_for_download' not in st.session_state and pdf_possible : st.caption("생성 버튼을 눌러주세요.")
-                elif not hasattr(pdf_generator, "generate_pdf"): st.caption("PDF 생성 모듈 오류")
-                elif not can_generate_anything: st.caption("견적 내용 확인 필요")
-                else: st.caption("PDF 생성 불가")
-
-
-            # --- 수정된 "Excel 및 견적 이미지 생성" 섹션 ---
-            with cols_actions_main[2]:
-                st.markdown("**③ 견적서 파일 생성 (Excel, 이미지)**")
-
-                excel_possible = hasattr(excel_filler, "fill_final_excel_template") and bool(final_selected_vehicle_calc)
-                pdf_possible_for_image = hasattr(pdf_generator, "generate_pdf") and can_generate_anything
-                image_conversion_possible = hasattr(pdf_generator, "generate_quote_image_from_pdf") and pdf_generator._PDF2IMAGE_AVAILABLE and pdf_generator._PILLOW_AVAILABLE
-
-                if st.button("📊 Excel 및 견적 이미지 생성", key="generate_excel_and_image_main"):
-                    actions_success_excel = False
-                    actions_success_image = False
-
-                    # 1. Excel 생성
-                    if excel_possible:
-                        latest_total_cost_excel, latest_cost_items_excel, latest_personnel_info_excel = calculations.calculate_total_moving_cost(st.session_state.to_dict())
-                        with st.spinner("Excel 파일 생성 중..."):
-                            filled_excel_data_dl = excel_filler.fill_final_excel_template(st.session_state.to_dict(), latest_cost_items_excel, latest_total_cost_excel, latest_personnel_info_excel)
-                        if filled_excel_data_dl:
-                            st.session_state['final_excel_data_for_download'] = filled_excel_data_dl
-                            st.success("✅ Excel 생성 완료!")
-                            actions_success_excel = True
-                        else:
-                            st.error("❌ Excel 파일 생성 실패.")
-                            if 'final_excel_data_for_download' in st.session_state: del st.session_state['final_excel_data_for_download']
-                    else:
-                        st.warning("Excel을 생성할 수 없습니다. (조건 미충족)")
-
-                    # 2. PDF 생성 및 이미지 변환
-                    if pdf_possible_for_image and image_conversion_possible:
-                        customer_name_img = st.session_state.get("customer_name", "고객")
-                        pdf_args_img = {
-                            "state_data": st.session_state.to_dict(),
-                            "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []),
-                            "total_cost": st.session_state.get("total_cost_for_pdf", 0),
-                            "personnel_info": st.session_state.get("personnel_info_for_pdf", {})
-                        }
-                        with st.spinner("견적서 PDF 생성 중 (이미지용)..."):
-                            pdf_bytes_img = pdf_generator.generate_pdf(**pdf_args_img)
-
-                        if pdf_bytes_img:
-                            with st.spinner("PDF를 이미지로 변환 중..."):
-                                image_bytes_converted = pdf_generator.generate_quote_image_from_pdf(pdf_bytes_img, poppler_path=None, image_format='JPEG') # JPEG 또는 PNG
-
-                            if image_bytes_converted:
-                                st.session_state['quote_image_data_for_download'] = image_bytes_converted
-                                st.success("✅ 견적서 이미지 변환 완료!")
-                                actions_success_image = True
-                            else:
-                                st.error("❌ 견적서 이미지 변환 실패.")
-                                if 'quote_image_data_for_download' in st.session_state: del st.session_state['quote_image_data_for_download']
-                        else:
-                            st.error("❌ 견적서 PDF 생성 실패 (이미지용).")
-                            if 'quote_image_data_for_download' in st.session_state: del st.session_state['quote_image_data_for_download']
-                    elif not pdf_possible_for_image:
-                         st.warning("견적서 이미지를 생성할 수 없습니다. (PDF 생성 조건 미충족)")
-                    elif not image_conversion_possible:
-                         st.warning("견적서 이미지를 생성할 수 없습니다. (이미지 변환 모듈 또는 라이브러리 문제)")
-
-                    if not actions_success_excel and not actions_success_image :
-                        st.error("Excel과 이미지 파일 생성 모두 실패했습니다.")
-                    elif not actions_success_excel :
-                        st.warning("Excel 파일 생성에 실패했습니다.")
-                    elif not actions_success_image :
-                         st.warning("견적서 이미지 생성에 실패했습니다.")
-
-
-                # --- 다운로드 버튼 영역 ---
-                # Excel 다운로드 버튼
-                if st.session_state.get('final_excel_data_for_download') and excel_possible:
-                    fname_excel_dl = f"최종견적서_{st.session_state.get('customer_name', '고객')}_{utils.get_current_kst_time_str('%y%m%d')}.xlsx"
-                    st.download_button(
-                        label="📥 다운로드 (Excel)",
-                        data=st.session_state['final_excel_data_for_download'],
-                        file_name=fname_excel_dl,
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        key='dl_btn_excel_final_section'
-                    )
-                elif excel_possible : st.caption("파일 생성 버튼을 눌러 Excel 파일을 준비하세요.")
-                else: st.caption("Excel 생성 불가 (견적 내용 또는 모듈 확인)")
-
-
-                # 이미지 다운로드 버튼
-                if st.session_state.get('quote_image_data_for_download') and pdf_possible_for_image and image_conversion_possible:
-                    image_format_ext = 'jpg' # generate_quote_image_from_pdf 에서 JPEG로 저장한 경우
-                    # image_format_ext = 'png' # PNG로 저장한 경우
-                    fname_image_dl = f"견적서이미지_{st.session_state.get('customer_name', '고객')}_{utils.get_current_kst_time_str('%y%m%d')}.{image_format_ext}"
-                    st.download_button(
-                        label=f"🖼️ 다운로드 (견적서 이미지 .{image_format_ext})",
-                        data=st.session_state['quote_image_data_for_download'],
-                        file_name=fname_image_dl,
-                        mime=f"image/{image_format_ext.lower()}", # image/jpeg 또는 image/png
-                        key='dl_btn_quote_image_final_section'
-                    )
-                elif pdf_possible_for_image and image_conversion_possible: st.caption("파일 생성 버튼을 눌러 견적서 이미지를 준비하세요.")
-                else: st.caption("견적서 이미지 생성 불가 (견적 내용 또는 PDF/이미지 변환 모듈 확인)")
-            # --- 수정된 섹션 끝 ---
-
-            with cols_actions_email[0]: # Email
-                st.markdown("**④ 견적서 이메일 발송 (PDF 첨부)**")
-                email_possible = (hasattr(email_utils, "send_quote_email") and hasattr(pdf_generator, "generate_pdf") and can_generate_anything and st.session_state.get("customer_email"))
-                if email_possible:
-                    if st.button("📧 이메일 발송", key="email_send_button_main"):
-                        recipient_email_send, customer_name_send = st.session_state.get("customer_email"), st.session_state.get("customer_name", "고객")
-                        pdf_args_email = {"state_data": st.session_state.to_dict(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
-                        with st.spinner("이메일 발송용 PDF 생성 중..."): pdf_email_bytes_send = pdf_generator.generate_pdf(**pdf_args_email)
-                        if pdf_email_bytes_send:
-                            subject_send, body_send, pdf_filename_send = f"[{customer_name_send}님] 이삿날 이사 견적서입니다.", f"{customer_name_send}님,\n\n요청하신 이사 견적서를 첨부 파일로 보내드립니다.\n\n감사합니다.\n이삿날 드림", f"견적서_{customer_name_send}_{utils.get_current_kst_time_str('%Y%m%d')}.pdf"
-                            with st.spinner(f"{recipient_email_send}(으)로 이메일 발송 중..."):
-                                email_sent_status = email_utils.send_quote_email(recipient_email_send, subject_send, body_send, pdf_email_bytes_send, pdf_filename_send)
-                            if email_sent_status: st.success(f"✅ 이메일 발송 성공!")
-                            else: st.error("❌ 이메일 발송 실패.")
-                        else: st.error("❌ 첨부 PDF 생성 실패 (이메일용).")
-                elif not (hasattr(email_utils, "send_quote_email") and hasattr(pdf_generator, "generate_pdf")): st.caption("이메일/PDF 생성 모듈 오류")
-                elif not can_generate_anything: st.caption("견적 내용 확인 필요")
-                elif not st.session_state.get("customer_email"): st.caption("고객 이메일 필요")
-                else: st.caption("이메일 발송 불가")
-
         except Exception as calc_err_outer_display:
-            st.error(f"최종 견적 표시 중 외부 오류 발생: {calc_err_outer_display}")
+            st.error(f"최종 견적 계산 중 외부 오류 발생: {calc_err_outer_display}")
             traceback.print_exc()
-    else: # 차량 미선택 시
-        st.warning("⚠️ **차량을 먼저 선택해주세요.** 비용 계산, 요약 정보 표시 및 다운로드는 차량 선택 후 가능합니다.")
+            st.session_state.update({"calculated_cost_items_for_pdf": [], "total_cost_for_pdf": 0, "personnel_info_for_pdf": {}})
+
+    # 견적 결과/요약과 견적서 버튼은 별도 fragment: 버튼을 누르면 비용 계산 없이 이 부분만 다시 실행
+    _render_quote_view()
 
 # --- End of render_tab3 function ---
\ No newline at end of file
@@ -1,6 +1,8 @@
 # utils.py
 
 import re
+import json
+import hashlib
 from datetime import datetime
 import pytz # 시간대 처리를 위해 필요
 
@@ -39,6 +41,14 @@ def extract_phone_number_part(phone_str, length=4, default="번호없음"):
     else:
         return default # 숫자가 없으면 기본값 반환
 
+def compute_content_hash(data_dict):
+    """
+    견적 데이터를 정규화된 JSON(키 정렬, 공백 없음)으로 직렬화한 뒤 SHA-256 해시를 반환합니다.
+    저장 생략 판단과 '저장되지 않은 변경사항' 표시에 같은 값을 사용합니다.
+    """
+    canonical = json.dumps(data_dict, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
 def sanitize_phone_number(phone_str):
     """전화번호 문자열에서 숫자만 추출하여 반환합니다."""
     if not phone_str or not isinstance(phone_str, str):
@@ -88,4 +98,35 @@ def get_item_qty(state_data, item_name_to_find):
     # 모든 섹션에서 못 찾았으면 0 반환
     # print(f"Warning [get_item_qty]: Item '{item_name_to_find}' not found in any section for move type '{current_move_type}'.")
     return 0
-# --- !!! 함수 추가 완료 !!! ---
\ No newline at end of file
+# --- !!! 함수 추가 완료 !!! ---
+
+_item_key_order_cache = {} # 이사 유형 -> [(품목명, state 키)] (섹션 정의 순서)
+
+def _item_key_order(move_type):
+    """이사 유형의 (품목명, qty_ 키) 목록을 섹션 정의 순서대로 한 번만 만들어 둡니다."""
+    cached = _item_key_order_cache.get(move_type)
+    if cached is None:
+        cached = []
+        item_definitions_for_type = data.item_definitions.get(move_type, {}) if data and hasattr(data, 'item_definitions') else {}
+        if isinstance(item_definitions_for_type, dict):
+            for section, item_list in item_definitions_for_type.items():
+                if isinstance(item_list, list):
+                    cached.extend((item_name, f"qty_{move_type}_{section}_{item_name}") for item_name in item_list)
+        _item_key_order_cache[move_type] = cached
+    return cached
+
+def build_item_qty_index(state_data):
+    """
+    현재 이사 유형의 모든 품목 수량을 한 번에 읽어 {품목명: 수량}으로 반환합니다.
+    get_item_qty와 같은 규칙(state_data에 키가 있는 첫 섹션의 값, 변환 실패 시 0)을 따르며,
+    여러 품목을 조회할 때 품목마다 섹션 전체를 다시 검색하지 않도록 합니다.
+    """
+    current_move_type = state_data.get('base_move_type')
+    if not current_move_type or not data or not hasattr(data, 'item_definitions'):
+        return {}
+    qty_index = {}
+    for item_name, key in _item_key_order(current_move_type):
+        if item_name in qty_index or key not in state_data: continue
+        try: qty_index[item_name] = int(state_data.get(key, 0) or 0)
+        except (ValueError, TypeError): qty_index[item_name] = 0
+    return qty_index
\ No newline at end of file
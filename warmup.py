@@ -0,0 +1,103 @@
+# warmup.py
+# 서버 프로세스 시작 시 백그라운드 준비(warm-up)
+# 배포 직후 첫 고객이 PDF 글꼴 등록, Excel 템플릿 분석, Drive 서비스 생성(discovery 문서), 견적 인덱스 로딩 비용을
+# 부담하지 않도록 프로세스당 한 번 백그라운드 스레드에서 차례로 미리 준비합니다.
+# 각 작업은 원래 함수(pdf_generator.register_fonts 등)를 그대로 호출하고, 그 함수들은 자체 잠금/캐시로 한 번만 실행됩니다.
+# 따라서 준비 중에 들어온 요청은 필요한 자원의 잠금에서만 기다리고(다른 자원 준비는 기다리지 않음),
+# 아직 차례가 오지 않은 자원은 요청이 직접 만든 뒤 백그라운드 작업은 캐시를 확인하고 바로 끝납니다.
+
+import threading
+import time
+import traceback
+
+import streamlit as st
+
+import excel_filler
+import google_drive_helper as gdrive
+import pdf_generator
+
+_status_lock = threading.Lock()
+_status = {} # 작업 이름 -> {"label", "state": pending/running/ready/skipped/failed, "elapsed_ms", "error"}
+
+
+def _drive_configured():
+    try: return "gcp_service_account" in st.secrets
+    except Exception: return False # secrets.toml 자체가 없는 경우
+
+
+def _warm_fonts():
+    return pdf_generator.register_fonts()
+
+
+def _warm_excel_template():
+    return excel_filler.warm_up_template()
+
+
+def _warm_drive_service():
+    if not _drive_configured(): return None
+    gdrive.get_shared_drive_service()
+    return True
+
+
+def _warm_quote_index():
+    if not _drive_configured(): return None
+    gdrive.load_quote_index(gdrive.get_root_folder_id(), service=gdrive.get_shared_drive_service())
+    return True
+
+
+# (이름, 표시 이름, 준비 함수) - 준비 함수 반환값: True 준비됨, None 건너뜀(설정 없음), False 실패
+WARMUP_TASKS = [
+    ("fonts", "PDF 글꼴 등록", _warm_fonts),
+    ("excel_template", "Excel 견적서 템플릿", _warm_excel_template),
+    ("drive_service", "Google Drive 서비스", _warm_drive_service),
+    ("quote_index", "견적 인덱스", _warm_quote_index),
+]
+
+for _name, _label, _ in WARMUP_TASKS:
+    _status[_name] = {"label": _label, "state": "pending", "elapsed_ms": None, "error": None}
+
+
+def _set_status(name, **fields):
+    with _status_lock:
+        _status[name].update(fields)
+
+
+def _run_task(name, func):
+    _set_status(name, state="running")
+    started = time.perf_counter()
+    try:
+        result = func()
+        state, error = ("ready" if result else "skipped" if result is None else "failed"), None
+    except Exception as e:
+        print(f"ERROR [Warmup]: '{name}' failed: {e}")
+        traceback.print_exc()
+        state, error = "failed", str(e)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    _set_status(name, state=state, elapsed_ms=elapsed_ms, error=error)
+    print(f"INFO [Warmup]: {name} {state} in {elapsed_ms} ms")
+
+
+def _run_all():
+    for name, _, func in WARMUP_TASKS:
+        _run_task(name, func)
+
+
+@st.cache_resource(show_spinner=False)
+def start_warmup():
+    """프로세스당 한 번 백그라운드 준비 스레드를 시작합니다 (app.py에서 매 실행 호출해도 한 번만 시작)."""
+    thread = threading.Thread(target=_run_all, name="server-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_warmup_status():
+    """작업 순서대로 [{'name', 'label', 'state', 'elapsed_ms', 'error'}] (관리자 화면 표시용)"""
+    with _status_lock:
+        return [dict(_status[name], name=name) for name, _, _ in WARMUP_TASKS]
+
+
+def is_ready(name=None):
+    """name 자원(없으면 전체)의 준비가 끝났는지 (건너뛴 작업도 끝난 것으로 봄)."""
+    names = [name] if name else [task_name for task_name, _, _ in WARMUP_TASKS]
+    with _status_lock:
+        return all(_status[task_name]["state"] in ("ready", "skipped") for task_name in names)
\ No newline at end of file